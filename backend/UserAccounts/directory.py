@@ -0,0 +1,205 @@
+"""
+=========================================================
+USER DIRECTORY (in-memory prefix index over accounts)
+=========================================================
+
+Purpose:
+- Backs GET /users/search?q= for the invite picker (InviteUserSearch).
+  The accounts table only has exact-match lookups (login, /register), and
+  `LIKE 'q%'` on email cannot use the UNIQUE index case-insensitively.
+
+How:
+- One sorted list of (key, accountID).  Every account is filed under its
+  normalized (lower-case) email and under each part of the email's local
+  part, so "jane.doe@unco.edu" is found by "jane", "jane.d" and "doe".
+- search() is a bisect to the first key >= q and a walk forward while
+  keys still start with q, stopping at the result cap: O(log n + limit),
+  well under a millisecond at 50k accounts.
+- Kept in step by the code that writes accounts: routes/auth.py /verify and
+  UserAccount.create_account call add(), UserAccount.delete_account calls
+  remove().  Each is one insort/delete per key.
+
+Staleness:
+- Other worker processes' sign-ups are picked up by a background thread
+  that rebuilds every USER_DIRECTORY_REFRESH_SECONDS (start_refresher(),
+  from main.py's startup).  A rebuild reads and sorts every account
+  without the lock and only swaps the new index in under it, so a search
+  never waits for one.  Before the first build (warm-up off or still
+  running) a search starts one in the background and answers from the
+  accounts add() has filed so far.
+
+Settings:
+- USER_DIRECTORY_REFRESH_SECONDS  default 300 (0 = build once, no refresher thread)
+- USER_SEARCH_MAX_RESULTS         default 20 (largest limit accepted)
+"""
+
+import bisect
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from db import connection
+
+REFRESH_SECONDS = float(os.environ.get("USER_DIRECTORY_REFRESH_SECONDS", "300"))
+MAX_RESULTS = int(os.environ.get("USER_SEARCH_MAX_RESULTS", "20"))
+
+_NAME_SEPARATORS = re.compile(r"[._+\-]+")
+
+_lock = threading.Lock()
+_rebuild_lock = threading.Lock()
+_keys: list[tuple[str, int]] = []
+_accounts: dict[int, tuple[str, str]] = {}  # accountID -> (email, accountType)
+_built_at: Optional[float] = None
+# While rebuild() reads the table, add/remove calls are also queued here
+_pending: Optional[list[tuple[int, Optional[str], Optional[str]]]] = None  # email None = remove
+_refresher: Optional[threading.Thread] = None
+
+
+def normalize(text: str) -> str:
+    return text.strip().lower()
+
+
+def _keys_for(email: str) -> set[str]:
+    email = normalize(email)
+    local = email.split("@", 1)[0]
+    return {email, *(part for part in _NAME_SEPARATORS.split(local) if part)}
+
+
+def _insert(account_id: int, email: str, account_type: str) -> None:
+    """Caller holds _lock."""
+    _delete(account_id)
+    _accounts[account_id] = (email, account_type)
+    for key in _keys_for(email):
+        bisect.insort(_keys, (key, account_id))
+
+
+def _delete(account_id: int) -> None:
+    """Caller holds _lock."""
+    entry = _accounts.pop(account_id, None)
+    if entry is None:
+        return
+    for key in _keys_for(entry[0]):
+        index = bisect.bisect_left(_keys, (key, account_id))
+        if index < len(_keys) and _keys[index] == (key, account_id):
+            del _keys[index]
+
+
+# -----------------------------
+# INCREMENTAL UPDATES
+# -----------------------------
+def add(account_id: int | str, email: str, account_type: str) -> None:
+    """File a new (or changed) account.  Call after the INSERT commits."""
+    account_id = int(account_id)
+    with _lock:
+        if _pending is not None:
+            _pending.append((account_id, email, account_type))
+        _insert(account_id, email, account_type)
+
+
+def remove(account_id: int | str) -> None:
+    """Drop a deleted account."""
+    try:
+        account_id = int(account_id)
+    except (TypeError, ValueError):
+        return
+    with _lock:
+        if _pending is not None:
+            _pending.append((account_id, None, None))
+        _delete(account_id)
+
+
+# -----------------------------
+# BUILD
+# -----------------------------
+def rebuild(conn: Optional[sqlite3.Connection] = None) -> dict:
+    """Reload every account from the database.  Also a warm-up step and the refresher's job."""
+    global _keys, _accounts, _built_at, _pending
+    with _rebuild_lock:
+        with _lock:
+            _pending = []
+        try:
+            with connection.use(conn) as conn:
+                rows = conn.execute("SELECT accountID, email, accountType FROM accounts").fetchall()
+            # Sorted without the lock; searches keep using the old index meanwhile
+            accounts = {row[0]: (row[1], row[2]) for row in rows}
+            keys = sorted((key, account_id) for account_id, (email, _) in accounts.items() for key in _keys_for(email))
+            with _lock:
+                _keys, _accounts, _built_at = keys, accounts, time.monotonic()
+                for account_id, email, account_type in _pending:
+                    if email is None:
+                        _delete(account_id)
+                    else:
+                        _insert(account_id, email, account_type)
+        finally:
+            with _lock:
+                _pending = None
+    return {"accounts": len(accounts)}
+
+
+def _stale() -> bool:
+    if _built_at is None:
+        return True
+    return REFRESH_SECONDS > 0 and time.monotonic() - _built_at > REFRESH_SECONDS
+
+
+def _refresh_forever() -> None:
+    while True:
+        if _stale():
+            try:
+                rebuild()
+            except sqlite3.Error as e:
+                print(f"[user_directory] rebuild failed: {e}")
+        if REFRESH_SECONDS <= 0 and _built_at is not None:
+            return
+        wait = 1.0 if _built_at is None else _built_at + REFRESH_SECONDS - time.monotonic()
+        time.sleep(max(wait, 1.0))
+
+
+def start_refresher(force: bool = False) -> Optional[threading.Thread]:
+    """
+    Start the background rebuild thread (once per process).  Without
+    ``force`` only when USER_DIRECTORY_REFRESH_SECONDS > 0; with it, a
+    one-off first build when REFRESH_SECONDS is 0.
+    """
+    global _refresher
+    if REFRESH_SECONDS <= 0 and not force:
+        return None
+    with _lock:
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = threading.Thread(target=_refresh_forever, name="user-directory-refresher", daemon=True)
+            _refresher.start()
+    return _refresher
+
+
+# -----------------------------
+# SEARCH
+# -----------------------------
+def search(query: str, limit: int = MAX_RESULTS) -> list[dict]:
+    """Accounts whose email, or a part of its local part, starts with ``query``; email order."""
+    if _built_at is None:
+        start_refresher(force=True)  # never built here yet; don't make this request wait for it
+    prefix = normalize(query)
+    limit = min(limit, MAX_RESULTS)
+    if not prefix or limit <= 0:
+        return []
+    found: list[int] = []
+    seen: set[int] = set()
+    with _lock:
+        index = bisect.bisect_left(_keys, (prefix,))
+        while index < len(_keys) and len(found) < limit:
+            key, account_id = _keys[index]
+            if not key.startswith(prefix):
+                break
+            if account_id not in seen:
+                seen.add(account_id)
+                found.append(account_id)
+            index += 1
+        results = [(account_id, *_accounts[account_id]) for account_id in found]
+    results.sort(key=lambda r: r[1])
+    return [
+        {"accountID": account_id, "email": email, "accountType": account_type}
+        for account_id, email, account_type in results
+    ]
@@ -0,0 +1,148 @@
+"""
+=========================================================
+PASSWORD HASHING (bcrypt on a bounded process pool)
+=========================================================
+
+Purpose:
+- Hash new passwords and check login attempts with bcrypt.
+- Every bcrypt call costs ~100 ms of pure CPU, so hash/verify run on
+  workers/process_pool.py instead of the thread serving the request.  A
+  login burst can then only occupy PASSWORD_HASH_WORKERS cores and a short
+  admission queue; everything beyond that gets PoolBusy (HTTP 503) instead
+  of starving event reads.
+
+What Changed:
+- Accounts created before hashing still hold plaintext.  verify_password()
+  accepts those rows and reports `needs_rehash`, so UserAccount.login can
+  swap in a hash after the first successful login.  The same flag is set
+  when a hash was made with a different BCRYPT_ROUNDS than configured.
+
+Calibration:
+    python -m UserAccounts.passwords --target-ms 250
+prints the time per hash for a range of cost factors on this machine and
+recommends the largest one under the target.  Run it on the Fly machine
+itself (1 shared vCPU) before changing BCRYPT_ROUNDS.
+"""
+
+import hmac
+import os
+import time
+
+import bcrypt
+
+from workers.process_pool import BoundedProcessPool, PoolBusy
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+MAX_PASSWORD_BYTES = 72  # bcrypt ignores (and bcrypt>=5 rejects) anything longer
+
+pool = BoundedProcessPool(
+    "password-hash",
+    max_workers=int(os.environ.get("PASSWORD_HASH_WORKERS", "1")),
+    max_queue=int(os.environ.get("PASSWORD_HASH_QUEUE", "8")),
+    admission_timeout=float(os.environ.get("PASSWORD_HASH_ADMISSION_TIMEOUT", "0.5")),
+)
+
+
+# -----------------------------
+# WORKER FUNCTIONS (run in the pool processes)
+# -----------------------------
+def _hash(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+# -----------------------------
+# PUBLIC HELPERS
+# -----------------------------
+def is_hashed(stored: str | bytes | None) -> bool:
+    """True if ``stored`` looks like a bcrypt hash rather than a legacy plaintext password."""
+    if stored is None:
+        return False
+    if isinstance(stored, (bytes, bytearray)):
+        stored = bytes(stored).decode("utf-8", "replace")
+    return len(stored) == 60 and stored[:4] in ("$2a$", "$2b$", "$2y$")
+
+
+def _rounds_of(hashed: str) -> int:
+    return int(hashed[4:6])
+
+
+def _encode(password: str) -> bytes:
+    raw = password.encode("utf-8")
+    if len(raw) > MAX_PASSWORD_BYTES:
+        raise ValueError(f"Password must be at most {MAX_PASSWORD_BYTES} bytes")
+    return raw
+
+
+def hash_password(password: str) -> str:
+    """Return a bcrypt hash (as text) for storing in accounts.password."""
+    return pool.run(_hash, _encode(password), BCRYPT_ROUNDS).decode("utf-8")
+
+
+def verify_password(password: str, stored: str | bytes | None) -> tuple[bool, bool]:
+    """
+    Check ``password`` against the stored value.
+    Returns (matches, needs_rehash).
+    """
+    if stored is None:
+        return False, False
+    if isinstance(stored, (bytes, bytearray)):
+        stored = bytes(stored).decode("utf-8", "replace")
+
+    if not is_hashed(stored):
+        # Legacy plaintext row: compare in constant time, then upgrade it
+        ok = hmac.compare_digest(stored.encode("utf-8"), password.encode("utf-8"))
+        return ok, ok
+
+    try:
+        raw = _encode(password)
+    except ValueError:
+        return False, False
+    ok = pool.run(_check, raw, stored.encode("utf-8"))
+    return ok, ok and _rounds_of(stored) != BCRYPT_ROUNDS
+
+
+# -----------------------------
+# COST-FACTOR CALIBRATION
+# -----------------------------
+def calibrate(rounds_range=range(8, 15), samples: int = 3) -> list[tuple[int, float]]:
+    """Median milliseconds per hash for each cost factor, measured in-process."""
+    results = []
+    for rounds in rounds_range:
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            _hash(b"calibration-password", rounds)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        results.append((rounds, timings[len(timings) // 2]))
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure bcrypt cost factors on this machine.")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Upper bound for one hash")
+    parser.add_argument("--min-rounds", type=int, default=8)
+    parser.add_argument("--max-rounds", type=int, default=14)
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"CPUs visible: {os.cpu_count()}  current BCRYPT_ROUNDS={BCRYPT_ROUNDS}")
+    best = None
+    for rounds, ms in calibrate(range(args.min_rounds, args.max_rounds + 1), args.samples):
+        per_core = 1000 / ms if ms else float("inf")
+        print(f"rounds={rounds:2d}  {ms:8.1f} ms/hash  ~{per_core:6.1f} logins/s per core")
+        if ms <= args.target_ms:
+            best = rounds
+    if best is None:
+        print(f"No cost factor fits under {args.target_ms} ms; use {args.min_rounds} and a bigger machine.")
+    else:
+        print(f"Recommended: BCRYPT_ROUNDS={best}")
@@ -0,0 +1,69 @@
+"""
+=========================================================
+ACCOUNT ROLE CACHE
+=========================================================
+
+Purpose:
+- Small in-process TTL + LRU cache of accountID -> accountType.
+- Lets events/authorization.py skip the accounts lookup for users who
+  keep editing/deleting, which is the common case.
+
+What Changed:
+- Entries expire after ROLE_CACHE_TTL seconds, and the least recently used
+  entry is dropped once ROLE_CACHE_SIZE is reached.
+- Anything that creates or deletes an account calls invalidate() so this
+  process never serves a stale role.  Other workers converge within the TTL.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+ROLE_CACHE_TTL_SECONDS = float(os.environ.get("ROLE_CACHE_TTL", "60"))
+ROLE_CACHE_SIZE = int(os.environ.get("ROLE_CACHE_SIZE", "2048"))
+
+_entries: "OrderedDict[int, tuple[float, str]]" = OrderedDict()
+_lock = threading.Lock()
+
+hits = 0
+misses = 0
+
+
+def get(account_id: int) -> Optional[str]:
+    """Cached accountType for ``account_id`` or None on a miss."""
+    global hits, misses
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(account_id)
+        if entry is None or now - entry[0] > ROLE_CACHE_TTL_SECONDS:
+            if entry is not None:
+                del _entries[account_id]
+            misses += 1
+            return None
+        _entries.move_to_end(account_id)
+        hits += 1
+        return entry[1]
+
+
+def put(account_id: int, account_type: str) -> None:
+    with _lock:
+        _entries[account_id] = (time.monotonic(), account_type)
+        _entries.move_to_end(account_id)
+        while len(_entries) > ROLE_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def invalidate(account_id: int | str) -> None:
+    try:
+        key = int(account_id)
+    except (TypeError, ValueError):
+        return
+    with _lock:
+        _entries.pop(key, None)
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
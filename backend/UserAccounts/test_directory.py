@@ -0,0 +1,112 @@
+"""
+User directory: prefix matches on email and name parts, incremental
+add/remove through /verify and delete_account, the cap, and speed at 50k.
+
+Run from the backend folder:
+    python -m pytest UserAccounts/test_directory.py
+"""
+
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from UserAccounts import directory
+
+
+@pytest.fixture
+def empty(monkeypatch):
+    monkeypatch.setattr(directory, "_keys", [])
+    monkeypatch.setattr(directory, "_accounts", {})
+    monkeypatch.setattr(directory, "_built_at", time.monotonic())
+    monkeypatch.setattr(directory, "REFRESH_SECONDS", 0)
+    return directory
+
+
+def _emails(results):
+    return [r["email"] for r in results]
+
+
+def test_matches_email_and_name_parts(empty):
+    empty.add(1, "Jane.Doe@unco.edu", "Student")
+    empty.add(2, "john_doerr@unco.edu", "Faculty")
+    empty.add(3, "janet@unco.edu", "Student")
+    assert _emails(empty.search("jane")) == ["Jane.Doe@unco.edu", "janet@unco.edu"]
+    assert _emails(empty.search("  DOE")) == ["Jane.Doe@unco.edu", "john_doerr@unco.edu"]
+    assert _emails(empty.search("jane.d")) == ["Jane.Doe@unco.edu"]
+    assert empty.search("x") == [] and empty.search(" ") == []
+
+    empty.remove(1)
+    empty.add(3, "janet.w@unco.edu", "Faculty")  # changed address replaces the old keys
+    assert _emails(empty.search("jane")) == ["janet.w@unco.edu"]
+    assert empty.search("doe")[0]["accountType"] == "Faculty"
+    assert len(empty._keys) == 6
+
+
+def test_results_are_capped(empty, monkeypatch):
+    monkeypatch.setattr(empty, "MAX_RESULTS", 5)
+    for account_id in range(30):
+        empty.add(account_id, f"student{account_id}@unco.edu", "Student")
+    assert len(empty.search("student")) == 5
+    assert len(empty.search("student", limit=2)) == 2
+
+
+def test_search_is_sub_millisecond_at_50k(empty):
+    for account_id in range(50_000):
+        empty._accounts[account_id] = (f"user{account_id}.last{account_id % 997}@unco.edu", "Student")
+    empty._keys[:] = sorted(
+        (key, account_id) for account_id, (email, _) in empty._accounts.items() for key in empty._keys_for(email)
+    )
+    queries = ["user4", "last99", "user49999", "zzz", "u"]
+    start = time.perf_counter()
+    for _ in range(200):
+        for q in queries:
+            empty.search(q, limit=20)
+    per_call = (time.perf_counter() - start) / (200 * len(queries))
+    assert per_call < 0.001
+
+
+def test_rebuild_does_not_block_search(empty):
+    empty.add(1, "old.timer@unco.edu", "Student")
+    started, release = threading.Event(), threading.Event()
+
+    class SlowConnection:
+        def execute(self, sql):
+            started.set()
+            release.wait(5)
+            return self
+
+        def fetchall(self):
+            return [(2, "olive.new@unco.edu", "Faculty")]
+
+    rebuilding = threading.Thread(target=empty.rebuild, args=(SlowConnection(),))
+    rebuilding.start()
+    assert started.wait(5)
+    start = time.perf_counter()
+    assert [r["accountID"] for r in empty.search("ol")] == [1]
+    assert time.perf_counter() - start < 0.5
+    empty.add(3, "olga.signup@unco.edu", "Student")  # replayed onto the new index
+    release.set()
+    rebuilding.join(5)
+    assert [r["accountID"] for r in empty.search("ol")] == [3, 2]
+
+
+def test_endpoint_follows_verify_and_delete(monkeypatch):
+    from main import app
+    from routes import auth
+
+    monkeypatch.setattr(auth, "DEV_ECHO", True)  # /register returns the code
+    with TestClient(app) as client:
+        code = client.post("/register", json={
+            "email": "Quincy.Adams@unco.edu", "password": "Sup3r-secret!", "accountType": "Student",
+        }).json()["dev_code"]
+        assert client.get("/users/search", params={"q": "adams"}).json() == []
+        account_id = client.post("/verify", json={"email": "Quincy.Adams@unco.edu", "code": code}).json()["accountID"]
+
+        found = client.get("/users/search", params={"q": "quin"}).json()
+        assert found == [{"accountID": account_id, "email": "Quincy.Adams@unco.edu", "accountType": "Student"}]
+
+        client.delete(f"/account/{account_id}")
+        assert client.get("/users/search", params={"q": "quin"}).json() == []
+        assert client.get("/users/search", params={"q": ""}).status_code == 422
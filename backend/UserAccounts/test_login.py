@@ -0,0 +1,73 @@
+"""
+Login: legacy plaintext rows upgraded to bcrypt on a correct login, the
+upgrade being best effort when the hash pool is busy, and a busy pool
+during the check itself answering 503 with Retry-After.
+
+Run from the backend folder:
+    python -m pytest UserAccounts/test_login.py
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from db import connection
+from UserAccounts import passwords
+
+PLAIN = "correct horse"
+
+
+@pytest.fixture
+def client():
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+def _legacy_account(account_id: int, email: str) -> None:
+    with connection.use() as conn:
+        conn.execute("DELETE FROM accounts WHERE accountID = ?", (account_id,))
+        conn.execute(
+            "INSERT INTO accounts (accountID, accountType, email, password, isVerified) VALUES (?, 'Student', ?, ?, 1)",
+            (account_id, email, PLAIN),
+        )
+
+
+def _stored(account_id: int) -> str:
+    with connection.use() as conn:
+        return conn.execute("SELECT password FROM accounts WHERE accountID = ?", (account_id,)).fetchone()[0]
+
+
+def test_correct_login_rehashes_legacy_password(client):
+    _legacy_account(9950, "legacy@unco.edu")
+    assert client.post("/login", json={"email": "legacy@unco.edu", "password": "wrong"}).status_code == 401
+    assert _stored(9950) == PLAIN
+
+    res = client.post("/login", json={"email": "legacy@unco.edu", "password": PLAIN})
+    assert res.status_code == 200 and res.json()["accountID"] == 9950
+    assert passwords.is_hashed(_stored(9950))
+    # And the upgraded hash still lets them in
+    assert client.post("/login", json={"email": "legacy@unco.edu", "password": PLAIN}).status_code == 200
+
+
+def test_busy_pool_skips_the_rehash_not_the_login(client, monkeypatch):
+    _legacy_account(9951, "legacy.busy@unco.edu")
+
+    def busy(password):
+        raise passwords.PoolBusy("password", retry_after=2)
+
+    monkeypatch.setattr(passwords, "hash_password", busy)
+    res = client.post("/login", json={"email": "legacy.busy@unco.edu", "password": PLAIN})
+    assert res.status_code == 200 and res.json()["accountID"] == 9951
+    assert _stored(9951) == PLAIN  # upgraded on a later login
+
+
+def test_busy_pool_during_the_check_is_503(client, monkeypatch):
+    _legacy_account(9952, "legacy.check@unco.edu")
+
+    def busy(password, stored):
+        raise passwords.PoolBusy("password", retry_after=2)
+
+    monkeypatch.setattr(passwords, "verify_password", busy)
+    res = client.post("/login", json={"email": "legacy.check@unco.edu", "password": PLAIN})
+    assert res.status_code == 503 and res.headers["retry-after"] == "2"
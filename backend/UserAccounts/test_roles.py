@@ -0,0 +1,54 @@
+"""
+Role cache: filled by the authorization check, dropped when the account
+is deleted (so a reused accountID never inherits the old role), expiry
+after the TTL, and the LRU cap.
+
+Run from the backend folder:
+    python -m pytest UserAccounts/test_roles.py
+"""
+
+from db import connection
+from events import authorization
+from events import create as events_create
+from UserAccounts import roles
+from UserAccounts.userAccount import ua
+
+HOST = 9860
+DEAN = 9861
+
+
+def test_deleted_account_loses_its_cached_role():
+    with connection.use() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO accounts (accountID, accountType, email, password, isVerified) VALUES (?, ?, ?, 'x', 1)",
+            [(HOST, "Student", "roles.host@unco.edu"), (DEAN, "Faculty", "roles.dean@unco.edu")],
+        )
+        event_id = events_create.create_event(HOST, "Role Check", "d", "UC", "Art", "2035-01-01 10:00:00", conn=conn)
+    roles.invalidate(DEAN)
+
+    assert authorization.check(event_id, DEAN) == authorization.ALLOWED
+    assert roles.get(DEAN) == "Faculty"  # cached by the check
+
+    ua.delete_account(DEAN)
+    assert roles.get(DEAN) is None
+    assert authorization.check(event_id, DEAN) == authorization.USER_NOT_FOUND
+
+    # The ID comes back as a Student: no Faculty rights left over
+    with connection.use() as conn:
+        conn.execute(
+            "INSERT INTO accounts (accountID, accountType, email, password, isVerified) VALUES (?, 'Student', ?, 'x', 1)",
+            (DEAN, "roles.reused@unco.edu"),
+        )
+    assert authorization.check(event_id, DEAN) == authorization.FORBIDDEN
+
+
+def test_entries_expire_and_are_capped(monkeypatch):
+    monkeypatch.setattr(roles, "ROLE_CACHE_SIZE", 2)
+    roles.clear()
+    for account_id in (1, 2, 3):
+        roles.put(account_id, "Student")
+    assert roles.get(1) is None and roles.get(3) == "Student"  # least recently used dropped
+
+    monkeypatch.setattr(roles, "ROLE_CACHE_TTL_SECONDS", -1)
+    assert roles.get(3) is None
+    roles.clear()
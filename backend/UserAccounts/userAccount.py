@@ -1,19 +1,14 @@
-import sqlite3
-import os
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Optional
+import sqlite3
 
-router = APIRouter()
-
-# -----------------------------
-# DATABASE PATH
-# -----------------------------
-DB_PATH = os.environ.get("DB_PATH", "/data/EventPlannerDB.db")
-
-def _get_conn():
-    return sqlite3.connect(DB_PATH)
+from UserAccounts import directory
+from UserAccounts import passwords
+from UserAccounts import roles
+from db import connection
 
+router = APIRouter()
 
 # -----------------------------
 # User Account Logic
@@ -21,7 +16,7 @@ def _get_conn():
 class UserAccount:
     def create_account(self, accountID: str, accountType: str, password: str, email: str):
         """Create a new account in the database."""
-        with _get_conn() as conn:
+        with connection.use() as conn:
             cur = conn.cursor()
             # Check if email already exists
             cur.execute("SELECT accountID FROM accounts WHERE email = ?", (email,))
@@ -29,32 +24,56 @@ class UserAccount:
                 raise ValueError("Email already registered")
             cur.execute(
                 "INSERT INTO accounts (accountID, accountType, password, email) VALUES (?, ?, ?, ?)",
-                (accountID, accountType, password, email)
+                (accountID, accountType, passwords.hash_password(password), email)
             )
             conn.commit()
+            roles.invalidate(accountID)
+            directory.add(accountID, email, accountType)
             return "123456"  # You can replace with actual verification code logic
 
     def login(self, email: str, password: str):
         """Check login credentials against the database."""
-        with _get_conn() as conn:
+        # Only the lookup holds a connection; bcrypt runs after it is closed
+        with connection.use() as conn:
             cur = conn.cursor()
             cur.execute(
                 "SELECT accountID, accountType, password FROM accounts WHERE email = ?",
                 (email,)
             )
             row = cur.fetchone()
-            if not row:
-                return False, "Email not found"
+        if not row:
+            return False, "Email not found"
+
+        accountID, accountType, stored_password = row
+        matches, needs_rehash = passwords.verify_password(password, stored_password)
+        if not matches:
+            return False, "Incorrect password"
 
-            accountID, accountType, stored_password = row
-            if stored_password != password:
-                return False, "Incorrect password"
+        if needs_rehash:
+            self._rehash(accountID, password, stored_password)
 
-            return True, {
-                "id": accountID,
-                "email": email,
-                "role": accountType
-            }
+        return True, {
+            "id": accountID,
+            "email": email,
+            "role": accountType
+        }
+
+    def _rehash(self, accountID, password: str, stored_password) -> None:
+        """
+        Legacy plaintext (or old cost factor): upgrade in place, best effort.
+        The password was right, so a busy hash pool or a locked database
+        only postpones the upgrade to the next login instead of failing it.
+        """
+        try:
+            new_hash = passwords.hash_password(password)
+            with connection.use() as conn:
+                # The WHERE on the old value keeps a concurrent change from being lost
+                conn.execute(
+                    "UPDATE accounts SET password = ? WHERE accountID = ? AND password = ?",
+                    (new_hash, accountID, stored_password)
+                )
+        except (passwords.PoolBusy, sqlite3.Error) as e:
+            print(f"[login] password rehash for account {accountID} skipped: {e!r}")
 
     def verify_code(self, accountID: str, code: str):
         """Stub for verification code."""
@@ -62,10 +81,12 @@ class UserAccount:
 
     def delete_account(self, accountID: str):
         """Delete account by ID."""
-        with _get_conn() as conn:
+        with connection.use() as conn:
             cur = conn.cursor()
             cur.execute("DELETE FROM accounts WHERE accountID = ?", (accountID,))
             conn.commit()
+        roles.invalidate(accountID)
+        directory.remove(accountID)
 
 
 # -----------------------------
@@ -99,7 +120,14 @@ class VerifyRequest(BaseModel):
 
 @router.post("/login")
 def login(data: LoginRequest):
-    success, result = ua.login(data.email, data.password)
+    try:
+        success, result = ua.login(data.email, data.password)
+    except passwords.PoolBusy as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-ins right now, please retry",
+            headers={"Retry-After": str(int(e.retry_after))},
+        )
     if success:
         return {
             "accountID": result["id"],
@@ -108,6 +136,14 @@ def login(data: LoginRequest):
         }
     raise HTTPException(status_code=401, detail=result)
 
+@router.get("/users/search")
+def search_users(
+    q: str = Query(..., min_length=1, description="Start of an email address or name"),
+    limit: int = Query(10, ge=1, le=directory.MAX_RESULTS),
+):
+    """Prefix search over account emails for the invite picker (UserAccounts/directory.py)."""
+    return directory.search(q, limit)
+
 @router.delete("/account/{accountID}")
 def delete(accountID: str):
     ua.delete_account(accountID)
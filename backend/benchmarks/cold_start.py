@@ -0,0 +1,131 @@
+"""
+=========================================================
+COLD START BENCHMARK (time to first successful /events)
+=========================================================
+
+What it measures, per run:
+- A fresh `uvicorn main:app` process is started against the synthetic
+  database, with the DB file evicted from the OS page cache first
+  (posix_fadvise DONTNEED, no root needed) so SQLite really reads from disk.
+- first_events_ms: process spawn -> first 200 from GET /events.  This is
+  what the first visitor after Fly stopped the machine waits for.
+- ready_ms: process spawn -> GET /ready turns 200 (warm-up finished).
+- The boot phases and slowest imports reported by /ready.
+
+Runs alternate between WARMUP=1 and WARMUP=0 (see startup/warmup.py) so the
+effect of the background warm-up is visible in one result file.
+
+Usage (from the backend folder):
+    python -m benchmarks.cold_start --events 5000 --runs 5
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks import dataset as bench_dataset
+from benchmarks.results import summarize, write_results
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def evict_page_cache(db_path: str) -> None:
+    for path in (db_path, db_path + "-wal"):
+        if os.path.exists(path) and hasattr(os, "posix_fadvise"):
+            with open(path, "rb") as fh:
+                os.posix_fadvise(fh.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def _poll(client: httpx.Client, url: str, deadline: float) -> float | None:
+    """Seconds (perf_counter) at which ``url`` first answered 200, or None."""
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(url).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    return None
+
+
+def one_run(db_path: str, warmup: bool, timeout: float = 60.0) -> dict:
+    port = _free_port()
+    env = {
+        **os.environ,
+        "DB_PATH": db_path,
+        "WARMUP": "1" if warmup else "0",
+        "OUTBOX_WORKERS": "0",
+    }
+    evict_page_cache(db_path)
+    spawned = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        with httpx.Client(timeout=timeout) as client:
+            deadline = spawned + timeout
+            first_events = _poll(client, base + "/events", deadline)
+            ready = _poll(client, base + "/ready", deadline)
+            second = time.perf_counter()
+            client.get(base + "/events")
+            second_ms = (time.perf_counter() - second) * 1000
+            boot = client.get(base + "/ready").json().get("boot", {}) if ready else {}
+    finally:
+        proc.terminate()
+        proc.wait(10)
+    return {
+        "warmup": warmup,
+        "first_events_ms": round((first_events - spawned) * 1000, 1) if first_events else None,
+        "ready_ms": round((ready - spawned) * 1000, 1) if ready else None,
+        "warm_events_ms": round(second_ms, 1),
+        "phases_ms": boot.get("phases_ms", {}),
+        "slowest_imports": boot.get("slowest_imports", [])[:10],
+    }
+
+
+def run(db_path: str, runs: int = 3) -> dict:
+    results: dict = {"runs": []}
+    for i in range(runs * 2):
+        results["runs"].append(one_run(db_path, warmup=(i % 2 == 0)))
+    for mode in (True, False):
+        label = "warmup_on" if mode else "warmup_off"
+        rows = [r for r in results["runs"] if r["warmup"] is mode]
+        results[label] = {
+            "first_events": summarize(r["first_events_ms"] for r in rows if r["first_events_ms"]),
+            "ready": summarize(r["ready_ms"] for r in rows if r["ready_ms"]),
+            "warm_events": summarize(r["warm_events_ms"] for r in rows),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold start: time to first successful /events.")
+    bench_dataset.add_arguments(parser)
+    parser.add_argument("--runs", type=int, default=3, help="Runs per mode (warm-up on/off)")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    summary = bench_dataset.from_arguments(args)
+    results = run(summary["db_path"], args.runs)
+    for label in ("warmup_on", "warmup_off"):
+        stats = results[label]
+        print(f"{label:11s} first /events p50 {stats['first_events'].get('p50_ms')} ms  "
+              f"ready p50 {stats['ready'].get('p50_ms')} ms  next /events p50 {stats['warm_events'].get('p50_ms')} ms")
+    if results["runs"] and results["runs"][0]["slowest_imports"]:
+        print("slowest imports:", ", ".join(
+            f"{m['module']} {m['cumulative_ms']:.0f}ms" for m in results["runs"][0]["slowest_imports"][:5]
+        ))
+    print("wrote", write_results("cold_start", results, summary, args.out))
@@ -0,0 +1,247 @@
+"""
+=========================================================
+SYNTHETIC CAMPUS DATASET GENERATOR
+=========================================================
+
+Purpose:
+- Builds a throwaway EventPlannerDB with realistic volume and skew so the
+  micro-benchmarks and load test have something to chew on.
+
+Shape of the data:
+- N accounts (~10% Faculty), M events spread over the next few months.
+- A configurable fraction of events carry an image of roughly the size a
+  phone upload ends up as, written to the image store next to the
+  database (events/image_store.py layout, one reference each).
+- Likes and RSVPs follow a Zipf-like distribution: a handful of events
+  are very popular and most get little attention, which is what makes
+  per-event N+1 queries and big `rsvps` arrays hurt.
+
+Usage (from the backend folder):
+    python -m benchmarks.dataset --db /tmp/bench.db --accounts 2000 --events 5000
+    python -m benchmarks.dataset --db /tmp/bench.db --from-snapshot 20251019-020000-000000
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from db import snapshots
+from db.currentDB import create_database
+from events import image_store
+
+EVENT_TYPES = [
+    "Art", "Math", "Science", "Computer Science", "History",
+    "Education", "Political Science", "Software Engineering",
+    "Business", "Sports", "Honors", "Workshops",
+    "Study Session", "Dissertation", "Performance", "Competition",
+]
+LOCATIONS = [
+    "University Center Ballroom", "Michener Library", "Ross Hall 1250",
+    "Candelaria Hall", "Kepner Hall", "Butler-Hancock Gym", "Nottingham Field",
+    "Campus Commons", "Gunter Hall", "McKee Hall", "Lindou Hall",
+]
+TITLE_WORDS = [
+    "Intro", "Advanced", "Night", "Workshop", "Seminar", "Showcase", "Meetup",
+    "Hackathon", "Lecture", "Panel", "Open House", "Tournament", "Review",
+    "Recital", "Colloquium", "Social", "Bootcamp", "Clinic",
+]
+DESCRIPTION_WORDS = (
+    "bring friends snacks provided faculty students research careers project "
+    "networking practice study exam prep guest speaker live music teams prizes "
+    "coding robotics painting statistics history debate chemistry biology"
+).split()
+
+
+def _fake_image(rng: random.Random, size: int) -> bytes:
+    # JPEG SOI/APP0 header followed by noise: the bytes only need to look
+    # like an upload for size/encoding purposes.
+    header = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00"
+    return header + rng.randbytes(max(size - len(header), 0))
+
+
+def _zipf_weights(n: int, s: float) -> list[float]:
+    return [1.0 / ((rank + 1) ** s) for rank in range(n)]
+
+
+def generate(
+    db_path: str,
+    accounts: int = 1000,
+    events: int = 2000,
+    image_ratio: float = 0.3,
+    image_kb: int = 200,
+    likes_per_account: float = 8.0,
+    rsvps_per_account: float = 3.0,
+    skew: float = 1.1,
+    categories_per_event: int = 1,
+    seed: int = 350,
+) -> dict:
+    """Create a fresh database at ``db_path`` and fill it.  Returns a summary dict."""
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    store_root = image_store.default_root(db_path)
+    shutil.rmtree(store_root, ignore_errors=True)
+    create_database(db_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    cur = conn.cursor()
+
+    # Accounts -------------------------------------------------------------
+    account_rows = []
+    for account_id in range(accounts):
+        account_type = "Faculty" if rng.random() < 0.1 else "Student"
+        account_rows.append((account_id, account_type, f"user{account_id}@unco.edu", "bench-password", 1))
+    cur.executemany(
+        "INSERT INTO accounts (accountID, accountType, email, password, isVerified) VALUES (?, ?, ?, ?, ?)",
+        account_rows,
+    )
+
+    # Events ---------------------------------------------------------------
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    event_rows = []
+    blob_rows = []
+    for event_id in range(1, events + 1):
+        start = now + timedelta(days=rng.randint(1, 120), hours=rng.randint(8, 20))
+        image_hash = None
+        if rng.random() < image_ratio:
+            image = _fake_image(rng, int(rng.uniform(0.5, 1.5) * image_kb * 1024))
+            image_hash = hashlib.sha256(image).hexdigest()
+            path = image_store.path_for(image_hash, store_root)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(image)
+            blob_rows.append((image_hash, len(image), "image/jpeg", 1, time.time()))
+        access = rng.choices(["Public", "Private", "Inactive"], weights=[85, 10, 5])[0]
+        is_priced = rng.random() < 0.2
+        event_rows.append((
+            event_id,
+            rng.randrange(accounts),
+            f"{rng.choice(TITLE_WORDS)} {rng.choice(EVENT_TYPES)} {rng.choice(TITLE_WORDS)}",
+            rng.choice(EVENT_TYPES),
+            " ".join(rng.choices(DESCRIPTION_WORDS, k=rng.randint(8, 40))),
+            rng.choice(LOCATIONS),
+            image_hash,
+            access,
+            start.strftime("%Y-%m-%d %H:%M:%S"),
+            int(rng.random() < 0.3),
+            int(is_priced),
+            round(rng.uniform(2, 40), 2) if is_priced else None,
+        ))
+    cur.executemany(
+        "INSERT INTO imageBlobs (hash, size, mime, refCount, createdAt) VALUES (?, ?, ?, ?, ?)", blob_rows
+    )
+    cur.executemany(
+        """
+        INSERT INTO events (eventID, creatorID, eventName, eventType, eventDescription, location,
+                            imageHash, eventAccess, startDateTime, rsvpRequired, isPriced, cost)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        event_rows,
+    )
+    cur.executemany(
+        "INSERT OR IGNORE INTO eventCategories (eventID, category) VALUES (?, ?)",
+        [
+            (event_id, category)
+            for event_id in range(1, events + 1)
+            for category in rng.sample(EVENT_TYPES, categories_per_event)
+        ],
+    )
+
+    # Likes / RSVPs with a popularity skew ----------------------------------
+    popularity = list(range(1, events + 1))
+    rng.shuffle(popularity)
+    weights = _zipf_weights(events, skew)
+
+    def _pairs(per_account: float) -> set[tuple[int, int]]:
+        pairs: set[tuple[int, int]] = set()
+        for account_id in range(accounts):
+            k = min(events, int(rng.expovariate(1.0 / per_account))) if per_account else 0
+            for event_id in rng.choices(popularity, weights=weights, k=k):
+                pairs.add((event_id, account_id))
+        return pairs
+
+    likes = _pairs(likes_per_account)
+    rsvps = _pairs(rsvps_per_account)
+    # Spread over the last two weeks so the trending view has ages to decay
+    now = time.time()
+    cur.executemany(
+        "INSERT INTO likesLog (eventID, accountID, createdAt) VALUES (?, ?, ?)",
+        [(e, a, now - rng.uniform(0, 14 * 86400)) for e, a in sorted(likes)],
+    )
+    cur.executemany(
+        "INSERT INTO rsvpLog (eventID, accountID, createdAt) VALUES (?, ?, ?)",
+        [(e, a, now - rng.uniform(0, 14 * 86400)) for e, a in sorted(rsvps)],
+    )
+    cur.execute(
+        """
+        UPDATE events SET numberLikes = (
+            SELECT COUNT(*) FROM likesLog WHERE likesLog.eventID = events.eventID
+        )
+        """
+    )
+    conn.commit()
+    conn.close()
+
+    return {
+        "db_path": db_path,
+        "accounts": accounts,
+        "events": events,
+        "events_with_images": len(blob_rows),
+        "image_kb": image_kb,
+        "likes": len(likes),
+        "rsvps": len(rsvps),
+        "skew": skew,
+        "seed": seed,
+        "db_bytes": os.path.getsize(db_path),
+        "build_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Dataset flags shared by every benchmark entry point."""
+    parser.add_argument("--db", default="/tmp/eventplanner-bench.db", help="Where to build the database")
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--image-ratio", type=float, default=0.3, help="Fraction of events with an image")
+    parser.add_argument("--image-kb", type=int, default=200)
+    parser.add_argument("--likes-per-account", type=float, default=8.0)
+    parser.add_argument("--rsvps-per-account", type=float, default=3.0)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for popularity")
+    parser.add_argument("--seed", type=int, default=350)
+    parser.add_argument("--reuse", action="store_true", help="Use an existing --db instead of rebuilding it")
+    parser.add_argument("--from-snapshot", default=None, metavar="SNAPSHOT",
+                        help="Seed --db from a db/snapshots.py snapshot (id or .db.gz path) instead of generating")
+
+
+def from_arguments(args: argparse.Namespace) -> dict:
+    """Build (or reuse) the dataset described by parsed ``add_arguments`` flags."""
+    if args.reuse and os.path.exists(args.db):
+        return {"db_path": args.db, "reused": True, "db_bytes": os.path.getsize(args.db)}
+    if args.from_snapshot:
+        return snapshots.seed(args.from_snapshot, args.db)
+    return generate(
+        args.db,
+        accounts=args.accounts,
+        events=args.events,
+        image_ratio=args.image_ratio,
+        image_kb=args.image_kb,
+        likes_per_account=args.likes_per_account,
+        rsvps_per_account=args.rsvps_per_account,
+        skew=args.skew,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic EventPlannerDB.")
+    add_arguments(parser)
+    summary = from_arguments(parser.parse_args())
+    for key, value in summary.items():
+        print(f"{key:20s} {value}")
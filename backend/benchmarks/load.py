@@ -0,0 +1,152 @@
+"""
+=========================================================
+HTTP LOAD TEST (scripted traffic against main.app)
+=========================================================
+
+Purpose:
+- Replays a weighted mix of the calls the React app makes (browse, open an
+  event, search, like/unlike, RSVP/cancel) with N concurrent virtual users.
+- Reports throughput plus p50/p95/p99 latency and status codes per
+  endpoint, and writes them to JSON (see benchmarks/results.py).
+
+Modes:
+- In-process (default): drives main.app through httpx's ASGI transport, so
+  no server is needed and results are comparable across commits.
+- --base-url http://127.0.0.1:8000 : hits a running uvicorn instead (for
+  measuring with real workers / on a Fly machine).  The dataset flags are
+  then only used to pick IDs; point the server at the same --db.
+
+Usage (from the backend folder):
+    python -m benchmarks.load --events 3000 --concurrency 16 --duration 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks import dataset as bench_dataset
+from benchmarks.results import summarize, write_results
+
+SEARCH_TERMS = ["workshop", "night", "math", "art", "review", "social", "panel"]
+
+# (weight, label, request builder)
+def _scenarios(accounts: int, events: int):
+    def uid(rng):
+        return rng.randrange(accounts)
+
+    def eid(rng):
+        # Popular-skewed like the dataset: low IDs are not special, so just
+        # bias towards a hot subset
+        return rng.randint(1, max(1, events // 20)) if rng.random() < 0.6 else rng.randint(1, events)
+
+    return [
+        (30, "GET /events", lambda rng: ("GET", "/events", {"params": {"user_id": uid(rng)}})),
+        (20, "GET /events/{id}", lambda rng: ("GET", f"/events/{eid(rng)}", {"params": {"user_id": uid(rng)}})),
+        (15, "GET /search", lambda rng: ("GET", "/search", {"params": {"title": rng.choice(SEARCH_TERMS)}})),
+        (10, "POST /events/{id}/like", lambda rng: ("POST", f"/events/{eid(rng)}/like", {"json": {"user_id": uid(rng)}})),
+        (8, "DELETE /events/{id}/like", lambda rng: ("DELETE", f"/events/{eid(rng)}/like", {"json": {"user_id": uid(rng)}})),
+        (10, "POST /events/{id}/rsvp", lambda rng: ("POST", f"/events/{eid(rng)}/rsvp", {"json": {"user_id": uid(rng)}})),
+        (7, "DELETE /events/{id}/rsvp", lambda rng: ("DELETE", f"/events/{eid(rng)}/rsvp", {"json": {"user_id": uid(rng)}})),
+    ]
+
+
+async def _virtual_user(client, scenarios, weights, deadline, max_requests, counter, samples, statuses, seed):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        if max_requests and counter[0] >= max_requests:
+            return
+        counter[0] += 1
+        _, label, build = rng.choices(scenarios, weights=weights)[0]
+        method, url, kwargs = build(rng)
+        start = time.perf_counter()
+        try:
+            resp = await client.request(method, url, **kwargs)
+            status = resp.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        samples[label].append((time.perf_counter() - start) * 1000)
+        statuses[label][str(status)] += 1
+
+
+async def run(
+    accounts: int,
+    events: int,
+    concurrency: int = 8,
+    duration: float = 10.0,
+    max_requests: int = 0,
+    base_url: str | None = None,
+    seed: int = 350,
+) -> dict:
+    if base_url:
+        client = httpx.AsyncClient(base_url=base_url, timeout=30)
+    else:
+        import main  # imported late so DB_PATH already points at the dataset
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench", timeout=30)
+
+    scenarios = _scenarios(accounts, events)
+    weights = [s[0] for s in scenarios]
+    samples: dict[str, list[float]] = defaultdict(list)
+    statuses: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    counter = [0]
+
+    started = time.perf_counter()
+    deadline = started + duration
+    async with client:
+        await asyncio.gather(*[
+            _virtual_user(client, scenarios, weights, deadline, max_requests, counter, samples, statuses, seed + i)
+            for i in range(concurrency)
+        ])
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in samples.values())
+    per_endpoint = {}
+    for label, values in sorted(samples.items()):
+        stats = summarize(values)
+        stats["throughput_rps"] = round(len(values) / elapsed, 2)
+        stats["status"] = dict(statuses[label])
+        per_endpoint[label] = stats
+    all_samples = [v for values in samples.values() for v in values]
+    return {
+        "config": {"concurrency": concurrency, "duration_s": duration, "max_requests": max_requests,
+                   "base_url": base_url or "in-process"},
+        "total": {**summarize(all_samples), "requests": total, "elapsed_s": round(elapsed, 3),
+                  "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0},
+        "endpoints": per_endpoint,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scripted HTTP load test for the Event Browsing API.")
+    bench_dataset.add_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--max-requests", type=int, default=0, help="Stop after this many requests (0 = no cap)")
+    parser.add_argument("--base-url", default=None, help="Target a running server instead of in-process")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    summary = bench_dataset.from_arguments(args)
+    os.environ["DB_PATH"] = summary["db_path"]
+    results = asyncio.run(run(
+        accounts=summary.get("accounts", args.accounts),
+        events=summary.get("events", args.events),
+        concurrency=args.concurrency,
+        duration=args.duration,
+        max_requests=args.max_requests,
+        base_url=args.base_url,
+        seed=args.seed,
+    ))
+    total = results["total"]
+    print(f"{'endpoint':28s} {'n':>6s} {'rps':>8s} {'p50':>8s} {'p95':>8s} {'p99':>8s}")
+    for label, stats in results["endpoints"].items():
+        print(f"{label:28s} {stats['count']:6d} {stats['throughput_rps']:8.1f} "
+              f"{stats['p50_ms']:8.1f} {stats['p95_ms']:8.1f} {stats['p99_ms']:8.1f}")
+    print(f"{'TOTAL':28s} {total['requests']:6d} {total['throughput_rps']:8.1f} "
+          f"{total['p50_ms']:8.1f} {total['p95_ms']:8.1f} {total['p99_ms']:8.1f}")
+    print("wrote", write_results("load", results, summary, args.out))
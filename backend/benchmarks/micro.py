@@ -0,0 +1,118 @@
+"""
+=========================================================
+MICRO-BENCHMARKS (read path building blocks)
+=========================================================
+
+Measures, against a synthetic dataset:
+- events/read.py      read_events() with and without inactive events
+- main.py             _event_to_response() for one event and for a page
+- GET /events body    built from models (as before events/fragments.py)
+                      vs. joined from the stored fragments, CPU time per
+                      request; the dataset gets its fragments first
+- searching_logic     each filter over the full event list
+
+Usage (from the backend folder):
+    python -m benchmarks.micro --events 5000 --repeat 20
+    python -m benchmarks.micro --db /tmp/bench.db --reuse --out before.json
+"""
+
+import argparse
+import os
+import time
+from typing import Callable
+
+from benchmarks import dataset as bench_dataset
+from benchmarks.results import summarize, write_results
+
+
+def _time(fn: Callable[[], object], repeat: int, warmup: int = 1) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def _cpu(fn: Callable[[], object], repeat: int) -> dict:
+    """Like _time, but process CPU time: what one request costs the server."""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        samples.append((time.process_time() - start) * 1000)
+    return summarize(samples)
+
+
+def run(repeat: int = 10, page: int = 50) -> dict:
+    # Imported here so DB_PATH is already pointing at the synthetic database
+    import main
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from db import connection
+    from events import fragments
+    from events import read as events_read
+    from searching_logic import searching_logic
+
+    results: dict[str, dict] = {}
+    events = events_read.read_events()
+    results["read_events"] = _time(lambda: events_read.read_events(), repeat)
+    results["read_events_include_inactive"] = _time(
+        lambda: events_read.read_events(include_inactive=True), repeat
+    )
+
+    if events:
+        sample = events[0]
+        results["event_to_response_single"] = _time(lambda: main._event_to_response(sample, user_id=1), repeat * 10)
+        first_page = events[:page]
+        results[f"event_to_response_page_{len(first_page)}"] = _time(
+            lambda: [main._event_to_response(e, user_id=1) for e in first_page], repeat
+        )
+
+    # The whole GET /events body, anonymous viewer, same queries both ways
+    fragments.ensure_schema()
+    fragments.backfill()
+
+    def list_from_models():
+        with connection.use() as conn:
+            rows = events_read.read_events(conn=conn)
+            return JSONResponse(jsonable_encoder(main._events_to_responses(rows, conn=conn))).body
+
+    def list_from_fragments():
+        with connection.use() as conn:
+            return main._fragments_response(events_read.read_events(conn=conn, fragments=True), conn=conn).body
+
+    results["list_events_cpu_models"] = _cpu(list_from_models, repeat)
+    results["list_events_cpu_fragments"] = _cpu(list_from_fragments, repeat)
+
+    results["search_by_title"] = _time(lambda: searching_logic.search_by_title(events, "workshop"), repeat)
+    results["search_by_description"] = _time(
+        lambda: searching_logic.search_by_description(events, "statistics"), repeat
+    )
+    results["search_by_category"] = _time(
+        lambda: searching_logic.search_by_category(events, ["Sports", "Math"]), repeat
+    )
+    results["search_by_date"] = _time(
+        lambda: searching_logic.search_by_date(events, "2000-01-01", "2999-12-31"), repeat
+    )
+    results["event_count"] = {"count": len(events)}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the event read path.")
+    bench_dataset.add_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--page", type=int, default=50, help="Events per _event_to_response page")
+    parser.add_argument("--out", default=None, help="Result JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    summary = bench_dataset.from_arguments(args)
+    os.environ["DB_PATH"] = summary["db_path"]
+    results = run(repeat=args.repeat, page=args.page)
+    for name, stats in results.items():
+        print(f"{name:40s} {stats}")
+    print("wrote", write_results("micro", results, summary, args.out))
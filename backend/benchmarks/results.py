@@ -0,0 +1,109 @@
+"""
+=========================================================
+BENCHMARK RESULTS (JSON files + comparison)
+=========================================================
+
+Purpose:
+- Every benchmark run writes one JSON file: the numbers plus enough
+  context (git commit, python, dataset shape) to know what was measured.
+- `python -m benchmarks.results compare old.json new.json` prints the
+  relative change for every metric the two runs share.
+"""
+
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Iterable
+
+RESULTS_DIR = os.environ.get(
+    "BENCH_RESULTS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "results"),
+)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(samples_ms: Iterable[float]) -> dict:
+    values = sorted(samples_ms)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 3),
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def write_results(name: str, results: dict, dataset: dict | None = None, out: str | None = None) -> str:
+    """Write ``results`` to ``out`` (or RESULTS_DIR/<name>-<timestamp>.json).  Returns the path."""
+    payload = {
+        "benchmark": name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "dataset": dataset or {},
+        "results": results,
+    }
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out, "w") as fh:
+        json.dump(payload, fh, indent=2, sort_keys=True)
+    return out
+
+
+def _flatten(prefix: str, value, into: dict) -> None:
+    if isinstance(value, dict):
+        for key, inner in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, inner, into)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        into[prefix] = value
+
+
+def compare(old_path: str, new_path: str) -> list[tuple[str, float, float, float]]:
+    """(metric, old, new, percent change) for every numeric metric in both runs."""
+    with open(old_path) as fh:
+        old = {}
+        _flatten("", json.load(fh)["results"], old)
+    with open(new_path) as fh:
+        new = {}
+        _flatten("", json.load(fh)["results"], new)
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        change = ((new[key] - old[key]) / old[key] * 100) if old[key] else 0.0
+        rows.append((key, old[key], new[key], change))
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "compare":
+        print("usage: python -m benchmarks.results compare OLD.json NEW.json")
+        sys.exit(2)
+    for metric, before, after, change in compare(sys.argv[2], sys.argv[3]):
+        print(f"{metric:60s} {before:12.3f} -> {after:12.3f}  ({change:+6.1f}%)")
@@ -0,0 +1,39 @@
+"""
+Shared pytest setup for the backend.
+
+Every module reads DB_PATH at import time, so the throwaway database has to
+be in the environment before any test module imports backend code.  The
+schema comes from db/currentDB.py, exactly like a local dev reset.
+"""
+
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_DB_DIR = tempfile.mkdtemp(prefix="eventplanner-tests-")
+
+os.environ["DB_PATH"] = os.path.join(TEST_DB_DIR, "EventPlannerDB.db")
+# Never talk to the real mail relay from the test suite
+os.environ["OUTBOX_WORKERS"] = "0"
+# Cheapest bcrypt cost so hashing doesn't dominate test time
+os.environ["BCRYPT_ROUNDS"] = "4"
+# No background warm-up racing the tests on the same database
+os.environ["WARMUP"] = "0"
+# Image variants are rendered in worker processes; events/test_variants.py turns them on
+os.environ["IMAGE_VARIANTS"] = "0"
+# Nothing is written to dist/; events/test_publisher.py publishes to tmp_path
+os.environ["STATIC_FEED"] = "0"
+# Tests fire requests back to back; routes/test_rate_limit.py sets its own limits
+os.environ["RATE_LIMITS"] = "0"
+os.environ["MAX_INFLIGHT_WRITES"] = "0"
+# The in-memory indexes are rebuilt by the tests that need it, not by refresher threads
+os.environ["SUGGEST_REFRESH_SECONDS"] = "0"
+os.environ["USER_DIRECTORY_REFRESH_SECONDS"] = "0"
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from db.currentDB import create_database  # noqa: E402
+
+create_database(os.environ["DB_PATH"])
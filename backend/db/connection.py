@@ -0,0 +1,72 @@
+"""
+=========================================================
+SHARED SQLITE CONNECTION HELPERS
+=========================================================
+
+Purpose:
+- The one place that knows where the database lives and how a connection
+  is configured (timeout, WAL, row_factory).
+- Every data module goes through `use(conn)`, so a caller can hand in an
+  existing connection (see db/unit_of_work.py) and have several modules
+  share one transaction.
+
+What Changed:
+- Each module used to open its own `sqlite3.connect(DB_PATH)` with slightly
+  different settings, commit on its own, and never close the connection.
+- `use(None)` keeps the old standalone behaviour (own connection, commit on
+  success, rollback on error) and now also closes the connection.
+- `use(conn)` borrows the caller's connection and never commits it.
+- Connections are `InstrumentedConnection`s (db/instrumentation.py) so every
+  statement is counted against the request that ran it.
+"""
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from db import instrumentation
+
+BUSY_TIMEOUT_SECONDS = float(os.environ.get("DB_BUSY_TIMEOUT", "15"))
+
+
+def db_path() -> str:
+    """Absolute path to the SQLite database (persistent volume on Fly.io)."""
+    return os.environ.get("DB_PATH", "/data/EventPlannerDB.db")
+
+
+def connect(path: Optional[str] = None) -> sqlite3.Connection:
+    """Open a connection (to ``path``, default the app DB) with the settings every module expects."""
+    start = time.perf_counter()
+    conn = sqlite3.connect(
+        path or db_path(),
+        timeout=BUSY_TIMEOUT_SECONDS,
+        check_same_thread=False,
+        factory=instrumentation.InstrumentedConnection,
+    )
+    conn.row_factory = sqlite3.Row  # return dict-like rows
+    # Connection setup is charged to the connection, not the query count
+    sqlite3.Connection.execute(conn, "PRAGMA journal_mode=WAL;")
+    instrumentation.record_connection(time.perf_counter() - start)
+    return conn
+
+
+@contextmanager
+def use(conn: Optional[sqlite3.Connection] = None) -> Iterator[sqlite3.Connection]:
+    """
+    Yield ``conn`` untouched if given (the owner commits), otherwise open a
+    private connection that is committed on success and always closed.
+    """
+    if conn is not None:
+        yield conn
+        return
+    own = connect()
+    try:
+        yield own
+        own.commit()
+    except BaseException:
+        own.rollback()
+        raise
+    finally:
+        own.close()
@@ -20,6 +20,22 @@ What Changed:
 - Foreign keys link accounts to events and logs.
 - RSVP, likes, and invite logs implemented as join tables.
 - Number of likes stored directly in `events` (denormalized for faster access).
+- likesLog/rsvpLog rows carry createdAt (unix time) for the trending view
+  (trending/scores.py adds the column to older databases).
+- Optional events.capacity with an ordered rsvpWaitlist (rsvp/rsvp.py adds
+  both to older databases).
+- Event images are files on the /data volume, named by SHA-256
+  (events/image_store.py): events.imageHash points into imageBlobs, which
+  reference-counts them.  Older databases keep an images BLOB column until
+  the image store migration empties it.
+- imageVariants: resized WebP/JPEG copies of each stored image, files in
+  the same store keyed by (hash, width, format) (events/variants.py renders
+  them; events/image_store.py creates the table on older databases).
+- eventFragments: pre-rendered JSON per event for the list endpoints
+  (events/fragments.py), with triggers that drop it when the event changes.
+- Indexes for the per-user views (events by creator, likes/RSVPs by
+  account, invites by account); events/read.py and
+  invite_log/invite_log.py create them on older databases too.
 - Extended comments and dev notes for clarity.
 - Built-in DROP statements for dev convenience (remove/comment in production).
 
@@ -37,18 +53,6 @@ Frontend Use:
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.environ.get("DB_PATH", "/data/EventPlannerDB.db")
 
-
-sqliteConnection = sqlite3.connect(DB_PATH)
-cursor = sqliteConnection.cursor()
-
-# Drop old tables if they exist (for clean re-runs during development, running this will create a "fresh" database for testing, delete or comment in production)
-cursor.execute("DROP TABLE IF EXISTS likesLog;")
-cursor.execute("DROP TABLE IF EXISTS rsvpLog;")
-cursor.execute("DROP TABLE IF EXISTS inviteLog;")
-cursor.execute("DROP TABLE IF EXISTS eventCategories;")
-cursor.execute("DROP TABLE IF EXISTS events;")
-cursor.execute("DROP TABLE IF EXISTS accounts;")
-
 sql_command = """
 
 -- =============================
@@ -82,7 +86,7 @@ CREATE TABLE events (
     )), 
     eventDescription TEXT NOT NULL,
     location TEXT NOT NULL, 
-    images BLOB,
+    imageHash TEXT REFERENCES imageBlobs(hash),  -- image file in events/image_store.py
     eventAccess TEXT CHECK(eventAccess IN ('Public','Private','Inactive')),
 
     startDateTime TEXT NOT NULL,  -- must use ISO format: YYYY-MM-DD HH:MM:SS
@@ -91,6 +95,7 @@ CREATE TABLE events (
     rsvpRequired BOOLEAN DEFAULT 0,
     isPriced BOOLEAN DEFAULT 0,
     cost REAL,
+    capacity INTEGER,  -- max confirmed RSVPs, NULL = unlimited (rsvp/rsvp.py)
 
     FOREIGN KEY (creatorID) REFERENCES accounts(accountID)
 );
@@ -113,6 +118,7 @@ CREATE TABLE eventCategories (
 CREATE TABLE rsvpLog (
     eventID INTEGER NOT NULL,
     accountID INTEGER NOT NULL,
+    createdAt REAL,  -- unix time of the RSVP (trending scores decay with age)
     PRIMARY KEY (eventID, accountID),
     FOREIGN KEY (eventID) REFERENCES events(eventID),
     FOREIGN KEY (accountID) REFERENCES accounts(accountID)
@@ -125,11 +131,76 @@ CREATE TABLE rsvpLog (
 CREATE TABLE likesLog (
     eventID INTEGER NOT NULL,
     accountID INTEGER NOT NULL,
+    createdAt REAL,  -- unix time of the like (trending scores decay with age)
     PRIMARY KEY (eventID, accountID),
     FOREIGN KEY (eventID) REFERENCES events(eventID),
     FOREIGN KEY (accountID) REFERENCES accounts(accountID)
 );
 
+-- =============================
+-- RSVP WAITLIST
+-- Users waiting for a seat at a full event, promoted in waitID order
+-- =============================
+CREATE TABLE rsvpWaitlist (
+    waitID INTEGER PRIMARY KEY AUTOINCREMENT,
+    eventID INTEGER NOT NULL,
+    accountID INTEGER NOT NULL,
+    createdAt REAL NOT NULL,
+    UNIQUE (eventID, accountID),
+    FOREIGN KEY (eventID) REFERENCES events(eventID),
+    FOREIGN KEY (accountID) REFERENCES accounts(accountID)
+);
+
+-- =============================
+-- IMAGE BLOBS
+-- One row per distinct image file on disk (SHA-256), with the number of
+-- events using it; events/image_store.py deletes files that reach 0
+-- =============================
+CREATE TABLE imageBlobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mime TEXT NOT NULL,
+    refCount INTEGER NOT NULL DEFAULT 0,
+    createdAt REAL NOT NULL
+);
+
+-- =============================
+-- IMAGE VARIANTS
+-- Narrower WebP/JPEG copies of each stored image (files next to the
+-- original), served by GET /events/{id}/image?w= and collected with it
+-- =============================
+CREATE TABLE imageVariants (
+    hash TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    format TEXT NOT NULL CHECK(format IN ('webp', 'jpeg')),
+    size INTEGER NOT NULL,
+    PRIMARY KEY (hash, width, format),
+    FOREIGN KEY (hash) REFERENCES imageBlobs(hash)
+);
+
+-- =============================
+-- EVENT FRAGMENTS
+-- Each event's static response JSON, spliced into the list endpoints
+-- (events/fragments.py); the triggers drop it when the event changes
+-- =============================
+CREATE TABLE eventFragments (
+    eventID INTEGER PRIMARY KEY,
+    body TEXT NOT NULL
+);
+
+CREATE TRIGGER eventFragments_stale
+AFTER UPDATE OF creatorID, eventName, eventDescription, location, eventType, eventAccess,
+                startDateTime, rsvpRequired, cost, capacity, imageHash ON events
+BEGIN
+    DELETE FROM eventFragments WHERE eventID = OLD.eventID;
+END;
+
+CREATE TRIGGER eventFragments_gone
+AFTER DELETE ON events
+BEGIN
+    DELETE FROM eventFragments WHERE eventID = OLD.eventID;
+END;
+
 -- =============================
 -- INVITE LOG
 -- Tracks invitations (which user was invited to which event)
@@ -141,11 +212,52 @@ CREATE TABLE inviteLog (
     FOREIGN KEY (eventID) REFERENCES events(eventID),
     FOREIGN KEY (accountID) REFERENCES accounts(accountID)
 );
+
+-- =============================
+-- INDEXES
+-- Per-user lookups (GET /users/{id}/events); the primary keys above all
+-- start with eventID, so "by account" needs its own index
+-- =============================
+CREATE INDEX idx_events_creatorID ON events (creatorID, startDateTime);
+CREATE INDEX idx_likesLog_accountID ON likesLog (accountID, eventID);
+CREATE INDEX idx_rsvpLog_accountID ON rsvpLog (accountID, eventID);
+-- Private-event visibility (events/read.py) and "my invites"
+CREATE INDEX idx_inviteLog_accountID ON inviteLog (accountID, eventID);
+-- Waitlist promotion order
+CREATE INDEX idx_rsvpWaitlist_queue ON rsvpWaitlist (eventID, waitID);
+-- Image garbage collection
+CREATE INDEX idx_imageBlobs_unreferenced ON imageBlobs (createdAt) WHERE refCount = 0;
 """
 
-cursor.executescript(sql_command)
 
-sqliteConnection.commit()
-sqliteConnection.close()
 
-print("Database and tables created successfully!") # To delete once we are in production
+def create_database(db_path: str = DB_PATH) -> None:
+    """
+    Drop and recreate every table at ``db_path``.
+    Also used by benchmarks/dataset.py and the test suite to build scratch databases.
+    """
+    sqliteConnection = sqlite3.connect(db_path)
+    cursor = sqliteConnection.cursor()
+
+    # Drop old tables if they exist (for clean re-runs during development, running this will create a "fresh" database for testing, delete or comment in production)
+    cursor.execute("DROP TABLE IF EXISTS likesLog;")
+    cursor.execute("DROP TABLE IF EXISTS rsvpLog;")
+    cursor.execute("DROP TABLE IF EXISTS rsvpWaitlist;")
+    cursor.execute("DROP TABLE IF EXISTS inviteLog;")
+    cursor.execute("DROP TABLE IF EXISTS eventImageVariants;")
+    cursor.execute("DROP TABLE IF EXISTS imageVariants;")
+    cursor.execute("DROP TABLE IF EXISTS eventFragments;")
+    cursor.execute("DROP TABLE IF EXISTS eventCategories;")
+    cursor.execute("DROP TABLE IF EXISTS events;")
+    cursor.execute("DROP TABLE IF EXISTS accounts;")
+    cursor.execute("DROP TABLE IF EXISTS imageBlobs;")
+
+    cursor.executescript(sql_command)
+
+    sqliteConnection.commit()
+    sqliteConnection.close()
+
+
+if __name__ == "__main__":
+    create_database()
+    print("Database and tables created successfully!") # To delete once we are in production
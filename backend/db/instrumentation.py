@@ -0,0 +1,268 @@
+"""
+=========================================================
+PER-REQUEST SQL INSTRUMENTATION
+=========================================================
+
+Purpose:
+- Counts what a request costs the database: statements executed,
+  connections opened, rows returned/changed and time spent inside SQLite.
+- Exposes the numbers to the browser as `Server-Timing` (shows up in the
+  devtools Network > Timing tab) and `X-DB-Queries` / `X-DB-Connections`
+  headers, and lets tests assert a query budget per endpoint.
+
+How it works:
+- db/connection.connect() builds an `InstrumentedConnection`, so every data
+  module is covered without changes.  Its cursors time each execute/fetch.
+- `SQLStatsMiddleware` puts a fresh `QueryStats` in a context variable at
+  the start of each request.  FastAPI copies the context into the threadpool
+  that runs sync endpoints and dependencies, so they all add to the same
+  object.  Outside a request (background threads, scripts) the variable is
+  empty and the cursors only pay for one ContextVar.get().
+- The same timings feed the slow-query log (monitoring/slow_query.py).
+
+Frontend Use:
+- Not called directly; headers are exposed through CORS for debugging.
+"""
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from monitoring import metrics
+from monitoring import slow_query
+
+# Set SQL_STATS_HEADERS=0 to keep counting but stop sending the headers
+HEADERS_ENABLED = os.environ.get("SQL_STATS_HEADERS", "1") != "0"
+
+
+class QueryStats:
+    """Running totals for one request (or one `capture()` block)."""
+
+    __slots__ = ("queries", "connections", "rows", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.connections = 0
+        self.rows = 0
+        self.db_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "queries": self.queries,
+            "connections": self.connections,
+            "rows": self.rows,
+            "db_ms": round(self.db_seconds * 1000, 3),
+        }
+
+    def headers(self, total_seconds: float) -> list[tuple[bytes, bytes]]:
+        timing = (
+            f'db;dur={self.db_seconds * 1000:.2f};'
+            f'desc="{self.queries} queries, {self.connections} conn, {self.rows} rows", '
+            f"app;dur={total_seconds * 1000:.2f}"
+        )
+        return [
+            (b"server-timing", timing.encode("latin-1")),
+            (b"x-db-queries", str(self.queries).encode("latin-1")),
+            (b"x-db-connections", str(self.connections).encode("latin-1")),
+        ]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("sql_stats", default=None)
+
+
+def current() -> Optional[QueryStats]:
+    """Stats of the request being served on this thread/task, if any."""
+    return _current.get()
+
+
+@contextmanager
+def capture() -> Iterator[QueryStats]:
+    """Collect stats for a block of code outside the HTTP stack (scripts, benchmarks)."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+# -----------------------------
+# CONNECTION / CURSOR WRAPPERS
+# -----------------------------
+def _count_lock_error(error: sqlite3.OperationalError, sql: str) -> None:
+    message = str(error)
+    if "locked" in message or "busy" in message:
+        words = sql.split(None, 1)
+        metrics.sqlite_lock_errors.inc(words[0].upper() if words else "?")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    # Last statement run on this cursor, kept for the slow-query log
+    _sql = ""
+    _params = None
+    _many = False
+    _elapsed = 0.0
+    _slow_logged = True
+
+    def _timed(self, method, sql, *params):
+        start = time.perf_counter()
+        try:
+            return method(sql, *params)
+        except sqlite3.OperationalError as e:
+            _count_lock_error(e, sql)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self._sql, self._elapsed, self._slow_logged = sql, elapsed, False
+            self._params = params[0] if params and not self._many else None
+            stats = _current.get()
+            if stats is not None:
+                stats.db_seconds += elapsed
+                stats.queries += 1
+                if self.rowcount > 0:
+                    stats.rows += self.rowcount
+            if elapsed >= slow_query.THRESHOLD_SECONDS and slow_query.enabled():
+                self._log_slow()
+
+    def _log_slow(self) -> None:
+        self._slow_logged = True
+        try:
+            slow_query.record(self.connection, self._sql, self._params, self._elapsed, many=self._many)
+        except Exception as e:
+            print(f"[slow-query] could not record statement: {e}")
+
+    def execute(self, sql, parameters=()):
+        self._many = False
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # The parameter iterable may be a generator, so it is not kept
+        self._many = True
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, script):
+        self._many = False
+        return self._timed(super().executescript, script)
+
+    def _account_fetch(self, elapsed: float, rows: int) -> None:
+        self._elapsed += elapsed
+        stats = _current.get()
+        if stats is not None:
+            stats.db_seconds += elapsed
+            stats.rows += rows
+        if not self._slow_logged and self._elapsed >= slow_query.THRESHOLD_SECONDS and slow_query.enabled():
+            self._log_slow()
+
+    def _fetched(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        if isinstance(result, list):
+            rows = len(result)
+        else:
+            rows = 0 if result is None else 1
+        self._account_fetch(time.perf_counter() - start, rows)
+        return result
+
+    def fetchone(self):
+        return self._fetched(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetched(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._fetched(super().fetchall)
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._account_fetch(time.perf_counter() - start, 0)
+            raise
+        self._account_fetch(time.perf_counter() - start, 1)
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    # sqlite3.Connection.execute() does not go through cursor(), so the
+    # shortcut methods are rerouted explicitly.
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+    def close(self):
+        if not getattr(self, "_closed_counted", False):
+            self._closed_counted = True
+            metrics.sqlite_connections_open.dec()
+        super().close()
+
+
+def record_connection(seconds: float) -> None:
+    """Called by db/connection.connect() for every connection it opens."""
+    metrics.sqlite_connections_opened.inc()
+    metrics.sqlite_connections_open.inc()
+    stats = _current.get()
+    if stats is not None:
+        stats.connections += 1
+        stats.db_seconds += seconds
+
+
+# -----------------------------
+# ASGI MIDDLEWARE
+# -----------------------------
+class SQLStatsMiddleware:
+    """Give each HTTP request its own QueryStats and report it in the response headers."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start" and HEADERS_ENABLED:
+                headers = list(message.get("headers", []))
+                headers.extend(stats.headers(time.perf_counter() - started))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+
+
+# -----------------------------
+# TEST HELPER
+# -----------------------------
+def assert_query_budget(response, queries: int, connections: Optional[int] = None) -> None:
+    """
+    Fail if ``response`` (a TestClient/httpx response) used more SQL
+    statements or connections than budgeted.  Keeps N+1 regressions out:
+
+        resp = client.get("/events")
+        assert_query_budget(resp, queries=3, connections=1)
+    """
+    used = int(response.headers["x-db-queries"])
+    opened = int(response.headers["x-db-connections"])
+    where = f"{response.request.method} {response.request.url.path}"
+    assert used <= queries, f"{where} ran {used} SQL statements (budget {queries})"
+    if connections is not None:
+        assert opened <= connections, f"{where} opened {opened} connections (budget {connections})"
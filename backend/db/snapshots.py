@@ -0,0 +1,366 @@
+"""
+=========================================================
+ONLINE SNAPSHOTS (incremental backup API)
+=========================================================
+
+Purpose:
+- Consistent copies of the live database without stopping the app.
+  Copying EventPlannerDB.db with cp while the app runs can tear the copy
+  (the WAL is a separate file), and a single-step backup holds a read
+  lock for the whole copy.
+- Snapshots are gzip-compressed and have a SHA-256 checksum and a small
+  manifest.  The newest SNAPSHOT_KEEP are kept.
+- The same files are the quickest way to get a realistic local database
+  for benchmarks and manual testing (`seed`).
+
+How it works:
+- `sqlite3.Connection.backup` copies SNAPSHOT_PAGES_PER_STEP pages per step
+  and sleeps SNAPSHOT_STEP_SLEEP_MS between steps, so readers and writers
+  only ever wait for one short step.  If the source is written between
+  steps, SQLite restarts the copy from the first page.  Under steady write
+  traffic that can repeat forever, so after SNAPSHOT_MAX_RESTARTS restarts
+  the copy is finished in one step instead.  In WAL mode that one step is a
+  read transaction, which writers do not wait for (the WAL just cannot be
+  checkpointed past it until it ends).
+- The raw copy is checked with PRAGMA quick_check before it is compressed.
+  Files are written under a temporary name and renamed into place, and
+  the manifest is written last, so a snapshot with a manifest is complete.
+
+Files (SNAPSHOT_DIR, default: snapshots/ next to the DB):
+    <id>.db.gz    the database, gzip
+    <id>.json     manifest: sha256 of the .gz, sizes, pages, source, created
+
+Settings:
+- SNAPSHOT_DIR                where snapshots go (point it at another volume
+                              when one is available)
+- SNAPSHOT_INTERVAL_HOURS     schedule (default 6, 0 = no scheduled snapshots)
+- SNAPSHOT_KEEP               snapshots kept (default 14)
+- SNAPSHOT_PAGES_PER_STEP     pages copied per backup step (default 256)
+- SNAPSHOT_STEP_SLEEP_MS      pause between steps (default 5)
+- SNAPSHOT_MAX_RESTARTS       restarts before finishing in one step (default 3)
+
+Usage (from the backend folder):
+    python -m db.snapshots take
+    python -m db.snapshots list
+    python -m db.snapshots verify <id>
+    python -m db.snapshots restore <id> --to /data/EventPlannerDB.db --force   (app stopped)
+    python -m db.snapshots seed <id|path> --to /tmp/eventplanner-bench.db
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from db import connection
+from monitoring import metrics
+
+INTERVAL_SECONDS = float(os.environ.get("SNAPSHOT_INTERVAL_HOURS", "6")) * 3600
+KEEP = int(os.environ.get("SNAPSHOT_KEEP", "14"))
+PAGES_PER_STEP = int(os.environ.get("SNAPSHOT_PAGES_PER_STEP", "256"))
+STEP_SLEEP_SECONDS = float(os.environ.get("SNAPSHOT_STEP_SLEEP_MS", "5")) / 1000
+MAX_RESTARTS = int(os.environ.get("SNAPSHOT_MAX_RESTARTS", "3"))
+
+_ID = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9]{6}$")
+_take_lock = threading.Lock()
+
+snapshot_bytes = metrics.LastValue(
+    "sqlite_snapshot_bytes", "Compressed size of the newest snapshot.",
+)
+
+
+class SnapshotError(Exception):
+    """A snapshot is missing, does not match its checksum or fails integrity_check."""
+
+
+class _TooManyRestarts(Exception):
+    """Raised from the backup progress callback to abandon the stepped copy."""
+
+
+def snapshot_dir() -> str:
+    return os.environ.get("SNAPSHOT_DIR") or os.path.join(
+        os.path.dirname(os.path.abspath(connection.db_path())), "snapshots"
+    )
+
+
+def valid_id(snapshot_id: str) -> bool:
+    return bool(_ID.match(snapshot_id))
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _check_integrity(path: str, full: bool = False) -> None:
+    conn = sqlite3.connect(path)
+    try:
+        pragma = "integrity_check" if full else "quick_check"
+        problems = [row[0] for row in conn.execute(f"PRAGMA {pragma}").fetchall()]
+    except sqlite3.DatabaseError as e:
+        raise SnapshotError(f"{path} is not a valid database: {e}") from e
+    finally:
+        conn.close()
+    if problems != ["ok"]:
+        raise SnapshotError(f"{pragma} failed for {path}: {'; '.join(problems[:5])}")
+
+
+# -----------------------------
+# TAKE
+# -----------------------------
+def take(source: Optional[str] = None, directory: Optional[str] = None) -> dict:
+    """Copy ``source`` (default: the live DB) into a new compressed snapshot."""
+    directory = directory or snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+    with _take_lock:
+        now = time.time()
+        # sortable by creation time, which retention relies on
+        snapshot_id = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now % 1 * 1e6):06d}"
+        raw_fd, raw_path = tempfile.mkstemp(suffix=".db", dir=directory)
+        os.close(raw_fd)
+        progress = {"steps": 0, "restarts": 0, "remaining": None}
+
+        def pause(status, remaining, total):
+            progress["steps"] += 1
+            # remaining only goes up when another connection wrote to the source
+            if progress["remaining"] is not None and remaining > progress["remaining"]:
+                progress["restarts"] += 1
+                if progress["restarts"] > MAX_RESTARTS:
+                    raise _TooManyRestarts()
+            progress["remaining"] = remaining
+            if remaining and STEP_SLEEP_SECONDS > 0:
+                time.sleep(STEP_SLEEP_SECONDS)
+
+        start = time.perf_counter()
+        try:
+            src = connection.connect() if source is None else sqlite3.connect(source)
+            dst = sqlite3.connect(raw_path)
+            try:
+                try:
+                    src.backup(dst, pages=max(PAGES_PER_STEP, 1), progress=pause)
+                except _TooManyRestarts:
+                    src.backup(dst, pages=-1)
+                    progress["steps"] += 1
+                pages = dst.execute("PRAGMA page_count").fetchone()[0]
+            finally:
+                dst.close()
+                src.close()
+            copy_seconds = time.perf_counter() - start
+            _check_integrity(raw_path)
+
+            gz_path = os.path.join(directory, snapshot_id + ".db.gz")
+            with open(raw_path, "rb") as raw, open(gz_path + ".tmp", "wb") as out:
+                # mtime=0: identical databases give identical files
+                with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=6, mtime=0) as gz:
+                    shutil.copyfileobj(raw, gz, 1 << 20)
+            os.replace(gz_path + ".tmp", gz_path)
+
+            manifest = {
+                "id": snapshot_id,
+                "file": os.path.basename(gz_path),
+                "sha256": _sha256(gz_path),
+                "bytes": os.path.getsize(gz_path),
+                "db_bytes": os.path.getsize(raw_path),
+                "pages": pages,
+                "steps": progress["steps"],
+                "restarts": progress["restarts"],
+                "copy_ms": round(copy_seconds * 1000, 1),
+                "total_ms": round((time.perf_counter() - start) * 1000, 1),
+                "source": os.path.abspath(source or connection.db_path()),
+                "created": time.time(),
+            }
+            with open(os.path.join(directory, snapshot_id + ".json.tmp"), "w") as fh:
+                json.dump(manifest, fh, indent=2)
+            # manifest last: its presence marks the snapshot as complete
+            os.replace(
+                os.path.join(directory, snapshot_id + ".json.tmp"),
+                os.path.join(directory, snapshot_id + ".json"),
+            )
+        finally:
+            for leftover in (raw_path, *(os.path.join(directory, snapshot_id + ext) for ext in (".db.gz.tmp", ".json.tmp"))):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+    snapshot_bytes.set(value=manifest["bytes"])
+    trim(directory)
+    return manifest
+
+
+# -----------------------------
+# RETENTION / LISTING
+# -----------------------------
+def list_snapshots(directory: Optional[str] = None) -> list[dict]:
+    """Complete snapshots, newest first."""
+    directory = directory or snapshot_dir()
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith(".json") and valid_id(name[:-5]):
+            try:
+                with open(os.path.join(directory, name)) as fh:
+                    found.append(json.load(fh))
+            except (OSError, ValueError):
+                continue
+    return found
+
+
+def trim(directory: Optional[str] = None, keep: Optional[int] = None) -> list[str]:
+    """Delete all but the newest ``keep`` snapshots.  Returns the removed ids."""
+    directory = directory or snapshot_dir()
+    keep = KEEP if keep is None else keep
+    ids = [s["id"] for s in list_snapshots(directory)]
+    removed = ids[keep:] if keep > 0 else []
+    for old in removed:
+        # manifest first, so a half-deleted snapshot is never listed
+        for suffix in (".json", ".db.gz"):
+            try:
+                os.remove(os.path.join(directory, old + suffix))
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def _resolve(snapshot: str, directory: Optional[str] = None) -> tuple[str, Optional[dict]]:
+    """(path to .db.gz, manifest or None) for a snapshot id or a file path."""
+    directory = directory or snapshot_dir()
+    if valid_id(snapshot):
+        manifest_path = os.path.join(directory, snapshot + ".json")
+        if not os.path.exists(manifest_path):
+            raise SnapshotError(f"no snapshot {snapshot} in {directory}")
+        with open(manifest_path) as fh:
+            manifest = json.load(fh)
+        return os.path.join(directory, manifest["file"]), manifest
+    if not os.path.exists(snapshot):
+        raise SnapshotError(f"{snapshot} does not exist")
+    manifest_path = re.sub(r"\.db\.gz$", ".json", snapshot)
+    if manifest_path != snapshot and os.path.exists(manifest_path):
+        with open(manifest_path) as fh:
+            return snapshot, json.load(fh)
+    return snapshot, None
+
+
+def _decompress(gz_path: str, target: str) -> None:
+    with gzip.open(gz_path, "rb") as gz, open(target, "wb") as out:
+        shutil.copyfileobj(gz, out, 1 << 20)
+
+
+# -----------------------------
+# VERIFY / RESTORE / SEED
+# -----------------------------
+def verify(snapshot: str, directory: Optional[str] = None, full: bool = True) -> dict:
+    """Check the checksum and run integrity_check on a decompressed copy."""
+    gz_path, manifest = _resolve(snapshot, directory)
+    if manifest is not None and _sha256(gz_path) != manifest["sha256"]:
+        raise SnapshotError(f"checksum mismatch for {gz_path}")
+    fd, tmp = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        try:
+            _decompress(gz_path, tmp)
+        except (OSError, EOFError) as e:
+            raise SnapshotError(f"{gz_path} is not a valid gzip file: {e}") from e
+        _check_integrity(tmp, full=full)
+    finally:
+        os.remove(tmp)
+    return {"snapshot": gz_path, "checksum": "ok" if manifest else "no manifest", "integrity": "ok"}
+
+
+def restore(snapshot: str, target: str, force: bool = False, directory: Optional[str] = None) -> dict:
+    """
+    Replace ``target`` with a verified snapshot.  Stop the app first: open
+    connections would keep writing to the old file.
+    """
+    if os.path.exists(target) and not force:
+        raise SnapshotError(f"{target} exists; pass force=True (--force) to replace it")
+    result = verify(snapshot, directory)
+    gz_path, _ = _resolve(snapshot, directory)
+    staging = target + ".restore-tmp"
+    _decompress(gz_path, staging)
+    _check_integrity(staging)
+    # A stale WAL next to the restored file would be replayed on top of it
+    for sidecar in (target + "-wal", target + "-shm"):
+        if os.path.exists(sidecar):
+            os.remove(sidecar)
+    os.replace(staging, target)
+    return {**result, "restored_to": os.path.abspath(target)}
+
+
+def seed(snapshot: str, target: str, directory: Optional[str] = None) -> dict:
+    """Write a snapshot out as a plain database for benchmarks or local testing."""
+    gz_path, manifest = _resolve(snapshot, directory)
+    if manifest is not None and _sha256(gz_path) != manifest["sha256"]:
+        raise SnapshotError(f"checksum mismatch for {gz_path}")
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    for stale in (target, target + "-wal", target + "-shm"):
+        if os.path.exists(stale):
+            os.remove(stale)
+    _decompress(gz_path, target)
+    return {"db_path": target, "seeded_from": gz_path, "db_bytes": os.path.getsize(target)}
+
+
+# -----------------------------
+# SCHEDULE
+# -----------------------------
+def _snapshot_forever():
+    while True:
+        time.sleep(INTERVAL_SECONDS)
+        try:
+            with metrics.time_job("snapshot"):
+                manifest = take()
+            print(f"[snapshots] {manifest['id']} {manifest['bytes'] >> 10} KiB "
+                  f"in {manifest['total_ms']:.0f} ms ({manifest['steps']} steps)")
+        except (sqlite3.Error, OSError, SnapshotError) as e:
+            print(f"[snapshots] snapshot failed: {e}")
+
+
+def start_scheduler() -> Optional[threading.Thread]:
+    if INTERVAL_SECONDS <= 0:
+        return None
+    thread = threading.Thread(target=_snapshot_forever, name="snapshot-scheduler", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Online database snapshots.")
+    parser.add_argument("--dir", default=None, help="Snapshot directory (default: SNAPSHOT_DIR / next to the DB)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    tk = sub.add_parser("take", help="Take a snapshot of the live database now")
+    tk.add_argument("--source", default=None, help="Database to snapshot (default: DB_PATH)")
+    sub.add_parser("list", help="List snapshots, newest first")
+    vf = sub.add_parser("verify", help="Check checksum and integrity of a snapshot")
+    vf.add_argument("snapshot", help="Snapshot id or .db.gz path")
+    rs = sub.add_parser("restore", help="Replace a database with a verified snapshot (stop the app first)")
+    rs.add_argument("snapshot")
+    rs.add_argument("--to", default=None, help="Target database (default: DB_PATH)")
+    rs.add_argument("--force", action="store_true", help="Replace the target if it exists")
+    sd = sub.add_parser("seed", help="Write a snapshot out as a local benchmark/test database")
+    sd.add_argument("snapshot")
+    sd.add_argument("--to", required=True)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "take":
+            print(json.dumps(take(args.source, args.dir), indent=2))
+        elif args.command == "list":
+            for s in list_snapshots(args.dir):
+                print(f"{s['id']}  {s['bytes'] >> 10:>8d} KiB  {s['pages']:>8d} pages  {s['sha256'][:12]}")
+        elif args.command == "verify":
+            print(json.dumps(verify(args.snapshot, args.dir), indent=2))
+        elif args.command == "restore":
+            print(json.dumps(restore(args.snapshot, args.to or connection.db_path(), args.force, args.dir), indent=2))
+        elif args.command == "seed":
+            print(json.dumps(seed(args.snapshot, args.to, args.dir), indent=2))
+    except SnapshotError as e:
+        raise SystemExit(f"error: {e}")
@@ -0,0 +1,94 @@
+"""
+Snapshot tests: backup in steps, checksum, retention, restore, seed.
+
+Run from the backend folder:
+    python -m pytest db/test_snapshots.py
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from db import connection, snapshots
+
+
+@pytest.fixture
+def snap_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshots, "PAGES_PER_STEP", 2)
+    monkeypatch.setattr(snapshots, "STEP_SLEEP_SECONDS", 0)
+    with connection.use() as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS snapProbe (id INTEGER PRIMARY KEY, body TEXT)")
+        conn.execute("DELETE FROM snapProbe")
+        conn.executemany("INSERT INTO snapProbe (body) VALUES (?)", [("x" * 500,) for _ in range(200)])
+    return tmp_path / "snapshots"
+
+
+def _count(path) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM snapProbe").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_take_is_stepped_checksummed_and_seedable(snap_dir, tmp_path):
+    manifest = snapshots.take(directory=str(snap_dir))
+    assert manifest["steps"] > 1
+    assert (snap_dir / manifest["file"]).stat().st_size == manifest["bytes"] < manifest["db_bytes"]
+    assert snapshots.verify(manifest["id"], str(snap_dir))["integrity"] == "ok"
+
+    seeded = snapshots.seed(manifest["id"], str(tmp_path / "bench.db"), str(snap_dir))
+    assert _count(seeded["db_path"]) == 200
+
+
+def test_writes_during_backup_still_give_a_consistent_copy(snap_dir, monkeypatch):
+    monkeypatch.setattr(snapshots, "STEP_SLEEP_SECONDS", 0.001)
+    stop = threading.Event()
+
+    def writer():
+        while not stop.is_set():
+            with connection.use() as conn:
+                conn.execute("INSERT INTO snapProbe (body) VALUES ('during')")
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        manifest = snapshots.take(directory=str(snap_dir))
+    finally:
+        stop.set()
+        thread.join()
+    assert snapshots.verify(manifest["id"], str(snap_dir))["integrity"] == "ok"
+
+
+def test_retention_keeps_newest(snap_dir, monkeypatch):
+    monkeypatch.setattr(snapshots, "KEEP", 2)
+    ids = [snapshots.take(directory=str(snap_dir))["id"] for _ in range(3)]
+    assert [s["id"] for s in snapshots.list_snapshots(str(snap_dir))] == ids[:0:-1]
+    assert not (snap_dir / f"{ids[0]}.db.gz").exists()
+
+
+def test_corrupt_snapshot_is_refused(snap_dir, tmp_path):
+    manifest = snapshots.take(directory=str(snap_dir))
+    gz = snap_dir / manifest["file"]
+    data = bytearray(gz.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    gz.write_bytes(bytes(data))
+    with pytest.raises(snapshots.SnapshotError, match="checksum"):
+        snapshots.verify(manifest["id"], str(snap_dir))
+    with pytest.raises(snapshots.SnapshotError):
+        snapshots.restore(manifest["id"], str(tmp_path / "restored.db"), directory=str(snap_dir))
+    assert not (tmp_path / "restored.db").exists()
+
+
+def test_restore_replaces_target_and_drops_stale_wal(snap_dir, tmp_path):
+    manifest = snapshots.take(directory=str(snap_dir))
+    target = tmp_path / "live.db"
+    target.write_bytes(b"old")
+    (tmp_path / "live.db-wal").write_bytes(b"stale")
+    with pytest.raises(snapshots.SnapshotError, match="force"):
+        snapshots.restore(manifest["id"], str(target), directory=str(snap_dir))
+
+    snapshots.restore(manifest["id"], str(target), force=True, directory=str(snap_dir))
+    assert _count(target) == 200
+    assert not (tmp_path / "live.db-wal").exists()
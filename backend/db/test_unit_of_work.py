@@ -0,0 +1,63 @@
+"""
+Unit of work: a failure anywhere in the transaction, or a request that
+never commits, leaves none of its writes behind.
+
+Run from the backend folder:
+    python -m pytest db/test_unit_of_work.py
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from db import connection
+from db.unit_of_work import UnitOfWork
+from events import create as events_create
+from events import fragments
+
+HOST = 9870
+
+
+def _rows(title):
+    with connection.use() as conn:
+        events = conn.execute("SELECT eventID FROM events WHERE eventName = ?", (title,)).fetchall()
+        categories = conn.execute(
+            "SELECT COUNT(*) FROM eventCategories WHERE eventID IN (SELECT eventID FROM events WHERE eventName = ?)",
+            (title,),
+        ).fetchone()[0]
+    return len(events), categories
+
+
+def test_error_rolls_back_every_write():
+    with pytest.raises(RuntimeError):
+        with UnitOfWork() as uow:
+            events_create.create_event(
+                HOST, "Half Written", "d", "UC", "Art", "2035-01-01 10:00:00",
+                categories=["Music", "Social"], conn=uow.conn,
+            )
+            assert _rows("Half Written") == (0, 0)  # not visible to others before commit
+            raise RuntimeError("crash halfway")
+    assert _rows("Half Written") == (0, 0)
+
+
+def test_exit_without_commit_rolls_back():
+    uow = UnitOfWork().begin()
+    events_create.create_event(HOST, "Never Committed", "d", "UC", "Art", "2035-01-01 10:00:00", conn=uow.conn)
+    uow.close()
+    assert _rows("Never Committed") == (0, 0)
+
+
+def test_failed_request_leaves_no_partial_event(monkeypatch):
+    from main import app
+
+    def fail(conn, event_ids):
+        raise RuntimeError("fragment render failed")
+
+    # The event and its categories are inserted before this runs
+    monkeypatch.setattr(fragments, "refresh", fail)
+    with TestClient(app, raise_server_exceptions=False) as client:
+        res = client.post("/events", json={
+            "creatorID": HOST, "title": "Partial Party", "description": "d", "location": "UC",
+            "eventType": "Art", "startDateTime": "2035-01-01 10:00:00", "categories": ["Music"],
+        })
+    assert res.status_code == 500
+    assert _rows("Partial Party") == (0, 0)
@@ -0,0 +1,71 @@
+"""
+=========================================================
+EVENT AUTHORIZATION (single-query creator/role check)
+=========================================================
+
+Purpose:
+- One place that answers "may this account change this event?".
+- Rule (unchanged): the event's creator or any Faculty account.
+
+What Changed:
+- Replaces the per-module `_is_authorized` helpers and the copies of the
+  same lookups in main.py.  A mutation used to read creatorID and
+  accountType up to three times over three connections; it now costs one
+  query: a join of events and accounts, or just the events row when the
+  requester's role is already in UserAccounts/roles.py.
+- Callers that already ran check() pass `authorized=True` to the data
+  modules so the check is not repeated.
+"""
+
+import sqlite3
+from typing import Optional
+
+from db import connection
+from UserAccounts import roles
+
+# Results of check()
+ALLOWED = "allowed"
+EVENT_NOT_FOUND = "event_not_found"
+USER_NOT_FOUND = "user_not_found"
+FORBIDDEN = "forbidden"
+
+
+def check(event_id: int, requester_id: int, conn: Optional[sqlite3.Connection] = None) -> str:
+    """Return ALLOWED, EVENT_NOT_FOUND, USER_NOT_FOUND or FORBIDDEN."""
+    if conn is None:
+        with connection.use() as own:
+            return check(event_id, requester_id, own)
+
+    cur = conn.cursor()
+    account_type = roles.get(requester_id)
+    if account_type is not None:
+        cur.execute("SELECT creatorID FROM events WHERE eventID = ?", (event_id,))
+        row = cur.fetchone()
+        if not row:
+            return EVENT_NOT_FOUND
+        creator_id = row[0]
+    else:
+        cur.execute(
+            """
+            SELECT e.creatorID, a.accountType
+            FROM events e
+            LEFT JOIN accounts a ON a.accountID = ?
+            WHERE e.eventID = ?
+            """,
+            (requester_id, event_id),
+        )
+        row = cur.fetchone()
+        if not row:
+            return EVENT_NOT_FOUND
+        creator_id, account_type = row[0], row[1]
+        if account_type is None:
+            return USER_NOT_FOUND
+        roles.put(requester_id, account_type)
+
+    if requester_id == creator_id or account_type == "Faculty":
+        return ALLOWED
+    return FORBIDDEN
+
+
+def is_authorized(event_id: int, requester_id: int, conn: Optional[sqlite3.Connection] = None) -> bool:
+    return check(event_id, requester_id, conn) == ALLOWED
@@ -1,9 +1,9 @@
-import os
 import sqlite3
 from typing import Optional
 
-# DB path: backend/db/EventPlannerDB.db
-DB_PATH = os.environ.get("DB_PATH", "/data/EventPlannerDB.db")
+from db import connection
+from events import fragments
+from events import image_store
 
 ALLOWED_EVENT_TYPES = {
     "Art", "Math", "Science", "Computer Science", "History",
@@ -25,31 +25,52 @@ def create_event(
     rsvpRequired: int = 0,
     isPriced: int = 0,
     cost: Optional[float] = None,
+    categories: Optional[list[str]] = None,
+    capacity: Optional[int] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> int:
+    """
+    Insert an event (and any extra categories) and return its eventID.
+    ``images`` (raw bytes) goes to the image store (events/image_store.py).
+    Pass ``conn`` to run inside a caller's transaction (db/unit_of_work.py);
+    otherwise the insert commits on its own.
+    """
     if eventType not in ALLOWED_EVENT_TYPES:
         raise ValueError(f"eventType must be one of: {sorted(ALLOWED_EVENT_TYPES)}")
     if eventAccess not in ALLOWED_ACCESS:
         raise ValueError(f"eventAccess must be one of: {sorted(ALLOWED_ACCESS)}")
+    if capacity is not None and capacity < 1:
+        raise ValueError("capacity must be at least 1 (or omitted for unlimited)")
 
-    with sqlite3.connect(DB_PATH, timeout=15, check_same_thread=False) as conn:
-        conn.execute("PRAGMA journal_mode=WAL;")
+    # Hashed and copied to disk before the insert, outside any lock we hold
+    staged = image_store.stage_bytes(images) if images else None
+
+    with connection.use(conn) as conn:
         cur = conn.cursor()
         creatorID = int(creatorID)
         print("DEBUG: inserting event with creatorID =", creatorID)
         cur.execute("""
             INSERT INTO events (
-                creatorID, eventName, eventDescription, location, images,
+                creatorID, eventName, eventDescription, location,
                 eventType, eventAccess, startDateTime,
-                numberLikes, rsvpRequired, isPriced, cost
+                numberLikes, rsvpRequired, isPriced, cost, capacity
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?)
         """, (
-            creatorID, eventName, eventDescription, location, images,
+            creatorID, eventName, eventDescription, location,
             eventType, eventAccess, startDateTime,
-            rsvpRequired, isPriced, cost
+            rsvpRequired, isPriced, cost, capacity
         ))
-        conn.commit()
-        return cur.lastrowid
+        event_id = cur.lastrowid
+        if categories:
+            cur.executemany(
+                "INSERT OR IGNORE INTO eventCategories (eventID, category) VALUES (?, ?)",
+                [(event_id, cat) for cat in categories],
+            )
+        if staged is not None:
+            image_store.attach(conn, event_id, staged)
+        fragments.refresh(conn, [event_id])
+        return event_id
 
 if __name__ == "__main__":
     new_id = create_event(
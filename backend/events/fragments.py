@@ -0,0 +1,186 @@
+"""
+=========================================================
+EVENT FRAGMENTS (pre-rendered JSON for the event lists)
+=========================================================
+
+Purpose:
+- GET /events rebuilt every event as an EventResponse model and had
+  FastAPI validate and encode it again, on every request, although an
+  event's fields only change when someone edits it.  Each event's
+  static part is now stored once as JSON text, and the list endpoints
+  (/events, /events/trending, /users/{id}/events) join the stored text
+  with the live like/RSVP values into the response body.
+
+How:
+- eventFragments(eventID, body) holds the event's JSON object without
+  its closing brace, rendered from static_fields() (the same dict
+  _event_to_response in main.py builds the model from, so the two can't
+  drift apart).  assemble() appends
+  ,"likes":N,"rsvps":[...],"userLiked":..,"userRsvped":..}
+  to each, so the counts and per-user flags are never stale.
+- The event write paths (create.py, update.py, soft_delete.py and the
+  image upload in main.py) call refresh() inside their own transaction.
+- Triggers drop a fragment when one of its columns changes (numberLikes
+  is left out, so a like doesn't) or the event is deleted, so writes that
+  bypass those paths (scripts, the midnight purge)
+  can't leave stale JSON behind.  A missing fragment is rendered on the
+  fly (counted as a miss in /metrics) until backfill() stores it again;
+  list reads never write.
+
+Usage (from the backend folder):
+    python -m events.fragments backfill
+"""
+
+import argparse
+import json
+import sqlite3
+from typing import Iterable, Optional
+
+from db import connection
+from events import variants
+from events.read import attach_image_url
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS eventFragments (
+    eventID INTEGER PRIMARY KEY,
+    body TEXT NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS eventFragments_stale
+AFTER UPDATE OF creatorID, eventName, eventDescription, location, eventType, eventAccess,
+                startDateTime, rsvpRequired, cost, capacity, imageHash ON events
+BEGIN
+    DELETE FROM eventFragments WHERE eventID = OLD.eventID;
+END;
+
+CREATE TRIGGER IF NOT EXISTS eventFragments_gone
+AFTER DELETE ON events
+BEGIN
+    DELETE FROM eventFragments WHERE eventID = OLD.eventID;
+END;
+"""
+
+hits = 0
+misses = 0
+
+
+def ensure_schema(conn: Optional[sqlite3.Connection] = None) -> None:
+    with connection.use(conn) as conn:
+        conn.executescript(SCHEMA)
+
+
+# -----------------------------
+# RENDERING
+# -----------------------------
+def static_fields(event: dict) -> dict:
+    """The response fields that only change when the event is written (a read.py row in)."""
+    eid = event["eventID"]
+    cost = event.get("cost")
+    return {
+        "id": eid,
+        "title": event["eventName"],
+        "description": event["eventDescription"],
+        "startDate": event["startDateTime"],
+        "location": event["location"],
+        "category": event["eventType"],
+        "eventAccess": event["eventAccess"],
+        "creatorID": event["creatorID"],
+        "price": None if cost is None else float(cost),
+        "rsvpRequired": bool(event.get("rsvpRequired", 0)),
+        "capacity": event.get("capacity"),
+        "imageUrl": event.get("imageUrl"),
+        "thumbnailUrl": f"/events/{eid}/image?w={variants.CARD_WIDTH}" if event.get("imageUrl") else None,
+    }
+
+
+def render(event: dict) -> str:
+    """The stored fragment: static_fields() as compact JSON, minus the closing brace."""
+    return json.dumps(static_fields(event), ensure_ascii=False, separators=(",", ":"))[:-1]
+
+
+def _rows(conn: sqlite3.Connection, event_ids: Iterable[int]) -> list[dict]:
+    cur = conn.execute(
+        """
+        SELECT eventID, creatorID, eventName, eventDescription, location, imageHash,
+               eventType, eventAccess, startDateTime, rsvpRequired, cost, capacity
+        FROM events WHERE eventID IN (SELECT value FROM json_each(?))
+        """,
+        (json.dumps(list(event_ids)),),
+    )
+    names = [c[0] for c in cur.description]
+    return [attach_image_url(dict(zip(names, row))) for row in cur.fetchall()]
+
+
+# -----------------------------
+# WRITE SIDE
+# -----------------------------
+def refresh(conn: sqlite3.Connection, event_ids: Iterable[int]) -> None:
+    """Re-render the events' fragments inside the caller's transaction (after its writes)."""
+    conn.executemany(
+        "INSERT OR REPLACE INTO eventFragments (eventID, body) VALUES (?, ?)",
+        [(event["eventID"], render(event)) for event in _rows(conn, event_ids)],
+    )
+
+
+def backfill(batch: int = 1000) -> int:
+    """Render every event that has no fragment.  Returns how many were stored."""
+    done = 0
+    while True:
+        with connection.use() as conn:
+            ids = [row[0] for row in conn.execute(
+                """
+                SELECT eventID FROM events e
+                WHERE NOT EXISTS (SELECT 1 FROM eventFragments f WHERE f.eventID = e.eventID)
+                LIMIT ?
+                """,
+                (batch,),
+            ).fetchall()]
+            if not ids:
+                return done
+            refresh(conn, ids)
+        done += len(ids)
+
+
+# -----------------------------
+# READ SIDE
+# -----------------------------
+def assemble(
+    rows: list[tuple[int, Optional[str]]],
+    likes: dict[int, list[int]],
+    rsvps: dict[int, list[int]],
+    user_id: Optional[int] = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> bytes:
+    """
+    The JSON array body for (eventID, fragment) rows from read.py
+    (fragments=True) plus the like/RSVP lists, in the rows' order.
+    """
+    global hits, misses
+    missing = [eid for eid, body in rows if body is None]
+    rendered = {}
+    if missing:
+        with connection.use(conn) as conn:
+            rendered = {event["eventID"]: render(event) for event in _rows(conn, missing)}
+    misses += len(missing)
+    hits += len(rows) - len(missing)
+
+    parts = []
+    for eid, body in rows:
+        body = body if body is not None else rendered.get(eid)
+        if body is None:
+            continue  # deleted between the two queries
+        liked, rsvped = likes.get(eid, []), rsvps.get(eid, [])
+        parts.append(
+            f'{body},"likes":{len(liked)},"rsvps":{json.dumps(rsvped, separators=(",", ":"))},'
+            f'"userLiked":{json.dumps(user_id in liked)},"userRsvped":{json.dumps(user_id in rsvped)}}}'
+        )
+    return ("[" + ",".join(parts) + "]").encode()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-rendered event JSON.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("backfill", help="Render fragments for events that have none")
+    args = parser.parse_args()
+    ensure_schema()
+    print(f"[fragments] rendered {backfill()} events")
@@ -1,72 +1,42 @@
-import os
 import sqlite3
+from typing import Optional
 
-# -----------------------------
-# DATABASE PATH
-# -----------------------------
-DB_PATH = os.environ.get("DB_PATH", "/data/EventPlannerDB.db")
-
-def _get_conn():
-    return sqlite3.connect(DB_PATH)
-
-# -----------------------------
-# AUTHORIZATION HELPER
-# -----------------------------
-def _is_authorized(updater_id: int, event_creator_id: int) -> bool:
-    """
-    Checks if user is allowed to delete event:
-    - Must be event creator OR Faculty accountType.
-    """
-    with _get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT accountType FROM accounts WHERE accountID = ?", (updater_id,))
-        row = cur.fetchone()
-        if not row:
-            return False
-        return updater_id == event_creator_id or row[0] == "Faculty"
+from db import connection
+from events import authorization
+from events import image_store
 
 # -----------------------------
 # HARD DELETE FUNCTION
 # -----------------------------
-def hard_delete_event(eventID: int, requesterID: int) -> bool:
+def hard_delete_event(
+    eventID: int,
+    requesterID: int,
+    authorized: bool = False,
+    conn: Optional[sqlite3.Connection] = None,
+) -> bool:
     """
     Permanently delete an event and related rows.
+    Must be event creator OR Faculty accountType (events/authorization.py);
+    pass authorized=True when the caller already checked, and ``conn`` to
+    run inside the caller's transaction.
     Returns True if deletion succeeded, False otherwise.
     """
-    with _get_conn() as conn:
+    with connection.use(conn) as conn:
         cur = conn.cursor()
 
-        # Get creatorID for authorization
-        cur.execute("SELECT creatorID FROM events WHERE eventID = ?", (eventID,))
-        row = cur.fetchone()
-        if not row:
-            return False
-        creator_id = row[0]
-
-        # Fetch requester's accountType
-        cur.execute("SELECT accountType FROM accounts WHERE accountID = ?", (requesterID,))
-        acc_row = cur.fetchone()
-        if not acc_row:
-            return False
-        requester_account_type = acc_row[0]
-
-        # Explicit authorization check consistent with main.py pattern
-        if requesterID != creator_id and requester_account_type != "Faculty":
-            return False
-
-        if not _is_authorized(requesterID, creator_id):
+        if not authorized and not authorization.is_authorized(eventID, requesterID, conn):
             return False
 
         # Delete related logs before event
         cur.execute("DELETE FROM rsvpLog         WHERE eventID = ?", (eventID,))
         cur.execute("DELETE FROM likesLog        WHERE eventID = ?", (eventID,))
+        cur.execute("DELETE FROM rsvpWaitlist    WHERE eventID = ?", (eventID,))
         cur.execute("DELETE FROM inviteLog       WHERE eventID = ?", (eventID,))
         cur.execute("DELETE FROM eventCategories WHERE eventID = ?", (eventID,))
+        image_store.detach(conn, eventID)
 
         # Delete event last
         cur.execute("DELETE FROM events WHERE eventID = ?", (eventID,))
-        conn.commit()
-
         return cur.rowcount > 0
 
 # -----------------------------
@@ -0,0 +1,505 @@
+"""
+=========================================================
+IMAGE STORE (content-addressed files on the /data volume)
+=========================================================
+
+Purpose:
+- Event images used to live in events.images as BLOBs, so every SELECT
+  over events dragged megabytes through SQLite's page cache, the same
+  poster uploaded to ten events was stored ten times, and soft-deleted
+  events kept their images forever.
+- Now each distinct image is one file named after its SHA-256, and
+  events.imageHash is all the row holds.  GET /events/{id}/image serves
+  the file with FileResponse (sendfile where the server supports it).
+
+How:
+- Layout: <IMAGE_STORE_DIR>/ab/cd/abcd...  (two levels of fan-out) plus
+  tmp/ for uploads in flight.
+- Writing is two steps so a slow upload never holds the database write
+  lock: stage_upload()/stage_bytes() copy the image into tmp/ while
+  hashing it (no transaction open), then attach() runs inside the
+  caller's transaction: it upserts the imageBlobs row, renames the staged
+  file into place (or drops it if that hash is already stored: dedup),
+  points the event at the hash and moves the reference counts.
+- imageBlobs(hash, size, mime, refCount, createdAt) counts the events
+  using each file.  attach() and detach() change refCount in the same
+  transaction as events.imageHash, so the two can't drift apart.
+- gc() deletes files whose refCount has been 0 for GC_GRACE_SECONDS (and
+  their variants), and
+  staged/stray files of the same age (a crash between staging and
+  commit).  The walk over the store runs first, without any lock, and
+  only yields candidates; the short write transaction deletes the rows
+  and re-checks each candidate against imageBlobs/imageVariants before
+  unlinking it.  attach() only publishes under that same lock, so a file
+  can't be collected between "already stored" and the reference that
+  reuses it.  Runs with the midnight cleanup in main.py.
+- Soft delete releases the image too (the event can't come back into
+  view with it); hard delete does the same before removing the row.
+- Resized copies (events/variants.py) live next to their original as
+  <hash>.<width>.<format>, listed in imageVariants(hash, width, format).
+  They belong to the image, not the event: events sharing an image share
+  its variants, and they go when gc() collects the original (its
+  refCount covers them).  The route serves them with FileResponse too.
+
+Migration:
+- Databases from before the store have the images BLOB column.
+  ensure_schema() adds imageHash/imageBlobs, and migrate() moves the
+  BLOBs out MIGRATE_BATCH events per transaction, then sets them to NULL.
+  main.py runs it in the background at start-up; until it finishes,
+  unmigrated events list without an image.  VACUUM afterwards to give
+  the space back (`--vacuum`).
+- The old per-event eventImageVariants table (variants as BLOBs) is
+  dropped; `python -m events.variants backfill` renders them into the store.
+- db/snapshots.py copies the database only: back up IMAGE_STORE_DIR with
+  the volume.
+
+Settings:
+- IMAGE_STORE_DIR     default: an "images" folder next to DB_PATH (/data/images)
+- IMAGE_GC_GRACE_SECONDS   default 3600
+- IMAGE_MIGRATE_BATCH      default 50 events per transaction
+
+Usage (from the backend folder):
+    python -m events.image_store migrate [--vacuum]
+    python -m events.image_store gc [--grace 0]
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from starlette.datastructures import UploadFile
+
+from db import connection
+from db.unit_of_work import UnitOfWork
+from events import images
+from monitoring import metrics
+
+GC_GRACE_SECONDS = float(os.environ.get("IMAGE_GC_GRACE_SECONDS", "3600"))
+MIGRATE_BATCH = int(os.environ.get("IMAGE_MIGRATE_BATCH", "50"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS imageBlobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mime TEXT NOT NULL,
+    refCount INTEGER NOT NULL DEFAULT 0,
+    createdAt REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_imageBlobs_unreferenced ON imageBlobs (createdAt) WHERE refCount = 0;
+CREATE TABLE IF NOT EXISTS imageVariants (
+    hash TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    format TEXT NOT NULL CHECK(format IN ('webp', 'jpeg')),
+    size INTEGER NOT NULL,
+    PRIMARY KEY (hash, width, format),
+    FOREIGN KEY (hash) REFERENCES imageBlobs(hash)
+);
+"""
+
+
+class Staged(NamedTuple):
+    """An image copied into tmp/ and hashed, not yet referenced by any event."""
+    hash: str
+    size: int
+    mime: str
+    path: str
+
+
+def default_root(db_path: str) -> str:
+    """The store that goes with the database at ``db_path`` when IMAGE_STORE_DIR is unset."""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "images")
+
+
+def root() -> str:
+    return os.environ.get("IMAGE_STORE_DIR") or default_root(connection.db_path())
+
+
+def path_for(image_hash: str, store_root: Optional[str] = None) -> str:
+    return os.path.join(store_root or root(), image_hash[:2], image_hash[2:4], image_hash)
+
+
+def variant_path(image_hash: str, width: int, fmt: str, store_root: Optional[str] = None) -> str:
+    return f"{path_for(image_hash, store_root)}.{width}.{fmt}"
+
+
+def _tmp_dir() -> str:
+    path = os.path.join(root(), "tmp")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def ensure_schema(conn: Optional[sqlite3.Connection] = None) -> None:
+    """imageBlobs and imageVariants, plus events.imageHash on databases from before the store."""
+    with connection.use(conn) as conn:
+        conn.executescript(SCHEMA)
+        conn.execute("DROP TABLE IF EXISTS eventImageVariants")  # BLOB variants, before the store
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(events)")}
+        if "imageHash" not in columns:
+            conn.execute("ALTER TABLE events ADD COLUMN imageHash TEXT")
+
+
+# -----------------------------
+# STAGING (no transaction needed)
+# -----------------------------
+def _open_staging():
+    fd, path = tempfile.mkstemp(dir=_tmp_dir(), suffix=".part")
+    return os.fdopen(fd, "wb"), path
+
+
+def _finish(out, path: str, digest, size: int, head: bytes) -> Staged:
+    out.flush()
+    os.fsync(out.fileno())
+    out.close()
+    mime = images.sniff(head)
+    if not size or mime is None:
+        os.unlink(path)
+        raise images.UnsupportedImage("Image must be a JPEG, PNG, GIF or WebP file")
+    try:
+        images.check_pixels(path)
+    except images.ImageTooLarge:
+        os.unlink(path)
+        raise
+    return Staged(digest.hexdigest(), size, mime, path)
+
+
+async def stage_upload(upload: UploadFile) -> Staged:
+    """Copy an uploaded file into tmp/ in CHUNK_SIZE pieces, hashing as it goes."""
+    out, path = _open_staging()
+    digest, size, head = hashlib.sha256(), 0, b""
+    try:
+        await upload.seek(0)
+        while chunk := await upload.read(images.CHUNK_SIZE):
+            size += len(chunk)
+            if size > images.MAX_IMAGE_BYTES:
+                raise images.ImageTooLarge(f"Image is larger than {images.MAX_IMAGE_BYTES >> 20} MB")
+            if len(head) < 16:
+                head += chunk[:16 - len(head)]
+            digest.update(chunk)
+            out.write(chunk)
+    except BaseException:
+        out.close()
+        os.unlink(path)
+        raise
+    return _finish(out, path, digest, size, head)
+
+
+def stage_bytes(data: bytes) -> Staged:
+    """Same as stage_upload() for an image already in memory (base64 uploads, migration)."""
+    if len(data) > images.MAX_IMAGE_BYTES:
+        raise images.ImageTooLarge(f"Image is larger than {images.MAX_IMAGE_BYTES >> 20} MB")
+    out, path = _open_staging()
+    try:
+        out.write(data)
+    except BaseException:
+        out.close()
+        os.unlink(path)
+        raise
+    return _finish(out, path, hashlib.sha256(data), len(data), bytes(data[:16]))
+
+
+def stage_variant(data: bytes) -> str:
+    """Write one rendered variant into tmp/; publish_variants() moves it into place."""
+    out, path = _open_staging()
+    try:
+        out.write(data)
+        out.flush()
+        os.fsync(out.fileno())
+    except BaseException:
+        out.close()
+        os.unlink(path)
+        raise
+    out.close()
+    return path
+
+
+def discard(staged: Staged) -> None:
+    """Drop a staged file that will not be attached (validation failed, request aborted)."""
+    try:
+        os.unlink(staged.path)
+    except FileNotFoundError:
+        pass
+
+
+# -----------------------------
+# REFERENCES (inside the caller's write transaction)
+# -----------------------------
+def _publish(conn: sqlite3.Connection, staged: Staged) -> None:
+    conn.execute(
+        """
+        INSERT INTO imageBlobs (hash, size, mime, refCount, createdAt) VALUES (?, ?, ?, 0, ?)
+        ON CONFLICT(hash) DO UPDATE SET createdAt = excluded.createdAt
+        """,
+        (staged.hash, staged.size, staged.mime, time.time()),
+    )
+    final = path_for(staged.hash)
+    if os.path.exists(final):
+        discard(staged)  # same bytes already stored
+    else:
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        os.replace(staged.path, final)
+
+
+def _release(conn: sqlite3.Connection, image_hash: Optional[str]) -> None:
+    if image_hash is not None:
+        conn.execute(
+            "UPDATE imageBlobs SET refCount = refCount - 1, createdAt = ? WHERE hash = ?",
+            (time.time(), image_hash),
+        )
+
+
+def attach(conn: sqlite3.Connection, event_id: int, staged: Staged) -> str:
+    """
+    Point ``event_id`` at the staged image.  Raises LookupError (and drops
+    the staged file) if the event does not exist.  Returns the hash.
+    """
+    row = conn.execute("SELECT imageHash FROM events WHERE eventID = ?", (event_id,)).fetchone()
+    if row is None:
+        discard(staged)
+        raise LookupError(f"Event {event_id} not found")
+    _publish(conn, staged)
+    conn.execute("UPDATE imageBlobs SET refCount = refCount + 1 WHERE hash = ?", (staged.hash,))
+    conn.execute("UPDATE events SET imageHash = ? WHERE eventID = ?", (staged.hash, event_id))
+    _release(conn, row[0])
+    return staged.hash
+
+
+def detach(conn: sqlite3.Connection, event_id: int) -> None:
+    """Remove the event's image reference (delete paths).  The file goes at the next gc()."""
+    row = conn.execute("SELECT imageHash FROM events WHERE eventID = ?", (event_id,)).fetchone()
+    if row is not None and row[0] is not None:
+        conn.execute("UPDATE events SET imageHash = NULL WHERE eventID = ?", (event_id,))
+        _release(conn, row[0])
+
+
+def release_matching(conn: sqlite3.Connection, where: str, params: tuple = ()) -> None:
+    """Release the images of every event matching ``where``, before a bulk DELETE (midnight purge)."""
+    conn.execute(
+        f"""
+        UPDATE imageBlobs SET refCount = refCount - gone.n, createdAt = ?
+        FROM (SELECT imageHash AS hash, COUNT(*) AS n FROM events
+              WHERE imageHash IS NOT NULL AND ({where}) GROUP BY imageHash) AS gone
+        WHERE imageBlobs.hash = gone.hash
+        """,
+        (time.time(), *params),
+    )
+
+
+def has_variants(conn: sqlite3.Connection, image_hash: str) -> bool:
+    return conn.execute("SELECT 1 FROM imageVariants WHERE hash = ? LIMIT 1", (image_hash,)).fetchone() is not None
+
+
+def publish_variants(conn: sqlite3.Connection, image_hash: str, staged: list[tuple[int, str, str]]) -> int:
+    """
+    Move staged (width, format, tmp path) variants of ``image_hash`` into
+    place, inside the caller's write transaction.  Nothing is stored if
+    no event uses the image any more (replaced while it was rendering);
+    the caller drops the staged files that were not moved.  Returns how
+    many were stored.
+    """
+    row = conn.execute("SELECT refCount FROM imageBlobs WHERE hash = ?", (image_hash,)).fetchone()
+    if row is None or row[0] <= 0:
+        return 0
+    for width, fmt, path in staged:
+        size = os.path.getsize(path)
+        os.replace(path, variant_path(image_hash, width, fmt))
+        conn.execute(
+            "INSERT OR REPLACE INTO imageVariants (hash, width, format, size) VALUES (?, ?, ?, ?)",
+            (image_hash, width, fmt, size),
+        )
+    return len(staged)
+
+
+def lookup(conn: sqlite3.Connection, event_id: int) -> Optional[tuple[str, int, str]]:
+    """(hash, size, MIME type) of the event's image, or None."""
+    row = conn.execute(
+        """
+        SELECT b.hash, b.size, b.mime FROM events e JOIN imageBlobs b ON b.hash = e.imageHash
+        WHERE e.eventID = ?
+        """,
+        (event_id,),
+    ).fetchone()
+    return None if row is None else (row[0], row[1], row[2])
+
+
+def read(image_hash: str) -> bytes:
+    with open(path_for(image_hash), "rb") as f:
+        return f.read()
+
+
+# -----------------------------
+# GARBAGE COLLECTION
+# -----------------------------
+def _known_names(conn: sqlite3.Connection) -> set[str]:
+    names = {row[0] for row in conn.execute("SELECT hash FROM imageBlobs")}
+    names.update(
+        os.path.basename(variant_path(h, w, f))
+        for h, w, f in conn.execute("SELECT hash, width, format FROM imageVariants")
+    )
+    return names
+
+
+def _is_referenced(conn: sqlite3.Connection, name: str) -> bool:
+    """Whether a file name in the store is an original or variant the database lists."""
+    parts = name.split(".")
+    if len(parts) == 1:
+        return conn.execute("SELECT 1 FROM imageBlobs WHERE hash = ?", (name,)).fetchone() is not None
+    if len(parts) == 3 and parts[1].isdigit():
+        return conn.execute(
+            "SELECT 1 FROM imageVariants WHERE hash = ? AND width = ? AND format = ?",
+            (parts[0], int(parts[1]), parts[2]),
+        ).fetchone() is not None
+    return False  # staged .part files
+
+
+def _stray_candidates(cutoff: float) -> list[str]:
+    """Files older than ``cutoff`` that nothing listed when we looked.  No write lock held."""
+    with connection.use() as conn:
+        known = _known_names(conn)
+    candidates = []
+    for folder, _, files in os.walk(root()):
+        for name in files:
+            path = os.path.join(folder, name)
+            if name in known:
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    candidates.append(path)
+            except FileNotFoundError:
+                pass  # published or discarded meanwhile
+    return candidates
+
+
+def gc(grace_seconds: float = GC_GRACE_SECONDS) -> dict:
+    """Delete unreferenced images and abandoned staged files older than ``grace_seconds``."""
+    cutoff = time.time() - grace_seconds
+    removed = strays = 0
+    candidates = _stray_candidates(cutoff)
+    with UnitOfWork() as uow:
+        hashes = [row[0] for row in uow.conn.execute(
+            "SELECT hash FROM imageBlobs WHERE refCount = 0 AND createdAt < ?", (cutoff,)
+        ).fetchall()]
+        paths = [path_for(h) for h in hashes]
+        for image_hash in hashes:
+            paths += [variant_path(image_hash, w, f) for w, f in uow.conn.execute(
+                "SELECT width, format FROM imageVariants WHERE hash = ?", (image_hash,)
+            )]
+        uow.conn.executemany("DELETE FROM imageVariants WHERE hash = ?", [(h,) for h in hashes])
+        uow.conn.executemany("DELETE FROM imageBlobs WHERE hash = ?", [(h,) for h in hashes])
+        # Unlinked under the write lock: attach() can't be reusing one of these right now
+        for path in paths:
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        for path in candidates:
+            if _is_referenced(uow.conn, os.path.basename(path)):
+                continue  # attached since the walk
+            try:
+                os.unlink(path)
+                strays += 1
+            except FileNotFoundError:
+                pass
+        uow.commit()
+    return {"removed": removed, "strays": strays}
+
+
+# -----------------------------
+# MIGRATION FROM events.images
+# -----------------------------
+def _has_blob_column(conn: sqlite3.Connection) -> bool:
+    return "images" in {row[1] for row in conn.execute("PRAGMA table_info(events)")}
+
+
+def pending_blobs(conn: Optional[sqlite3.Connection] = None) -> int:
+    with connection.use(conn) as conn:
+        if not _has_blob_column(conn):
+            return 0
+        return conn.execute("SELECT COUNT(*) FROM events WHERE images IS NOT NULL").fetchone()[0]
+
+
+def migrate(batch: int = MIGRATE_BATCH) -> dict:
+    """
+    Move every events.images BLOB into the store, ``batch`` events per
+    transaction.  Each batch is read and staged (hashed, written, fsynced)
+    first; the write transaction only publishes it.
+    """
+    moved = skipped = 0
+    while True:
+        with connection.use() as conn:
+            if not _has_blob_column(conn):
+                break
+            rows = conn.execute(
+                "SELECT eventID, images FROM events WHERE images IS NOT NULL LIMIT ?", (batch,)
+            ).fetchall()
+        if not rows:
+            break
+        staged: dict[int, Optional[Staged]] = {}
+        for event_id, blob in rows:
+            try:
+                staged[event_id] = stage_bytes(bytes(blob))
+            except (images.UnsupportedImage, images.ImageTooLarge):
+                staged[event_id] = None  # never displayable (or servable) anyway
+        try:
+            with UnitOfWork() as uow:
+                for event_id, item in list(staged.items()):
+                    # Nothing else writes images any more, but don't trust that blindly
+                    if uow.conn.execute(
+                        "SELECT 1 FROM events WHERE eventID = ? AND images IS NOT NULL", (event_id,)
+                    ).fetchone() is None:
+                        continue
+                    if item is None:
+                        skipped += 1
+                        print(f"[image_store] event {event_id}: not an image or over the size limits, dropped")
+                    else:
+                        attach(uow.conn, event_id, item)
+                        del staged[event_id]
+                        moved += 1
+                    uow.conn.execute("UPDATE events SET images = NULL WHERE eventID = ?", (event_id,))
+                uow.commit()
+        finally:
+            for item in staged.values():
+                if item is not None:
+                    discard(item)
+    return {"moved": moved, "skipped": skipped}
+
+
+def _migrate_job() -> None:
+    try:
+        with metrics.time_job("image_store_migration"):
+            print(f"[image_store] migration done: {migrate()}")
+    except Exception as e:
+        print(f"[image_store] migration failed: {e}")
+
+
+def start_migration() -> Optional[threading.Thread]:
+    """Run migrate() in a background thread if any BLOBs are left (start-up hook)."""
+    if not pending_blobs():
+        return None
+    thread = threading.Thread(target=_migrate_job, daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Content-addressed event image store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    mg = sub.add_parser("migrate", help="Move events.images BLOBs into the store")
+    mg.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to return the space")
+    gp = sub.add_parser("gc", help="Delete unreferenced images")
+    gp.add_argument("--grace", type=float, default=GC_GRACE_SECONDS, help="Minimum age in seconds")
+    args = parser.parse_args()
+
+    ensure_schema()
+    if args.command == "migrate":
+        print(migrate())
+        if args.vacuum:
+            with connection.use() as conn:
+                conn.execute("VACUUM")
+    else:
+        print(gc(args.grace))
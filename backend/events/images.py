@@ -0,0 +1,165 @@
+"""
+=========================================================
+EVENT IMAGES (upload limits and content sniffing)
+=========================================================
+
+Purpose:
+- Accept an event image as a multipart file upload (POST /events and
+  PUT /events/{id}) without ever holding the whole file in Python memory.
+  The bytes themselves go to the image store (events/image_store.py).
+
+How:
+- UploadLimitMiddleware caps the request body while it streams in: a
+  Content-Length over the limit is refused with 413 before anything is
+  read, and a chunked body is cut off with 413 as soon as it passes it.
+  JSON and urlencoded bodies are capped too (the base64 fallback in
+  ``images`` / ``image_b64``), at the base64 size of MAX_IMAGE_BYTES, so
+  they are never buffered whole beyond that.
+- A base64 image is measured before it is decoded (base64_size()).
+- Starlette spools the file part to a temporary file (memory only up to
+  1 MB); image_store.stage_upload() copies it on in CHUNK_SIZE pieces.
+- The first bytes are sniffed (JPEG, PNG, GIF, WebP) and anything else is
+  refused with 415, whatever Content-Type the client claimed.  The sniffed
+  type is stored with the image and sent when it is served.
+- A small file can still decode to a huge bitmap (a "decompression
+  bomb").  Once staged, the image header is read (check_pixels(), via
+  Pillow, which reads the header only) and more than MAX_IMAGE_PIXELS is
+  refused with 413.  events/variants.py applies the same cap as
+  Pillow's Image.MAX_IMAGE_PIXELS before decoding.
+
+Settings:
+- IMAGE_MAX_MB        largest accepted image (default 5)
+- IMAGE_CHUNK_KB      copy chunk size (default 64)
+- IMAGE_MAX_MEGAPIXELS  largest accepted width x height (default 40)
+"""
+
+import os
+import warnings
+from typing import Optional
+
+from starlette.responses import PlainTextResponse
+
+MAX_IMAGE_BYTES = int(float(os.environ.get("IMAGE_MAX_MB", "5")) * (1 << 20))
+CHUNK_SIZE = int(os.environ.get("IMAGE_CHUNK_KB", "64")) << 10
+MAX_IMAGE_PIXELS = int(float(os.environ.get("IMAGE_MAX_MEGAPIXELS", "40")) * 1_000_000)
+# Room for the other form fields and multipart boundaries around the file
+FORM_OVERHEAD_BYTES = 64 << 10
+
+# Leading bytes -> MIME type
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+class UnsupportedImage(ValueError):
+    pass
+
+
+def sniff(head: bytes) -> Optional[str]:
+    """MIME type from an image's first bytes (at least 12), or None if not a supported image."""
+    for signature, mime in _SIGNATURES:
+        if head.startswith(signature):
+            return mime
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def base64_size(text: str | bytes) -> int:
+    """Bytes base64 text decodes to (an upper bound if it has line breaks), without decoding it."""
+    padding = text[-2:].count(b"=" if isinstance(text, bytes) else "=")
+    return len(text) * 3 // 4 - padding
+
+
+def body_limit(content_type: bytes) -> int:
+    """Largest request body accepted: an image file for multipart, its base64 text otherwise."""
+    if content_type.startswith(b"multipart/form-data"):
+        return MAX_IMAGE_BYTES + FORM_OVERHEAD_BYTES
+    return (MAX_IMAGE_BYTES + 2) // 3 * 4 + FORM_OVERHEAD_BYTES
+
+
+def check_pixels(path: str, max_pixels: Optional[int] = None) -> None:
+    """
+    Raise ImageTooLarge if the header at ``path`` declares more than
+    ``max_pixels`` (default MAX_IMAGE_PIXELS).  Files Pillow can't identify
+    are left to sniff(); nothing is decoded here.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    max_pixels = MAX_IMAGE_PIXELS if max_pixels is None else max_pixels
+    Image.MAX_IMAGE_PIXELS = max_pixels  # same deliberate cap as events/variants.py
+    too_large = ImageTooLarge(f"Image is larger than {max_pixels / 1_000_000:g} megapixels")
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            with Image.open(path) as image:
+                width, height = image.size
+    except Image.DecompressionBombError:
+        raise too_large
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+        return
+    if width * height > max_pixels:
+        raise too_large
+
+
+# -----------------------------
+# REQUEST SIZE LIMIT
+# -----------------------------
+class UploadLimitMiddleware:
+    """
+    Pure ASGI middleware: 413 for bodies bigger than body_limit(), checked
+    on Content-Length up front and on the bytes actually received for
+    chunked uploads.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        limit = body_limit(headers.get(b"content-type", b""))
+        too_large = PlainTextResponse(f"Upload larger than {MAX_IMAGE_BYTES >> 20} MB", status_code=413)
+        length = headers.get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > limit:
+            await too_large(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise ImageTooLarge("request body over the upload limit")
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if exceeded and not response_started:
+                return  # the app's own error for the aborted body; 413 is sent below
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except ImageTooLarge:
+            if response_started:
+                raise
+        if exceeded and not response_started:
+            await too_large(scope, receive, send)
@@ -0,0 +1,307 @@
+"""
+=========================================================
+STATIC FEED PUBLISHER (public event list as files in dist/)
+=========================================================
+
+Purpose:
+- Every anonymous visitor asked GET /events for the same public list.
+  This module writes that list (Public events only, never Inactive or
+  Private) as static JSON next to the frontend build, so the web server
+  hands it out and anonymous browsing never reaches Python.
+
+Layout (under STATIC_FEED_DIR, default dist/feed):
+    manifest.json                      small, poll it (no-cache)
+    <version>/events/1.json ...        all public events, soonest first
+    <version>/categories/<slug>/1.json per eventType, same order
+  Each page is {"page", "pages", "total", "events": [...]} with the
+  events exactly as GET /events returns them to an anonymous viewer
+  (events/fragments.py builds both).  manifest.json has, under
+  "lists", each list's total and page paths (relative to the manifest),
+  keyed "events" or by eventType.  <version> is a hash of
+  the content, so version directories never change once written and
+  may be cached for good; an unchanged feed is not rewritten at all.
+
+Getting the feed to visitors:
+- The frontend is served by the static host (Apache, dist/htaccess.txt),
+  not by the API container.  On Fly nothing serves the container's
+  files, so publishing is off unless STATIC_FEED_DIR is set.  Either:
+  - run the API where the static host's document root is a local
+    directory and point STATIC_FEED_DIR at <docroot>/feed, or
+  - publish as part of the frontend deploy, from the backend folder
+    against the live database, and upload dist/ as usual:
+        STATIC_FEED_DIR=../dist/feed python -m events.publisher publish
+    (the feed is then as fresh as the last deploy; GET /events is
+    always current).
+
+How:
+- main.py calls notify() after each committed event write (create,
+  update, delete, image upload) and notify(counts_only=True) after a
+  like/RSVP change (the counts are in the feed).  A background thread
+  publishes once no notify() has come in for STATIC_FEED_DEBOUNCE
+  seconds, but at most STATIC_FEED_MAX_DELAY seconds after the first
+  one, so a steady stream of likes can't hold the feed back
+  indefinitely.  Count changes alone publish at most once per
+  STATIC_FEED_MAX_DELAY: every page embeds the counts, so each such
+  publish rewrites the whole feed.
+- A publish writes the whole version into a staging directory, renames
+  it into place (atomic), then replaces manifest.json (atomic), so a
+  reader sees either the old feed or the new one, never half of one.
+  The STATIC_FEED_KEEP newest older versions stay behind for clients
+  that fetched the previous manifest.
+- The warm-up step publishes once at start-up, covering writes made
+  while the app was down.
+
+Settings:
+- STATIC_FEED=1/0             publish or not (default: only if STATIC_FEED_DIR is set)
+- STATIC_FEED_DIR             output directory (the CLI defaults to <repo>/dist/feed)
+- STATIC_FEED_PAGE_SIZE       events per page (default 50)
+- STATIC_FEED_DEBOUNCE        quiet seconds before publishing (default 2)
+- STATIC_FEED_MAX_DELAY       longest wait after the first change (default 30)
+- STATIC_FEED_KEEP            previous versions kept on disk (default 3)
+
+Usage (from the backend folder):
+    python -m events.publisher publish
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from db import connection
+from events import fragments
+from events import read as events_read
+from liking_log import liking_log
+from monitoring import metrics
+from rsvp import rsvp as rsvp_log
+
+ENABLED = os.environ.get("STATIC_FEED", "1" if os.environ.get("STATIC_FEED_DIR") else "0") != "0"
+FEED_DIR = os.environ.get(
+    "STATIC_FEED_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "dist", "feed"),
+)
+PAGE_SIZE = int(os.environ.get("STATIC_FEED_PAGE_SIZE", "50"))
+DEBOUNCE_SECONDS = float(os.environ.get("STATIC_FEED_DEBOUNCE", "2"))
+MAX_DELAY_SECONDS = float(os.environ.get("STATIC_FEED_MAX_DELAY", "30"))
+KEEP_VERSIONS = int(os.environ.get("STATIC_FEED_KEEP", "3"))
+
+MANIFEST = "manifest.json"
+_VERSION_DIR = re.compile(r"^[0-9a-f]{16}$")
+
+
+def slug(category: str) -> str:
+    """Directory name for an eventType ("Computer Science" -> "computer-science")."""
+    return re.sub(r"[^a-z0-9]+", "-", category.lower()).strip("-")
+
+
+# -----------------------------
+# RENDERING
+# -----------------------------
+def _pages(rows: list[tuple], likes: dict, rsvps: dict, conn) -> list[bytes]:
+    """The page files for one list of (eventID, fragment) rows (at least one, maybe empty)."""
+    chunks = [rows[i:i + PAGE_SIZE] for i in range(0, len(rows), PAGE_SIZE)] or [[]]
+    return [
+        b'{"page":%d,"pages":%d,"total":%d,"events":%s}'
+        % (n, len(chunks), len(rows), fragments.assemble(chunk, likes, rsvps, conn=conn))
+        for n, chunk in enumerate(chunks, start=1)
+    ]
+
+
+def render() -> dict[str, tuple[int, list[bytes]]]:
+    """Every list in the feed: {"events": (total, pages), "<eventType>": (total, pages), ...}."""
+    with connection.use() as conn:
+        # Anonymous viewer: Public only, Inactive excluded (events/read.py)
+        rows = events_read.read_events(conn=conn, fragments=True)
+        ids = [eid for eid, _ in rows]
+        likes = liking_log.get_likes_for_events(ids, conn=conn)
+        rsvps = rsvp_log.get_rsvps_for_events(ids, conn=conn)
+        types = dict(conn.execute(
+            "SELECT eventID, eventType FROM events WHERE eventID IN (SELECT value FROM json_each(?))",
+            (json.dumps(ids),),
+        ).fetchall())
+        by_category: dict[str, list[tuple]] = {}
+        for row in rows:
+            if row[0] in types:
+                by_category.setdefault(types[row[0]], []).append(row)
+        lists = {"events": (len(rows), _pages(rows, likes, rsvps, conn))}
+        for category in sorted(by_category):
+            members = by_category[category]
+            lists[category] = (len(members), _pages(members, likes, rsvps, conn))
+    return lists
+
+
+def _folder(name: str) -> str:
+    return "events" if name == "events" else f"categories/{slug(name)}"
+
+
+def _files(lists: dict[str, tuple[int, list[bytes]]]) -> dict[str, bytes]:
+    """Relative path -> content for one version directory."""
+    return {
+        f"{_folder(name)}/{n}.json": body
+        for name, (_, pages) in lists.items()
+        for n, body in enumerate(pages, start=1)
+    }
+
+
+def _version(files: dict[str, bytes]) -> str:
+    digest = hashlib.sha256()
+    for path in sorted(files):
+        digest.update(path.encode() + b"\0" + files[path] + b"\0")
+    return digest.hexdigest()[:16]
+
+
+# -----------------------------
+# WRITING
+# -----------------------------
+def current_version(feed_dir: Optional[str] = None) -> Optional[str]:
+    """The version manifest.json points at, or None before the first publish."""
+    try:
+        with open(os.path.join(feed_dir or FEED_DIR, MANIFEST), "rb") as f:
+            return json.load(f)["version"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def publish(feed_dir: Optional[str] = None) -> dict:
+    """Render the feed and, if it changed, swap it in.  Returns version, event count and whether it was written."""
+    feed_dir = feed_dir or FEED_DIR
+    with metrics.time_job("static_feed"):
+        lists = render()
+        files = _files(lists)
+        version = _version(files)
+        total = lists["events"][0]
+        if version == current_version(feed_dir) and os.path.isdir(os.path.join(feed_dir, version)):
+            return {"version": version, "events": total, "written": False}
+
+        os.makedirs(feed_dir, exist_ok=True)
+        target = os.path.join(feed_dir, version)
+        if not os.path.isdir(target):
+            staging = os.path.join(feed_dir, f".staging-{version}-{os.getpid()}-{threading.get_ident()}")
+            for path, body in files.items():
+                full = os.path.join(staging, path)
+                os.makedirs(os.path.dirname(full), exist_ok=True)
+                with open(full, "wb") as f:
+                    f.write(body)
+            try:
+                os.rename(staging, target)
+            except OSError:  # another process published the same version first
+                shutil.rmtree(staging, ignore_errors=True)
+
+        manifest = {
+            "version": version,
+            "generatedAt": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "pageSize": PAGE_SIZE,
+            "lists": {
+                name: {
+                    "total": count,
+                    "pages": [f"{version}/{_folder(name)}/{n}.json" for n in range(1, len(pages) + 1)],
+                }
+                for name, (count, pages) in lists.items()
+            },
+        }
+        staging_manifest = os.path.join(feed_dir, f".{MANIFEST}.{os.getpid()}.tmp")
+        with open(staging_manifest, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(staging_manifest, os.path.join(feed_dir, MANIFEST))
+        _prune(feed_dir, version)
+    return {"version": version, "events": total, "written": True}
+
+
+def _prune(feed_dir: str, current: str) -> None:
+    """Keep the current version plus the KEEP_VERSIONS newest others."""
+    versions = [
+        entry for entry in os.scandir(feed_dir)
+        if entry.is_dir() and _VERSION_DIR.match(entry.name) and entry.name != current
+    ]
+    versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in versions[KEEP_VERSIONS:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+# -----------------------------
+# DEBOUNCE
+# -----------------------------
+_lock = threading.Lock()
+_wake = threading.Event()
+_first_change: Optional[float] = None
+_last_change: Optional[float] = None
+_counts_only = True  # every pending change is a like/RSVP count
+_last_publish: Optional[float] = None
+_thread: Optional[threading.Thread] = None
+
+
+def notify(counts_only: bool = False) -> None:
+    """
+    An event write committed; publish once things have been quiet for a
+    moment.  ``counts_only`` for like/RSVP changes, which are throttled.
+    """
+    global _first_change, _last_change, _counts_only
+    if not ENABLED:
+        return
+    with _lock:
+        now = time.monotonic()
+        if _first_change is None:
+            _first_change = now
+        _last_change = now
+        _counts_only = _counts_only and counts_only
+    _wake.set()
+
+
+def _due() -> Optional[float]:
+    with _lock:
+        if _first_change is None:
+            return None
+        due = min(_last_change + DEBOUNCE_SECONDS, _first_change + MAX_DELAY_SECONDS)
+        if _counts_only and _last_publish is not None:
+            due = max(due, _last_publish + MAX_DELAY_SECONDS)
+        return due
+
+
+def _run() -> None:
+    global _first_change, _last_change, _counts_only, _last_publish
+    while True:
+        _wake.wait()
+        due = _due()
+        while due is not None and time.monotonic() < due:
+            time.sleep(due - time.monotonic())
+            due = _due()
+        with _lock:
+            # Changes from here on trigger the next publish
+            _first_change = _last_change = None
+            _counts_only = True
+            _last_publish = time.monotonic()
+            _wake.clear()
+        try:
+            result = publish()
+            if result["written"]:
+                print(f"[static_feed] published {result['version']} ({result['events']} events)")
+        except Exception as e:  # keep the thread alive; the next change retries
+            print(f"[static_feed] publish failed: {e}")
+
+
+def start() -> Optional[threading.Thread]:
+    """Start the background publisher (once per process)."""
+    global _thread
+    if not ENABLED:
+        return None
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name="static-feed", daemon=True)
+            _thread.start()
+    return _thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Public event feed as static JSON.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("publish", help="Write the feed now")
+    args = parser.parse_args()
+    fragments.ensure_schema()
+    fragments.backfill()
+    print(f"[static_feed] {publish()} -> {FEED_DIR}")
@@ -1,6 +1,8 @@
-import os
 import sqlite3
-import base64
+import json
+from typing import Optional
+
+from db import connection
 
 """
 =========================================================
@@ -15,85 +17,189 @@ What Changed:
 - Uses row_factory so results return as dicts, not tuples.
 - Excludes 'Inactive' events by default (soft-deleted).
 - Added chronological ordering option for better UI display.
+- Private events are only listed for their creator, invitees and Faculty;
+  the check is part of the query (inviteLog index), not a Python filter.
+- read_user_events() serves the profile pages (created / liked / RSVPed)
+  with one indexed query per relation instead of the whole catalogue.
+- Image bytes are no longer selected: rows carry imageHash only and
+  imageUrl points at GET /events/{id}/image (events/image_store.py).
 
 Frontend Use:
 - "Browse Events" page → call read_events() to populate event list.
 - "Event Details" page → call read_event_by_id() with the eventID.
+- "My Profile" / "Events Created" → GET /users/{id}/events?relation=...
 - Useful for both list views and detail views in frontend.
 """
 
 # -----------------------------
-# DATABASE PATH
+# READ FUNCTIONS
 # -----------------------------
-DB_PATH = os.environ.get("DB_PATH", "/data/EventPlannerDB.db")
+def attach_image_url(row: dict) -> dict:
+    """
+    Set row["imageUrl"] to the event's image route (or None), versioned by
+    the image hash so browsers may cache it for good (events/image_store.py).
+    """
+    image_hash = row.pop("imageHash", None)
+    row["imageUrl"] = f"/events/{row['eventID']}/image?v={image_hash[:16]}" if image_hash else None
+    return row
 
-def _get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # return dict-like rows
-    return conn
+# Private events are visible to their creator, invitees and Faculty.  The
+# invite check is a lookup on inviteLog(accountID, eventID)
+# (invite_log/invite_log.py), so no event is filtered out in Python.
+_VISIBLE_TO_VIEWER = """({t}.eventAccess != 'Private' OR {t}.creatorID = ?
+    OR EXISTS (SELECT 1 FROM inviteLog i WHERE i.accountID = ? AND i.eventID = {t}.eventID)
+    OR EXISTS (SELECT 1 FROM accounts a WHERE a.accountID = ? AND a.accountType = 'Faculty'))"""
+VISIBLE_TO_VIEWER = _VISIBLE_TO_VIEWER.format(t="events")
 
-# -----------------------------
-# READ FUNCTIONS
-# -----------------------------
-def read_events(include_inactive: bool = False, chronological: bool = True) -> list[dict]:
+def _visibility(viewer_id: Optional[int], table: str = "events") -> tuple[str, tuple]:
+    """SQL condition (and its parameters) for the events ``viewer_id`` may see; None = anonymous."""
+    if viewer_id is None:
+        return f"{table}.eventAccess != 'Private'", ()
+    return _VISIBLE_TO_VIEWER.format(t=table), (viewer_id, viewer_id, viewer_id)
+
+# fragments=True selects (eventID, pre-rendered JSON or None) instead of
+# the columns (events/fragments.py); a primary-key lookup per row
+_FRAGMENT = "(SELECT body FROM eventFragments f WHERE f.eventID = {table}.eventID)"
+
+def _columns(fragments: bool, table: str = "events") -> str:
+    prefix = "" if table == "events" else table + "."
+    if fragments:
+        return f"{prefix}eventID, " + _FRAGMENT.format(table=table)
+    return ", ".join(prefix + c for c in (
+        "eventID", "creatorID", "eventName", "eventDescription", "location", "imageHash", "eventType",
+        "eventAccess", "startDateTime", "numberLikes", "rsvpRequired", "isPriced", "cost", "capacity",
+    ))
+
+def _results(rows, fragments: bool) -> list:
+    if fragments:
+        return [(r[0], r[1]) for r in rows]
+    return [attach_image_url(dict(r)) for r in rows]
+
+def read_events(
+    include_inactive: bool = False,
+    chronological: bool = True,
+    conn: Optional[sqlite3.Connection] = None,
+    viewer_id: Optional[int] = None,
+    fragments: bool = False,
+) -> list:
     """
     Return events as list of dicts.
     Excludes 'Inactive' events by default.
+    Private events only appear for viewer_id = their creator, an invitee or Faculty.
     Optionally sorts by startDateTime.
-    Always includes base64-encoded imageUrl if present.
+    imageUrl is the image route, not the image itself.
+    With fragments=True, (eventID, stored JSON fragment or None) pairs instead.
     """
-    with _get_conn() as conn:
+    with connection.use(conn) as conn:
         cur = conn.cursor()
-        base = """SELECT eventID, creatorID, eventName, eventDescription, location, images,
-                         eventType, eventAccess, startDateTime, numberLikes, rsvpRequired, isPriced, cost
-                  FROM events"""
-        where = "" if include_inactive else " WHERE eventAccess != 'Inactive'"
+        base = f"SELECT {_columns(fragments)} FROM events"
+        visible, params = _visibility(viewer_id)
+        where = " WHERE " + visible + ("" if include_inactive else " AND eventAccess != 'Inactive'")
         order = " ORDER BY startDateTime ASC" if chronological else ""
-        cur.execute(base + where + order)
-        results = [dict(r) for r in cur.fetchall()]
-        for r in results:
-            if r.get("images") is not None:
-                try:
-                    blob = r["images"]
-                    if isinstance(blob, memoryview):
-                        blob = blob.tobytes()
-                    r["imageUrl"] = "data:image/jpeg;base64," + base64.b64encode(blob).decode("utf-8")
-                except Exception as e:
-                    print(f"Error encoding image for event {r.get('eventID', 'unknown')}: {e}")
-                    r["imageUrl"] = None
-            else:
-                r["imageUrl"] = None
-        return results
-
-def read_event_by_id(eventID: int, include_inactive: bool = False) -> dict | None:
+        cur.execute(base + where + order, params)
+        return _results(cur.fetchall(), fragments)
+
+def read_event_by_id(
+    eventID: int,
+    include_inactive: bool = False,
+    conn: Optional[sqlite3.Connection] = None,
+    viewer_id: Optional[int] = None,
+    visible_only: bool = False,
+) -> dict | None:
     """
     Fetch single event by ID.
     Excludes 'Inactive' events unless override=True.
+    With visible_only=True, also None for a Private event ``viewer_id``
+    may not see (same rule as read_events; None = anonymous).
     Always returns imageUrl if present.
     """
-    with _get_conn() as conn:
+    with connection.use(conn) as conn:
         cur = conn.cursor()
-        cur.execute("""SELECT eventID, creatorID, eventName, eventDescription, location, images,
-                              eventType, eventAccess, startDateTime, numberLikes, rsvpRequired, isPriced, cost
-                       FROM events WHERE eventID = ?""", (eventID,))
+        visible, params = _visibility(viewer_id) if visible_only else ("1", ())
+        cur.execute(f"""SELECT eventID, creatorID, eventName, eventDescription, location, imageHash,
+                               eventType, eventAccess, startDateTime, numberLikes, rsvpRequired, isPriced, cost, capacity
+                        FROM events WHERE eventID = ? AND {visible}""", (eventID, *params))
         row = cur.fetchone()
         if not row:
             return None
         row = dict(row)
         if not include_inactive and row.get("eventAccess") == "Inactive":
             return None
-        if row.get("images") is not None:
-            try:
-                blob = row["images"]
-                if isinstance(blob, memoryview):
-                    blob = blob.tobytes()
-                row["imageUrl"] = "data:image/jpeg;base64," + base64.b64encode(blob).decode("utf-8")
-            except Exception as e:
-                print(f"Error encoding image for event {row.get('eventID', 'unknown')}: {e}")
-                row["imageUrl"] = None
-        else:
-            row["imageUrl"] = None
-        return row
+        return attach_image_url(row)
+
+def read_events_by_ids(
+    event_ids: list[int],
+    include_inactive: bool = False,
+    conn: Optional[sqlite3.Connection] = None,
+    viewer_id: Optional[int] = None,
+    fragments: bool = False,
+) -> list:
+    """
+    Fetch several events in one query, in the order of ``event_ids``.
+    Missing (and, by default, Inactive) events are left out, and so are
+    Private ones ``viewer_id`` may not see (same rule as read_events).
+    fragments=True works as in read_events.
+    """
+    if not event_ids:
+        return []
+    with connection.use(conn) as conn:
+        cur = conn.cursor()
+        visible, params = _visibility(viewer_id)
+        where = " AND " + visible + ("" if include_inactive else " AND eventAccess != 'Inactive'")
+        cur.execute(f"""SELECT {_columns(fragments)}
+                        FROM events WHERE eventID IN (SELECT value FROM json_each(?)){where}""",
+                    (json.dumps(list(event_ids)), *params))
+        rows = {r[0]: r for r in cur.fetchall()}
+    return _results([rows[eid] for eid in event_ids if eid in rows], fragments)
+
+# Each relation is one indexed lookup for the user's rows joined to events.
+# The indexes come from db/currentDB.py (ensure_user_indexes() for older DBs).
+USER_RELATIONS = {
+    "created": "FROM events e WHERE e.creatorID = ?",
+    "liked": "FROM likesLog l JOIN events e ON e.eventID = l.eventID WHERE l.accountID = ?",
+    "rsvped": "FROM rsvpLog r JOIN events e ON e.eventID = r.eventID WHERE r.accountID = ?",
+}
+
+USER_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_events_creatorID ON events (creatorID, startDateTime);
+CREATE INDEX IF NOT EXISTS idx_likesLog_accountID ON likesLog (accountID, eventID);
+CREATE INDEX IF NOT EXISTS idx_rsvpLog_accountID ON rsvpLog (accountID, eventID);
+"""
+
+def ensure_user_indexes(conn: Optional[sqlite3.Connection] = None) -> None:
+    """Create the per-user lookup indexes on databases built before they existed."""
+    with connection.use(conn) as conn:
+        conn.executescript(USER_INDEXES)
+
+def read_user_events(
+    user_id: int,
+    relation: str,
+    limit: int = 20,
+    offset: int = 0,
+    include_inactive: bool = False,
+    conn: Optional[sqlite3.Connection] = None,
+    fragments: bool = False,
+    viewer_id: Optional[int] = None,
+) -> list:
+    """
+    One page of the events ``user_id`` created, liked or RSVPed to
+    (``relation`` is a key of USER_RELATIONS), soonest first, leaving out
+    Private ones ``viewer_id`` may not see (same rule as read_events).
+    Raises ValueError for an unknown relation.  fragments=True works as
+    in read_events.
+    """
+    if relation not in USER_RELATIONS:
+        raise ValueError(f"relation must be one of {', '.join(USER_RELATIONS)}")
+    with connection.use(conn) as conn:
+        cur = conn.cursor()
+        visible, params = _visibility(viewer_id, "e")
+        where = " AND " + visible + ("" if include_inactive else " AND e.eventAccess != 'Inactive'")
+        cur.execute(f"""SELECT {_columns(fragments, "e")}
+                        {USER_RELATIONS[relation]}{where}
+                        ORDER BY e.startDateTime ASC, e.eventID ASC
+                        LIMIT ? OFFSET ?""",
+                    (user_id, *params, limit, offset))
+        return _results(cur.fetchall(), fragments)
 
 def read_event_field(eventID: int, field: str) -> object | None:
     """
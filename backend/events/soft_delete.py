@@ -1,5 +1,10 @@
-import os
 import sqlite3
+from typing import Optional
+
+from db import connection
+from events import authorization
+from events import fragments
+from events import image_store
 
 """
 =========================================================
@@ -9,10 +14,13 @@ SOFT DELETE EVENT (mark inactive)
 Purpose:
 - Marks an event as 'Inactive' instead of deleting it from DB.
 - Removes RSVP and Like rows so counts don’t linger.
+- Releases the event's image (events/image_store.py collects it once
+  nothing else uses it).
 - Allows recovery/history since event row still exists.
 
 What Changed:
-- Authorization check: only creator or Faculty can delete.
+- Authorization check: only creator or Faculty can delete
+  (events/authorization.py, one query).
 - Instead of physical delete, updates eventAccess to 'Inactive'.
 - Keeps schema cleaner than hard delete for audit/logging.
 
@@ -22,56 +30,33 @@ Frontend Use:
 - Admin panel can still query inactive events with include_inactive=True.
 """
 
-# -----------------------------
-# DATABASE PATH
-# -----------------------------
-DB_PATH = os.environ.get("DB_PATH", "/data/EventPlannerDB.db")
-
-def _get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-# -----------------------------
-# AUTHORIZATION HELPER
-# -----------------------------
-def _is_authorized(updater_id: int, event_creator_id: int) -> bool:
-    """
-    Authorized if requester is event creator OR Faculty account.
-    """
-    with _get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT accountType FROM accounts WHERE accountID = ?", (updater_id,))
-        row = cur.fetchone()
-        if not row:
-            return False
-        return updater_id == event_creator_id or row[0] == "Faculty"
-
 # -----------------------------
 # SOFT DELETE FUNCTION
 # -----------------------------
-def soft_delete_event(eventID: int, requesterID: int) -> bool:
+def soft_delete_event(
+    eventID: int,
+    requesterID: int,
+    authorized: bool = False,
+    conn: Optional[sqlite3.Connection] = None,
+) -> bool:
     """
     Marks event as Inactive and removes related RSVPs/Likes.
+    Pass authorized=True when the caller already ran events/authorization.py,
+    and ``conn`` to run inside the caller's transaction.
     Returns True if updated, False otherwise.
     """
-    with _get_conn() as conn:
+    with connection.use(conn) as conn:
         cur = conn.cursor()
 
-        # Get creatorID
-        cur.execute("SELECT creatorID FROM events WHERE eventID = ?", (eventID,))
-        row = cur.fetchone()
-        if not row:
-            return False
-        creator_id = row[0]
-
-        # Check authorization
-        if not _is_authorized(requesterID, creator_id):
+        # Check authorization (creator or Faculty)
+        if not authorized and not authorization.is_authorized(eventID, requesterID, conn):
             return False
 
         # Clean related logs
         cur.execute("DELETE FROM rsvpLog  WHERE eventID = ?", (eventID,))
         cur.execute("DELETE FROM likesLog WHERE eventID = ?", (eventID,))
+        cur.execute("DELETE FROM rsvpWaitlist WHERE eventID = ?", (eventID,))
+        image_store.detach(conn, eventID)
 
         # Flag inactive
         cur.execute("""
@@ -79,5 +64,7 @@ def soft_delete_event(eventID: int, requesterID: int) -> bool:
             SET eventAccess = 'Inactive'
             WHERE eventID = ?
         """, (eventID,))
-        conn.commit()
-        return cur.rowcount > 0
+        if cur.rowcount == 0:
+            return False
+        fragments.refresh(conn, [eventID])  # include_inactive lists still show it
+        return True
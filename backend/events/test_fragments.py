@@ -0,0 +1,94 @@
+"""
+Pre-rendered event JSON: the list endpoints return what the models did,
+and the write paths (or the triggers) keep the stored JSON current.
+
+Run from the backend folder:
+    python -m pytest events/test_fragments.py
+"""
+
+import json
+import os
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from db import connection
+from events import create as events_create
+from events import fragments
+from events import image_store
+from events import read as events_read
+from events import soft_delete as events_soft_delete
+from events import update as events_update
+
+HOST = 9880
+FAN = 9881
+POSTER = b"\x89PNG\r\n\x1a\n" + os.urandom(10_000)
+
+
+def _setup():
+    with connection.use() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO accounts (accountID, accountType, email, password, isVerified) VALUES (?, ?, ?, 'x', 1)",
+            [(HOST, "Faculty", "fragments@unco.edu"), (FAN, "Student", "fan@unco.edu")],
+        )
+        return events_create.create_event(
+            HOST, "Café \"Night\"", "ünïcode", "L", "Art", "2036-02-01 18:00:00",
+            images=POSTER, cost=5, capacity=30, conn=conn,
+        )
+
+
+def _stored(event_id):
+    with connection.use() as conn:
+        row = conn.execute("SELECT body FROM eventFragments WHERE eventID = ?", (event_id,)).fetchone()
+    return None if row is None else row[0]
+
+
+def test_list_matches_the_models():
+    import main
+
+    event_id = _setup()
+    with TestClient(main.app) as client:
+        client.post(f"/events/{event_id}/like", json={"user_id": FAN})
+        client.post(f"/events/{event_id}/rsvp", json={"user_id": FAN})
+        for path, params in (("/events", {"user_id": FAN}),
+                             (f"/users/{HOST}/events", {"relation": "created", "viewer_id": FAN})):
+            res = client.get(path, params=params)
+            assert res.headers["content-type"] == "application/json"
+            with connection.use() as conn:
+                events = (events_read.read_events(conn=conn, viewer_id=FAN) if path == "/events"
+                          else events_read.read_user_events(HOST, "created", conn=conn, viewer_id=FAN))
+                expected = jsonable_encoder(main._events_to_responses(events, user_id=FAN, conn=conn))
+            assert res.json() == expected
+        mine = next(e for e in res.json() if e["id"] == event_id)
+        assert mine["likes"] == 1 and mine["userLiked"] and mine["rsvps"] == [FAN]
+        assert mine["price"] == 5.0 and mine["thumbnailUrl"].endswith("?w=480")
+
+
+def test_write_paths_keep_fragments_current():
+    event_id = _setup()
+    body = _stored(event_id)
+    assert json.loads(body + "}")["title"] == "Café \"Night\""
+
+    # A like touches numberLikes only, so the fragment stays
+    with connection.use() as conn:
+        conn.execute("UPDATE events SET numberLikes = numberLikes + 1 WHERE eventID = ?", (event_id,))
+    assert _stored(event_id) == body
+
+    assert events_update.update_event(event_id, HOST, eventName="Renamed")
+    assert json.loads(_stored(event_id) + "}")["title"] == "Renamed"
+
+    with connection.use() as conn:
+        image_store.detach(conn, event_id)
+    assert _stored(event_id) is None  # trigger; rendered live until backfill
+    before = fragments.misses
+    with connection.use() as conn:
+        rows = events_read.read_events_by_ids([event_id], conn=conn, fragments=True)
+        out = json.loads(fragments.assemble(rows, {}, {}, conn=conn))
+    assert out[0]["imageUrl"] is None and fragments.misses == before + 1
+    assert fragments.backfill() >= 1 and _stored(event_id) is not None
+
+    events_soft_delete.soft_delete_event(event_id, HOST, authorized=True)
+    assert json.loads(_stored(event_id) + "}")["eventAccess"] == "Inactive"
+    with connection.use() as conn:
+        conn.execute("DELETE FROM events WHERE eventID = ?", (event_id,))
+    assert _stored(event_id) is None
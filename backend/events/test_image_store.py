@@ -0,0 +1,174 @@
+"""
+Image store: dedup and reference counts, garbage collection, the BLOB
+migration and how the files are served.
+
+Run from the backend folder:
+    python -m pytest events/test_image_store.py
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from db import connection
+from db.currentDB import create_database
+from events import create as events_create
+from events import image_store
+from events import soft_delete as events_soft_delete
+
+HOST = 9870
+POSTER = b"\x89PNG\r\n\x1a\n" + os.urandom(40_000)
+FLYER = b"\xff\xd8\xff\xe0" + os.urandom(20_000)
+
+
+def _event(image=None, start="2035-03-01 18:00:00"):
+    with connection.use() as conn:
+        return events_create.create_event(HOST, "Poster Night", "d", "L", "Art", start, images=image, conn=conn)
+
+
+def _refs(image_hash):
+    with connection.use() as conn:
+        row = conn.execute("SELECT refCount FROM imageBlobs WHERE hash = ?", (image_hash,)).fetchone()
+    return None if row is None else row[0]
+
+
+def test_same_image_is_stored_once_and_counted():
+    poster = hashlib.sha256(POSTER).hexdigest()
+    flyer = hashlib.sha256(FLYER).hexdigest()
+    first, second = _event(POSTER), _event(POSTER)
+    assert _refs(poster) == 2
+    assert os.listdir(os.path.dirname(image_store.path_for(poster))) == [poster]
+
+    # Replacing one event's image moves its reference
+    with connection.use() as conn:
+        image_store.attach(conn, second, image_store.stage_bytes(FLYER))
+    assert (_refs(poster), _refs(flyer)) == (1, 1)
+
+    with connection.use() as conn:
+        events_soft_delete.soft_delete_event(first, HOST, authorized=True, conn=conn)
+        assert conn.execute("SELECT imageHash FROM events WHERE eventID = ?", (first,)).fetchone()[0] is None
+    assert _refs(poster) == 0
+
+    # Kept through the grace period, then collected; the flyer is still in use
+    assert image_store.gc(grace_seconds=3600)["removed"] == 0
+    assert os.path.exists(image_store.path_for(poster))
+    image_store.gc(grace_seconds=0)
+    assert not os.path.exists(image_store.path_for(poster)) and _refs(poster) is None
+    assert os.path.exists(image_store.path_for(flyer))
+
+
+def test_abandoned_staging_files_are_collected():
+    staged = image_store.stage_bytes(FLYER + b"!")
+    assert os.path.exists(staged.path)
+    image_store.gc(grace_seconds=3600)
+    assert os.path.exists(staged.path)  # could still be an upload in flight
+    old = time.time() - 7200
+    os.utime(staged.path, (old, old))
+    assert image_store.gc(grace_seconds=3600)["strays"] >= 1
+    assert not os.path.exists(staged.path)
+
+
+def test_attach_to_missing_event_leaves_nothing_behind():
+    staged = image_store.stage_bytes(POSTER + b"?")
+    with connection.use() as conn, pytest.raises(LookupError):
+        image_store.attach(conn, 10_000_000, staged)
+    assert not os.path.exists(staged.path) and _refs(staged.hash) is None
+
+
+def test_purge_releases_images():
+    past = _event(FLYER + b"old", start="2001-01-01 10:00:00")
+    image_hash = hashlib.sha256(FLYER + b"old").hexdigest()
+    with connection.use() as conn:
+        image_store.release_matching(conn, "eventID = ?", (past,))
+        conn.execute("DELETE FROM events WHERE eventID = ?", (past,))
+    assert _refs(image_hash) == 0
+
+
+def test_migration_moves_blobs_out(tmp_path, monkeypatch):
+    path = str(tmp_path / "legacy.db")
+    create_database(path)
+    monkeypatch.setenv("DB_PATH", path)
+    monkeypatch.setenv("IMAGE_STORE_DIR", str(tmp_path / "store"))
+    with connection.use() as conn:
+        # The events table as it was before the store
+        conn.execute("ALTER TABLE events DROP COLUMN imageHash")
+        conn.execute("ALTER TABLE events ADD COLUMN images BLOB")
+        for image in (POSTER, POSTER, FLYER, b"not an image", None):
+            conn.execute(
+                "INSERT INTO events (creatorID, eventName, eventDescription, location, eventType, startDateTime, images) "
+                "VALUES (1, 'Old', 'd', 'L', 'Art', '2035-01-01 10:00:00', ?)",
+                (image,),
+            )
+    image_store.ensure_schema()
+    assert image_store.pending_blobs() == 4
+
+    assert image_store.migrate(batch=2) == {"moved": 3, "skipped": 1}
+    assert image_store.pending_blobs() == 0
+    with connection.use() as conn:
+        hashes = [row[0] for row in conn.execute("SELECT imageHash FROM events ORDER BY eventID")]
+    poster = hashlib.sha256(POSTER).hexdigest()
+    assert hashes == [poster, poster, hashlib.sha256(FLYER).hexdigest(), None, None]
+    assert _refs(poster) == 2
+    assert image_store.read(poster) == POSTER
+    assert image_store.migrate() == {"moved": 0, "skipped": 0}
+
+
+def test_image_route_serves_the_file():
+    from main import app
+
+    event_id = _event(POSTER + b"route")
+    image_hash = hashlib.sha256(POSTER + b"route").hexdigest()
+    with TestClient(app) as client:
+        url = client.get(f"/events/{event_id}").json()["imageUrl"]
+        res = client.get(url)
+        assert res.content == POSTER + b"route" and res.headers["content-type"] == "image/png"
+        assert "immutable" in res.headers["cache-control"] and res.headers["etag"] == f'"{image_hash}"'
+        # Unversioned (or stale version): short cache only
+        assert "immutable" not in client.get(f"/events/{event_id}/image?v=0000").headers["cache-control"]
+        assert client.get(f"/events/{_event()}/image").status_code == 404
+
+
+def test_gc_walks_the_store_without_the_write_lock(monkeypatch):
+    walked = []
+    real_walk = os.walk
+
+    def walk_while_writing(top):
+        # Another writer gets the lock straight away while the store is scanned
+        conn = sqlite3.connect(connection.db_path(), timeout=0, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("ROLLBACK")
+        finally:
+            conn.close()
+        walked.append(top)
+        return real_walk(top)
+
+    monkeypatch.setattr(image_store.os, "walk", walk_while_writing)
+    image_store.gc(grace_seconds=3600)
+    assert walked
+
+
+def test_stray_attached_after_the_walk_is_kept(monkeypatch):
+    image = POSTER + b"late"
+    image_hash = hashlib.sha256(image).hexdigest()
+    path = image_store.path_for(image_hash)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(image)  # left behind by a crash: no imageBlobs row
+    old = time.time() - 7200
+    os.utime(path, (old, old))
+    real_candidates = image_store._stray_candidates
+
+    def attach_meanwhile(cutoff):
+        found = real_candidates(cutoff)
+        assert path in found
+        _event(image)  # reuses the file ("already stored") before gc takes the lock
+        return found
+
+    monkeypatch.setattr(image_store, "_stray_candidates", attach_meanwhile)
+    image_store.gc(grace_seconds=3600)
+    assert os.path.exists(path) and _refs(image_hash) == 1
@@ -0,0 +1,168 @@
+"""
+Image uploads: multipart on create and update, copied into the image
+store in chunks, with the size limit, content sniffing and the image route.
+
+Run from the backend folder:
+    python -m pytest events/test_images.py
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import tracemalloc
+
+import pytest
+from starlette.datastructures import UploadFile
+from fastapi.testclient import TestClient
+
+from db import connection
+from events import create as events_create
+from events import image_store
+from events import images as event_images
+
+HOST = 9800
+PNG = b"\x89PNG\r\n\x1a\n" + os.urandom(300_000)
+JPEG = b"\xff\xd8\xff\xe0" + os.urandom(50_000)
+
+FIELDS = {
+    "creatorID": str(HOST), "title": "Gallery Opening", "description": "d", "location": "Mariani Gallery",
+    "eventType": "Art", "startDateTime": "2035-01-01 18:00:00",
+}
+
+
+@pytest.fixture(scope="module")
+def client():
+    from main import app
+
+    with connection.use() as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO accounts (accountID, accountType, email, password, isVerified) VALUES (?, 'Student', 'gallery@unco.edu', 'x', 1)",
+            (HOST,),
+        )
+    with TestClient(app) as client:
+        yield client
+
+
+def _event_count():
+    with connection.use() as conn:
+        return conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+
+def test_multipart_create_update_and_serve(client):
+    res = client.post("/events", data={**FIELDS, "categories": ["Honors", "Art"], "capacity": "40"},
+                      files={"images": ("poster.bin", PNG, "application/octet-stream")})
+    assert res.status_code == 201
+    event_id = res.json()["eventID"]
+
+    image = client.get(f"/events/{event_id}/image")
+    assert image.content == PNG and image.headers["content-type"] == "image/png"
+    event = client.get(f"/events/{event_id}").json()
+    assert event["capacity"] == 40
+    assert event["imageUrl"] == f"/events/{event_id}/image?v={hashlib.sha256(PNG).hexdigest()[:16]}"
+
+    res = client.put(f"/events/{event_id}", data={"updaterID": HOST}, files={"images": ("new.jpg", JPEG, "image/jpeg")})
+    assert res.json() == {"success": True, "imageUrl": f"/events/{event_id}/image?v={hashlib.sha256(JPEG).hexdigest()[:16]}"}
+    image = client.get(f"/events/{event_id}/image")
+    assert image.content == JPEG and image.headers["content-type"] == "image/jpeg"
+
+
+def test_non_images_are_refused_and_nothing_is_written(client):
+    before = _event_count()
+    res = client.post("/events", data=FIELDS, files={"images": ("evil.png", b"<?php echo 1; ?>" * 10, "image/png")})
+    assert res.status_code == 415
+    assert _event_count() == before
+
+
+def test_size_limit_is_enforced_while_streaming(client, monkeypatch):
+    monkeypatch.setattr(event_images, "MAX_IMAGE_BYTES", 100_000)
+    before = _event_count()
+    # Known length: refused from the header
+    res = client.post("/events", data=FIELDS, files={"images": ("big.png", PNG, "image/png")})
+    assert res.status_code == 413
+    # Chunked, no Content-Length: refused once the received bytes pass the limit
+    body = b"--b\r\nContent-Disposition: form-data; name=\"images\"; filename=\"big.png\"\r\n\r\n" + PNG + b"\r\n--b--\r\n"
+    chunks = (body[i:i + 16_384] for i in range(0, len(body), 16_384))
+    res = client.post("/events", content=chunks, headers={"content-type": "multipart/form-data; boundary=b"})
+    assert res.status_code == 413
+    # Under the transport limit but over the image limit (form overhead allowance)
+    monkeypatch.setattr(event_images, "FORM_OVERHEAD_BYTES", 1_000_000)
+    res = client.post("/events", data=FIELDS, files={"images": ("big.png", PNG, "image/png")})
+    assert res.status_code == 413
+    assert _event_count() == before
+
+
+def test_base64_images_are_capped_before_buffering_or_decoding(client, monkeypatch):
+    import main
+
+    monkeypatch.setattr(event_images, "MAX_IMAGE_BYTES", 100_000)
+    before = _event_count()
+    encoded = base64.b64encode(PNG).decode()
+    # Over the transport limit: refused from Content-Length, then while a chunked body streams in
+    res = client.post("/events", json={**FIELDS, "creatorID": HOST, "images": encoded})
+    assert res.status_code == 413
+    body = json.dumps({**FIELDS, "creatorID": HOST, "images": encoded}).encode()
+    chunks = (body[i:i + 16_384] for i in range(0, len(body), 16_384))
+    res = client.post("/events", content=chunks, headers={"content-type": "application/json"})
+    assert res.status_code == 413
+
+    # Within the transport allowance but over the image limit: measured, never decoded
+    def no_decode(data):
+        raise AssertionError("decoded an oversize image")
+
+    monkeypatch.setattr(event_images, "FORM_OVERHEAD_BYTES", 1_000_000)
+    monkeypatch.setattr(main.base64, "b64decode", no_decode)
+    res = client.post("/events", json={**FIELDS, "creatorID": HOST, "images": encoded})
+    assert res.status_code == 413
+    event_id = client.post("/events", json={**FIELDS, "creatorID": HOST}).json()["eventID"]
+    res = client.put(f"/events/{event_id}", data={"updaterID": HOST, "image_b64": encoded})
+    assert res.status_code == 413
+    assert _event_count() == before + 1
+
+
+def test_pixel_limit_is_checked_when_staged(client, monkeypatch):
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.new("RGB", (400, 300)).save(out, format="PNG")  # a few KB, 120k pixels
+    monkeypatch.setattr(event_images, "MAX_IMAGE_PIXELS", 100_000)
+    before = _event_count()
+    res = client.post("/events", data=FIELDS, files={"images": ("bomb.png", out.getvalue(), "image/png")})
+    assert res.status_code == 413 and "megapixels" in res.json()["detail"]
+    assert _event_count() == before
+    monkeypatch.setattr(event_images, "MAX_IMAGE_PIXELS", 120_000)
+    res = client.post("/events", data=FIELDS, files={"images": ("ok.png", out.getvalue(), "image/png")})
+    assert res.status_code == 201
+
+
+def test_stage_upload_holds_one_chunk_at_a_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_images, "MAX_IMAGE_BYTES", 8 << 20)
+    size = 4 << 20
+    path = tmp_path / "upload.jpg"
+    path.write_bytes(b"\xff\xd8\xff\xe0" + os.urandom(size - 4))
+    with connection.use() as conn:
+        event_id = events_create.create_event(HOST, "Big", "d", "L", "Art", "2035-01-01 10:00:00", conn=conn)
+
+    async def upload():
+        with open(path, "rb") as f:
+            upload = UploadFile(f, size=size, filename="upload.jpg")
+            tracemalloc.start()
+            staged = await image_store.stage_upload(upload)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return staged, peak
+
+    staged, peak = asyncio.run(upload())
+    assert peak < size // 8
+    with connection.use() as conn:
+        image_store.attach(conn, event_id, staged)
+    with open(image_store.path_for(staged.hash), "rb") as f:
+        assert f.read() == path.read_bytes()
+
+
+def test_sniff():
+    assert event_images.sniff(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
+    assert event_images.sniff(b"GIF89a....") == "image/gif"
+    assert event_images.sniff(io.BytesIO(b"%PDF-1.7").read()) is None
@@ -0,0 +1,114 @@
+"""
+Invites: bulk fan-out in one transaction, who may manage them, and Private
+events showing up (in lists, search, the detail route and profile pages)
+only for their creator, invitees and Faculty.
+
+Run from the backend folder:
+    python -m pytest events/test_invites.py
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from db import connection
+from db.instrumentation import assert_query_budget
+
+HOST = 9400
+FACULTY = 9401
+OUTSIDER = 9402
+GUESTS = list(range(9500, 9800))
+
+
+@pytest.fixture(scope="module")
+def client():
+    from main import app
+
+    with connection.use() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO accounts (accountID, accountType, email, password, isVerified) VALUES (?, ?, ?, 'x', 1)",
+            [(HOST, "Student", "host@unco.edu"), (FACULTY, "Faculty", "dean@unco.edu"),
+             (OUTSIDER, "Student", "outsider@unco.edu")]
+            + [(guest, "Student", f"guest{guest}@unco.edu") for guest in GUESTS],
+        )
+    with TestClient(app) as client:
+        res = client.post("/events", json={
+            "creatorID": HOST, "title": "Secret Supper Club", "description": "d", "location": "UC",
+            "eventType": "Business", "startDateTime": "2033-01-01 19:00:00", "eventAccess": "Private",
+        })
+        client.event_id = res.json()["eventID"]
+        yield client
+
+
+def _titles(client, path, **params):
+    return [e["title"] for e in client.get(path, params=params).json()]
+
+
+def test_bulk_invite_is_one_batch(client):
+    eid = client.event_id
+    res = client.post(f"/events/{eid}/invites", json={"inviterID": HOST, "user_ids": GUESTS + GUESTS[:10] + [123456]})
+    assert res.status_code == 200
+    # Duplicates and the unknown account are skipped by the statement itself
+    assert res.json() == {"invited": len(GUESTS)}
+    # permission check, BEGIN, the executemany, COMMIT
+    assert_query_budget(res, queries=4, connections=1)
+
+    res = client.post(f"/events/{eid}/invites", json={"inviterID": HOST, "user_ids": GUESTS[:5]})
+    assert res.json() == {"invited": 0}
+    assert client.get(f"/events/{eid}/invites", params={"user_id": HOST}).json()["invites"] == GUESTS
+
+
+def test_only_creator_or_faculty_manage_invites(client):
+    eid = client.event_id
+    res = client.post(f"/events/{eid}/invites", json={"inviterID": OUTSIDER, "user_ids": [OUTSIDER]})
+    assert res.status_code == 403
+    assert client.get(f"/events/{eid}/invites", params={"user_id": OUTSIDER}).status_code == 403
+    assert client.get(f"/events/{eid}/invites", params={"user_id": FACULTY}).status_code == 200
+
+
+def test_private_events_are_filtered_in_list_and_search(client):
+    guest = GUESTS[0]
+    for viewer in (HOST, FACULTY, guest):
+        assert "Secret Supper Club" in _titles(client, "/events", user_id=viewer)
+        assert "Secret Supper Club" in _titles(client, "/search", title="supper", user_id=viewer)
+    assert "Secret Supper Club" not in _titles(client, "/events", user_id=OUTSIDER)
+    assert "Secret Supper Club" not in _titles(client, "/events")
+    assert _titles(client, "/search", title="supper", user_id=OUTSIDER) == []
+
+
+def test_private_event_detail_and_profile_lists(client):
+    eid = client.event_id
+    for viewer in (HOST, FACULTY, GUESTS[3]):
+        assert client.get(f"/events/{eid}", params={"user_id": viewer}).json()["title"] == "Secret Supper Club"
+    assert client.get(f"/events/{eid}", params={"user_id": OUTSIDER}).status_code == 404
+    assert client.get(f"/events/{eid}").status_code == 404
+
+    profile = f"/users/{HOST}/events"
+    assert "Secret Supper Club" in _titles(client, profile, relation="created", viewer_id=HOST)
+    assert "Secret Supper Club" in _titles(client, profile, relation="created", viewer_id=FACULTY)
+    assert "Secret Supper Club" not in _titles(client, profile, relation="created", viewer_id=OUTSIDER)
+    assert "Secret Supper Club" not in _titles(client, profile, relation="created")
+
+
+def test_revoke_and_decline(client):
+    eid = client.event_id
+    first, second = GUESTS[:2]
+    res = client.delete(f"/events/{eid}/invites/{first}", params={"user_id": HOST})
+    assert res.json() == {"success": True}
+    assert "Secret Supper Club" not in _titles(client, "/events", user_id=first)
+
+    # An invitee may decline, but not revoke somebody else's invite
+    assert client.delete(f"/events/{eid}/invites/{second}", params={"user_id": second}).json() == {"success": True}
+    assert client.delete(f"/events/{eid}/invites/{GUESTS[2]}", params={"user_id": second}).status_code == 403
+
+
+def test_visibility_check_is_indexed():
+    from events import read as events_read
+
+    with connection.use() as conn:
+        def plan(sql, params):
+            return " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall())
+
+        assert "idx_inviteLog_accountID" in plan("SELECT eventID FROM inviteLog WHERE accountID = ?", (1,))
+        visible = plan(f"SELECT eventID FROM events WHERE {events_read.VISIBLE_TO_VIEWER}", (1, 1, 1))
+        # Only the events table itself is scanned; the invite and role checks are index lookups
+        assert visible.count("SCAN") == 1 and "SCAN events" in visible
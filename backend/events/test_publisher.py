@@ -0,0 +1,115 @@
+"""
+Static feed: what gets published, versioning and the atomic swap, the
+debounce, and the throttle on like/RSVP count changes.
+
+Run from the backend folder:
+    python -m pytest events/test_publisher.py
+"""
+
+import json
+import os
+import time
+
+from db import connection
+from events import create as events_create
+from events import publisher
+from events import soft_delete as events_soft_delete
+
+HOST = 9890
+
+
+def _event(title, category="Sports", access="Public"):
+    with connection.use() as conn:
+        return events_create.create_event(HOST, title, "d", "L", category, "2037-05-01 12:00:00", eventAccess=access, conn=conn)
+
+
+def _read(feed, path):
+    with open(os.path.join(feed, path), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _published_ids(feed, name="events"):
+    manifest = _read(feed, "manifest.json")
+    return [e["id"] for page in manifest["lists"][name]["pages"] for e in _read(feed, page)["events"]]
+
+
+def test_publishes_public_events_paged_and_by_category(tmp_path, monkeypatch):
+    monkeypatch.setattr(publisher, "PAGE_SIZE", 2)
+    feed = str(tmp_path / "feed")
+    public = [_event(f"Match {i}") for i in range(3)]
+    art = _event("Sketching", category="Study Session")
+    private = _event("Secret", access="Private")
+    cancelled = _event("Cancelled")
+    events_soft_delete.soft_delete_event(cancelled, HOST, authorized=True)
+
+    first = publisher.publish(feed)
+    assert first["written"]
+    ids = _published_ids(feed)
+    assert set(public + [art]) <= set(ids) and private not in ids and cancelled not in ids
+    manifest = _read(feed, "manifest.json")
+    assert manifest["version"] == first["version"] and manifest["lists"]["events"]["total"] == len(ids)
+    assert manifest["lists"]["Study Session"]["pages"][0] == f"{first['version']}/categories/study-session/1.json"
+    assert art in _published_ids(feed, "Study Session") and art not in _published_ids(feed, "Sports")
+    page = _read(feed, manifest["lists"]["events"]["pages"][0])
+    assert page["page"] == 1 and len(page["events"]) == 2 and page["events"][0]["userLiked"] is False
+
+    # Nothing changed: nothing rewritten
+    assert publisher.publish(feed) == {**first, "written": False}
+
+    # A change is a new version directory; the old one stays for clients mid-read
+    events_soft_delete.soft_delete_event(public[0], HOST, authorized=True)
+    second = publisher.publish(feed)
+    assert second["version"] != first["version"] and public[0] not in _published_ids(feed)
+    assert os.path.isdir(os.path.join(feed, first["version"]))
+    assert not [name for name in os.listdir(feed) if name.startswith(".")]  # no staging left over
+
+
+def test_old_versions_are_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(publisher, "KEEP_VERSIONS", 1)
+    feed = str(tmp_path / "feed")
+    versions = []
+    for i in range(4):
+        _event(f"Prune {i}")
+        versions.append(publisher.publish(feed)["version"])
+        os.utime(os.path.join(feed, versions[-1]), (time.time() + i, time.time() + i))
+    assert sorted(name for name in os.listdir(feed) if name != "manifest.json") == sorted(versions[-2:])
+
+
+def test_notify_is_debounced(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(publisher, "ENABLED", True)
+    monkeypatch.setattr(publisher, "DEBOUNCE_SECONDS", 0.2)
+    monkeypatch.setattr(publisher, "MAX_DELAY_SECONDS", 5)
+    monkeypatch.setattr(publisher, "publish", lambda: calls.append(time.monotonic()) or {"written": False})
+    publisher.start()
+    for _ in range(5):
+        publisher.notify()
+        time.sleep(0.05)
+    deadline = time.monotonic() + 3
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.4)
+    assert len(calls) == 1
+
+
+def test_count_changes_are_throttled(monkeypatch):
+    calls = []
+    monkeypatch.setattr(publisher, "ENABLED", True)
+    monkeypatch.setattr(publisher, "DEBOUNCE_SECONDS", 0.05)
+    monkeypatch.setattr(publisher, "MAX_DELAY_SECONDS", 0.6)
+    monkeypatch.setattr(publisher, "publish", lambda: calls.append(time.monotonic()) or {"written": False})
+    monkeypatch.setattr(publisher, "_last_publish", time.monotonic())
+    publisher.start()
+    start = time.monotonic()
+    publisher.notify(counts_only=True)
+    deadline = start + 3
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert calls and calls[0] - start >= 0.5  # held back until MAX_DELAY after the last publish
+
+    # An event write right after still goes out after the debounce
+    publisher.notify()
+    deadline = time.monotonic() + 3
+    while len(calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert len(calls) == 2 and calls[1] - calls[0] < 0.4
@@ -0,0 +1,127 @@
+"""
+RSVP capacity: the conditional insert never oversells under a burst of
+concurrent RSVPs, the waitlist keeps arrival order, and cancelling or
+raising the cap promotes the next in line.
+
+Run from the backend folder:
+    python -m pytest events/test_rsvp_capacity.py
+"""
+
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from db import connection
+from events import create as events_create
+from rsvp import rsvp as rsvp_log
+
+HOST = 9700
+
+
+def _capped_event(capacity):
+    with connection.use() as conn:
+        return events_create.create_event(
+            HOST, "Limited Seats", "d", "UC", "Workshops", "2034-01-01 10:00:00", capacity=capacity, conn=conn,
+        )
+
+
+def test_burst_of_rsvps_never_oversells():
+    capacity, threads, per_thread = 50, 32, 64
+    event_id = _capped_event(capacity)
+    results: dict[int, str] = {}
+    start_gate = threading.Barrier(threads)
+
+    def worker(first_user):
+        start_gate.wait()
+        for user_id in range(first_user, first_user + per_thread):
+            results[user_id] = rsvp_log.reserve(user_id, event_id)[0]
+
+    pool = [threading.Thread(target=worker, args=(10_000 + i * per_thread,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    confirmed = sorted(u for u, r in results.items() if r == rsvp_log.CONFIRMED)
+    assert len(results) == threads * per_thread
+    assert len(confirmed) == capacity
+    assert sorted(rsvp_log.get_event_rsvps(event_id)) == confirmed
+    waitlist = rsvp_log.get_event_waitlist(event_id)
+    assert len(waitlist) == len(set(waitlist)) == threads * per_thread - capacity
+    assert not set(waitlist) & set(confirmed)
+    # Serialized on the write lock, but still hundreds of RSVPs a second
+    assert len(results) / elapsed > 200
+
+    # Each cancellation hands the seat to the longest-waiting user
+    for user_id in confirmed[:5]:
+        status, promoted = rsvp_log.cancel_and_promote(user_id, event_id)
+        assert status == rsvp_log.CANCELLED and len(promoted) == 1
+    assert rsvp_log.get_event_waitlist(event_id) == waitlist[5:]
+    assert len(rsvp_log.get_event_rsvps(event_id)) == capacity
+
+
+def test_rsvp_endpoints_with_a_waitlist():
+    from main import app
+
+    with connection.use() as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO accounts (accountID, accountType, email, password, isVerified) VALUES (?, 'Student', 'seats@unco.edu', 'x', 1)",
+            (HOST,),
+        )
+    with TestClient(app) as client:
+        event_id = client.post("/events", json={
+            "creatorID": HOST, "title": "Tiny Seminar", "description": "d", "location": "Ross Hall",
+            "eventType": "Math", "startDateTime": "2034-02-01 10:00:00", "capacity": 2,
+        }).json()["eventID"]
+        assert client.get(f"/events/{event_id}").json()["capacity"] == 2
+
+        statuses = [client.post(f"/events/{event_id}/rsvp", json={"user_id": u}).json() for u in (1, 2, 3, 4)]
+        assert [s["status"] for s in statuses] == ["confirmed", "confirmed", "waitlisted", "waitlisted"]
+        assert [s.get("waitlistPosition") for s in statuses[2:]] == [1, 2]
+        again = client.post(f"/events/{event_id}/rsvp", json={"user_id": 4}).json()
+        assert again["waitlistPosition"] == 2
+
+        res = client.request("DELETE", f"/events/{event_id}/rsvp", json={"user_id": 1}).json()
+        assert res["promoted"] == [3] and sorted(res["rsvps"]) == [2, 3]
+        waitlist = f"/events/{event_id}/waitlist"
+        assert client.get(waitlist, params={"user_id": HOST}).json() == {"waitlist": [4]}
+        # Anyone else only sees their own place
+        assert client.get(waitlist, params={"user_id": 4}).json() == {"waitlistPosition": 1}
+        assert client.get(waitlist, params={"user_id": 2}).json() == {"waitlistPosition": None}
+
+        # Raising the cap lets the rest in; leaving a waitlist promotes nobody
+        client.post(f"/events/{event_id}/rsvp", json={"user_id": 5})
+        client.put(f"/events/{event_id}", data={"updaterID": HOST, "capacity": 3})
+        assert client.get(waitlist, params={"user_id": HOST}).json() == {"waitlist": [5]}
+        res = client.request("DELETE", f"/events/{event_id}/rsvp", json={"user_id": 5}).json()
+        assert res["promoted"] == [] and sorted(res["rsvps"]) == [2, 3, 4]
+
+        assert client.post("/events/999999/rsvp", json={"user_id": 1}).status_code == 404
+        assert client.get("/events/999999/waitlist", params={"user_id": HOST}).status_code == 404
+        bad = client.post("/events", json={
+            "creatorID": HOST, "title": "x", "description": "d", "location": "l",
+            "eventType": "Math", "startDateTime": "2034-02-01 10:00:00", "capacity": 0,
+        })
+        assert bad.status_code == 422
+
+
+def test_private_waitlist_is_hidden_from_outsiders():
+    from main import app
+
+    event_id = _capped_event(1)
+    with connection.use() as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO accounts (accountID, accountType, email, password, isVerified) VALUES (?, 'Student', 'seats@unco.edu', 'x', 1)",
+            (HOST,),
+        )
+        conn.execute("UPDATE events SET eventAccess = 'Private' WHERE eventID = ?", (event_id,))
+    for user_id in (1, 2):
+        rsvp_log.reserve(user_id, event_id)
+    with TestClient(app) as client:
+        waitlist = f"/events/{event_id}/waitlist"
+        assert client.get(waitlist, params={"user_id": HOST}).json() == {"waitlist": [2]}
+        assert client.get(waitlist, params={"user_id": 3}).status_code == 404
+        assert client.get(waitlist).status_code == 422
@@ -0,0 +1,83 @@
+"""
+GET /users/{id}/events: each relation, paging, and that every relation is
+answered from its index rather than a scan of the whole table.
+
+Run from the backend folder:
+    python -m pytest events/test_user_events.py
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from db import connection
+from events import read as events_read
+
+OWNER = 9300
+FAN = 9301
+
+
+@pytest.fixture(scope="module")
+def client():
+    from main import app
+
+    with connection.use() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO accounts (accountID, accountType, email, password, isVerified) VALUES (?, 'Student', ?, 'x', 1)",
+            [(OWNER, "owner@unco.edu"), (FAN, "fan@unco.edu")],
+        )
+    with TestClient(app) as client:
+        ids = []
+        for day in (3, 1, 2):
+            res = client.post("/events", json={
+                "creatorID": OWNER, "title": f"Talk {day}", "description": "d", "location": "UC",
+                "eventType": "Science", "startDateTime": f"2032-05-0{day} 12:00:00",
+            })
+            ids.append(res.json()["eventID"])
+        client.post(f"/events/{ids[0]}/like", json={"user_id": FAN})
+        client.post(f"/events/{ids[2]}/like", json={"user_id": FAN})
+        client.post(f"/events/{ids[0]}/rsvp", json={"user_id": FAN})
+        client.delete(f"/events/{ids[1]}", params={"user_id": OWNER})  # soft delete
+        client.ids = ids
+        yield client
+
+
+def test_created_is_chronological_and_paged(client):
+    third, _, second = client.ids
+    res = client.get(f"/users/{OWNER}/events", params={"relation": "created"})
+    assert [e["id"] for e in res.json()] == [second, third]
+
+    res = client.get(f"/users/{OWNER}/events", params={"relation": "created", "include_inactive": True})
+    assert [e["title"] for e in res.json()] == ["Talk 1", "Talk 2", "Talk 3"]
+    res = client.get(f"/users/{OWNER}/events", params={
+        "relation": "created", "include_inactive": True, "limit": 2, "offset": 2,
+    })
+    assert [e["title"] for e in res.json()] == ["Talk 3"]
+
+
+def test_liked_and_rsvped_carry_the_users_flags(client):
+    third, _, second = client.ids
+    liked = client.get(f"/users/{FAN}/events", params={"relation": "liked"}).json()
+    assert [e["id"] for e in liked] == [second, third]
+    assert all(e["userLiked"] for e in liked)
+
+    rsvped = client.get(f"/users/{FAN}/events", params={"relation": "rsvped"}).json()
+    assert [e["id"] for e in rsvped] == [third] and rsvped[0]["userRsvped"]
+
+    as_owner = client.get(f"/users/{FAN}/events", params={"relation": "liked", "viewer_id": OWNER}).json()
+    assert not any(e["userLiked"] for e in as_owner)
+
+
+def test_unknown_relation_is_rejected(client):
+    assert client.get(f"/users/{OWNER}/events", params={"relation": "invited"}).status_code == 400
+
+
+@pytest.mark.parametrize("relation", sorted(events_read.USER_RELATIONS))
+def test_each_relation_uses_its_index(relation):
+    with connection.use() as conn:
+        plan = " ".join(
+            row[3] for row in conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT e.eventID {events_read.USER_RELATIONS[relation]}", (1,)
+            ).fetchall()
+        )
+    assert "USING" in plan and "INDEX" in plan
+    assert "SCAN" not in plan
@@ -0,0 +1,165 @@
+"""
+Image variants: rendering, the background job, stale-job protection,
+sharing between events with the same image, collection with the original
+and GET /events/{id}/image?w=.
+
+Run from the backend folder:
+    python -m pytest events/test_variants.py
+"""
+
+import io
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from db import connection
+from events import image_store
+from events import images as event_images
+from events import variants
+
+HOST = 9850
+
+
+def _photo(width=1200, height=800, color=(200, 40, 40)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(out, format="JPEG")
+    return out.getvalue()
+
+
+@pytest.fixture(scope="module")
+def client():
+    from main import app
+
+    with connection.use() as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO accounts (accountID, accountType, email, password, isVerified) VALUES (?, 'Faculty', 'variants@unco.edu', 'x', 1)",
+            (HOST,),
+        )
+    with TestClient(app) as client:
+        yield client
+    variants.pool.shutdown()
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(variants, "ENABLED", True)
+
+
+def _create(client, image: bytes) -> int:
+    res = client.post("/events", data={
+        "creatorID": str(HOST), "title": "Print Sale", "description": "d", "location": "Guggenheim Hall",
+        "eventType": "Art", "startDateTime": "2035-02-01 18:00:00",
+    }, files={"images": ("print.jpg", image, "image/jpeg")})
+    assert res.status_code == 201
+    return res.json()["eventID"]
+
+
+def _stored(event_id):
+    """(width, format) of the variants of the event's current image."""
+    with connection.use() as conn:
+        return [tuple(row) for row in conn.execute(
+            """
+            SELECT v.width, v.format FROM events e JOIN imageVariants v ON v.hash = e.imageHash
+            WHERE e.eventID = ? ORDER BY v.width, v.format
+            """,
+            (event_id,),
+        )]
+
+
+def _image_hash(event_id):
+    with connection.use() as conn:
+        return conn.execute("SELECT imageHash FROM events WHERE eventID = ?", (event_id,)).fetchone()[0]
+
+
+def test_render_only_narrower_widths():
+    rendered = variants._render(_photo(600, 300), (160, 480, 960), 80)
+    assert [(w, f) for w, f, _ in rendered] == [(160, "webp"), (160, "jpeg"), (480, "webp"), (480, "jpeg")]
+    for width, fmt, data in rendered:
+        with Image.open(io.BytesIO(data)) as image:
+            assert image.format == fmt.upper() and image.size == (width, width // 2)
+
+
+def test_render_refuses_too_many_pixels():
+    with pytest.raises(event_images.ImageTooLarge):
+        variants._render(_photo(600, 300), (160,), 80, max_pixels=600 * 300 - 1)
+
+
+def test_upload_renders_variants_served_by_width(client, enabled, monkeypatch):
+    started = []
+    monkeypatch.setattr(variants, "schedule", lambda event_id: started.append(event_id))
+    original = _photo()
+    event_id = _create(client, original)
+    # The request only schedules the job; it never waits for the rendering
+    assert started == [event_id] and _stored(event_id) == []
+    assert client.get(f"/events/{event_id}/image", params={"w": 200}).content == original
+
+    assert variants.generate(event_id) == 6
+    small = client.get(f"/events/{event_id}/image", params={"w": 200}, headers={"Accept": "image/webp,*/*"})
+    assert small.headers["content-type"] == "image/webp" and "Accept" in small.headers["vary"]
+    with Image.open(io.BytesIO(small.content)) as image:
+        assert image.width == 480
+    jpeg = client.get(f"/events/{event_id}/image", params={"w": 100, "format": "jpeg"})
+    assert jpeg.headers["content-type"] == "image/jpeg" and len(jpeg.content) < len(original)
+    # Wider than any variant: the original
+    assert client.get(f"/events/{event_id}/image", params={"w": 2000}).content == original
+
+    event = client.get(f"/events/{event_id}").json()
+    assert event["thumbnailUrl"] == f"/events/{event_id}/image?w={variants.CARD_WIDTH}"
+
+
+def test_new_upload_drops_variants_and_stale_job_is_ignored(client, enabled, monkeypatch):
+    monkeypatch.setattr(variants, "schedule", lambda event_id: None)
+    event_id = _create(client, _photo(1200, 800, (10, 200, 10)))
+
+    # A job that rendered the old image finishes after a new upload: nothing stored
+    real_run = variants.pool.run
+
+    def replace_meanwhile(fn, *args):
+        result = real_run(fn, *args)
+        res = client.put(f"/events/{event_id}", data={"updaterID": str(HOST)},
+                         files={"images": ("new.jpg", _photo(400, 400, (0, 0, 255)), "image/jpeg")})
+        assert res.status_code == 200
+        return result
+
+    tmp = os.path.join(image_store.root(), "tmp")
+    staging = set(os.listdir(tmp))
+    monkeypatch.setattr(variants.pool, "run", replace_meanwhile)
+    assert variants.generate(event_id) == 0
+    assert _stored(event_id) == []
+    assert set(os.listdir(tmp)) == staging  # the rendered files were dropped
+
+    monkeypatch.setattr(variants.pool, "run", real_run)
+    assert variants.generate(event_id) == 2  # 400 px wide: only the 160 px copies
+    variants.backfill()  # already has its variants: left alone
+    assert len(_stored(event_id)) == 2
+
+
+def test_same_image_shares_its_variants(client, enabled, monkeypatch):
+    monkeypatch.setattr(variants, "schedule", lambda event_id: None)
+    poster = _photo(800, 400, (90, 90, 0))
+    first, second = _create(client, poster), _create(client, poster)
+    assert variants.generate(first) == 4
+    assert variants.generate(second) == 0  # same image: already rendered
+    assert _stored(second) == _stored(first)
+    a = client.get(f"/events/{first}/image", params={"w": 300, "format": "webp"})
+    b = client.get(f"/events/{second}/image", params={"w": 300, "format": "webp"})
+    assert a.content == b.content and a.headers["etag"] == b.headers["etag"]
+
+
+def test_background_job_and_delete(client, enabled):
+    event_id = _create(client, _photo(1000, 500))
+    variants.schedule(event_id).join(timeout=60)
+    assert [w for w, _ in _stored(event_id)] == [160, 160, 480, 480, 960, 960]
+    image_hash = _image_hash(event_id)
+    files = [image_store.variant_path(image_hash, w, f) for w, f in _stored(event_id)]
+    assert all(os.path.exists(path) for path in files)
+
+    res = client.delete(f"/events/{event_id}", params={"user_id": HOST, "hard": True})
+    assert res.status_code == 200
+    # Collected with the original once nothing uses it
+    image_store.gc(grace_seconds=0)
+    assert not any(os.path.exists(path) for path in files)
+    with connection.use() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM imageVariants WHERE hash = ?", (image_hash,)).fetchone()[0] == 0
@@ -0,0 +1,206 @@
+"""
+=========================================================
+IMAGE VARIANTS (thumbnails / responsive widths)
+=========================================================
+
+Purpose:
+- Event cards were sent the full uploaded photo (often a multi-megabyte
+  phone JPEG, base64 in the list response).  After an upload, this module
+  renders a few narrower copies, as WebP and JPEG, and
+  GET /events/{id}/image?w=480 serves the smallest one at least that wide
+  (WebP when the browser's Accept header allows it).  Event responses
+  carry that URL as thumbnailUrl for list cards.
+
+How:
+- schedule(event_id) is called once the upload has committed (create and
+  update in main.py).  A background thread reads the original from the
+  image store (events/image_store.py), runs _render() on a
+  BoundedProcessPool (Pillow decoding/resizing is CPU work and would hold
+  the GIL on the request threads), writes the results into the store's
+  tmp/ and publishes them in one short transaction.  The request itself
+  never waits for it.
+- Variants are files in the image store keyed by (imageHash, width,
+  format), so an image shared by several events is rendered and stored
+  once, and they are collected with their original.  A new upload points
+  the event at another hash, so the old variants simply stop being
+  served; a job whose image no event uses any more stores nothing.
+- _render() refuses images over IMAGE_MAX_MEGAPIXELS (events/images.py)
+  before decoding them; uploads that big are already refused when
+  staged, so this only catches images stored before the cap.
+- Until the variants exist (or if the pool was busy and the job was
+  skipped) the original is served; `python -m events.variants backfill`
+  renders whatever is missing.
+- GET /events/{id}/image?w= looks the variant up in imageVariants and
+  serves the file with FileResponse, like the original.
+
+Settings:
+- IMAGE_VARIANT_WIDTHS     comma-separated widths (default 160,480,960)
+- IMAGE_VARIANT_QUALITY    WebP/JPEG quality (default 80)
+- IMAGE_CARD_WIDTH         width asked for by EventResponse.thumbnailUrl (default 480)
+- IMAGE_WORKERS            worker processes (default 1)
+- IMAGE_QUEUE              jobs that may wait for a worker (default 16)
+- IMAGE_VARIANTS=0         don't generate variants at all
+
+Usage (from the backend folder):
+    python -m events.variants backfill
+"""
+
+import argparse
+import io
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+from db import connection
+from db.unit_of_work import UnitOfWork
+from events import image_store
+from events import images
+from monitoring import metrics
+from workers.process_pool import BoundedProcessPool, PoolBusy
+
+ENABLED = os.environ.get("IMAGE_VARIANTS", "1") != "0"
+WIDTHS = tuple(sorted(int(w) for w in os.environ.get("IMAGE_VARIANT_WIDTHS", "160,480,960").split(",") if w.strip()))
+QUALITY = int(os.environ.get("IMAGE_VARIANT_QUALITY", "80"))
+CARD_WIDTH = int(os.environ.get("IMAGE_CARD_WIDTH", "480"))
+FORMATS = ("webp", "jpeg")
+
+pool = BoundedProcessPool(
+    "images",
+    max_workers=int(os.environ.get("IMAGE_WORKERS", "1")),
+    max_queue=int(os.environ.get("IMAGE_QUEUE", "16")),
+    admission_timeout=0,
+)
+
+# -----------------------------
+# RENDERING (runs in a worker process)
+# -----------------------------
+def _render(
+    original: bytes, widths: tuple[int, ...], quality: int, max_pixels: int = images.MAX_IMAGE_PIXELS,
+) -> list[tuple[int, str, bytes]]:
+    """
+    Decode once, then (width, format, bytes) for every width narrower than the original.
+    Raises ImageTooLarge, before decoding, for more than ``max_pixels``.
+    """
+    from PIL import Image, ImageOps
+
+    # Deliberate cap instead of Pillow's default (which only warns below twice its value)
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    with Image.open(io.BytesIO(original)) as image:
+        if image.width * image.height > max_pixels:
+            raise images.ImageTooLarge(f"{image.width}x{image.height} is over {max_pixels} pixels")
+        image = ImageOps.exif_transpose(image)  # phone photos are often stored sideways
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        results = []
+        for width in widths:
+            if width >= image.width:
+                break
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            for fmt in FORMATS:
+                out = io.BytesIO()
+                frame = resized if fmt == "webp" or resized.mode == "RGB" else resized.convert("RGB")
+                frame.save(out, format=fmt.upper(), quality=quality, optimize=True)
+                results.append((width, fmt, out.getvalue()))
+        return results
+
+
+# -----------------------------
+# PIPELINE (request side)
+# -----------------------------
+def _image_hash(conn: sqlite3.Connection, event_id: int) -> Optional[str]:
+    row = conn.execute("SELECT imageHash FROM events WHERE eventID = ?", (event_id,)).fetchone()
+    return None if row is None else row[0]
+
+
+def render(image_hash: str) -> int:
+    """Render and store the variants of one stored image now.  Returns how many were stored."""
+    rendered = pool.run(_render, image_store.read(image_hash), WIDTHS, QUALITY, images.MAX_IMAGE_PIXELS)
+    staged = []
+    try:
+        for width, fmt, data in rendered:
+            staged.append((width, fmt, image_store.stage_variant(data)))
+        with UnitOfWork() as uow:
+            stored = image_store.publish_variants(uow.conn, image_hash, staged)
+            uow.commit()
+    finally:
+        for _, _, path in staged:  # the ones publish_variants() didn't move
+            if os.path.exists(path):
+                os.unlink(path)
+    return stored
+
+
+def generate(event_id: int) -> int:
+    """Render and store the variants of an event's image, unless it already has them."""
+    with connection.use() as conn:
+        image_hash = _image_hash(conn, event_id)
+        if image_hash is None or image_store.has_variants(conn, image_hash):
+            return 0  # no image, or another event with the same image got there first
+    return render(image_hash)
+
+
+def _run_job(event_id: int) -> None:
+    try:
+        with metrics.time_job("image_variants"):
+            generate(event_id)
+    except PoolBusy:  # counted in process_pool_rejected_total{pool="images"}
+        print(f"[variants] pool busy, event {event_id} serves its original until backfill")
+    except Exception as e:  # a corrupt upload must not kill the thread silently
+        print(f"[variants] event {event_id} failed: {e}")
+
+
+def schedule(event_id: int) -> Optional[threading.Thread]:
+    """Start rendering the variants for a just-committed upload in the background."""
+    if not ENABLED:
+        return None
+    thread = threading.Thread(target=_run_job, args=(event_id,), daemon=True)
+    thread.start()
+    return thread
+
+
+def backfill() -> int:
+    """Render variants for every image in use that has none yet.  Returns how many got some."""
+    with connection.use() as conn:
+        hashes = [row[0] for row in conn.execute(
+            """
+            SELECT hash FROM imageBlobs b
+            WHERE refCount > 0
+              AND NOT EXISTS (SELECT 1 FROM imageVariants v WHERE v.hash = b.hash)
+            """
+        ).fetchall()]
+    done = 0
+    for image_hash in hashes:
+        try:
+            done += render(image_hash) > 0
+        except Exception as e:  # one unreadable upload must not stop the rest
+            print(f"[variants] image {image_hash[:16]} failed: {e}")
+    return done
+
+
+# -----------------------------
+# SERVING
+# -----------------------------
+def pick(conn: sqlite3.Connection, event_id: int, width: int, fmt: str) -> Optional[tuple[str, int]]:
+    """(imageHash, width) of the narrowest stored variant at least ``width`` wide, or None (serve the original)."""
+    row = conn.execute(
+        """
+        SELECT v.hash, v.width FROM events e
+        JOIN imageVariants v ON v.hash = e.imageHash
+        WHERE e.eventID = ? AND v.format = ? AND v.width >= ?
+        ORDER BY v.width LIMIT 1
+        """,
+        (event_id, fmt, width),
+    ).fetchone()
+    return None if row is None else (row[0], row[1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Event image variants.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("backfill", help="Render variants for images that have none")
+    args = parser.parse_args()
+    image_store.ensure_schema()
+    try:
+        print(f"[variants] rendered variants for {backfill()} events")
+    finally:
+        pool.shutdown()
@@ -0,0 +1,87 @@
+"""
+=========================================================
+INVITE LOG (inviteLog table integration)
+=========================================================
+
+Purpose:
+- Manage invitations to Private events: invite many users at once,
+  revoke one, and list who is invited.
+- Each invite = user (accountID) ↔ event (eventID).
+
+What Changed:
+- First writer of inviteLog (the table and its cleanup in
+  events/hard_delete.py already existed).
+- add_invites() fans out to hundreds of invitees with one executemany
+  inside the caller's transaction; unknown accountIDs and existing invites
+  are skipped by the statement itself, so no per-invitee lookups.
+- Who may see a Private event is decided in SQL (events/read.py joins
+  inviteLog on the (accountID, eventID) index), not by filtering in Python.
+
+Frontend Use:
+- InviteUserSearch → POST /events/{id}/invites with the chosen user IDs.
+- Event detail (creator view) → GET /events/{id}/invites,
+  DELETE /events/{id}/invites/{user_id}.
+"""
+
+import sqlite3
+from typing import Iterable, Optional
+
+from db import connection
+
+# Index for "which events is this account invited to" (the primary key
+# starts with eventID).  Also in db/currentDB.py for fresh databases.
+INDEX = "CREATE INDEX IF NOT EXISTS idx_inviteLog_accountID ON inviteLog (accountID, eventID)"
+
+
+def ensure_index(conn: Optional[sqlite3.Connection] = None) -> None:
+    """Create the inviteLog(accountID, eventID) index on older databases."""
+    with connection.use(conn) as conn:
+        conn.execute(INDEX)
+
+def add_invites(event_id: int, user_ids: Iterable[int], conn: Optional[sqlite3.Connection] = None) -> int:
+    """
+    Invite every account in ``user_ids`` to the event in one statement batch.
+    Returns how many new invites were written (duplicates, existing invites
+    and IDs with no account are skipped).
+    """
+    unique_ids = list(dict.fromkeys(user_ids))
+    if not unique_ids:
+        return 0
+    with connection.use(conn) as conn:
+        cur = conn.cursor()
+        cur.executemany(
+            """
+            INSERT OR IGNORE INTO inviteLog (eventID, accountID)
+            SELECT ?, accountID FROM accounts WHERE accountID = ?
+            """,
+            [(event_id, user_id) for user_id in unique_ids],
+        )
+        return cur.rowcount
+
+def remove_invite(event_id: int, user_id: int, conn: Optional[sqlite3.Connection] = None) -> bool:
+    """Revoke one invite.  Returns True if it existed."""
+    with connection.use(conn) as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM inviteLog WHERE eventID=? AND accountID=?", (event_id, user_id))
+        return cur.rowcount > 0
+
+def is_invited(user_id: int, event_id: int, conn: Optional[sqlite3.Connection] = None) -> bool:
+    """Check if this user is invited to this event."""
+    with connection.use(conn) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT 1 FROM inviteLog WHERE accountID=? AND eventID=? LIMIT 1", (user_id, event_id))
+        return cur.fetchone() is not None
+
+def get_event_invites(event_id: int, conn: Optional[sqlite3.Connection] = None) -> list[int]:
+    """Return the accountIDs invited to this event, in ID order."""
+    with connection.use(conn) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT accountID FROM inviteLog WHERE eventID=? ORDER BY accountID", (event_id,))
+        return [row[0] for row in cur.fetchall()]
+
+def get_user_invites(user_id: int, conn: Optional[sqlite3.Connection] = None) -> list[int]:
+    """Return the eventIDs this user is invited to."""
+    with connection.use(conn) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT eventID FROM inviteLog WHERE accountID=?", (user_id,))
+        return [row[0] for row in cur.fetchall()]
@@ -9,61 +9,80 @@ Purpose:
   linking a user (accountID) and an event (eventID).
 
 What Changed:
-- Uses a shared DB path resolver so it always points to backend/db/EventPlannerDB.db.
+- Uses the shared connection helper (db/connection.py); every function takes
+  an optional `conn` so it can join a request's unit of work.
 - Adds functions to check, insert, remove, and query likes.
 - Returns lists of user IDs or event IDs for flexibility.
-- Prevents duplicate likes with a `has_liked` check.
+- Prevents duplicate likes via the (eventID, accountID) primary key.
 
 Frontend Use:
 - React frontend can call API endpoints that wrap these functions
   (e.g., POST /like, DELETE /like, GET /likes).
 """
 
-import os, sqlite3
+import json
+import sqlite3
+import time
+from typing import Optional
 
-DB_PATH = os.environ.get("DB_PATH", "/data/EventPlannerDB.db")
+from db import connection
 
-def _get_conn():
-    """Helper: open a SQLite connection with row_factory enabled."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
 
-def has_liked(user_id: int, event_id: int) -> bool:
+def has_liked(user_id: int, event_id: int, conn: Optional[sqlite3.Connection] = None) -> bool:
     """Check if the user already liked this event."""
-    with _get_conn() as conn:
+    with connection.use(conn) as conn:
         cur = conn.cursor()
         cur.execute("SELECT 1 FROM likesLog WHERE accountID=? AND eventID=? LIMIT 1", (user_id, event_id))
         return cur.fetchone() is not None
 
-def add_like(user_id: int, event_id: int):
-    """Add a like to the event (only if not already liked)."""
-    if has_liked(user_id, event_id):
-        return False
-    with _get_conn() as conn:
+def add_like(user_id: int, event_id: int, conn: Optional[sqlite3.Connection] = None):
+    """Add a like to the event (only if not already liked).  Returns True if a row was added."""
+    with connection.use(conn) as conn:
         cur = conn.cursor()
-        cur.execute("INSERT INTO likesLog (eventID, accountID) VALUES (?, ?)", (event_id, user_id))
-        conn.commit()
-        return True
+        # One statement instead of has_liked + INSERT: the primary key makes
+        # the duplicate check and the insert atomic.
+        cur.execute(
+            "INSERT OR IGNORE INTO likesLog (eventID, accountID, createdAt) VALUES (?, ?, ?)",
+            (event_id, user_id, time.time()),
+        )
+        return cur.rowcount > 0
 
-def remove_like(user_id: int, event_id: int):
+def remove_like(user_id: int, event_id: int, conn: Optional[sqlite3.Connection] = None):
     """Remove a like from the event."""
-    with _get_conn() as conn:
+    with connection.use(conn) as conn:
         cur = conn.cursor()
         cur.execute("DELETE FROM likesLog WHERE accountID=? AND eventID=?", (user_id, event_id))
-        conn.commit()
         return cur.rowcount > 0
 
-def get_event_likes(event_id: int) -> list[int]:
+def get_event_likes(event_id: int, conn: Optional[sqlite3.Connection] = None) -> list[int]:
     """Return list of all accountIDs that liked this event."""
-    with _get_conn() as conn:
+    with connection.use(conn) as conn:
         cur = conn.cursor()
         cur.execute("SELECT accountID FROM likesLog WHERE eventID=?", (event_id,))
         return [row[0] for row in cur.fetchall()]
 
-def get_user_likes(user_id: int) -> list[int]:
+def get_user_likes(user_id: int, conn: Optional[sqlite3.Connection] = None) -> list[int]:
     """Return list of all eventIDs this user has liked."""
-    with _get_conn() as conn:
+    with connection.use(conn) as conn:
         cur = conn.cursor()
         cur.execute("SELECT eventID FROM likesLog WHERE accountID=?", (user_id,))
         return [row[0] for row in cur.fetchall()]
+
+def get_likes_for_events(event_ids: list[int], conn: Optional[sqlite3.Connection] = None) -> dict[int, list[int]]:
+    """
+    accountIDs that liked each of ``event_ids``, in one query.
+    Used by list endpoints instead of one query per event.
+    """
+    result: dict[int, list[int]] = {eid: [] for eid in event_ids}
+    if not event_ids:
+        return result
+    with connection.use(conn) as conn:
+        cur = conn.cursor()
+        # json_each keeps this a single statement however many IDs are passed
+        cur.execute(
+            "SELECT eventID, accountID FROM likesLog WHERE eventID IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(event_ids)),),
+        )
+        for event_id, account_id in cur.fetchall():
+            result[event_id].append(account_id)
+    return result
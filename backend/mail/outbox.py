@@ -0,0 +1,213 @@
+"""
+=========================================================
+EMAIL OUTBOX (emailOutbox table)
+=========================================================
+
+Purpose:
+- Durable queue of outgoing emails.  Request handlers only INSERT a row;
+  mail/sender.py delivers it in the background.
+
+What Changed:
+- /register no longer talks SMTP inside the request.  A slow or broken
+  relay can no longer add seconds to signup or tie up a worker thread.
+- Rows are claimed with one UPDATE ... RETURNING under a lease, so several
+  uvicorn workers can drain the same outbox without sending twice.  A
+  crashed worker's lease simply expires and the row is picked up again.
+- Failed sends are rescheduled with exponential backoff and jitter; after
+  MAX_ATTEMPTS the row is parked as 'dead' for inspection.
+
+Frontend Use:
+- Not called directly.
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from db import connection
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "8"))
+BACKOFF_BASE_SECONDS = float(os.environ.get("OUTBOX_BACKOFF_BASE", "5"))
+BACKOFF_MAX_SECONDS = float(os.environ.get("OUTBOX_BACKOFF_MAX", "900"))
+LEASE_SECONDS = float(os.environ.get("OUTBOX_LEASE_SECONDS", "60"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS emailOutbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending'
+        CHECK(status IN ('pending','sending','sent','dead')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    nextAttemptAt REAL NOT NULL,
+    lockedUntil REAL,
+    lastError TEXT,
+    createdAt REAL NOT NULL,
+    sentAt REAL
+);
+CREATE INDEX IF NOT EXISTS idx_emailOutbox_due
+    ON emailOutbox (status, nextAttemptAt);
+"""
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+# Set whenever a message is queued so idle sender threads wake immediately
+# instead of waiting for their next poll.
+wakeup = threading.Event()
+
+
+def ensure_schema(conn: Optional[sqlite3.Connection] = None) -> None:
+    """Create the outbox table if this database predates it."""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        if conn is None:
+            with connection.use() as own:
+                own.executescript(_SCHEMA)
+        else:
+            conn.executescript(_SCHEMA)
+        _schema_ready = True
+
+
+# -----------------------------
+# PRODUCER SIDE
+# -----------------------------
+def enqueue(recipient: str, subject: str, body: str) -> int:
+    """Queue one email for delivery.  Returns the outbox row id."""
+    ensure_schema()
+    now = time.time()
+    with connection.use() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO emailOutbox (recipient, subject, body, nextAttemptAt, createdAt)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (recipient, subject, body, now, now),
+        )
+        conn.commit()
+        outbox_id = cur.lastrowid
+    wakeup.set()
+    return outbox_id
+
+
+# -----------------------------
+# CONSUMER SIDE
+# -----------------------------
+def claim_batch(limit: int, lease_seconds: float = LEASE_SECONDS) -> list[dict]:
+    """
+    Lease up to ``limit`` due messages for this worker.  Also reclaims rows
+    whose previous lease ran out (the worker holding them died).
+    """
+    ensure_schema()
+    now = time.time()
+    with connection.use() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            UPDATE emailOutbox
+            SET status = 'sending', lockedUntil = ?
+            WHERE id IN (
+                SELECT id FROM emailOutbox
+                WHERE (status = 'pending' AND nextAttemptAt <= ?)
+                   OR (status = 'sending' AND lockedUntil < ?)
+                ORDER BY nextAttemptAt
+                LIMIT ?
+            )
+            RETURNING id, recipient, subject, body, attempts
+            """,
+            (now + lease_seconds, now, now, limit),
+        )
+        rows = [dict(r) for r in cur.fetchall()]
+        conn.commit()
+    rows.sort(key=lambda r: r["id"])
+    return rows
+
+
+def mark_sent(ids: list[int]) -> None:
+    if not ids:
+        return
+    now = time.time()
+    with connection.use() as conn:
+        conn.executemany(
+            "UPDATE emailOutbox SET status = 'sent', sentAt = ?, lockedUntil = NULL, lastError = NULL WHERE id = ?",
+            [(now, i) for i in ids],
+        )
+        conn.commit()
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter, capped at BACKOFF_MAX_SECONDS."""
+    ceiling = min(BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), BACKOFF_MAX_SECONDS)
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def mark_failed(outbox_id: int, error: str, permanent: bool = False) -> None:
+    """Record a failed attempt and either reschedule or park the message."""
+    with connection.use() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT attempts FROM emailOutbox WHERE id = ?", (outbox_id,))
+        row = cur.fetchone()
+        if not row:
+            return
+        attempts = row["attempts"] + 1
+        if permanent or attempts >= MAX_ATTEMPTS:
+            cur.execute(
+                "UPDATE emailOutbox SET status = 'dead', attempts = ?, lastError = ?, lockedUntil = NULL WHERE id = ?",
+                (attempts, error, outbox_id),
+            )
+        else:
+            cur.execute(
+                """
+                UPDATE emailOutbox
+                SET status = 'pending', attempts = ?, lastError = ?, lockedUntil = NULL, nextAttemptAt = ?
+                WHERE id = ?
+                """,
+                (attempts, error, time.time() + backoff_delay(attempts), outbox_id),
+            )
+        conn.commit()
+
+
+def release(ids: list[int], delay_seconds: float = 0.0) -> None:
+    """Hand leased rows back untouched (e.g. the circuit breaker just opened)."""
+    if not ids:
+        return
+    when = time.time() + delay_seconds
+    with connection.use() as conn:
+        conn.executemany(
+            "UPDATE emailOutbox SET status = 'pending', lockedUntil = NULL, nextAttemptAt = ? WHERE id = ?",
+            [(when, i) for i in ids],
+        )
+        conn.commit()
+
+
+def purge_sent(older_than_seconds: float = 7 * 24 * 3600) -> int:
+    """Delete delivered rows older than the cutoff.  Returns rows removed."""
+    ensure_schema()
+    with connection.use() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "DELETE FROM emailOutbox WHERE status = 'sent' AND sentAt < ?",
+            (time.time() - older_than_seconds,),
+        )
+        conn.commit()
+        return cur.rowcount
+
+
+def get_message(outbox_id: int) -> Optional[dict]:
+    with connection.use() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM emailOutbox WHERE id = ?", (outbox_id,))
+        row = cur.fetchone()
+        return dict(row) if row else None
@@ -0,0 +1,303 @@
+"""
+=========================================================
+OUTBOX SENDER (background SMTP delivery)
+=========================================================
+
+Purpose:
+- Drains mail/outbox.py on a small pool of daemon threads.
+
+What Changed:
+- SMTP connections are pooled: STARTTLS + LOGIN happen once per connection
+  and the connection is reused for every message in a batch and across
+  batches until it goes idle for too long.
+- Each worker claims a batch of due messages and sends them back to back
+  over a single connection.
+- Failures go back to the outbox with exponential backoff.  Repeated
+  transport failures trip a circuit breaker, so while the relay is down we
+  stop hammering it (and stop burning attempts) until a cool-down passes
+  and a single trial send succeeds.
+
+Frontend Use:
+- Not called directly.  Started from main.py on application startup.
+"""
+
+import os
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from queue import Empty, LifoQueue
+from typing import Optional
+
+from mail import outbox
+
+# -----------------------------
+# SMTP SETTINGS
+# -----------------------------
+# Mailtrap configuration (hardcoded for dev, overridable from the env)
+SMTP_HOST = os.environ.get("SMTP_HOST", "send.smtp.mailtrap.io")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+SMTP_USER = os.environ.get("SMTP_USER", "api")
+SMTP_PASS = os.environ.get("SMTP_PASS", "336e403b8d0b431c09af7b7615405303")
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", "20"))
+FROM_EMAIL = os.environ.get("FROM_EMAIL", "verify@cs350unco.com")
+
+WORKERS = int(os.environ.get("OUTBOX_WORKERS", "2"))
+BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", "20"))
+POLL_INTERVAL_SECONDS = float(os.environ.get("OUTBOX_POLL_INTERVAL", "5"))
+POOL_SIZE = int(os.environ.get("SMTP_POOL_SIZE", "2"))
+POOL_MAX_IDLE_SECONDS = float(os.environ.get("SMTP_POOL_MAX_IDLE", "60"))
+BREAKER_THRESHOLD = int(os.environ.get("SMTP_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.environ.get("SMTP_BREAKER_RESET", "60"))
+
+
+# -----------------------------
+# CIRCUIT BREAKER
+# -----------------------------
+class CircuitBreaker:
+    """
+    closed    -> calls allowed; consecutive failures are counted.
+    open      -> calls refused until ``reset_timeout`` has passed.
+    half-open -> exactly one trial call; success closes, failure re-opens.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_THRESHOLD, reset_timeout: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half-open"
+                self._trial_in_flight = False
+            if self.state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self.state != "open":
+                return 0.0
+            return max(self.reset_timeout - (time.monotonic() - self.opened_at), 0.0)
+
+    def release_trial(self) -> None:
+        """Give back an unused half-open trial slot."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"[outbox] SMTP circuit opened after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+# -----------------------------
+# SMTP CONNECTION POOL
+# -----------------------------
+class SMTPConnectionPool:
+    """Keeps up to ``size`` logged-in SMTP connections for reuse."""
+
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        user: Optional[str] = SMTP_USER,
+        password: Optional[str] = SMTP_PASS,
+        starttls: bool = SMTP_STARTTLS,
+        size: int = POOL_SIZE,
+        max_idle: float = POOL_MAX_IDLE_SECONDS,
+        timeout: float = SMTP_TIMEOUT,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        # LIFO so the most recently used (least likely to be stale) goes first
+        self._idle: LifoQueue = LifoQueue()
+        self.opened = 0
+
+    def _open(self) -> smtplib.SMTP:
+        if self.port == 465:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                server.starttls()
+        if self.user and self.password:
+            server.login(self.user, self.password)
+        self.opened += 1
+        return server
+
+    def acquire(self) -> smtplib.SMTP:
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except Empty:
+                return self._open()
+            if time.monotonic() - last_used > self.max_idle:
+                self._close(server)
+                continue
+            return server
+
+    def release(self, server: smtplib.SMTP) -> None:
+        if self._idle.qsize() >= self.size:
+            self._close(server)
+        else:
+            self._idle.put((server, time.monotonic()))
+
+    def discard(self, server: smtplib.SMTP) -> None:
+        self._close(server)
+
+    def close_all(self) -> None:
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except Empty:
+                return
+            self._close(server)
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+
+def build_message(row: dict, from_email: str = FROM_EMAIL) -> MIMEText:
+    msg = MIMEText(row["body"])
+    msg["Subject"] = row["subject"]
+    msg["From"] = from_email
+    msg["To"] = row["recipient"]
+    return msg
+
+
+# -----------------------------
+# SENDER
+# -----------------------------
+class OutboxSender:
+    def __init__(
+        self,
+        pool: Optional[SMTPConnectionPool] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        workers: int = WORKERS,
+        batch_size: int = BATCH_SIZE,
+        poll_interval: float = POLL_INTERVAL_SECONDS,
+        from_email: str = FROM_EMAIL,
+    ):
+        self.pool = pool or SMTPConnectionPool()
+        self.breaker = breaker or CircuitBreaker()
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.from_email = from_email
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        outbox.ensure_schema()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"outbox-sender-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        outbox.wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+        self.pool.close_all()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                sent = self.drain_once()
+            except Exception as e:
+                print(f"[outbox] sender loop error: {e}")
+                sent = 0
+            if sent == 0:
+                wait = self.breaker.retry_after() or self.poll_interval
+                outbox.wakeup.wait(wait)
+                outbox.wakeup.clear()
+
+    def drain_once(self) -> int:
+        """Claim and deliver one batch.  Returns the number of emails sent."""
+        if not self.breaker.allow():
+            return 0
+        batch = outbox.claim_batch(self.batch_size)
+        if not batch:
+            # Nothing was tried, so a half-open trial slot must not stay taken
+            self.breaker.release_trial()
+            return 0
+
+        try:
+            server = self.pool.acquire()
+        except Exception as e:
+            self.breaker.record_failure()
+            for row in batch:
+                outbox.mark_failed(row["id"], f"connect: {e}")
+            return 0
+
+        sent_ids: list[int] = []
+        for index, row in enumerate(batch):
+            try:
+                server.send_message(build_message(row, self.from_email))
+            except smtplib.SMTPRecipientsRefused as e:
+                # The relay is fine; this address never will be
+                outbox.mark_failed(row["id"], f"refused: {e}", permanent=True)
+                continue
+            except (smtplib.SMTPException, OSError) as e:
+                self.pool.discard(server)
+                self.breaker.record_failure()
+                outbox.mark_failed(row["id"], str(e))
+                # Whatever is left of the batch waits for the next claim
+                outbox.release([r["id"] for r in batch[index + 1:]], self.breaker.retry_after())
+                outbox.mark_sent(sent_ids)
+                return len(sent_ids)
+            sent_ids.append(row["id"])
+
+        self.pool.release(server)
+        self.breaker.record_success()
+        outbox.mark_sent(sent_ids)
+        return len(sent_ids)
+
+
+_sender: Optional[OutboxSender] = None
+
+
+def start_sender() -> OutboxSender:
+    """Start the process-wide sender (idempotent)."""
+    global _sender
+    if _sender is None:
+        print(f"[Mailtrap Config] Host={SMTP_HOST}, Port={SMTP_PORT}, User={SMTP_USER}, From={FROM_EMAIL}")
+        _sender = OutboxSender()
+        _sender.start()
+    return _sender
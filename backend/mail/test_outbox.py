@@ -0,0 +1,146 @@
+"""
+Outbox + sender tests against a local aiosmtpd stand-in (no network).
+
+Run from the backend folder:
+    python -m pytest mail/test_outbox.py
+"""
+
+import smtplib
+import socket
+import time
+
+import pytest
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+from aiosmtpd.handlers import Sink
+
+from db import connection
+from mail import outbox
+from mail.sender import CircuitBreaker, OutboxSender, SMTPConnectionPool
+
+
+class RecordingHandler(Sink):
+    def __init__(self):
+        self.messages = []
+        self.refuse = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refuse:
+            return "550 no such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos[:], envelope.content.decode("utf8", "replace")))
+        return "250 Message accepted"
+
+
+@pytest.fixture
+def smtp_server():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        yield handler, port
+    finally:
+        controller.stop()
+
+
+@pytest.fixture(autouse=True)
+def empty_outbox():
+    outbox.ensure_schema()
+    with connection.use() as conn:
+        conn.execute("DELETE FROM emailOutbox")
+        conn.commit()
+    yield
+
+
+def _sender(port, **kwargs):
+    pool = SMTPConnectionPool(host="127.0.0.1", port=port, user=None, password=None, starttls=False, timeout=5)
+    return OutboxSender(pool=pool, workers=kwargs.pop("workers", 1), **kwargs)
+
+
+def test_batch_is_sent_over_one_pooled_connection(smtp_server):
+    handler, port = smtp_server
+    ids = [outbox.enqueue(f"user{i}@unco.edu", "Code", f"Your code is {i}") for i in range(5)]
+
+    sender = _sender(port)
+    assert sender.drain_once() == 5
+    assert sender.drain_once() == 0
+
+    assert len(handler.messages) == 5
+    assert sender.pool.opened == 1
+    assert all(outbox.get_message(i)["status"] == "sent" for i in ids)
+
+
+def test_refused_recipient_is_parked_without_tripping_breaker(smtp_server):
+    handler, port = smtp_server
+    handler.refuse.add("ghost@unco.edu")
+    bad = outbox.enqueue("ghost@unco.edu", "Code", "123456")
+    good = outbox.enqueue("real@unco.edu", "Code", "654321")
+
+    sender = _sender(port)
+    assert sender.drain_once() == 1
+    assert outbox.get_message(bad)["status"] == "dead"
+    assert outbox.get_message(good)["status"] == "sent"
+    assert sender.breaker.state == "closed"
+
+
+def test_unreachable_relay_backs_off_and_opens_circuit():
+    msg = outbox.enqueue("user@unco.edu", "Code", "123456")
+    # Port 1 on localhost refuses connections immediately
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    sender = _sender(1, breaker=breaker)
+
+    assert sender.drain_once() == 0
+    row = outbox.get_message(msg)
+    assert row["status"] == "pending" and row["attempts"] == 1
+    assert row["nextAttemptAt"] > time.time()
+
+    # Force it due again; the second failure opens the breaker
+    with connection.use() as conn:
+        conn.execute("UPDATE emailOutbox SET nextAttemptAt = 0 WHERE id = ?", (msg,))
+        conn.commit()
+    sender.drain_once()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert sender.drain_once() == 0
+
+
+def test_background_workers_deliver_queued_mail(smtp_server):
+    handler, port = smtp_server
+    sender = _sender(port, workers=2, poll_interval=0.05)
+    sender.start()
+    try:
+        for i in range(10):
+            outbox.enqueue(f"user{i}@unco.edu", "Code", str(i))
+        deadline = time.time() + 5
+        while len(handler.messages) < 10 and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        sender.stop()
+    assert len(handler.messages) == 10
+    # Leased rows are claimed atomically, so nothing is sent twice
+    assert sorted(m[0][0] for m in handler.messages) == sorted(f"user{i}@unco.edu" for i in range(10))
+
+
+def test_register_returns_after_queueing(monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+    from routes import auth
+
+    monkeypatch.setattr(auth, "DEV_ECHO", False)
+
+    def fail_if_called(*args, **kwargs):
+        raise AssertionError("SMTP must not be used inside the request")
+
+    monkeypatch.setattr(smtplib, "SMTP", fail_if_called)
+    client = TestClient(main.app)
+    resp = client.post("/register", json={"email": "queued@unco.edu", "password": "pw", "accountType": "Student"})
+    assert resp.status_code == 200
+    with connection.use() as conn:
+        row = conn.execute("SELECT status FROM emailOutbox WHERE recipient = ?", ("queued@unco.edu",)).fetchone()
+    assert row["status"] == "pending"
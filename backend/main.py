@@ -23,6 +23,10 @@ frontend can then talk to these endpoints under the ``/events`` path.
 
 from __future__ import annotations
 
+# First, so the import of everything below is timed (see startup/boot.py)
+from startup import boot
+boot.install_import_timer()
+
 from dotenv import load_dotenv
 import os
 
@@ -33,20 +37,48 @@ import sqlite3
 import base64
 from typing import List, Optional, Any
 
-from fastapi import FastAPI, HTTPException, status, Depends, Query, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, status, Depends, Query, UploadFile, File, Form, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import FileResponse, JSONResponse, Response
+from pydantic import BaseModel, Field, ValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile as StarletteUploadFile
 
 from events import create as events_create
 from events import read as events_read
 from events import update as events_update
 from events import soft_delete as events_soft_delete
 from events import hard_delete as events_hard_delete
+from events import authorization
+from events import fragments
+from events import publisher
+from events import images as event_images
+from events import image_store
+from events import variants as image_variants
 from rsvp import rsvp as rsvp_log
 from liking_log import liking_log
+from invite_log import invite_log
 from searching_logic import searching_logic
+from searching_logic import suggest
 from UserAccounts import userAccount
+from UserAccounts import directory
+from UserAccounts import passwords
+from UserAccounts import roles
 from routes import auth
+from routes import admin
+from routes import pending_verifications
+from routes import rate_limit
+from mail import outbox
+from mail import sender as mail_sender
+from db import connection
+from db import instrumentation
+from db import snapshots
+from db.unit_of_work import UnitOfWork, get_unit_of_work
+from monitoring import metrics
+from monitoring import profiler
+from startup import warmup
+from trending import scores as trending
 
 
 
@@ -56,13 +88,23 @@ from routes import auth
 app = FastAPI(title="Event Browsing API")
 app.include_router(userAccount.router)
 app.include_router(auth.router)
+app.include_router(admin.router)
+# Inside CORS, so a 413 for an oversized upload still carries CORS headers
+app.add_middleware(event_images.UploadLimitMiddleware)
+# Also inside CORS (browsers can read the 429/503), outside the upload limit
+app.add_middleware(rate_limit.RateLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["https://cs350unco.com",  "https://test.cs350unco.com", "http://localhost:3000",],
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-DB-Queries", "X-DB-Connections", "X-Profile-Id", "Retry-After"],
 )
+# Added after CORS so they wrap it (the last one added runs outermost)
+app.add_middleware(instrumentation.SQLStatsMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(profiler.ProfilerMiddleware)
 
 # ---------------------------------------------------------------------------
 # Pydantic models
@@ -82,9 +124,11 @@ class EventResponse(BaseModel):
     creatorID: int
     price: Optional[float] = None
     rsvpRequired: bool = False
+    capacity: Optional[int] = None  # max confirmed RSVPs, None = unlimited
     userLiked: Optional[bool] = False
     userRsvped: Optional[bool] = False
-    imageUrl: Optional[str] = None  # Optional image URL or base64 data
+    imageUrl: Optional[str] = None  # GET /events/{id}/image?v=<hash>, relative to the API base
+    thumbnailUrl: Optional[str] = None  # card-sized variant, relative to the API base
     # Additional optional fields the frontend can choose to display
     # E.g. images, host, etc.  Unused fields are omitted from the response.
 
@@ -116,6 +160,9 @@ class EventCreateRequest(BaseModel):
     categories: Optional[List[str]] = Field(
         None, description="Additional categories for the event"
     )
+    capacity: Optional[int] = Field(
+        None, ge=1, description="Max confirmed RSVPs; further RSVPs join a waitlist.  Omit for unlimited"
+    )
 
 
 class UpdateEventRequest(BaseModel):
@@ -145,43 +192,49 @@ class LikeRequest(BaseModel):
     user_id: int = Field(..., description="ID of the user performing the like action")
 
 
+class InviteRequest(BaseModel):
+    inviterID: int = Field(..., description="ID of the user sending the invites (creator or Faculty)")
+    user_ids: List[int] = Field(..., max_length=1000, description="Accounts to invite")
+
+
 # ---------------------------------------------------------------------------
 # Helper functions
 # ---------------------------------------------------------------------------
-def _get_db_path() -> str:
-    """Return the absolute path to the SQLite database (persistent on Fly.io)."""
-    return os.environ.get("DB_PATH", "/data/EventPlannerDB.db")
-
-
-def _insert_categories(event_id: int, categories: List[str]) -> None:
-    """Persist additional categories for an event into the eventCategories table."""
-    if not categories:
-        return
-    db_path = _get_db_path()
-    with sqlite3.connect(db_path) as conn:
-        cur = conn.cursor()
-        for cat in categories:
-            cur.execute(
-                "INSERT OR IGNORE INTO eventCategories (eventID, category) VALUES (?, ?)",
-                (event_id, cat),
-            )
-        conn.commit()
-
-
-def _event_to_response(event: dict, user_id: Optional[int] = None) -> EventResponse:
+def _require_event_permission(
+    event_id: int, user_id: int, action: str, conn: Optional[sqlite3.Connection] = None
+) -> None:
+    """Raise the matching HTTP error unless ``user_id`` may ``action`` the event."""
+    result = authorization.check(event_id, user_id, conn)
+    if result == authorization.EVENT_NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Event not found")
+    if result == authorization.USER_NOT_FOUND:
+        raise HTTPException(status_code=404, detail="User not found")
+    if result == authorization.FORBIDDEN:
+        raise HTTPException(status_code=403, detail=f"Not authorized to {action} this event")
+
+
+def _event_to_response(
+    event: dict,
+    user_id: Optional[int] = None,
+    likes_list: Optional[List[int]] = None,
+    rsvp_list: Optional[List[int]] = None,
+) -> EventResponse:
     """Transform a raw DB event row into a response model.
 
     If ``user_id`` is provided the returned object will include
     ``userLiked`` and ``userRsvped`` flags based on the likesLog and
     rsvpLog tables.  RSVP lists are always returned as lists of
-    integers (account IDs).
+    integers (account IDs).  Callers that already fetched the like/RSVP
+    lists (see ``_events_to_responses``) pass them in.
     """
     eid = event["eventID"]
     # Calculate likes and rsvps dynamically rather than trusting the
     # denormalised numberLikes field.  This ensures consistency with
     # the like and RSVP tables.
-    likes_list = liking_log.get_event_likes(eid)
-    rsvp_list = rsvp_log.get_event_rsvps(eid)
+    if likes_list is None:
+        likes_list = liking_log.get_event_likes(eid)
+    if rsvp_list is None:
+        rsvp_list = rsvp_log.get_event_rsvps(eid)
 
     user_liked = False
     user_rsvped = False
@@ -189,30 +242,44 @@ def _event_to_response(event: dict, user_id: Optional[int] = None) -> EventRespo
         user_liked = user_id in likes_list
         user_rsvped = user_id in rsvp_list
 
-    response = {
-        "id": eid,
-        "title": event["eventName"],
-        "description": event["eventDescription"],
-        "startDate": event["startDateTime"],
-        "location": event["location"],
-        "category": event["eventType"],
-        "likes": len(likes_list),
-        "rsvps": rsvp_list,
-        "eventAccess": event["eventAccess"],
-        "creatorID": event["creatorID"],
-        "price": event.get("cost"),
-        "rsvpRequired": bool(event.get("rsvpRequired", 0)),
-        "userLiked": user_liked,
-        "userRsvped": user_rsvped,
-    }
-
-    if "imageUrl" in event:
-        response["imageUrl"] = event["imageUrl"]
-    # If no imageUrl but images exist, encode and provide as base64 fallback
-    if "imageUrl" not in event and event.get("images"):
-        response["imageUrl"] = "data:image/jpeg;base64," + base64.b64encode(event["images"]).decode("utf-8")
-
-    return EventResponse(**response)
+    # Same fields as the pre-rendered list JSON (events/fragments.py)
+    return EventResponse(
+        **fragments.static_fields(event),
+        likes=len(likes_list),
+        rsvps=rsvp_list,
+        userLiked=user_liked,
+        userRsvped=user_rsvped,
+    )
+
+
+def _events_to_responses(
+    events: List[dict], user_id: Optional[int] = None, conn: Optional[sqlite3.Connection] = None
+) -> List[EventResponse]:
+    """Build responses for many events with two queries total instead of two per event."""
+    ids = [evt["eventID"] for evt in events]
+    with connection.use(conn) as conn:
+        likes = liking_log.get_likes_for_events(ids, conn=conn)
+        rsvps = rsvp_log.get_rsvps_for_events(ids, conn=conn)
+    return [
+        _event_to_response(evt, user_id, likes[evt["eventID"]], rsvps[evt["eventID"]])
+        for evt in events
+    ]
+
+
+def _fragments_response(
+    rows: List[tuple], user_id: Optional[int] = None, conn: Optional[sqlite3.Connection] = None
+) -> Response:
+    """A list response joined from stored event JSON (events/fragments.py) instead of models.
+
+    Same body as ``_events_to_responses`` would give; the routes keep their
+    response_model for the docs, FastAPI passes a Response through as is.
+    """
+    ids = [eid for eid, _ in rows]
+    with connection.use(conn) as conn:
+        likes = liking_log.get_likes_for_events(ids, conn=conn)
+        rsvps = rsvp_log.get_rsvps_for_events(ids, conn=conn)
+        body = fragments.assemble(rows, likes, rsvps, user_id=user_id, conn=conn)
+    return Response(body, media_type="application/json")
 
 
 # ---------------------------------------------------------------------------
@@ -227,57 +294,269 @@ def list_events(
 
     The ``include_inactive`` flag can be set to true to include events
     whose eventAccess is ``Inactive``.  If ``user_id`` is provided the
-    returned objects include ``userLiked`` and ``userRsvped`` flags.
+    returned objects include ``userLiked`` and ``userRsvped`` flags, and
+    Private events the user created or is invited to are included.
     """
-    events = events_read.read_events(include_inactive=include_inactive)
-    return [_event_to_response(evt, user_id=user_id) for evt in events]
+    with connection.use() as conn:
+        rows = events_read.read_events(
+            include_inactive=include_inactive, conn=conn, viewer_id=user_id, fragments=True
+        )
+        return _fragments_response(rows, user_id=user_id, conn=conn)
+
+
+@app.get("/events/trending", response_model=List[EventResponse])
+def trending_events(
+    limit: int = Query(10, ge=1, le=trending.CACHE_K, description="How many events to return"),
+    user_id: Optional[int] = Query(None, description="ID of current user (for like/RSVP flags)"),
+) -> List[EventResponse]:
+    """Most popular events right now: likes and RSVPs, weighted down as they age.
+
+    Declared before ``/events/{event_id}`` so "trending" is not parsed as an ID.
+    """
+    # Scores are shared by every viewer, so ranked events this one may not
+    # see (Private, Inactive) are skipped; rank deeper until ``limit`` are found
+    k, rows, seen = min(limit * 2, trending.CACHE_K), [], 0
+    with connection.use() as conn:
+        while True:
+            ranked = trending.top(k)
+            rows += events_read.read_events_by_ids(
+                [eid for eid, _ in ranked[seen:]], conn=conn, viewer_id=user_id, fragments=True
+            )
+            if len(rows) >= limit or len(ranked) < k:
+                break  # enough, or every scored event has been looked at
+            k, seen = k * 2, len(ranked)
+        return _fragments_response(rows[:limit], user_id=user_id, conn=conn)
 
 
 @app.get("/events/{event_id}", response_model=EventResponse)
 def get_event(event_id: int, user_id: Optional[int] = Query(None)) -> EventResponse:
-    """Retrieve a single event by ID."""
-    evt = events_read.read_event_by_id(event_id)
-    if not evt:
-        raise HTTPException(status_code=404, detail="Event not found")
-    return _event_to_response(evt, user_id=user_id)
+    """Retrieve a single event by ID (404 for a Private event ``user_id`` may not see)."""
+    with connection.use() as conn:
+        evt = events_read.read_event_by_id(event_id, conn=conn, viewer_id=user_id, visible_only=True)
+        if not evt:
+            raise HTTPException(status_code=404, detail="Event not found")
+        return _events_to_responses([evt], user_id=user_id, conn=conn)[0]
 
 
-@app.post("/events", status_code=status.HTTP_201_CREATED)
-def create_event(payload: EventCreateRequest) -> dict[str, Any]:
-    """Create a new event and optionally attach additional categories."""
+def _upload_or_none(upload: Any) -> Optional[UploadFile]:
+    """The form's file part, unless the file input was left empty."""
+    # request.form() yields Starlette's UploadFile (FastAPI's subclasses it)
+    if isinstance(upload, StarletteUploadFile) and (upload.filename or upload.size):
+        return upload
+    return None
+
+
+async def _stage_image(upload: UploadFile) -> image_store.Staged:
+    """Copy an uploaded image into the store's staging area, as the matching HTTP error on failure."""
     try:
-        images = None
-        # EventCreateRequest.images is expected to be base64-encoded, decode before insert
-        if payload.images:
-            try:
-                images = base64.b64decode(payload.images)
-            except Exception:
-                images = None
-
-        eid = events_create.create_event(
-            creatorID=payload.creatorID,
-            eventName=payload.title,
-            eventDescription=payload.description,
-            location=payload.location,
-            eventType=payload.eventType,
-            startDateTime=payload.startDateTime,
-            eventAccess=payload.eventAccess or "Public",
-            images=images,
-            rsvpRequired=int(bool(payload.rsvpRequired)),
-            isPriced=int(bool(payload.isPriced)),
-            cost=payload.cost,
-        )
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc))
+        return await image_store.stage_upload(upload)
+    except event_images.ImageTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except event_images.UnsupportedImage as exc:
+        raise HTTPException(status_code=415, detail=str(exc))
+
+
+def _check_base64_size(text: str | bytes) -> None:
+    """413 for a base64 image over the limit, before it is decoded."""
+    if event_images.base64_size(text) > event_images.MAX_IMAGE_BYTES:
+        raise HTTPException(status_code=413, detail=f"Image is larger than {event_images.MAX_IMAGE_BYTES >> 20} MB")
+
+
+def _stage_image_bytes(data: bytes) -> image_store.Staged:
+    """_stage_image() for a decoded base64 image (run in the threadpool: it hashes and fsyncs)."""
+    try:
+        return image_store.stage_bytes(data)
+    except event_images.ImageTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except event_images.UnsupportedImage as exc:
+        raise HTTPException(status_code=415, detail=str(exc))
+
+
+def _attach_image(uow: UnitOfWork, event_id: int, staged: image_store.Staged) -> None:
+    """Point the event at a staged image in the request's transaction."""
+    try:
+        image_store.attach(uow.conn, event_id, staged)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Event not found")
+    fragments.refresh(uow.conn, [event_id])  # new imageUrl in the list JSON
+
+
+def _insert_event(payload: EventCreateRequest, staged: Optional[image_store.Staged]) -> int:
+    """The create transaction (run in the threadpool by create_event)."""
+    with UnitOfWork() as uow:
+        try:
+            eid = events_create.create_event(
+                creatorID=payload.creatorID,
+                eventName=payload.title,
+                eventDescription=payload.description,
+                location=payload.location,
+                eventType=payload.eventType,
+                startDateTime=payload.startDateTime,
+                eventAccess=payload.eventAccess or "Public",
+                rsvpRequired=int(bool(payload.rsvpRequired)),
+                isPriced=int(bool(payload.isPriced)),
+                cost=payload.cost,
+                categories=payload.categories,
+                capacity=payload.capacity,
+                conn=uow.conn,
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        if staged is not None:
+            _attach_image(uow, eid, staged)
+    return eid
+
+
+_CREATE_SCHEMA = EventCreateRequest.model_json_schema()
 
-    if payload.categories:
-        _insert_categories(eid, payload.categories)
 
+@app.post(
+    "/events",
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json": {"schema": _CREATE_SCHEMA},
+        "multipart/form-data": {"schema": {**_CREATE_SCHEMA, "properties": {
+            **_CREATE_SCHEMA["properties"], "images": {"type": "string", "format": "binary"},
+        }}},
+    }}},
+)
+async def create_event(request: Request) -> dict[str, Any]:
+    """Create a new event and its additional categories in one transaction.
+
+    Accepts the EventCreateRequest fields either as JSON (image, if any,
+    base64 in ``images``) or as multipart/form-data with the image as an
+    ``images`` file part, which is copied into the image store
+    (events/image_store.py) in chunks.
+    """
+    upload = None
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            upload = _upload_or_none(form.get("images"))
+            fields = {k: v for k, v in form.items() if k not in ("images", "categories") and isinstance(v, str)}
+            fields["categories"] = form.getlist("categories") or None
+            payload = EventCreateRequest.model_validate(fields)
+        else:
+            payload = EventCreateRequest.model_validate(await request.json())
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be JSON or multipart/form-data")
+
+    images = None
+    # EventCreateRequest.images is expected to be base64-encoded, decode before insert
+    if payload.images and upload is None:
+        _check_base64_size(payload.images)
+        try:
+            images = base64.b64decode(payload.images)
+        except Exception:
+            images = None
+
+    # Staged and opened only now that the body is in: a slow upload never holds the write lock
+    if upload is not None:
+        staged = await _stage_image(upload)
+    elif images:
+        staged = await run_in_threadpool(_stage_image_bytes, images)
+    else:
+        staged = None
+    try:
+        # BEGIN IMMEDIATE can wait busy_timeout for the lock; keep that off the event loop
+        eid = await run_in_threadpool(_insert_event, payload, staged)
+    except BaseException:
+        if staged is not None:
+            image_store.discard(staged)  # no-op once attached
+        raise
+
+    if staged is not None:
+        image_variants.schedule(eid)
+    publisher.notify()
+    if (payload.eventAccess or "Public") == "Public":
+        suggest.add(eid, payload.title, payload.location, [payload.eventType, *(payload.categories or [])])
     return {"eventID": eid}
 
 
+@app.get("/events/{event_id}/image")
+def get_event_image(
+    event_id: int,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, le=4096, description="Smallest width wanted, in pixels"),
+    format: Optional[str] = Query(None, pattern="^(webp|jpeg)$", description="Variant format (default: WebP if accepted)"),
+    v: Optional[str] = Query(None, description="Image version from imageUrl; makes the response cacheable for good"),
+) -> Response:
+    """
+    The event's image.  With ``w``, the narrowest pre-rendered variant at
+    least that wide (events/variants.py); otherwise, or until the variants
+    exist, the original file.  Both are files in the image store
+    (events/image_store.py), sent with FileResponse.
+    """
+    if w is not None:
+        fmt = format or ("webp" if "image/webp" in request.headers.get("accept", "") else "jpeg")
+        with connection.use() as conn:
+            variant = image_variants.pick(conn, event_id, w, fmt)
+        if variant is not None:
+            image_hash, width = variant
+            headers = {"Cache-Control": "public, max-age=300", "ETag": f'"{image_hash}.{width}.{fmt}"'}
+            if format is None:
+                headers["Vary"] = "Accept"
+            return FileResponse(
+                image_store.variant_path(image_hash, width, fmt), media_type=f"image/{fmt}", headers=headers,
+            )
+    with connection.use() as conn:
+        found = image_store.lookup(conn, event_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Event has no image")
+    image_hash, _, media_type = found
+    # imageUrl carries ?v=<hash prefix>, so that URL always means these bytes
+    versioned = v is not None and image_hash.startswith(v)
+    return FileResponse(
+        image_store.path_for(image_hash),
+        media_type=media_type,
+        headers={
+            "Cache-Control": "public, max-age=31536000, immutable" if versioned else "public, max-age=300",
+            "ETag": f'"{image_hash}"',
+        },
+    )
+
 
 # --- Updated PUT endpoint for /events/{event_id} to support multipart/form-data with image upload ---
+def _apply_update(
+    event_id: int,
+    updater_id: int,
+    updates: dict[str, Any],
+    staged: Optional[image_store.Staged],
+) -> tuple[list, Optional[str]]:
+    """
+    The update transaction (run in the threadpool by update_event).
+    Returns the promoted waitlist entries and, if the image changed, the new imageUrl.
+    """
+    with UnitOfWork() as uow:
+        # Authorization block: Only the creator or Faculty can update
+        _require_event_permission(event_id, updater_id, "update", uow.conn)
+        if updates:
+            try:
+                success = events_update.update_event(
+                    event_id,
+                    updater_id,
+                    authorized=True,
+                    conn=uow.conn,
+                    **updates,
+                )
+            except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc))
+            if not success:
+                raise HTTPException(status_code=403, detail="Not authorised or event not found")
+        if staged is not None:
+            _attach_image(uow, event_id, staged)
+        # A larger (or lifted) cap frees seats for the waitlist in the same transaction
+        promoted = rsvp_log.promote(event_id, conn=uow.conn) if "capacity" in updates else []
+        uow.commit()
+        image_url = None
+        if staged is not None:
+            # Versioned by the new hash, so clients don't keep showing the old image
+            image_url = events_read.read_event_by_id(event_id, include_inactive=True, conn=uow.conn)["imageUrl"]
+    return promoted, image_url
+
+
 @app.put("/events/{event_id}")
 async def update_event(
     event_id: int,
@@ -291,39 +570,21 @@ async def update_event(
     rsvpRequired: Optional[bool] = Form(None),
     isPriced: Optional[bool] = Form(None),
     cost: Optional[float] = Form(None),
+    capacity: Optional[int] = Form(None, ge=0, description="New RSVP cap; 0 removes it"),
     images: UploadFile | None = File(None),
     image_b64: Optional[str] = Form(None),
 ) -> dict[str, Any]:
     """
     Partially update an existing event.
-    Supports multipart/form-data with image file upload (param: images).
+    Supports multipart/form-data with image file upload (param: images),
+    copied into the image store in chunks (events/image_store.py).
     Also allows base64-encoded image (image_b64) as a fallback.
     """
-    # Authorization block: Only the creator or Faculty can update
-    db_path = _get_db_path()
-    with sqlite3.connect(db_path) as conn:
-        cur = conn.cursor()
-        # Get creatorID of the event
-        cur.execute("SELECT creatorID FROM events WHERE eventID = ?", (event_id,))
-        row = cur.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Event not found")
-        creator_id = row[0]
-        # Get accountType of the updater
-        cur.execute("SELECT accountType FROM accounts WHERE accountID = ?", (updaterID,))
-        acc_row = cur.fetchone()
-        if not acc_row:
-            raise HTTPException(status_code=404, detail="User not found")
-        account_type = acc_row[0]
-        if updaterID != creator_id and account_type != "Faculty":
-            raise HTTPException(status_code=403, detail="Not authorized to update this event")
-
-    # Handle image upload or base64 decoding
+    # An uploaded file is staged into the image store below; base64 is decoded here
+    upload = _upload_or_none(images)
     img_bytes = None
-    if images:
-        img_bytes = await images.read()
-        print(f"[DEBUG] Received uploaded image for event {event_id}, {len(img_bytes)} bytes")
-    elif image_b64:
+    if upload is None and image_b64:
+        _check_base64_size(image_b64)
         try:
             img_bytes = base64.b64decode(image_b64)
         except Exception:
@@ -343,27 +604,42 @@ async def update_event(
         updates["startDateTime"] = startDateTime
     if eventAccess is not None:
         updates["eventAccess"] = eventAccess
-    if img_bytes is not None:
-        updates["images"] = img_bytes
     if rsvpRequired is not None:
         updates["rsvpRequired"] = int(bool(rsvpRequired))
     if isPriced is not None:
         updates["isPriced"] = int(bool(isPriced))
     if cost is not None:
         updates["cost"] = cost
+    if capacity is not None:
+        updates["capacity"] = capacity
 
-    if not updates:
+    if not updates and upload is None and not img_bytes:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    success = events_update.update_event(
-        event_id,
-        updaterID,
-        **updates,
-    )
-    if not success:
-        raise HTTPException(status_code=403, detail="Not authorised or event not found")
-
-    return {"success": True, "imageUrl": f"/events/{event_id}/image" if img_bytes else None}
+    # The body is in; stage the image before the transaction opens
+    if upload is not None:
+        staged = await _stage_image(upload)
+    elif img_bytes:
+        staged = await run_in_threadpool(_stage_image_bytes, img_bytes)
+    else:
+        staged = None
+    try:
+        # BEGIN IMMEDIATE can wait busy_timeout for the lock; keep that off the event loop
+        promoted, image_url = await run_in_threadpool(_apply_update, event_id, updaterID, updates, staged)
+    except BaseException:
+        if staged is not None:
+            image_store.discard(staged)  # no-op once attached
+        raise
+    for _ in promoted:
+        trending.record(event_id, trending.RSVP_WEIGHT)
+        suggest.bump(event_id, 1)
+    if updates.keys() & {"eventName", "location", "eventType", "eventAccess"}:
+        suggest.refresh(event_id)
+
+    if image_url is not None:
+        image_variants.schedule(event_id)
+    publisher.notify()
+    return {"success": True, "imageUrl": image_url}
 
 
 @app.delete("/events/{event_id}")
@@ -371,95 +647,212 @@ def delete_event(
     event_id: int,
     user_id: int = Query(..., description="ID of the user requesting the delete"),
     hard: bool = Query(False, description="If true, perform a hard delete (Faculty only)"),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ) -> dict[str, Any]:
     """Delete an event.  Students can soft delete their own events; faculty can hard delete."""
     # Authorization block: Only the creator or Faculty can delete
-    db_path = _get_db_path()
-    with sqlite3.connect(db_path) as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT creatorID FROM events WHERE eventID = ?", (event_id,))
-        row = cur.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Event not found")
-        creator_id = row[0]
-        cur.execute("SELECT accountType FROM accounts WHERE accountID = ?", (user_id,))
-        acc_row = cur.fetchone()
-        if not acc_row:
-            raise HTTPException(status_code=404, detail="User not found")
-        account_type = acc_row[0]
-        if user_id != creator_id and account_type != "Faculty":
-            raise HTTPException(status_code=403, detail="Not authorized to delete this event")
+    _require_event_permission(event_id, user_id, "delete", uow.conn)
 
     if hard:
-        success = events_hard_delete.hard_delete_event(event_id, user_id)
+        success = events_hard_delete.hard_delete_event(event_id, user_id, authorized=True, conn=uow.conn)
     else:
-        success = events_soft_delete.soft_delete_event(event_id, user_id)
+        success = events_soft_delete.soft_delete_event(event_id, user_id, authorized=True, conn=uow.conn)
     if not success:
         raise HTTPException(status_code=403, detail="Not authorised or event not found")
+    uow.commit()
+    trending.forget(event_id)
+    suggest.forget(event_id)
+    publisher.notify()
     return {"success": True}
 
 
+# ---------------------------------------------------------------------------
+# Per-user event lists (profile pages)
+# ---------------------------------------------------------------------------
+@app.get("/users/{user_id}/events", response_model=List[EventResponse])
+def user_events(
+    user_id: int,
+    relation: str = Query(..., description="created, liked or rsvped"),
+    limit: int = Query(20, ge=1, le=100, description="Page size"),
+    offset: int = Query(0, ge=0, description="Events to skip"),
+    include_inactive: bool = Query(False, description="Include events marked as Inactive"),
+    viewer_id: Optional[int] = Query(
+        None, description="Who is looking: Private events are only listed if they may see them, "
+        "and the like/RSVP flags are theirs (default: anonymous, flags for user_id)",
+    ),
+) -> List[EventResponse]:
+    """Events the user created, liked or RSVPed to, soonest first, one page at a time."""
+    with connection.use() as conn:
+        try:
+            rows = events_read.read_user_events(
+                user_id, relation, limit=limit, offset=offset, include_inactive=include_inactive,
+                conn=conn, fragments=True, viewer_id=viewer_id,
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        viewer = user_id if viewer_id is None else viewer_id
+        return _fragments_response(rows, user_id=viewer, conn=conn)
+
+
 # ---------------------------------------------------------------------------
 # RSVP and Like endpoints
 # ---------------------------------------------------------------------------
 @app.post("/events/{event_id}/rsvp")
-def rsvp_event(event_id: int, payload: RSVPRequest) -> dict[str, Any]:
-    """Add an RSVP for the given user.  Returns the new RSVP list."""
-    added = rsvp_log.add_rsvp(payload.user_id, event_id)
-    if not added:
-        # Already RSVPed – treat as idempotent success
-        pass
-    rsvp_list = rsvp_log.get_event_rsvps(event_id)
-    return {"rsvps": rsvp_list}
+def rsvp_event(
+    event_id: int, payload: RSVPRequest, uow: UnitOfWork = Depends(get_unit_of_work)
+) -> dict[str, Any]:
+    """Add an RSVP for the given user, or a waitlist spot if the event is full.
+
+    Returns the RSVP list plus ``status`` ("confirmed" or "waitlisted") and,
+    when waitlisted, ``waitlistPosition`` (1 = next in line).
+    """
+    # Already RSVPed (or waitlisted) – treat as idempotent success
+    result, position = rsvp_log.reserve(payload.user_id, event_id, conn=uow.conn)
+    if result == rsvp_log.EVENT_NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Event not found")
+    rsvp_list = rsvp_log.get_event_rsvps(event_id, conn=uow.conn)
+    uow.commit()
+    if result == rsvp_log.CONFIRMED:
+        trending.record(event_id, trending.RSVP_WEIGHT)
+        suggest.bump(event_id, 1)
+        publisher.notify(counts_only=True)
+    if result == rsvp_log.WAITLISTED:
+        return {"rsvps": rsvp_list, "status": "waitlisted", "waitlistPosition": position}
+    return {"rsvps": rsvp_list, "status": "confirmed"}
 
 
 @app.delete("/events/{event_id}/rsvp")
-def cancel_rsvp(event_id: int, payload: RSVPRequest) -> dict[str, Any]:
-    """Remove an RSVP for the given user."""
-    rsvp_log.cancel_rsvp(payload.user_id, event_id)
-    rsvp_list = rsvp_log.get_event_rsvps(event_id)
-    return {"rsvps": rsvp_list}
+def cancel_rsvp(
+    event_id: int, payload: RSVPRequest, uow: UnitOfWork = Depends(get_unit_of_work)
+) -> dict[str, Any]:
+    """Remove an RSVP (or waitlist spot) for the given user; the next waitlisted users get the seat."""
+    result, promoted = rsvp_log.cancel_and_promote(payload.user_id, event_id, conn=uow.conn)
+    rsvp_list = rsvp_log.get_event_rsvps(event_id, conn=uow.conn)
+    uow.commit()
+    if result == rsvp_log.CANCELLED:
+        trending.record(event_id, -trending.RSVP_WEIGHT)
+        suggest.bump(event_id, -1)
+    for _ in promoted:
+        trending.record(event_id, trending.RSVP_WEIGHT)
+        suggest.bump(event_id, 1)
+    if result == rsvp_log.CANCELLED:
+        publisher.notify(counts_only=True)
+    return {"rsvps": rsvp_list, "promoted": promoted}
+
+
+@app.get("/events/{event_id}/waitlist")
+def event_waitlist(
+    event_id: int, user_id: int = Query(..., description="ID of the user asking")
+) -> dict[str, Any]:
+    """The waitlist, next in line first, for the creator or Faculty.
+
+    Anyone else only gets their own ``waitlistPosition`` (None if not
+    waiting), and a 404 for a Private event they may not see.
+    """
+    with connection.use() as conn:
+        result = authorization.check(event_id, user_id, conn)
+        if result == authorization.EVENT_NOT_FOUND:
+            raise HTTPException(status_code=404, detail="Event not found")
+        if result == authorization.ALLOWED:
+            return {"waitlist": rsvp_log.get_event_waitlist(event_id, conn=conn)}
+        if not events_read.read_event_by_id(event_id, conn=conn, viewer_id=user_id, visible_only=True):
+            raise HTTPException(status_code=404, detail="Event not found")
+        return {"waitlistPosition": rsvp_log.waitlist_position(user_id, event_id, conn=conn)}
 
 
 @app.post("/events/{event_id}/like")
-def like_event(event_id: int, payload: LikeRequest) -> dict[str, Any]:
+def like_event(
+    event_id: int, payload: LikeRequest, uow: UnitOfWork = Depends(get_unit_of_work)
+) -> dict[str, Any]:
     """Add a like for the given user.  Returns the new like count."""
-    liked = liking_log.add_like(payload.user_id, event_id)
-    # Optionally update the denormalised numberLikes column
+    liked = liking_log.add_like(payload.user_id, event_id, conn=uow.conn)
+    # Keep the denormalised numberLikes column in the same transaction
     if liked:
-        db_path = _get_db_path()
-        with sqlite3.connect(db_path) as conn:
-            cur = conn.cursor()
-            cur.execute(
-                "UPDATE events SET numberLikes = numberLikes + 1 WHERE eventID = ?",
-                (event_id,),
-            )
-            conn.commit()
-    count = len(liking_log.get_event_likes(event_id))
+        uow.conn.execute(
+            "UPDATE events SET numberLikes = numberLikes + 1 WHERE eventID = ?",
+            (event_id,),
+        )
+    count = len(liking_log.get_event_likes(event_id, conn=uow.conn))
+    uow.commit()
+    if liked:
+        trending.record(event_id, trending.LIKE_WEIGHT)
+        suggest.bump(event_id, 1)
+        publisher.notify(counts_only=True)
     return {"likes": count}
 
 
 @app.delete("/events/{event_id}/like")
-def unlike_event(event_id: int, payload: LikeRequest) -> dict[str, Any]:
+def unlike_event(
+    event_id: int, payload: LikeRequest, uow: UnitOfWork = Depends(get_unit_of_work)
+) -> dict[str, Any]:
     """Remove a like for the given user."""
-    removed = liking_log.remove_like(payload.user_id, event_id)
+    removed = liking_log.remove_like(payload.user_id, event_id, conn=uow.conn)
     if removed:
         # Decrement numberLikes
-        db_path = _get_db_path()
-        with sqlite3.connect(db_path) as conn:
-            cur = conn.cursor()
-            cur.execute(
-                "UPDATE events SET numberLikes = MAX(numberLikes - 1, 0) WHERE eventID = ?",
-                (event_id,),
-            )
-            conn.commit()
-    count = len(liking_log.get_event_likes(event_id))
+        uow.conn.execute(
+            "UPDATE events SET numberLikes = MAX(numberLikes - 1, 0) WHERE eventID = ?",
+            (event_id,),
+        )
+    count = len(liking_log.get_event_likes(event_id, conn=uow.conn))
+    uow.commit()
+    if removed:
+        trending.record(event_id, -trending.LIKE_WEIGHT)
+        suggest.bump(event_id, -1)
+        publisher.notify(counts_only=True)
     return {"likes": count}
 
 
+# ---------------------------------------------------------------------------
+# Invite endpoints (who may see a Private event)
+# ---------------------------------------------------------------------------
+@app.post("/events/{event_id}/invites")
+def invite_users(
+    event_id: int, payload: InviteRequest, uow: UnitOfWork = Depends(get_unit_of_work)
+) -> dict[str, Any]:
+    """Invite many users at once (one transaction).  Returns how many invites were new."""
+    _require_event_permission(event_id, payload.inviterID, "invite to", uow.conn)
+    invited = invite_log.add_invites(event_id, payload.user_ids, conn=uow.conn)
+    uow.commit()
+    return {"invited": invited}
+
+
+@app.get("/events/{event_id}/invites")
+def list_invites(
+    event_id: int, user_id: int = Query(..., description="ID of the user asking (creator or Faculty)")
+) -> dict[str, Any]:
+    """Account IDs invited to the event."""
+    with connection.use() as conn:
+        _require_event_permission(event_id, user_id, "view invites for", conn)
+        return {"invites": invite_log.get_event_invites(event_id, conn=conn)}
+
+
+@app.delete("/events/{event_id}/invites/{invitee_id}")
+def revoke_invite(
+    event_id: int,
+    invitee_id: int,
+    user_id: int = Query(..., description="ID of the user revoking (creator, Faculty or the invitee)"),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+) -> dict[str, Any]:
+    """Revoke an invite; invitees may also decline their own."""
+    if user_id != invitee_id:
+        _require_event_permission(event_id, user_id, "revoke invites for", uow.conn)
+    removed = invite_log.remove_invite(event_id, invitee_id, conn=uow.conn)
+    uow.commit()
+    return {"success": removed}
+
+
 # ---------------------------------------------------------------------------
 # Search endpoint
 # ---------------------------------------------------------------------------
+@app.get("/search/suggest")
+def search_suggestions(
+    q: str = Query(..., min_length=1, description="What the user has typed so far"),
+    limit: int = Query(8, ge=1, le=suggest.MAX_LIMIT, description="How many suggestions"),
+) -> List[dict]:
+    """Typeahead: titles, locations and categories starting with ``q``, most liked/RSVPed first."""
+    return suggest.suggest(q, limit)
+
+
 @app.get("/search", response_model=List[EventResponse])
 def search_events(
     title: Optional[str] = Query(None, description="Title contains this substring"),
@@ -470,22 +863,24 @@ def search_events(
     user_id: Optional[int] = Query(None),
 ) -> List[EventResponse]:
     """Filter events by various optional parameters."""
-    events = events_read.read_events()
-    # Apply filters in Python rather than SQL for simplicity
-    if title:
-        events = searching_logic.search_by_title(events, title)
-    if description:
-        events = searching_logic.search_by_description(events, description)
-    if category:
-        events = searching_logic.search_by_category(events, [category])
-    if start_date and end_date:
-        events = searching_logic.search_by_date(events, start_date, end_date)
-    elif start_date or end_date:
-        # If only one bound provided, treat the other as unbounded
-        sd = start_date or "0001-01-01"
-        ed = end_date or "9999-12-31"
-        events = searching_logic.search_by_date(events, sd, ed)
-    return [_event_to_response(evt, user_id=user_id) for evt in events]
+    with connection.use() as conn:
+        # Private events are already filtered for user_id in SQL
+        events = events_read.read_events(conn=conn, viewer_id=user_id)
+        # Apply filters in Python rather than SQL for simplicity
+        if title:
+            events = searching_logic.search_by_title(events, title)
+        if description:
+            events = searching_logic.search_by_description(events, description)
+        if category:
+            events = searching_logic.search_by_category(events, [category])
+        if start_date and end_date:
+            events = searching_logic.search_by_date(events, start_date, end_date)
+        elif start_date or end_date:
+            # If only one bound provided, treat the other as unbounded
+            sd = start_date or "0001-01-01"
+            ed = end_date or "9999-12-31"
+            events = searching_logic.search_by_date(events, sd, ed)
+        return _events_to_responses(events, user_id=user_id, conn=conn)
 
 # ---------------------------------------------------------------------------
 # Deletes all past-day events once per night at midnight
@@ -495,12 +890,22 @@ import threading
 import time
 
 def delete_past_events():
-    db_path = _get_db_path()
+    # The purge is not urgent; let the first requests and warm-up go first
+    warmup.wait(timeout=60)
     while True:
-        with sqlite3.connect(db_path) as conn:
-            cur = conn.cursor()
-            cur.execute("DELETE FROM events WHERE DATE(startDateTime) < DATE('now')")
-            conn.commit()
+        try:
+            with metrics.time_job("midnight_purge"), connection.use() as conn:
+                cur = conn.cursor()
+                past = "DATE(startDateTime) < DATE('now')"
+                image_store.release_matching(conn, past)  # variants go with their images at gc()
+                cur.execute(f"DELETE FROM events WHERE {past}")  # triggers drop their fragments
+            suggest.rebuild()  # purged events drop out of the typeahead
+            fragments.backfill()  # anything written around the event write paths
+            publisher.notify()  # past events leave the static feed
+            with metrics.time_job("image_gc"):
+                print(f"[cleanup] image store: {image_store.gc()}")
+        except (sqlite3.Error, OSError) as e:
+            print(f"[cleanup] midnight purge failed: {e}")
         # Sleep until next midnight
         now = datetime.now()
         tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
@@ -512,6 +917,179 @@ def schedule_cleanup():
     thread.start()
 
 
+@app.on_event("startup")
+def schedule_verification_sweep():
+    # The schema check is a warm-up step; the sweeper creates it lazily too
+    pending_verifications.start_sweeper()
+
+
+@app.on_event("startup")
+def start_outbox_sender():
+    if auth.DEV_ECHO:
+        return
+    mail_sender.start_sender()
+
+
+@app.on_event("startup")
+def prepare_indexes():
+    # Databases created before the per-user and invite indexes existed
+    events_read.ensure_user_indexes()
+    invite_log.ensure_index()
+
+
+@app.on_event("startup")
+def prepare_rsvp_capacity():
+    # events.capacity and rsvpWaitlist on databases created before them
+    rsvp_log.ensure_schema()
+
+
+@app.on_event("startup")
+def prepare_image_store():
+    # events.imageHash/imageBlobs/imageVariants on older databases; their BLOBs move out in the background
+    image_store.ensure_schema()
+    image_store.start_migration()
+
+
+@app.on_event("startup")
+def prepare_event_fragments():
+    # Table and triggers on older databases; the rows come from the warm-up step
+    fragments.ensure_schema()
+
+
+@app.on_event("startup")
+def prepare_trending():
+    # Adds likesLog/rsvpLog.createdAt on older databases before any like is written
+    trending.ensure_schema()
+    trending.start_rebuilder()
+
+
+@app.on_event("startup")
+def start_static_feed():
+    # The first publish is a warm-up step; this thread handles later changes
+    publisher.start()
+
+
+@app.on_event("startup")
+def start_index_refreshers():
+    # The first builds are warm-up steps; these threads pick up other workers' writes
+    suggest.start_refresher()
+    directory.start_refresher()
+
+
+@app.on_event("startup")
+def schedule_snapshots():
+    snapshots.start_scheduler()
+
+
+@app.on_event("startup")
+def start_warmup():
+    boot.mark("startup_hooks_done")
+    boot.remove_import_timer()
+    warmup.start()
+
+
+@app.on_event("shutdown")
+def stop_password_pool():
+    # Warm-up may still be starting the workers; let it finish so none leak
+    warmup.wait(timeout=10)
+    passwords.pool.shutdown()
+    image_variants.pool.shutdown()
+
+
+# ---------------------------------------------------------------------------
+# Warm-up steps (run in the background after start-up, in this order)
+# ---------------------------------------------------------------------------
+def _warm_hot_queries() -> dict:
+    # The home page's GET /events query plan (same WHERE/ORDER BY, so the
+    # same index and table pages) plus its like/RSVP lookups.  Images are
+    # files in the image store now, so the rows are small.
+    with connection.use() as conn:
+        ids = [row[0] for row in conn.execute(
+            "SELECT eventID FROM events WHERE eventAccess != 'Inactive' ORDER BY startDateTime ASC"
+        ).fetchall()]
+        liking_log.get_likes_for_events(ids, conn=conn)
+        rsvp_log.get_rsvps_for_events(ids, conn=conn)
+    return {"events": len(ids)}
+
+
+def _warm_schemas() -> None:
+    pending_verifications.ensure_schema()
+    outbox.ensure_schema()
+
+
+def _warm_role_cache() -> dict:
+    with connection.use() as conn:
+        rows = conn.execute(
+            "SELECT accountID, accountType FROM accounts ORDER BY accountID DESC LIMIT ?",
+            (roles.ROLE_CACHE_SIZE,),
+        ).fetchall()
+    for account_id, account_type in rows:
+        roles.put(account_id, account_type)
+    return {"accounts": len(rows)}
+
+
+def _warm_page_cache() -> dict:
+    path = connection.db_path()
+    limit = warmup.PAGE_CACHE_MB << 20
+    return {"bytes": sum(warmup.read_into_page_cache(p, limit) for p in (path, path + "-wal"))}
+
+
+def _warm_static_feed() -> Optional[dict]:
+    # After event_fragments, so the feed is joined from stored JSON
+    return publisher.publish() if publisher.ENABLED else None
+
+
+def _warm_query_planner() -> None:
+    with connection.use() as conn:
+        conn.execute("PRAGMA optimize")
+
+
+warmup.add_step("page_cache", _warm_page_cache)
+warmup.add_step("hot_queries", _warm_hot_queries)
+warmup.add_step("schemas", _warm_schemas)
+warmup.add_step("role_cache", _warm_role_cache)
+warmup.add_step("trending", trending.rebuild)
+warmup.add_step("event_fragments", fragments.backfill)
+warmup.add_step("static_feed", _warm_static_feed)
+warmup.add_step("user_directory", directory.rebuild)
+warmup.add_step("search_suggestions", suggest.rebuild)
+warmup.add_step("query_planner", _warm_query_planner)
+warmup.add_step("password_pool", passwords.pool.warm_up)
+
+
+@app.get("/ready")
+def ready() -> JSONResponse:
+    """503 until background warm-up has finished, then 200.  Includes boot timings."""
+    body = {**warmup.state(), "boot": boot.summary()}
+    return JSONResponse(body, status_code=200 if warmup.is_ready() else 503)
+
+
+
+# ---------------------------------------------------------------------------
+# Metrics endpoint (Prometheus text format)
+# ---------------------------------------------------------------------------
+metrics.register_cache("roles", lambda: (roles.hits, roles.misses))
+metrics.register_cache("pending_verifications", lambda: (pending_verifications.hits, pending_verifications.misses))
+metrics.register_cache("search_suggestions", lambda: (suggest.hits, suggest.misses))
+metrics.register_cache("event_fragments", lambda: (fragments.hits, fragments.misses))
+metrics.Callback(
+    "process_pool_in_use", "Jobs running or queued in a worker process pool.", ("pool",),
+    lambda: {(pool.name,): pool.in_use for pool in (passwords.pool, image_variants.pool)},
+)
+metrics.Callback(
+    "process_pool_rejected_total", "Jobs turned away because the pool queue was full.", ("pool",),
+    lambda: {(pool.name,): pool.rejected for pool in (passwords.pool, image_variants.pool)}, kind="counter",
+)
+metrics.Callback(
+    "smtp_circuit_open", "1 while the outbox SMTP circuit breaker is open or half-open.", (),
+    lambda: {(): float(mail_sender._sender is not None and mail_sender._sender.breaker.state != "closed")},
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint() -> Response:
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 
 # ---------------------------------------------------------------------------
 # Health check endpoint
@@ -519,4 +1097,7 @@ def schedule_cleanup():
 @app.get("/")
 def root() -> dict[str, str]:
     """Simple endpoint for load balancers and monitoring."""
-    return {"message": "Event Browsing API is running"}
\ No newline at end of file
+    return {"message": "Event Browsing API is running"}
+
+
+boot.mark("main_imported")
@@ -0,0 +1,359 @@
+"""
+=========================================================
+METRICS REGISTRY (Prometheus text format)
+=========================================================
+
+Purpose:
+- Counters, gauges and histograms for the API, rendered by GET /metrics in
+  the Prometheus text exposition format (version 0.0.4).
+- Covers HTTP latency by route/status, in-flight requests, SQLite
+  connections and lock waits, background job runs, cache hit ratios and
+  worker pool state.
+
+Hot path:
+- Each metric keeps one small dict per thread (threading.local).  A thread
+  only ever writes its own dict, so recording is a couple of dict/list
+  operations with no lock.  The registry lock is taken once per thread per
+  metric (to register the new dict) and by the scraper, which copies and
+  sums the per-thread dicts.
+- Values owned by other modules (cache hit counters, pool sizes) are read
+  lazily at scrape time through callbacks instead of being pushed.
+
+Frontend Use:
+- Not used by the React app; scraped by Prometheus / Fly metrics.
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from sub-millisecond reads to slow writes
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: list["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# -----------------------------
+# METRIC TYPES
+# -----------------------------
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        with _registry_lock:
+            _registry.append(self)
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.values
+        except AttributeError:
+            values: dict = {}
+            self._local.values = values
+            with _registry_lock:
+                self._shards.append(values)
+            return values
+
+    def _snapshot(self) -> list[dict]:
+        # dict.copy() is atomic under the GIL, so no writer has to lock
+        with _registry_lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def totals(self) -> dict[tuple, float]:
+        merged: dict[tuple, float] = {}
+        for shard in self._snapshot():
+            for key, value in shard.items():
+                merged[key] = merged.get(key, 0.0) + value
+        if not merged and not self.labelnames:
+            merged[()] = 0.0
+        return merged
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self.totals().items())
+        ]
+
+
+class Gauge(Counter):
+    """Up/down value.  inc() on one thread and dec() on another still sums correctly."""
+
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class LastValue(_Metric):
+    """Gauge that is set rather than summed (e.g. a last-run timestamp)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def set(self, *labels, value: float) -> None:
+        self._values[labels] = value
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.copy().items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value: float) -> None:
+        shard = self._shard()
+        slot = shard.get(labels)
+        if slot is None:
+            # per-bucket counts (+Inf last), then sum, then count
+            slot = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        slot[bisect.bisect_left(self.buckets, value)] += 1
+        slot[-2] += value
+        slot[-1] += 1
+
+    @contextmanager
+    def time(self, *labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(*labels, value=time.perf_counter() - start)
+
+    def render(self) -> list[str]:
+        merged: dict[tuple, list] = {}
+        for shard in self._snapshot():
+            for key, slot in shard.items():
+                slot = list(slot)
+                if key in merged:
+                    merged[key] = [a + b for a, b in zip(merged[key], slot)]
+                else:
+                    merged[key] = slot
+        if not merged and not self.labelnames:
+            merged[()] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        lines = []
+        bounds = self.buckets + (math.inf,)
+        for key, slot in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, slot):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(slot[-2])}")
+            lines.append(f"{self.name}_count{labels} {slot[-1]}")
+        return lines
+
+
+class Callback(_Metric):
+    """Counter or gauge whose values are read from ``fn()`` at scrape time."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str],
+        fn: Callable[[], dict[tuple, float]],
+        kind: str = "gauge",
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def render(self) -> list[str]:
+        try:
+            values = self.fn()
+        except Exception as e:
+            print(f"[metrics] collector {self.name} failed: {e}")
+            return []
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+def render() -> str:
+    """The whole registry in Prometheus text format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines: list[str] = []
+    for metric in metrics:
+        body = metric.render()
+        if not body and metric.labelnames:
+            continue
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(body)
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------
+# SHARED METRICS
+# -----------------------------
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template and status.",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "Requests currently being served.", ("method",),
+)
+sqlite_connections_opened = Counter(
+    "sqlite_connections_opened_total", "SQLite connections opened.",
+)
+sqlite_connections_open = Gauge(
+    "sqlite_connections_open", "SQLite connections currently open.",
+)
+sqlite_lock_errors = Counter(
+    "sqlite_lock_errors_total",
+    "Statements that failed with 'database is locked/busy' after the busy timeout.",
+    ("statement",),
+)
+sqlite_lock_wait = Histogram(
+    "sqlite_write_lock_wait_seconds",
+    "Time BEGIN IMMEDIATE spent waiting (busy-handler retries) for the write lock.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0),
+)
+sqlite_lock_waits = Counter(
+    "sqlite_write_lock_waits_total",
+    "BEGIN IMMEDIATE calls that had to wait for another writer (took > 1 ms).",
+)
+job_duration = Histogram(
+    "background_job_duration_seconds", "Duration of background job runs.", ("job",),
+    buckets=(0.001, 0.01, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0),
+)
+job_failures = Counter(
+    "background_job_failures_total", "Background job runs that raised.", ("job",),
+)
+job_last_success = LastValue(
+    "background_job_last_success_timestamp_seconds", "Unix time of the last successful run.", ("job",),
+)
+
+_caches: dict[str, Callable[[], tuple[float, float]]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], tuple[float, float]]) -> None:
+    """Export a cache's (hits, misses) as counters plus a hit ratio gauge."""
+    _caches[name] = stats
+
+
+def _cache_values(index: int) -> dict[tuple, float]:
+    return {(name, ): fn()[index] for name, fn in list(_caches.items())}
+
+
+def _cache_ratios() -> dict[tuple, float]:
+    ratios = {}
+    for name, fn in list(_caches.items()):
+        hits, misses = fn()
+        ratios[(name,)] = hits / (hits + misses) if hits + misses else 0.0
+    return ratios
+
+
+Callback("cache_hits_total", "Cache hits.", ("cache",), lambda: _cache_values(0), kind="counter")
+Callback("cache_misses_total", "Cache misses.", ("cache",), lambda: _cache_values(1), kind="counter")
+Callback("cache_hit_ratio", "hits / (hits + misses) since process start.", ("cache",), _cache_ratios)
+
+
+@contextmanager
+def time_job(job: str) -> Iterator[None]:
+    """Record one run of a background job (duration, failure, last success)."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        job_failures.inc(job)
+        raise
+    finally:
+        job_duration.observe(job, value=time.perf_counter() - start)
+    job_last_success.set(job, value=time.time())
+
+
+# -----------------------------
+# ASGI MIDDLEWARE
+# -----------------------------
+class MetricsMiddleware:
+    """Latency histogram + in-flight gauge for every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_holder = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec(method)
+            # Route template (e.g. /events/{event_id}), never the raw path,
+            # so label cardinality stays bounded.
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe(
+                method, path, str(status_holder[0]), value=time.perf_counter() - start
+            )
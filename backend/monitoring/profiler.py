@@ -0,0 +1,338 @@
+"""
+=========================================================
+ON-DEMAND REQUEST PROFILER
+=========================================================
+
+Purpose:
+- Profile a single live request without restarting the server.  Turned on
+  per request by an admin header, or for a random fraction of requests.
+- Each profile is saved in three formats:
+    <id>.speedscope.json   open at https://www.speedscope.app
+    <id>.collapsed.txt     flamegraph.pl / inferno input
+    <id>.pstats            `python -m pstats`, snakeviz
+  plus <id>.json with the request line, status, duration and sample count.
+- The newest PROFILE_KEEP profiles are kept; older ones are deleted, so the
+  directory is a bounded ring.
+
+How it works:
+- A sampler thread wakes every PROFILE_INTERVAL_MS and reads
+  sys._current_frames().  A thread's stack belongs to the request when it
+  contains this request's middleware frame (async code on the event loop)
+  or the route's endpoint function (sync endpoints in the threadpool).
+- Sampling was chosen over cProfile: cProfile only sees the thread it was
+  enabled on, while the sync endpoints here run on threadpool workers.  The
+  .pstats file is derived from the samples (times are sampled, call counts
+  are sample counts).
+- Two requests to the same sync route at the same instant can blend into
+  each other's profile; profile in isolation when that matters.
+
+Settings:
+- ADMIN_TOKEN            required for the X-Profile header and /admin routes
+- PROFILE_SAMPLE_RATE    fraction of requests profiled automatically (default 0)
+- PROFILE_INTERVAL_MS    sampling interval (default 2)
+- PROFILE_KEEP           profiles kept on disk (default 50)
+- PROFILE_MAX_ACTIVE     concurrent profiles allowed (default 2)
+- PROFILE_DIR            default: profiles/ next to the DB
+
+Usage:
+    curl -H "X-Profile: 1" -H "X-Admin-Token: $ADMIN_TOKEN" https://.../events
+    -> response header X-Profile-Id; download with GET /admin/profiles/<id>/speedscope
+"""
+
+import asyncio
+import hmac
+import json
+import marshal
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from db import connection
+
+SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+INTERVAL_SECONDS = float(os.environ.get("PROFILE_INTERVAL_MS", "2")) / 1000
+KEEP = int(os.environ.get("PROFILE_KEEP", "50"))
+MAX_ACTIVE = int(os.environ.get("PROFILE_MAX_ACTIVE", "2"))
+
+FORMATS = {
+    "speedscope": ("speedscope.json", "application/json"),
+    "collapsed": ("collapsed.txt", "text/plain"),
+    "pstats": ("pstats", "application/octet-stream"),
+}
+
+_active = threading.BoundedSemaphore(max(MAX_ACTIVE, 1))
+_save_lock = threading.Lock()
+_ID = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9]{6}$")
+
+
+def admin_token() -> str:
+    return os.environ.get("ADMIN_TOKEN", "")
+
+
+def is_admin(token: Optional[str]) -> bool:
+    expected = admin_token()
+    return bool(expected) and token is not None and hmac.compare_digest(token, expected)
+
+
+def profile_dir() -> str:
+    return os.environ.get("PROFILE_DIR") or os.path.join(
+        os.path.dirname(os.path.abspath(connection.db_path())), "profiles"
+    )
+
+
+def valid_id(profile_id: str) -> bool:
+    return bool(_ID.match(profile_id))
+
+
+# -----------------------------
+# SAMPLER
+# -----------------------------
+FrameKey = tuple[str, int, str]  # (filename, first line, function)
+
+
+class Session:
+    """Samples the stacks of one request until stop() is called."""
+
+    def __init__(self, scope: dict, anchor_frame):
+        self.scope = scope
+        self.anchor = anchor_frame
+        now = time.time()
+        # sortable by creation time, which the ring trimming relies on
+        self.id = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now % 1 * 1e6):06d}"
+        self.stacks: Counter[tuple[FrameKey, ...]] = Counter()
+        self.weights: Counter[tuple[FrameKey, ...]] = Counter()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+
+    def start(self) -> "Session":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _endpoint_code(self):
+        route = self.scope.get("route")
+        endpoint = getattr(route, "endpoint", None)
+        return getattr(endpoint, "__code__", None)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(INTERVAL_SECONDS):
+            now = time.perf_counter()
+            weight, last = now - last, now
+            endpoint_code = self._endpoint_code()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = []
+                mine = False
+                while frame is not None:
+                    code = frame.f_code
+                    if frame is self.anchor or code is endpoint_code:
+                        mine = True
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                if mine:
+                    key = tuple(reversed(stack))
+                    self.stacks[key] += 1
+                    self.weights[key] += weight
+                    self.samples += 1
+
+    # -----------------------------
+    # EXPORT FORMATS
+    # -----------------------------
+    @staticmethod
+    def _label(frame: FrameKey) -> str:
+        filename, line, name = frame
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    def collapsed(self) -> str:
+        return "".join(
+            ";".join(self._label(f) for f in stack) + f" {count}\n"
+            for stack, count in self.stacks.most_common()
+        )
+
+    def speedscope(self, name: str) -> dict:
+        index: dict[FrameKey, int] = {}
+        frames = []
+        samples, weights = [], []
+        for stack, weight in self.weights.items():
+            row = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame[2], "file": frame[0], "line": frame[1]})
+                row.append(index[frame])
+            samples.append(row)
+            weights.append(round(weight * 1000, 3))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": name,
+            "exporter": "eventplanner-profiler",
+        }
+
+    def pstats(self) -> dict:
+        """pstats.Stats-compatible dict: {func: (cc, nc, tt, ct, {caller: (cc, nc, tt, ct)})}."""
+        self_time: Counter[FrameKey] = Counter()
+        inclusive: Counter[FrameKey] = Counter()
+        hits: Counter[FrameKey] = Counter()
+        edges: dict[FrameKey, Counter] = {}
+        edge_time: dict[FrameKey, Counter] = {}
+        for stack, weight in self.weights.items():
+            count = self.stacks[stack]
+            self_time[stack[-1]] += weight
+            for frame in set(stack):  # recursion counts once per sample
+                inclusive[frame] += weight
+                hits[frame] += count
+            for caller, callee in set(zip(stack, stack[1:])):
+                edges.setdefault(callee, Counter())[caller] += count
+                edge_time.setdefault(callee, Counter())[caller] += weight
+        stats = {}
+        for frame, ct in inclusive.items():
+            callers = {
+                caller: (n, n, 0.0, edge_time[frame][caller])
+                for caller, n in edges.get(frame, {}).items()
+            }
+            stats[frame] = (hits[frame], hits[frame], self_time[frame], ct, callers)
+        return stats
+
+    def save(self, method: str, path: str, status: int) -> str:
+        directory = profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        name = f"{method} {path}"
+        base = os.path.join(directory, self.id)
+        with open(base + ".speedscope.json", "w") as fh:
+            json.dump(self.speedscope(name), fh)
+        with open(base + ".collapsed.txt", "w") as fh:
+            fh.write(self.collapsed())
+        with open(base + ".pstats", "wb") as fh:
+            marshal.dump(self.pstats(), fh)
+        meta = {
+            "id": self.id,
+            "method": method,
+            "path": path,
+            "route": getattr(self.scope.get("route"), "path", None),
+            "status": status,
+            "duration_ms": round(self.elapsed * 1000, 3),
+            "samples": self.samples,
+            "interval_ms": INTERVAL_SECONDS * 1000,
+            "created": time.time(),
+        }
+        # meta last: its presence marks the profile as complete
+        with open(base + ".json", "w") as fh:
+            json.dump(meta, fh)
+        _trim(directory)
+        return self.id
+
+
+# -----------------------------
+# RING STORAGE
+# -----------------------------
+def _trim(directory: str) -> None:
+    with _save_lock:
+        ids = sorted(f[:-5] for f in os.listdir(directory) if f.endswith(".json") and valid_id(f[:-5]))
+        for old in ids[:-KEEP] if KEEP > 0 else ids:
+            for suffix in [".json"] + ["." + ext for ext, _ in FORMATS.values()]:
+                try:
+                    os.remove(os.path.join(directory, old + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+def list_profiles() -> list[dict]:
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith(".json") and valid_id(name[:-5]):
+            try:
+                with open(os.path.join(directory, name)) as fh:
+                    profiles.append(json.load(fh))
+            except (OSError, ValueError):
+                continue
+    return profiles
+
+
+def profile_file(profile_id: str, fmt: str) -> Optional[tuple[str, str]]:
+    """(path, media type) of one stored profile, or None."""
+    if fmt not in FORMATS or not valid_id(profile_id):
+        return None
+    suffix, media_type = FORMATS[fmt]
+    path = os.path.join(profile_dir(), f"{profile_id}.{suffix}")
+    return (path, media_type) if os.path.exists(path) else None
+
+
+# -----------------------------
+# ASGI MIDDLEWARE
+# -----------------------------
+def _wants_profile(scope: dict) -> bool:
+    headers = dict(scope.get("headers") or [])
+    requested = headers.get(b"x-profile")
+    if requested and requested not in (b"0", b"false"):
+        token = headers.get(b"x-admin-token")
+        return is_admin(token.decode("latin-1") if token else None)
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+class ProfilerMiddleware:
+    """Profile requests that ask for it (or are sampled) and store the result."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _active.acquire(blocking=False):
+            # Enough profiles running already; serve the request normally
+            await self.app(scope, receive, send)
+            return
+
+        session = Session(scope, sys._getframe()).start()
+        status_holder = [500]
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", session.id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, session.stop)
+                await loop.run_in_executor(
+                    None, session.save, scope["method"], scope["path"], status_holder[0]
+                )
+            except OSError as e:
+                print(f"[profiler] could not save profile {session.id}: {e}")
+            finally:
+                _active.release()
@@ -0,0 +1,244 @@
+"""
+=========================================================
+SLOW-QUERY LOG (+ offender report)
+=========================================================
+
+Purpose:
+- Any statement whose SQLite time crosses SLOW_QUERY_MS is appended to a
+  JSON-lines log with its text, the *shape* of its parameters (types and
+  sizes, never the values -- these include emails and password hashes),
+  its duration and its EXPLAIN QUERY PLAN.
+- Plan steps that SCAN a table with more than SLOW_QUERY_LARGE_TABLE rows
+  are flagged; those are the missing indexes.
+- `python -m monitoring.slow_query report` aggregates the log into the top
+  offenders by total time.
+- The log is capped: once a write would take it past SLOW_QUERY_LOG_MAX_MB
+  it is renamed to `<log>.1` (replacing the previous one) and a fresh file
+  is started, so at most twice the cap is ever on disk.  The report reads
+  both.
+
+Where it hooks in:
+- db/instrumentation.InstrumentedCursor measures every execute and fetch
+  and calls `record()` once per statement that went over the threshold.
+  A SELECT does most of its work while rows are fetched, so the duration
+  includes fetches up to the point the threshold was crossed (all of it
+  for fetchall()).
+
+Settings:
+- SLOW_QUERY_MS            threshold in milliseconds (default 200, 0 = off)
+- SLOW_QUERY_LOG           log path (default: slow_queries.jsonl next to the DB)
+- SLOW_QUERY_LARGE_TABLE   rows above which a SCAN is flagged (default 10000)
+- SLOW_QUERY_LOG_MAX_MB    size at which the log is rotated (default 10, 0 = never)
+
+Usage (from the backend folder):
+    python -m monitoring.slow_query report --top 20
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from db import connection
+from monitoring import metrics
+
+THRESHOLD_SECONDS = float(os.environ.get("SLOW_QUERY_MS", "200")) / 1000
+LARGE_TABLE_ROWS = int(os.environ.get("SLOW_QUERY_LARGE_TABLE", "10000"))
+LOG_MAX_BYTES = int(float(os.environ.get("SLOW_QUERY_LOG_MAX_MB", "10")) * (1 << 20))
+TABLE_SIZE_TTL_SECONDS = 300
+
+slow_queries = metrics.Counter(
+    "sqlite_slow_queries_total", "Statements slower than SLOW_QUERY_MS.", ("statement",),
+)
+
+_write_lock = threading.Lock()
+_table_rows: dict[str, tuple[float, Optional[int]]] = {}
+_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def enabled() -> bool:
+    return THRESHOLD_SECONDS > 0
+
+
+def log_path() -> str:
+    return os.environ.get("SLOW_QUERY_LOG") or os.path.join(
+        os.path.dirname(os.path.abspath(connection.db_path())), "slow_queries.jsonl"
+    )
+
+
+def _rotate_if_full(path: str, incoming: int) -> None:
+    """Move a full log aside to `<path>.1`.  Caller holds _write_lock."""
+    if LOG_MAX_BYTES <= 0:
+        return
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return  # not created yet
+    if size and size + incoming > LOG_MAX_BYTES:
+        os.replace(path, path + ".1")
+
+
+# -----------------------------
+# RECORDING
+# -----------------------------
+def param_shape(params: Any) -> Any:
+    """Types/sizes of bound parameters without their values."""
+    def one(value):
+        if value is None:
+            return "null"
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return f"blob[{len(value)}]"
+        if isinstance(value, str):
+            return f"text[{len(value)}]"
+        return type(value).__name__
+
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: one(value) for key, value in params.items()}
+    return [one(value) for value in params]
+
+
+def _table_size(conn: sqlite3.Connection, table: str) -> Optional[int]:
+    cached = _table_rows.get(table)
+    now = time.monotonic()
+    if cached and now - cached[0] < TABLE_SIZE_TTL_SECONDS:
+        return cached[1]
+    try:
+        # MAX(rowid) is an O(log n) estimate; COUNT(*) would itself be a scan
+        row = sqlite3.Connection.execute(conn, f'SELECT MAX(rowid) FROM "{table}"').fetchone()
+        rows = row[0] if row and row[0] is not None else 0
+    except sqlite3.Error:
+        rows = None  # virtual table (json_each) or a view
+    _table_rows[table] = (now, rows)
+    return rows
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: Any) -> tuple[list[str], list[dict]]:
+    """EXPLAIN QUERY PLAN lines, plus the SCAN steps over large tables."""
+    head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    if head not in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE"):
+        return [], []
+    try:
+        # Base-class execute: must not be counted or timed itself
+        rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, params or ()).fetchall()
+    except sqlite3.Error as e:
+        return [f"(explain failed: {e})"], []
+    plan = [row[3] for row in rows]
+    flags = []
+    for detail in plan:
+        match = _SCAN.match(detail)
+        if not match:
+            continue
+        table = match.group(1)
+        size = _table_size(conn, table)
+        if size is not None and size >= LARGE_TABLE_ROWS:
+            flags.append({"table": table, "rows": size, "detail": detail})
+    return plan, flags
+
+
+def record(
+    conn: sqlite3.Connection,
+    sql: str,
+    params: Any,
+    seconds: float,
+    many: bool = False,
+) -> dict:
+    """Log one slow statement.  Returns the entry that was written."""
+    plan, flags = explain(conn, sql, params)
+    words = sql.split(None, 1)
+    statement = words[0].upper() if words else "?"
+    entry = {
+        "ts": round(time.time(), 3),
+        "ms": round(seconds * 1000, 3),
+        "sql": " ".join(sql.split()),
+        "params": param_shape(params),
+        "executemany": many,
+        "plan": plan,
+        "large_scans": flags,
+    }
+    slow_queries.inc(statement)
+    scan_note = f" SCAN {','.join(f['table'] for f in flags)}" if flags else ""
+    print(f"[slow-query] {entry['ms']:.1f} ms{scan_note}: {entry['sql'][:200]}")
+    try:
+        line = json.dumps(entry) + "\n"
+        path = log_path()
+        with _write_lock:
+            _rotate_if_full(path, len(line))
+            with open(path, "a") as fh:
+                fh.write(line)
+    except OSError as e:
+        print(f"[slow-query] could not write log: {e}")
+    return entry
+
+
+# -----------------------------
+# REPORT
+# -----------------------------
+def normalize(sql: str) -> str:
+    """Collapse whitespace and literals so the same statement groups together."""
+    return _LITERALS.sub("?", " ".join(sql.split()))
+
+
+def _lines(path: str):
+    """The rotated-out backup (older entries) first, then the live log."""
+    for name in (path + ".1", path):
+        try:
+            fh = open(name)
+        except FileNotFoundError:
+            continue
+        with fh:
+            yield from fh
+
+
+def report(path: str, top: int = 20, since: Optional[float] = None) -> list[dict]:
+    groups: dict[str, dict] = {}
+    for line in _lines(path):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if since is not None and entry.get("ts", 0) < since:
+            continue
+        key = normalize(entry["sql"])
+        group = groups.setdefault(key, {
+            "sql": key, "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+            "large_scans": set(), "plan": entry.get("plan", []),
+        })
+        group["count"] += 1
+        group["total_ms"] += entry["ms"]
+        group["max_ms"] = max(group["max_ms"], entry["ms"])
+        group["large_scans"].update(f["table"] for f in entry.get("large_scans", []))
+    ranked = sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)[:top]
+    for group in ranked:
+        group["mean_ms"] = round(group["total_ms"] / group["count"], 3)
+        group["total_ms"] = round(group["total_ms"], 3)
+        group["large_scans"] = sorted(group["large_scans"])
+    return ranked
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Slow-query log tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rep = sub.add_parser("report", help="Top statements by total time")
+    rep.add_argument("--log", default=None, help="Log file (default: SLOW_QUERY_LOG / next to the DB)")
+    rep.add_argument("--top", type=int, default=20)
+    rep.add_argument("--hours", type=float, default=None, help="Only entries from the last N hours")
+    rep.add_argument("--plans", action="store_true", help="Print the query plan under each statement")
+    args = parser.parse_args()
+
+    since = time.time() - args.hours * 3600 if args.hours else None
+    rows = report(args.log or log_path(), args.top, since)
+    print(f"{'total ms':>10s} {'count':>6s} {'mean ms':>9s} {'max ms':>9s}  statement")
+    for row in rows:
+        scans = f"  [SCAN {', '.join(row['large_scans'])}]" if row["large_scans"] else ""
+        print(f"{row['total_ms']:10.1f} {row['count']:6d} {row['mean_ms']:9.1f} {row['max_ms']:9.1f}  "
+              f"{row['sql'][:120]}{scans}")
+        if args.plans:
+            for step in row["plan"]:
+                print(f"{'':40s}{step}")
@@ -0,0 +1,62 @@
+"""
+/metrics exposition tests.
+
+Run from the backend folder:
+    python -m pytest monitoring/test_metrics.py
+"""
+
+import threading
+
+from fastapi.testclient import TestClient
+
+import main
+from monitoring import metrics
+
+
+def test_histogram_merges_thread_shards():
+    hist = metrics.Histogram("test_merge_seconds", "test", ("kind",), buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            hist.observe("a", value=0.05)
+            hist.observe("a", value=0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    text = "\n".join(hist.render())
+    assert 'test_merge_seconds_bucket{kind="a",le="0.1"} 4000' in text
+    assert 'test_merge_seconds_bucket{kind="a",le="+Inf"} 8000' in text
+    assert 'test_merge_seconds_count{kind="a"} 8000' in text
+
+
+def test_metrics_endpoint_reports_route_templates():
+    client = TestClient(main.app)
+    client.get("/events/424242")
+    client.get("/no-such-path")
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = resp.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/events/{event_id}",status="404"}' in body
+    assert 'route="unmatched",status="404"' in body
+    assert "/events/424242" not in body
+    assert "sqlite_connections_opened_total" in body
+    assert 'cache_hit_ratio{cache="roles"}' in body
+    assert 'http_requests_in_flight{method="GET"} 1' in body  # the /metrics request itself
+
+
+def test_time_job_records_failures():
+    try:
+        with metrics.time_job("test_job"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    with metrics.time_job("test_job"):
+        pass
+    body = metrics.render()
+    assert 'background_job_failures_total{job="test_job"} 1' in body
+    assert 'background_job_duration_seconds_count{job="test_job"} 2' in body
+    assert 'background_job_last_success_timestamp_seconds{job="test_job"}' in body
@@ -0,0 +1,73 @@
+"""
+Request profiler tests.
+
+Run from the backend folder:
+    python -m pytest monitoring/test_profiler.py
+"""
+
+import marshal
+import pstats
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from monitoring import profiler
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiler, "INTERVAL_SECONDS", 0.0005)
+    return TestClient(main.app)
+
+
+def test_profile_needs_admin_token(client):
+    resp = client.get("/events", headers={"X-Profile": "1", "X-Admin-Token": "wrong"})
+    assert resp.status_code == 200
+    assert "x-profile-id" not in resp.headers
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+
+def test_profiled_request_is_listed_and_downloadable(client):
+    resp = client.get("/events", headers={"X-Profile": "1", "X-Admin-Token": "s3cret"})
+    assert resp.status_code == 200
+    profile_id = resp.headers["x-profile-id"]
+
+    listed = client.get("/admin/profiles", headers={"X-Admin-Token": "s3cret"}).json()
+    assert listed[0]["id"] == profile_id
+    assert listed[0]["route"] == "/events" and listed[0]["status"] == 200
+
+    scope = client.get(f"/admin/profiles/{profile_id}/speedscope", headers={"X-Admin-Token": "s3cret"})
+    assert scope.status_code == 200 and scope.json()["profiles"][0]["type"] == "sampled"
+    assert client.get(f"/admin/profiles/{profile_id}/collapsed", headers={"X-Admin-Token": "s3cret"}).status_code == 200
+    assert client.get(f"/admin/profiles/../x/pstats", headers={"X-Admin-Token": "s3cret"}).status_code == 404
+
+
+def test_pstats_export_loads(tmp_path):
+    session = profiler.Session({}, None)
+    leaf = ("app.py", 10, "leaf")
+    mid = ("app.py", 5, "mid")
+    root = ("app.py", 1, "root")
+    for stack, n in (((root, mid, leaf), 3), ((root, mid), 1)):
+        session.stacks[stack] += n
+        session.weights[stack] += n * 0.002
+    path = tmp_path / "p.pstats"
+    with open(path, "wb") as fh:
+        marshal.dump(session.pstats(), fh)
+    stats = pstats.Stats(str(path))
+    cc, nc, tt, ct, callers = stats.stats[mid]
+    assert nc == 4 and abs(ct - 0.008) < 1e-9 and abs(tt - 0.002) < 1e-9
+    assert callers[root][0] == 4
+    assert session.collapsed().splitlines()[0] == "root (app.py:1);mid (app.py:5);leaf (app.py:10) 3"
+
+
+def test_ring_keeps_newest(client, monkeypatch):
+    monkeypatch.setattr(profiler, "KEEP", 2)
+    ids = [
+        client.get("/", headers={"X-Profile": "1", "X-Admin-Token": "s3cret"}).headers["x-profile-id"]
+        for _ in range(3)
+    ]
+    listed = [p["id"] for p in profiler.list_profiles()]
+    assert len(listed) == 2 and ids[0] not in listed
@@ -0,0 +1,84 @@
+"""
+Slow-query log tests.
+
+Run from the backend folder:
+    python -m pytest monitoring/test_slow_query.py
+"""
+
+import json
+
+import pytest
+
+from db import connection
+from monitoring import slow_query
+
+
+@pytest.fixture
+def slow_log(tmp_path, monkeypatch):
+    path = tmp_path / "slow.jsonl"
+    monkeypatch.setenv("SLOW_QUERY_LOG", str(path))
+    # Everything counts as slow, every table counts as large
+    monkeypatch.setattr(slow_query, "THRESHOLD_SECONDS", 1e-9)
+    monkeypatch.setattr(slow_query, "LARGE_TABLE_ROWS", 1)
+    monkeypatch.setattr(slow_query, "_table_rows", {})
+    with connection.use() as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS slowProbe (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.execute("DELETE FROM slowProbe")
+        conn.executemany("INSERT INTO slowProbe (name) VALUES (?)", [(f"n{i}",) for i in range(50)])
+    path.write_text("")
+    return path
+
+
+def _entries(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_scan_is_flagged_with_plan_and_param_shape(slow_log):
+    with connection.use() as conn:
+        conn.execute("SELECT * FROM slowProbe WHERE name = ?", ("secret@unco.edu",)).fetchall()
+        conn.execute("SELECT * FROM slowProbe WHERE id = ?", (3,)).fetchone()
+
+    entries = _entries(slow_log)
+    scan = next(e for e in entries if "name = ?" in e["sql"])
+    assert scan["params"] == ["text[15]"]
+    assert "secret" not in json.dumps(scan)
+    assert any(step.startswith("SCAN") for step in scan["plan"])
+    assert scan["large_scans"][0]["table"] == "slowProbe"
+
+    lookup = next(e for e in entries if "id = ?" in e["sql"])
+    assert lookup["large_scans"] == []
+    assert any("USING INTEGER PRIMARY KEY" in step for step in lookup["plan"])
+
+
+def test_each_statement_logged_once(slow_log):
+    with connection.use() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM slowProbe")
+        for _ in cur:
+            pass
+    assert sum("SELECT id FROM slowProbe" in e["sql"] for e in _entries(slow_log)) == 1
+
+
+def test_report_groups_by_statement(slow_log):
+    with connection.use() as conn:
+        for i in range(3):
+            conn.execute(f"SELECT name FROM slowProbe WHERE id = {i}").fetchall()
+        conn.execute("SELECT COUNT(*) FROM slowProbe").fetchall()
+    rows = slow_query.report(str(slow_log))
+    grouped = next(r for r in rows if r["sql"] == "SELECT name FROM slowProbe WHERE id = ?")
+    assert grouped["count"] == 3
+    assert rows == sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+
+def test_log_is_rotated_at_the_size_cap(slow_log, monkeypatch):
+    monkeypatch.setattr(slow_query, "LOG_MAX_BYTES", 2000)
+    with connection.use() as conn:
+        for i in range(30):
+            conn.execute(f"SELECT name FROM slowProbe WHERE id = {i}").fetchall()
+    backup = slow_log.with_name(slow_log.name + ".1")
+    assert backup.exists()
+    assert slow_log.stat().st_size <= 2000 and backup.stat().st_size <= 2000
+    # The report still sees entries from both files
+    grouped = next(r for r in slow_query.report(str(slow_log), top=100)
+                   if r["sql"] == "SELECT name FROM slowProbe WHERE id = ?")
+    assert grouped["count"] == len(_entries(backup)) + len(_entries(slow_log))
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse
+from typing import Optional
+
+from monitoring import profiler
+
+"""
+=========================================================
+ADMIN ROUTES (request profiles)
+=========================================================
+
+Purpose:
+- List and download the profiles written by monitoring/profiler.py.
+- Every route needs the X-Admin-Token header to match ADMIN_TOKEN; with no
+  ADMIN_TOKEN configured the routes answer 404 as if they did not exist.
+
+Frontend Use:
+- Not used by the React app; for developers with curl / the browser.
+"""
+
+router = APIRouter(prefix="/admin")
+
+
+def _require_admin(token: Optional[str]) -> None:
+    if not profiler.admin_token():
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiler.is_admin(token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@router.get("/profiles")
+def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Stored profiles, newest first."""
+    _require_admin(x_admin_token)
+    return profiler.list_profiles()
+
+
+@router.get("/profiles/{profile_id}/{fmt}")
+def download_profile(profile_id: str, fmt: str, x_admin_token: Optional[str] = Header(None)):
+    """One profile as speedscope, collapsed or pstats."""
+    _require_admin(x_admin_token)
+    found = profiler.profile_file(profile_id, fmt)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    path, media_type = found
+    suffix = profiler.FORMATS[fmt][0]
+    return FileResponse(path, media_type=media_type, filename=f"{profile_id}.{suffix}")
@@ -1,30 +1,29 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from email.mime.text import MIMEText
-import os, smtplib, sqlite3, random, string, datetime
+import os, sqlite3, random, string, datetime
 
-router = APIRouter()
+from db import connection
+from mail import outbox
+from mail.sender import SMTP_USER, SMTP_PASS, FROM_EMAIL
+from routes import pending_verifications
+from UserAccounts import directory
+from UserAccounts import passwords
+from UserAccounts import roles
 
-# DB
-DB_PATH = os.environ.get("DB_PATH", "/data/EventPlannerDB.db")
+router = APIRouter()
 
+# DB (path and pragmas live in db/connection.py)
 def get_connection():
-    con = sqlite3.connect(DB_PATH, timeout=15, check_same_thread=False)
-    con.execute("PRAGMA journal_mode=WAL;")
-    return con
+    return connection.connect()
 
 #
-# Mailtrap configuration (hardcoded for dev)
-SMTP_HOST = "send.smtp.mailtrap.io"
-SMTP_PORT = 587
-SMTP_USER = "api"
-SMTP_PASS = "336e403b8d0b431c09af7b7615405303"
-FROM_EMAIL = "verify@cs350unco.com"
+# Mailtrap configuration lives in mail/sender.py (and is logged when the
+# sender starts, not at import); emails go out via the outbox
 DEV_ECHO = False
-print(f"[Mailtrap Config] Host={SMTP_HOST}, Port={SMTP_PORT}, User={SMTP_USER}, From={FROM_EMAIL}")
 
-# Pending verifications (dev-only memory store)
-pending_verifications: dict[str, dict] = {}
+# Pending verifications live in SQLite (routes/pending_verifications.py) so
+# /register and /verify may be served by different workers.
+VERIFICATION_TTL_SECONDS = 60 * 60
 
 class RegisterRequest(BaseModel):
     email: str
@@ -42,46 +41,48 @@ def register(req: RegisterRequest):
         raise HTTPException(status_code=400, detail="Invalid account type")
 
     # prevent duplicates (existing verified accounts)
-    with get_connection() as con:
+    with connection.use() as con:
         cur = con.cursor()
         cur.execute("SELECT 1 FROM accounts WHERE email = ?", (email,))
         if cur.fetchone():
             raise HTTPException(status_code=400, detail="Email already exists")
 
-    code = "".join(random.choices(string.digits, k=6))
-    expiry = (datetime.datetime.now() + datetime.timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S")
+    # Hash up front so the plaintext never reaches the database
+    try:
+        password_hash = passwords.hash_password(req.password)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except passwords.PoolBusy as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-ups right now, please retry",
+            headers={"Retry-After": str(int(e.retry_after))},
+        )
 
-    pending_verifications[email] = {
-        "email": email,
-        "password": req.password,  # TODO: hash before storing in prod
-        "accountType": req.accountType,
-        "code": code,
-        "expiry": expiry,
-    }
+    code = "".join(random.choices(string.digits, k=6))
+    pending_verifications.put(
+        email,
+        password_hash,
+        req.accountType,
+        code,
+        VERIFICATION_TTL_SECONDS,
+    )
 
     # Dev echo or missing creds => bypass SMTP and return code
     if DEV_ECHO or not (SMTP_USER and SMTP_PASS and FROM_EMAIL):
         print(f"[DEV_EMAIL_ECHO] to={email} code={code}")
         return {"message": "Verification email 'sent' (dev)", "dev_code": code}
 
-    # Real SMTP send
+    # Queue for the background sender (mail/sender.py) instead of talking
+    # SMTP inside the request
     try:
-        msg = MIMEText(f"Your UNCO Event App verification code is: {code}")
-        msg["Subject"] = "UNCO Event App Verification Code"
-        msg["From"] = FROM_EMAIL
-        msg["To"] = email
-
-        if SMTP_PORT == 465:
-            with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT) as server:
-                server.login(SMTP_USER, SMTP_PASS)
-                server.send_message(msg)
-        else:
-            with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-                server.starttls()
-                server.login(SMTP_USER, SMTP_PASS)
-                server.send_message(msg)
-    except Exception as e:
-        pending_verifications.pop(email, None)
+        outbox.enqueue(
+            email,
+            "UNCO Event App Verification Code",
+            f"Your UNCO Event App verification code is: {code}",
+        )
+    except sqlite3.Error as e:
+        pending_verifications.discard(email)
         raise HTTPException(status_code=500, detail=f"Email failed: {str(e)}")
 
     return {"message": "Verification email sent"}
@@ -89,36 +90,55 @@ def register(req: RegisterRequest):
 @router.post("/verify")
 def verify(req: VerifyRequest):
     email = req.email.strip()
+    code = req.code.strip()
     data = pending_verifications.get(email)
+    if data and data["code"] != code:
+        # The cached copy may predate a re-register handled by another worker
+        data = pending_verifications.get(email, use_cache=False)
     if not data:
         raise HTTPException(status_code=404, detail="No pending verification")
-    if data["code"] != req.code.strip():
+    if data["code"] != code:
         raise HTTPException(status_code=400, detail="Invalid verification code")
-    if datetime.datetime.strptime(data["expiry"], "%Y-%m-%d %H:%M:%S") < datetime.datetime.now():
-        pending_verifications.pop(email, None)
+    if data["expiresAt"] < datetime.datetime.now().timestamp():
+        pending_verifications.discard(email)
         raise HTTPException(status_code=400, detail="Code expired")
 
-    # Insert AFTER verification
+    # Redeem the code and insert the account in one write transaction.  The
+    # new accountID is computed inside the INSERT itself, so concurrent
+    # verifications can never be handed the same ID.
+    con = get_connection()
     try:
-        with get_connection() as con:
-            cur = con.cursor()
-            cur.execute("SELECT MAX(accountID) FROM accounts")
-            row = cur.fetchone()
-            new_id = 0 if row[0] is None else int(row[0]) + 1
-            cur.execute(
-                """
-                INSERT INTO accounts (accountID, accountType, email, password, isVerified, verificationCode, verificationExpiry)
-                VALUES (?, ?, ?, ?, 1, ?, ?)
-                """,
-                (new_id, data["accountType"], data["email"], data["password"], data["code"], data["expiry"]),
-            )
-            con.commit()
+        con.isolation_level = None
+        cur = con.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        data = pending_verifications.consume(con, email, code)
+        if not data:
+            cur.execute("ROLLBACK")
+            raise HTTPException(status_code=404, detail="No pending verification")
+        expiry = datetime.datetime.fromtimestamp(data["expiresAt"]).strftime("%Y-%m-%d %H:%M:%S")
+        cur.execute(
+            """
+            INSERT INTO accounts (accountID, accountType, email, password, isVerified, verificationCode, verificationExpiry)
+            SELECT COALESCE(MAX(accountID), -1) + 1, ?, ?, ?, 1, ?, ?
+            FROM accounts
+            """,
+            (data["accountType"], data["email"], data["password"], data["code"], expiry),
+        )
+        new_id = cur.lastrowid
+        cur.execute("COMMIT")
+        # accountIDs can be reused after a delete; drop any stale cached role
+        roles.invalidate(new_id)
+        directory.add(new_id, data["email"], data["accountType"])
     except sqlite3.IntegrityError:
-        pending_verifications.pop(email, None)
+        con.rollback()
+        pending_verifications.discard(email)
         raise HTTPException(status_code=400, detail="Email already exists")
+    except HTTPException:
+        raise
     except Exception as e:
+        con.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     finally:
-        pending_verifications.pop(email, None)
+        con.close()
 
-    return {"message": "Account verified and created", "accountID": new_id}
\ No newline at end of file
+    return {"message": "Account verified and created", "accountID": new_id}
@@ -0,0 +1,194 @@
+"""
+=========================================================
+PENDING VERIFICATIONS (pendingVerifications table)
+=========================================================
+
+Purpose:
+- Holds sign-ups between POST /register and POST /verify.
+- Lives in SQLite instead of process memory, so /verify can be served by
+  any uvicorn worker (or Fly machine) that shares the database volume.
+
+What Changed:
+- Replaces the module-level `pending_verifications` dict in routes/auth.py.
+- Rows carry a unix `expiresAt` with its own index; a background sweeper
+  deletes expired rows instead of letting them pile up forever.
+- Small per-process read cache for repeated lookups of the same email
+  (e.g. a user retrying a mistyped code).  Only positive hits are cached
+  and any local write invalidates the entry.
+- `consume()` is a single conditional DELETE ... RETURNING, so a code can
+  only ever be redeemed once even if two workers race on it.
+
+Frontend Use:
+- Not called directly; backs the /register and /verify endpoints.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from db import connection
+from monitoring import metrics
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+CACHE_TTL_SECONDS = float(os.environ.get("PENDING_CACHE_TTL", "5"))
+SWEEP_INTERVAL_SECONDS = float(os.environ.get("PENDING_SWEEP_INTERVAL", "300"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pendingVerifications (
+    email TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    accountType TEXT NOT NULL,
+    code TEXT NOT NULL,
+    expiresAt REAL NOT NULL  -- unix timestamp
+);
+CREATE INDEX IF NOT EXISTS idx_pendingVerifications_expiresAt
+    ON pendingVerifications (expiresAt);
+"""
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+# email -> (cached_at, row)
+_cache: dict[str, tuple[float, dict]] = {}
+hits = 0
+misses = 0
+
+
+def ensure_schema(conn: Optional[sqlite3.Connection] = None) -> None:
+    """Create the table and expiry index if this database predates them."""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        if conn is None:
+            with connection.use() as own:
+                own.executescript(_SCHEMA)
+        else:
+            conn.executescript(_SCHEMA)
+        _schema_ready = True
+
+
+# -----------------------------
+# STORE OPERATIONS
+# -----------------------------
+def put(email: str, password: str, accountType: str, code: str, ttl_seconds: float) -> float:
+    """Insert or replace the pending sign-up for ``email``.  Returns expiresAt."""
+    ensure_schema()
+    expires_at = time.time() + ttl_seconds
+    with connection.use() as conn:
+        conn.execute(
+            """
+            INSERT INTO pendingVerifications (email, password, accountType, code, expiresAt)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(email) DO UPDATE SET
+                password = excluded.password,
+                accountType = excluded.accountType,
+                code = excluded.code,
+                expiresAt = excluded.expiresAt
+            """,
+            (email, password, accountType, code, expires_at),
+        )
+        conn.commit()
+    _cache.pop(email, None)
+    return expires_at
+
+
+def get(email: str, use_cache: bool = True) -> Optional[dict]:
+    """Return the pending sign-up for ``email`` (expired or not), or None."""
+    global hits, misses
+    now = time.time()
+    if use_cache:
+        hit = _cache.get(email)
+        if hit and now - hit[0] < CACHE_TTL_SECONDS:
+            hits += 1
+            return hit[1]
+        misses += 1
+
+    ensure_schema()
+    with connection.use() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT email, password, accountType, code, expiresAt FROM pendingVerifications WHERE email = ?",
+            (email,),
+        )
+        row = cur.fetchone()
+    if not row:
+        _cache.pop(email, None)
+        return None
+    data = dict(row)
+    _cache[email] = (now, data)
+    return data
+
+
+def consume(conn: sqlite3.Connection, email: str, code: str) -> Optional[dict]:
+    """
+    Atomically remove and return the pending sign-up if ``code`` matches and
+    has not expired.  Runs on the caller's connection so the account insert
+    can share the same transaction.
+    """
+    ensure_schema(conn)
+    cur = conn.cursor()
+    cur.execute(
+        """
+        DELETE FROM pendingVerifications
+        WHERE email = ? AND code = ? AND expiresAt >= ?
+        RETURNING email, password, accountType, code, expiresAt
+        """,
+        (email, code, time.time()),
+    )
+    row = cur.fetchone()
+    _cache.pop(email, None)
+    if not row:
+        return None
+    return dict(zip(("email", "password", "accountType", "code", "expiresAt"), row))
+
+
+def discard(email: str) -> None:
+    """Forget any pending sign-up for ``email``."""
+    ensure_schema()
+    with connection.use() as conn:
+        conn.execute("DELETE FROM pendingVerifications WHERE email = ?", (email,))
+        conn.commit()
+    _cache.pop(email, None)
+
+
+def sweep_expired() -> int:
+    """Delete every expired row.  Returns the number removed."""
+    ensure_schema()
+    now = time.time()
+    with connection.use() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM pendingVerifications WHERE expiresAt < ?", (now,))
+        conn.commit()
+        removed = cur.rowcount
+    for email, (_, data) in list(_cache.items()):
+        if data["expiresAt"] < now:
+            _cache.pop(email, None)
+    return removed
+
+
+# -----------------------------
+# BACKGROUND SWEEPER
+# -----------------------------
+def _sweep_forever():
+    while True:
+        try:
+            with metrics.time_job("pending_verification_sweep"):
+                removed = sweep_expired()
+            if removed:
+                print(f"[pending_verifications] swept {removed} expired rows")
+        except sqlite3.Error as e:
+            print(f"[pending_verifications] sweep failed: {e}")
+        time.sleep(SWEEP_INTERVAL_SECONDS)
+
+
+def start_sweeper() -> threading.Thread:
+    thread = threading.Thread(target=_sweep_forever, name="pending-verification-sweeper", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,414 @@
+"""
+=========================================================
+RATE LIMITS + WRITE ADMISSION (pure ASGI middleware)
+=========================================================
+
+Purpose:
+- A client (or a frontend loop around toggleLike) could call the
+  like/RSVP routes as fast as it liked.  Every one of those takes the
+  single SQLite write lock, so one client slowed the API for everyone
+  and piled up "database is locked" timeouts.
+- Each request now spends a token from a per-user and a per-IP bucket
+  for its route class; an empty bucket is a 429 with Retry-After.
+- At most MAX_INFLIGHT_WRITES write requests run at once.  One more
+  waits up to WRITE_ADMISSION_WAIT_MS for a slot, then gets a 503 with
+  Retry-After instead of queueing on the lock until busy_timeout.
+  Waiters queue on an asyncio.Semaphore: slots go first come, first
+  served, and a waiter sleeps until a slot is handed to it.
+  A request with a body only asks for its slot once the last body chunk
+  has been received, so a slow multipart upload doesn't hold one while
+  it streams in.
+
+How:
+- Route classes (ROUTE_CLASSES, first match wins):
+      social  POST/DELETE /events/{id}/like and /rsvp
+      auth    POST /login, /register, /verify
+      write   any other POST/PUT/PATCH/DELETE
+      read    GET/HEAD
+  OPTIONS (CORS preflight), /metrics and / are never limited.
+- Token buckets: `burst` tokens, refilled at `per_minute`/60 per second.
+  A request must find a token in both buckets and takes one from each.
+  The per-IP bucket is IP_MULTIPLIER times larger (a campus NAT puts
+  many users behind one address).  Buckets live in memory, per worker,
+  least recently used dropped past MAX_KEYS (a dropped bucket starts
+  full again).
+- The user is the user_id / updaterID / inviterID / creatorID the
+  request names: the query string first, then a small JSON body (read
+  once here and handed on unchanged).  Multipart uploads aren't read;
+  they only have the IP bucket.  IDs aren't authenticated, so the user
+  bucket is per (IP, user): naming someone else's ID from another
+  address can't use up their bucket.  The IP bucket is always checked
+  too, which covers rotating IDs from one address.
+- The address is the socket peer unless RATE_LIMIT_IP_HEADER names a
+  header set by the proxy in front (fly-client-ip on Fly, see fly.toml).
+  Any client can send that header itself, so it is only read when
+  configured, and with RATE_LIMIT_TRUSTED_PROXIES only on connections
+  from those addresses.
+- Runs inside CORS (so browsers can read the 429/503) and inside the
+  metrics middleware (so refusals show up in the request histogram).
+
+Settings:
+- RATE_LIMITS=0               no per-client limits (the write cap still applies)
+- RATE_LIMIT_SOCIAL           per_minute/burst (default 60/20); 0 = unlimited
+- RATE_LIMIT_AUTH             default 10/5
+- RATE_LIMIT_WRITE            default 30/10
+- RATE_LIMIT_READ             default 600/120
+- RATE_LIMIT_IP_MULTIPLIER    default 4
+- RATE_LIMIT_IP_HEADER        header with the client address, set by the
+                              proxy (default empty = the socket peer)
+- RATE_LIMIT_TRUSTED_PROXIES  comma-separated addresses/networks the header
+                              is accepted from (default empty = any peer)
+- RATE_LIMIT_MAX_KEYS         buckets kept per worker (default 50000)
+- MAX_INFLIGHT_WRITES         concurrent write requests (default 4, 0 = no cap)
+- WRITE_ADMISSION_WAIT_MS     wait for a write slot before the 503 (default 100)
+
+Metrics:
+- http_rate_limited_total{route_class, key="user"|"ip"}
+- http_writes_shed_total, http_writes_in_flight
+"""
+
+import asyncio
+import ipaddress
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qs
+
+from starlette.responses import JSONResponse
+
+from monitoring import metrics
+
+
+class Limit(NamedTuple):
+    per_minute: float
+    burst: float
+
+
+def parse_limit(value: str) -> Optional[Limit]:
+    """Parse "per_minute/burst" ("60/20"); a bare "60" means burst 60 and "0" unlimited (None)."""
+    per_minute, _, burst = value.partition("/")
+    if float(per_minute) <= 0:
+        return None
+    return Limit(float(per_minute), float(burst or per_minute))
+
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+DEFAULT_LIMITS = {"social": "60/20", "auth": "10/5", "write": "30/10", "read": "600/120"}
+
+ENABLED = os.environ.get("RATE_LIMITS", "1") != "0"
+LIMITS = {
+    name: parse_limit(os.environ.get(f"RATE_LIMIT_{name.upper()}", default))
+    for name, default in DEFAULT_LIMITS.items()
+}
+IP_MULTIPLIER = float(os.environ.get("RATE_LIMIT_IP_MULTIPLIER", "4"))
+IP_HEADER = os.environ.get("RATE_LIMIT_IP_HEADER", "").strip().lower()
+TRUSTED_PROXIES = tuple(
+    ipaddress.ip_network(net.strip(), strict=False)
+    for net in os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", "").split(",") if net.strip()
+)
+MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "50000"))
+MAX_INFLIGHT_WRITES = int(os.environ.get("MAX_INFLIGHT_WRITES", "4"))
+WRITE_ADMISSION_WAIT_SECONDS = float(os.environ.get("WRITE_ADMISSION_WAIT_MS", "100")) / 1000
+WRITE_RETRY_AFTER_SECONDS = 1
+
+ROUTE_CLASSES = (
+    ("social", frozenset({"POST", "DELETE"}), re.compile(r"^/events/\d+/(?:like|rsvp)$")),
+    ("auth", frozenset({"POST"}), re.compile(r"^/(?:login|register|verify)$")),
+    ("write", frozenset({"POST", "PUT", "PATCH", "DELETE"}), re.compile(r"")),
+    ("read", frozenset({"GET", "HEAD"}), re.compile(r"")),
+)
+EXEMPT_PATHS = frozenset({"/", "/metrics"})
+USER_FIELDS = ("user_id", "updaterID", "inviterID", "creatorID")
+MAX_PEEK_BYTES = 4096
+
+rate_limited = metrics.Counter(
+    "http_rate_limited_total", "Requests refused with 429, by route class and the bucket that was empty.",
+    ("route_class", "key"),
+)
+writes_shed = metrics.Counter(
+    "http_writes_shed_total", "Write requests refused with 503 because MAX_INFLIGHT_WRITES were running.",
+)
+writes_in_flight = metrics.Gauge("http_writes_in_flight", "Write requests currently admitted.")
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """The ROUTE_CLASSES name for a request, or None if it is never limited."""
+    if path in EXEMPT_PATHS:
+        return None
+    for name, methods, pattern in ROUTE_CLASSES:
+        if method in methods and pattern.match(path):
+            return name
+    return None
+
+
+# -----------------------------
+# TOKEN BUCKETS
+# -----------------------------
+class Buckets:
+    """Token buckets by key, least recently used dropped past ``max_keys``."""
+
+    def __init__(self, max_keys: int = MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[tuple, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _level(self, key: tuple, limit: Limit, now: float) -> list[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [limit.burst, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.per_minute / 60)
+            bucket[1] = now
+        return bucket
+
+    def take(self, wanted: list[tuple[tuple, Limit]], now: Optional[float] = None) -> tuple[Optional[int], float]:
+        """
+        Take one token from every (key, limit) bucket, or none if any is empty.
+        Returns (None, 0) on success, else (index of the empty bucket, seconds until it has a token).
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            levels = [self._level(key, limit, now) for key, limit in wanted]
+            for index, (bucket, (_, limit)) in enumerate(zip(levels, wanted)):
+                if bucket[0] < 1:
+                    return index, (1 - bucket[0]) * 60 / limit.per_minute
+            for bucket in levels:
+                bucket[0] -= 1
+        return None, 0.0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# -----------------------------
+# MIDDLEWARE
+# -----------------------------
+def _user_from_query(query_string: bytes) -> Optional[str]:
+    params = parse_qs(query_string.decode("latin-1"))
+    for field in USER_FIELDS:
+        if field in params:
+            return params[field][0]
+    return None
+
+
+def _user_from_json(body: bytes) -> Optional[str]:
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    if isinstance(payload, dict):
+        for field in USER_FIELDS:
+            if isinstance(payload.get(field), (int, str)):
+                return str(payload[field])
+    return None
+
+
+def _has_body(scope) -> bool:
+    headers = dict(scope["headers"])
+    length = headers.get(b"content-length", b"0")
+    return b"transfer-encoding" in headers or not length.isdigit() or int(length) > 0
+
+
+class _Shed(Exception):
+    """No write slot came free after the body was received (raised from receive())."""
+
+
+def _refusal(status: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail}, status_code=status,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimitMiddleware:
+    """Per-user/per-IP token buckets by route class, plus the in-flight write cap."""
+
+    def __init__(
+        self,
+        app,
+        enabled: Optional[bool] = None,
+        limits: Optional[dict[str, Optional[Limit]]] = None,
+        ip_multiplier: Optional[float] = None,
+        max_writes: Optional[int] = None,
+        admission_wait: Optional[float] = None,
+        ip_header: Optional[str] = None,
+        trusted_proxies: Optional[tuple] = None,
+    ):
+        self.app = app
+        self.enabled = ENABLED if enabled is None else enabled
+        self.limits = LIMITS if limits is None else limits
+        self.ip_multiplier = IP_MULTIPLIER if ip_multiplier is None else ip_multiplier
+        self.max_writes = MAX_INFLIGHT_WRITES if max_writes is None else max_writes
+        self.admission_wait = WRITE_ADMISSION_WAIT_SECONDS if admission_wait is None else admission_wait
+        self.ip_header = (IP_HEADER if ip_header is None else ip_header).encode("latin-1")
+        self.trusted_proxies = TRUSTED_PROXIES if trusted_proxies is None else trusted_proxies
+        self.buckets = Buckets()
+        self.in_flight = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop = None
+
+    def _from_trusted_proxy(self, peer: Optional[str]) -> bool:
+        if not self.trusted_proxies:
+            return True
+        try:
+            address = ipaddress.ip_address(peer or "")
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_proxies)
+
+    def _client_ip(self, scope) -> str:
+        client = scope.get("client")
+        peer = client[0] if client else None
+        if self.ip_header and self._from_trusted_proxy(peer):
+            for name, value in scope["headers"]:
+                if name == self.ip_header:
+                    return value.decode("latin-1").strip()
+        return peer or "unknown"
+
+    async def _peek_user(self, scope, receive):
+        """The user a small JSON body names, and a receive() that replays the body."""
+        headers = dict(scope["headers"])
+        length = headers.get(b"content-length", b"")
+        if not (headers.get(b"content-type", b"").startswith(b"application/json")
+                and length.isdigit() and int(length) <= MAX_PEEK_BYTES):
+            return None, receive
+        chunks, more = [], True
+        while more:
+            message = await receive()
+            if message["type"] != "http.request":
+                # Client went away; let the app see it
+                async def disconnected():
+                    return message
+                return None, disconnected
+            chunks.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        body = b"".join(chunks)
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return _user_from_json(body), replay
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limits.get(name) if self.enabled else None
+        if limit is not None:
+            user = _user_from_query(scope.get("query_string", b""))
+            if user is None and name != "read":
+                user, receive = await self._peek_user(scope, receive)
+            ip_limit = Limit(limit.per_minute * self.ip_multiplier, limit.burst * self.ip_multiplier)
+            wanted = [((name, "ip", self._client_ip(scope)), ip_limit)]
+            if user is not None:
+                wanted.append(((name, "user", wanted[0][0][2], user), limit))
+            empty, retry_after = self.buckets.take(wanted)
+            if empty is not None:
+                key = wanted[empty][0][1]
+                rate_limited.inc(name, key)
+                await _refusal(429, f"Too many {name} requests; slow down", retry_after)(scope, receive, send)
+                return
+
+        if name == "read" or self.max_writes <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        if not _has_body(scope):
+            slots = await self._admit()
+            if slots is None:
+                await self._shed(scope, receive, send)
+                return
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self._release(slots)
+            return
+
+        # Upload time doesn't count against the cap: the slot is taken when
+        # the app receives the last body chunk, before it can start writing
+        admitted: Optional[asyncio.Semaphore] = None
+        shed = response_started = False
+
+        async def admitting_receive():
+            nonlocal admitted, shed
+            message = await receive()
+            if message["type"] == "http.request" and not message.get("more_body", False) and admitted is None:
+                admitted = await self._admit()
+                if admitted is None:
+                    shed = True
+                    raise _Shed()
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if shed and not response_started:
+                return  # the app's own error for the aborted body; 503 is sent below
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, admitting_receive, tracking_send)
+        except _Shed:
+            if response_started:
+                raise
+        finally:
+            if admitted is not None:
+                self._release(admitted)
+        if shed and not response_started:
+            await self._shed(scope, receive, send)
+
+    def _write_slots(self) -> asyncio.Semaphore:
+        """The slot semaphore for the running event loop (one per worker; tests may start several)."""
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_writes)
+            self._slots_loop = loop
+        return self._slots
+
+    async def _admit(self) -> Optional[asyncio.Semaphore]:
+        """
+        Wait up to admission_wait, in arrival order, for a write slot and
+        take it.  Returns the semaphore to release it to, or None (counted
+        as shed) if none came free.
+        """
+        slots = self._write_slots()
+        try:
+            if slots.locked():  # full, or others already waiting ahead of us
+                await asyncio.wait_for(slots.acquire(), self.admission_wait)
+            else:
+                await slots.acquire()
+        except asyncio.TimeoutError:
+            writes_shed.inc()
+            return None
+        self.in_flight += 1
+        writes_in_flight.inc()
+        return slots
+
+    def _release(self, slots: asyncio.Semaphore) -> None:
+        self.in_flight -= 1
+        writes_in_flight.dec()
+        slots.release()
+
+    async def _shed(self, scope, receive, send) -> None:
+        await _refusal(503, "Server busy; try again shortly", WRITE_RETRY_AFTER_SECONDS)(scope, receive, send)
@@ -0,0 +1,75 @@
+"""
+Pending verifications: codes expire after their TTL, the sweeper purges
+expired rows (and their cached copies) but keeps live ones, and
+concurrent /verify calls are handed distinct accountIDs.
+
+Run from the backend folder:
+    python -m pytest routes/test_pending_verifications.py
+"""
+
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from db import connection
+from routes import auth
+from routes import pending_verifications as pending
+
+
+def _forget_accounts(emails):
+    with connection.use() as conn:
+        conn.executemany("DELETE FROM accounts WHERE email = ?", [(e,) for e in emails])
+
+
+def test_expired_code_is_refused_and_dropped():
+    pending.put("late@unco.edu", "hash", "Student", "111111", ttl_seconds=-1)
+    with connection.use() as conn:
+        assert pending.consume(conn, "late@unco.edu", "111111") is None  # past expiresAt
+    with pytest.raises(HTTPException) as refused:
+        auth.verify(auth.VerifyRequest(email="late@unco.edu", code="111111"))
+    assert refused.value.status_code == 400 and refused.value.detail == "Code expired"
+    assert pending.get("late@unco.edu", use_cache=False) is None
+
+
+def test_sweep_purges_only_expired_rows_and_their_cache():
+    pending.put("gone@unco.edu", "hash", "Student", "222222", ttl_seconds=-1)
+    pending.put("alive@unco.edu", "hash", "Student", "333333", ttl_seconds=60)
+    assert pending.get("gone@unco.edu")["code"] == "222222"  # now cached
+    assert pending.sweep_expired() >= 1
+    assert "gone@unco.edu" not in pending._cache
+    assert pending.get("gone@unco.edu", use_cache=False) is None
+    assert pending.get("alive@unco.edu", use_cache=False)["code"] == "333333"
+    pending.discard("alive@unco.edu")
+
+
+def test_concurrent_verifications_get_distinct_ids():
+    emails = [f"burst{i}@unco.edu" for i in range(12)]
+    _forget_accounts(emails)
+    for email in emails:
+        pending.put(email, "hash", "Student", "444444", ttl_seconds=60)
+    start = threading.Barrier(len(emails))
+    ids, errors = [], []
+
+    def verify(email):
+        start.wait()
+        try:
+            ids.append(auth.verify(auth.VerifyRequest(email=email, code="444444"))["accountID"])
+        except HTTPException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=verify, args=(email,)) for email in emails]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert errors == []
+        assert len(set(ids)) == len(emails)
+        with connection.use() as conn:
+            stored = conn.execute(
+                f"SELECT accountID FROM accounts WHERE email IN ({','.join('?' * len(emails))})", emails,
+            ).fetchall()
+        assert sorted(row[0] for row in stored) == sorted(ids)
+    finally:
+        _forget_accounts(emails)
@@ -0,0 +1,212 @@
+"""
+Rate limits and write admission: buckets per user and per IP, 429/503
+with Retry-After, the body handed on intact, and the metrics.
+
+Run from the backend folder:
+    python -m pytest routes/test_rate_limit.py
+"""
+
+import asyncio
+import ipaddress
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from monitoring import metrics
+from routes import rate_limit
+from routes.rate_limit import Buckets, Limit, RateLimitMiddleware
+
+
+class Like(BaseModel):
+    user_id: int
+
+
+def _app(release=None, **settings):
+    app = FastAPI()
+
+    @app.post("/events/{event_id}/like")
+    def like(event_id: int, payload: Like):
+        if release is not None:
+            release.wait(5)
+        return {"user": payload.user_id}
+
+    @app.get("/events")
+    def events():
+        return []
+
+    settings.setdefault("enabled", True)
+    app.add_middleware(RateLimitMiddleware, **settings)
+    return app
+
+
+def test_route_classes():
+    assert rate_limit.route_class("POST", "/events/7/like") == "social"
+    assert rate_limit.route_class("DELETE", "/events/7/rsvp") == "social"
+    assert rate_limit.route_class("POST", "/login") == "auth"
+    assert rate_limit.route_class("PUT", "/events/7") == "write"
+    assert rate_limit.route_class("GET", "/events/7") == "read"
+    assert rate_limit.route_class("OPTIONS", "/events") is None
+    assert rate_limit.route_class("GET", "/metrics") is None
+    assert rate_limit.parse_limit("60/20") == Limit(60, 20) and rate_limit.parse_limit("0") is None
+
+
+def test_bucket_refills_over_time():
+    buckets = Buckets()
+    limit = Limit(per_minute=60, burst=2)
+    assert buckets.take([(("k",), limit)], now=0)[0] is None
+    assert buckets.take([(("k",), limit)], now=0)[0] is None
+    empty, retry_after = buckets.take([(("k",), limit)], now=0)
+    assert empty == 0 and retry_after == 1.0
+    assert buckets.take([(("k",), limit)], now=1.0)[0] is None
+    # A refused request takes nothing from the other bucket
+    other = (("other",), Limit(60, 5))
+    assert buckets.take([other, (("k",), limit)], now=1.0)[0] == 1
+    assert buckets.take([other], now=1.0)[0] is None
+
+
+def test_user_bucket_gives_429_with_retry_after():
+    app = _app(limits={"social": Limit(per_minute=6, burst=2)}, max_writes=0)
+    with TestClient(app) as client:
+        before = rate_limit.rate_limited.totals().get(("social", "user"), 0)
+        for _ in range(2):
+            res = client.post("/events/1/like", json={"user_id": 5})
+            assert res.status_code == 200 and res.json() == {"user": 5}  # body still reaches the route
+        res = client.post("/events/1/like", json={"user_id": 5})
+        assert res.status_code == 429 and res.headers["retry-after"] == "10"
+        assert rate_limit.rate_limited.totals()[("social", "user")] == before + 1
+        # Someone else on the same address still gets through (IP bucket is 4x)
+        assert client.post("/events/1/like", json={"user_id": 6}).status_code == 200
+        # Reads aren't limited here
+        assert client.get("/events").status_code == 200
+
+
+def test_someone_elses_id_from_another_address_doesnt_use_their_bucket():
+    app = _app(limits={"social": Limit(per_minute=6, burst=2)}, max_writes=0, ip_header="fly-client-ip")
+    with TestClient(app) as client:
+        attacker = {"fly-client-ip": "203.0.113.9"}
+        codes = [client.post("/events/1/like", json={"user_id": 5}, headers=attacker).status_code for _ in range(3)]
+        assert codes == [200, 200, 429]
+        assert client.post("/events/1/like", json={"user_id": 5}, headers={"fly-client-ip": "198.51.100.1"}).status_code == 200
+
+
+def test_ip_bucket_catches_rotating_user_ids():
+    app = _app(limits={"social": Limit(per_minute=60, burst=1)}, ip_multiplier=3, max_writes=0)
+    with TestClient(app) as client:
+        codes = [client.post("/events/1/like", json={"user_id": uid}).status_code for uid in range(5)]
+    assert codes == [200, 200, 200, 429, 429]
+
+
+def test_write_cap_sheds_with_503():
+    release = threading.Event()
+    app = _app(release=release, enabled=False, max_writes=1, admission_wait=0.05)
+    with TestClient(app) as client:
+        first = threading.Thread(target=client.post, args=("/events/1/like",), kwargs={"json": {"user_id": 1}})
+        first.start()
+        deadline = time.monotonic() + 5
+        while rate_limit.writes_in_flight.totals().get((), 0) < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        shed_before = rate_limit.writes_shed.totals()[()]
+        res = client.post("/events/1/like", json={"user_id": 2})
+        assert res.status_code == 503 and res.headers["retry-after"] == "1"
+        assert rate_limit.writes_shed.totals()[()] == shed_before + 1
+        assert client.get("/events").status_code == 200  # reads don't count
+        release.set()
+        first.join()
+        assert client.post("/events/1/like", json={"user_id": 2}).status_code == 200
+    assert "http_writes_shed_total" in metrics.render()
+
+
+def test_slow_upload_holds_no_write_slot():
+    async def echo(scope, receive, send):
+        body, more = b"", True
+        while more:
+            message = await receive()
+            body, more = body + message.get("body", b""), message.get("more_body", False)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": body})
+
+    middleware = RateLimitMiddleware(echo, enabled=False, max_writes=1, admission_wait=0.05)
+
+    async def request(chunks, wait_before_last=None):
+        scope = {
+            "type": "http", "method": "POST", "path": "/events", "query_string": b"", "client": ("1.2.3.4", 1),
+            "headers": [(b"content-length", str(sum(map(len, chunks))).encode())],
+        }
+        pending = list(chunks)
+        sent = []
+
+        async def receive():
+            if len(pending) == 1 and wait_before_last is not None:
+                await wait_before_last.wait()
+            chunk = pending.pop(0)
+            return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware(scope, receive, send)
+        return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+    async def scenario():
+        rest_arrives = asyncio.Event()
+        upload = asyncio.create_task(request([b"part 1, ", b"part 2"], rest_arrives))
+        await asyncio.sleep(0.05)
+        assert middleware.in_flight == 0  # still streaming in
+        assert await request([b"small"]) == (200, b"small")
+        rest_arrives.set()
+        assert await upload == (200, b"part 1, part 2")
+        assert middleware.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_write_slots_are_handed_out_in_arrival_order():
+    middleware = RateLimitMiddleware(None, enabled=False, max_writes=1, admission_wait=5)
+
+    async def scenario():
+        held = await middleware._admit()
+        order = []
+
+        async def write(name):
+            slots = await middleware._admit()
+            order.append(name)
+            await asyncio.sleep(0)
+            middleware._release(slots)
+
+        waiters = []
+        for name in "abcd":
+            waiters.append(asyncio.create_task(write(name)))
+            await asyncio.sleep(0)  # queued in this order
+        assert order == []
+        middleware._release(held)
+        await asyncio.gather(*waiters)
+        assert order == ["a", "b", "c", "d"] and middleware.in_flight == 0
+        # A free slot is taken at once, even with no wait allowed
+        middleware.admission_wait = 0
+        slots = await middleware._admit()
+        assert slots is not None
+        middleware._release(slots)
+
+    asyncio.run(scenario())
+
+
+def test_client_ip_header_is_only_trusted_when_configured():
+    scope = {"client": ("10.0.0.2", 5000), "headers": [(b"fly-client-ip", b"198.51.100.7")]}
+    # Off Fly: a client-sent header must not pick the bucket
+    assert RateLimitMiddleware(None, ip_header="")._client_ip(scope) == "10.0.0.2"
+    assert RateLimitMiddleware(None, ip_header="fly-client-ip")._client_ip(scope) == "198.51.100.7"
+    proxies = (ipaddress.ip_network("172.16.0.0/12"),)
+    behind = RateLimitMiddleware(None, ip_header="fly-client-ip", trusted_proxies=proxies)
+    assert behind._client_ip(scope) == "10.0.0.2"  # not from the proxy
+    assert behind._client_ip({**scope, "client": ("172.19.0.1", 5000)}) == "198.51.100.7"
+
+    app = _app(limits={"social": Limit(per_minute=60, burst=1)}, ip_multiplier=1, max_writes=0, ip_header="")
+    with TestClient(app) as client:
+        codes = [
+            client.post("/events/1/like", json={"user_id": uid}, headers={"fly-client-ip": f"203.0.113.{uid}"}).status_code
+            for uid in range(2)
+        ]
+    assert codes == [200, 429]  # a fresh header per request is still one address
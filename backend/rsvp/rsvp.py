@@ -8,60 +8,233 @@ Purpose:
 - Each RSVP = user (accountID) ↔ event (eventID).
 
 What Changed:
-- Uses shared DB resolver like CRUD files.
-- Ensures one RSVP per user/event (via `has_rsvp`).
+- Uses the shared connection helper (db/connection.py); every function takes
+  an optional `conn` so it can join a request's unit of work.
+- Ensures one RSVP per user/event (via the primary key, INSERT OR IGNORE).
 - Returns lists of eventIDs or accountIDs for querying.
+- Optional per-event capacity (events.capacity, NULL = unlimited) with an
+  ordered waitlist (rsvpWaitlist):
+  - reserve() is one conditional INSERT (only while the event has a free
+    seat) inside a BEGIN IMMEDIATE transaction, so concurrent RSVPs are
+    serialized on the write lock and can never oversell.  A full event
+    puts the user on the waitlist instead.
+  - cancel_rsvp() frees the seat and promotes the longest-waiting users in
+    the same transaction; promote() also runs when capacity is raised.
+  - Without a caller's transaction these helpers open their own
+    UnitOfWork (BEGIN IMMEDIATE); with one, the caller's must be IMMEDIATE
+    too (db/unit_of_work.py is).
 
 Frontend Use:
 - Maps cleanly to endpoints (POST /rsvp, DELETE /rsvp, GET /rsvp).
+- POST /events/{id}/rsvp answers "confirmed" or "waitlisted" (+ position).
 - Helps display attendees for events or show a user’s RSVPs.
 """
 
-import os, sqlite3
+import json
+import sqlite3
+import time
+from typing import Optional
 
-DB_PATH = os.environ.get("DB_PATH", "/data/EventPlannerDB.db")
+from db import connection
+from db.unit_of_work import UnitOfWork
 
-def _get_conn():
-    """Helper: open SQLite connection with row_factory enabled."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Results of reserve()
+CONFIRMED = "confirmed"
+ALREADY_CONFIRMED = "already_confirmed"
+WAITLISTED = "waitlisted"
+EVENT_NOT_FOUND = "event_not_found"
+# Results of cancel_and_promote()
+CANCELLED = "cancelled"
+LEFT_WAITLIST = "left_waitlist"
+NOT_RSVPED = "not_rsvped"
 
-def has_rsvp(user_id: int, event_id: int) -> bool:
+WAITLIST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rsvpWaitlist (
+    waitID INTEGER PRIMARY KEY AUTOINCREMENT,  -- queue order
+    eventID INTEGER NOT NULL,
+    accountID INTEGER NOT NULL,
+    createdAt REAL NOT NULL,
+    UNIQUE (eventID, accountID),
+    FOREIGN KEY (eventID) REFERENCES events(eventID),
+    FOREIGN KEY (accountID) REFERENCES accounts(accountID)
+);
+CREATE INDEX IF NOT EXISTS idx_rsvpWaitlist_queue ON rsvpWaitlist (eventID, waitID);
+"""
+
+# One statement: insert only if the event exists and still has a free seat.
+# Inside BEGIN IMMEDIATE nobody else can insert between the COUNT and the INSERT.
+_CONDITIONAL_INSERT = """
+INSERT OR IGNORE INTO rsvpLog (eventID, accountID, createdAt)
+SELECT e.eventID, ?, ?
+FROM events e
+WHERE e.eventID = ?
+  AND (e.capacity IS NULL
+       OR (SELECT COUNT(*) FROM rsvpLog r WHERE r.eventID = e.eventID) < e.capacity)
+"""
+
+
+def ensure_schema(conn: Optional[sqlite3.Connection] = None) -> None:
+    """Add events.capacity and the waitlist table to databases created before them."""
+    with connection.use(conn) as conn:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(events)").fetchall()]
+        if "capacity" not in columns:
+            conn.execute("ALTER TABLE events ADD COLUMN capacity INTEGER")
+            print("[rsvp] added events.capacity")
+        conn.executescript(WAITLIST_SCHEMA)
+
+
+def has_rsvp(user_id: int, event_id: int, conn: Optional[sqlite3.Connection] = None) -> bool:
     """Check if this user has RSVP’d to this event already."""
-    with _get_conn() as conn:
+    with connection.use(conn) as conn:
         cur = conn.cursor()
         cur.execute("SELECT 1 FROM rsvpLog WHERE accountID=? AND eventID=? LIMIT 1", (user_id, event_id))
         return cur.fetchone() is not None
 
-def add_rsvp(user_id: int, event_id: int):
-    """Add RSVP (if not already exists)."""
-    if has_rsvp(user_id, event_id):
-        return False
-    with _get_conn() as conn:
+def _transaction(conn: Optional[sqlite3.Connection], fn):
+    """Run fn(conn) in the caller's transaction, or in an own BEGIN IMMEDIATE one."""
+    if conn is not None:
+        return fn(conn)
+    with UnitOfWork() as uow:
+        return fn(uow.conn)
+
+def reserve(user_id: int, event_id: int, conn: Optional[sqlite3.Connection] = None) -> tuple[str, Optional[int]]:
+    """
+    RSVP if there is a seat, else join the waitlist.
+    Returns (CONFIRMED | ALREADY_CONFIRMED | WAITLISTED | EVENT_NOT_FOUND,
+    waitlist position (1 = next) or None).
+    """
+    def run(conn):
         cur = conn.cursor()
-        cur.execute("INSERT INTO rsvpLog (eventID, accountID) VALUES (?, ?)", (event_id, user_id))
-        conn.commit()
-        return True
+        now = time.time()
+        cur.execute(_CONDITIONAL_INSERT, (user_id, now, event_id))
+        if cur.rowcount > 0:
+            return CONFIRMED, None
+        # Not inserted: already RSVPed, no such event, or full
+        if has_rsvp(user_id, event_id, conn):
+            return ALREADY_CONFIRMED, None
+        cur.execute("SELECT 1 FROM events WHERE eventID = ?", (event_id,))
+        if cur.fetchone() is None:
+            return EVENT_NOT_FOUND, None
+        cur.execute(
+            "INSERT OR IGNORE INTO rsvpWaitlist (eventID, accountID, createdAt) VALUES (?, ?, ?)",
+            (event_id, user_id, now),
+        )
+        return WAITLISTED, waitlist_position(user_id, event_id, conn)
+    return _transaction(conn, run)
 
-def cancel_rsvp(user_id: int, event_id: int):
-    """Cancel RSVP (remove this user’s RSVP for the event)."""
-    with _get_conn() as conn:
+def add_rsvp(user_id: int, event_id: int, conn: Optional[sqlite3.Connection] = None):
+    """Add RSVP if the event has a free seat (no waitlist).  Returns True if a row was added."""
+    def run(conn):
         cur = conn.cursor()
-        cur.execute("DELETE FROM rsvpLog WHERE accountID=? AND eventID=?", (user_id, event_id))
-        conn.commit()
+        cur.execute(_CONDITIONAL_INSERT, (user_id, time.time(), event_id))
         return cur.rowcount > 0
+    return _transaction(conn, run)
+
+def promote(event_id: int, conn: Optional[sqlite3.Connection] = None) -> list[int]:
+    """Move waitlisted users into free seats, longest waiting first.  Returns their accountIDs."""
+    def run(conn):
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT e.capacity - (SELECT COUNT(*) FROM rsvpLog r WHERE r.eventID = e.eventID)
+            FROM events e WHERE e.eventID = ?
+            """,
+            (event_id,),
+        )
+        row = cur.fetchone()
+        if row is None:
+            return []
+        free = row[0]  # NULL capacity = unlimited
+        cur.execute(
+            "SELECT waitID, accountID FROM rsvpWaitlist WHERE eventID = ? ORDER BY waitID"
+            + ("" if free is None else " LIMIT ?"),
+            (event_id,) if free is None else (event_id, max(free, 0)),
+        )
+        promoted = cur.fetchall()
+        if not promoted:
+            return []
+        now = time.time()
+        cur.executemany(
+            "INSERT OR IGNORE INTO rsvpLog (eventID, accountID, createdAt) VALUES (?, ?, ?)",
+            [(event_id, account_id, now) for _, account_id in promoted],
+        )
+        cur.executemany("DELETE FROM rsvpWaitlist WHERE waitID = ?", [(wait_id,) for wait_id, _ in promoted])
+        return [account_id for _, account_id in promoted]
+    return _transaction(conn, run)
 
-def get_event_rsvps(event_id: int):
+def cancel_rsvp(user_id: int, event_id: int, conn: Optional[sqlite3.Connection] = None):
+    """
+    Cancel RSVP (remove this user’s RSVP for the event, or their waitlist
+    spot).  Returns True if either existed; promote() fills the freed seat.
+    """
+    return cancel_and_promote(user_id, event_id, conn)[0] != NOT_RSVPED
+
+def cancel_and_promote(
+    user_id: int, event_id: int, conn: Optional[sqlite3.Connection] = None
+) -> tuple[str, list[int]]:
+    """
+    cancel_rsvp() with details: (CANCELLED | LEFT_WAITLIST | NOT_RSVPED,
+    accountIDs promoted off the waitlist into the freed seat).
+    """
+    def run(conn):
+        cur = conn.cursor()
+        cur.execute("DELETE FROM rsvpLog WHERE accountID=? AND eventID=?", (user_id, event_id))
+        if cur.rowcount > 0:
+            return CANCELLED, promote(event_id, conn)
+        cur.execute("DELETE FROM rsvpWaitlist WHERE accountID=? AND eventID=?", (user_id, event_id))
+        return (LEFT_WAITLIST if cur.rowcount > 0 else NOT_RSVPED), []
+    return _transaction(conn, run)
+
+def waitlist_position(user_id: int, event_id: int, conn: Optional[sqlite3.Connection] = None) -> Optional[int]:
+    """1-based place in the event's waitlist, or None if not waiting."""
+    with connection.use(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT (SELECT COUNT(*) FROM rsvpWaitlist o WHERE o.eventID = w.eventID AND o.waitID <= w.waitID)
+            FROM rsvpWaitlist w WHERE w.eventID = ? AND w.accountID = ?
+            """,
+            (event_id, user_id),
+        )
+        row = cur.fetchone()
+        return row[0] if row else None
+
+def get_event_waitlist(event_id: int, conn: Optional[sqlite3.Connection] = None) -> list[int]:
+    """accountIDs waiting for a seat, in promotion order."""
+    with connection.use(conn) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT accountID FROM rsvpWaitlist WHERE eventID=? ORDER BY waitID", (event_id,))
+        return [row[0] for row in cur.fetchall()]
+
+def get_event_rsvps(event_id: int, conn: Optional[sqlite3.Connection] = None):
     """Return list of accountIDs who RSVP’d to this event."""
-    with _get_conn() as conn:
+    with connection.use(conn) as conn:
         cur = conn.cursor()
         cur.execute("SELECT accountID FROM rsvpLog WHERE eventID=?", (event_id,))
         return [row[0] for row in cur.fetchall()]
 
-def get_user_rsvps(user_id: int):
+def get_user_rsvps(user_id: int, conn: Optional[sqlite3.Connection] = None):
     """Return list of eventIDs this user has RSVP’d to."""
-    with _get_conn() as conn:
+    with connection.use(conn) as conn:
         cur = conn.cursor()
         cur.execute("SELECT eventID FROM rsvpLog WHERE accountID=?", (user_id,))
         return [row[0] for row in cur.fetchall()]
+
+def get_rsvps_for_events(event_ids: list[int], conn: Optional[sqlite3.Connection] = None) -> dict[int, list[int]]:
+    """
+    accountIDs that RSVP’d to each of ``event_ids``, in one query.
+    Used by list endpoints instead of one query per event.
+    """
+    result: dict[int, list[int]] = {eid: [] for eid in event_ids}
+    if not event_ids:
+        return result
+    with connection.use(conn) as conn:
+        cur = conn.cursor()
+        # json_each keeps this a single statement however many IDs are passed
+        cur.execute(
+            "SELECT eventID, accountID FROM rsvpLog WHERE eventID IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(event_ids)),),
+        )
+        for event_id, account_id in cur.fetchall():
+            result[event_id].append(account_id)
+    return result
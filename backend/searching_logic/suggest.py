@@ -0,0 +1,347 @@
+"""
+=========================================================
+SEARCH SUGGESTIONS (typeahead over titles, locations, categories)
+=========================================================
+
+Purpose:
+- Backs GET /search/suggest?q=&limit= so SearchBar.tsx can show a short
+  list of completions while the user types, instead of running a full
+  /search (every event, images included) on each keystroke.
+- Suggestions are event titles, locations and categories that start with
+  the query, or have a word that does ("jazz" finds "Friday Jazz Night"),
+  ranked by popularity: the likes + RSVPs of the Public events using them.
+
+How:
+- Every distinct term (kind, lower-cased text) is filed in one sorted list
+  of (key, term) under each word-start of its text ("friday jazz night",
+  "jazz night", "night").  A lookup is a bisect plus a walk over the keys
+  that start with the query, then the top `limit` by popularity.
+- Results are cached per prefix (LRU, SUGGEST_CACHE_SIZE entries) at the
+  largest limit and sliced per request, so repeated keystrokes and common
+  prefixes are a dict hit.
+- Kept in step incrementally from main.py: add/refresh when an event is
+  created or updated, bump() on like/unlike/RSVP/cancel, forget() on
+  delete.  Each change only evicts the cached prefixes of the terms it
+  touched, never the whole cache.
+
+Staleness:
+- Writes handled by other worker processes are picked up by a background
+  thread that rebuilds every SUGGEST_REFRESH_SECONDS (start_refresher(),
+  from main.py's startup).  A rebuild loads and indexes every event
+  without the lock and only swaps the finished index in under it, so
+  lookups never wait for one.  Before the first build (warm-up off or
+  still running) a lookup starts one in the background and answers from
+  what the incremental updates have filed so far.
+
+Settings:
+- SUGGEST_MAX_LIMIT        default 10 (largest limit accepted)
+- SUGGEST_CACHE_SIZE       default 4096 cached prefixes
+- SUGGEST_REFRESH_SECONDS  default 300 (0 = build once, no refresher thread)
+"""
+
+import bisect
+import heapq
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from db import connection
+
+MAX_LIMIT = int(os.environ.get("SUGGEST_MAX_LIMIT", "10"))
+CACHE_SIZE = int(os.environ.get("SUGGEST_CACHE_SIZE", "4096"))
+REFRESH_SECONDS = float(os.environ.get("SUGGEST_REFRESH_SECONDS", "300"))
+
+KINDS = ("title", "location", "category")
+
+Term = tuple[str, str]  # (kind, normalized text)
+
+_lock = threading.Lock()
+_rebuild_lock = threading.Lock()
+_keys: list[tuple[str, Term]] = []
+_terms: dict[Term, list] = {}           # term -> [popularity, events, display text]
+_events: dict[int, tuple[tuple[Term, ...], int]] = {}  # eventID -> (terms, popularity)
+_cache: "OrderedDict[str, list[dict]]" = OrderedDict()
+_built_at: Optional[float] = None
+# While rebuild() reads the tables, updates are also queued here to replay
+_pending: Optional[list[tuple]] = None
+_refresher: Optional[threading.Thread] = None
+
+hits = 0
+misses = 0
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _word_starts(text: str) -> list[str]:
+    words = text.split(" ")
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+def _evict_prefixes(term: Term) -> None:
+    """Drop every cached prefix whose results could include ``term``.  Caller holds _lock."""
+    for key in _word_starts(term[1]):
+        for end in range(1, len(key) + 1):
+            _cache.pop(key[:end], None)
+
+
+# -----------------------------
+# INCREMENTAL UPDATES (caller holds _lock)
+# -----------------------------
+def _remove_event(event_id: int) -> None:
+    entry = _events.pop(event_id, None)
+    if entry is None:
+        return
+    terms, popularity = entry
+    for term in terms:
+        stats = _terms[term]
+        stats[0] -= popularity
+        stats[1] -= 1
+        if stats[1] == 0:
+            del _terms[term]
+            for key in _word_starts(term[1]):
+                index = bisect.bisect_left(_keys, (key, term))
+                if index < len(_keys) and _keys[index] == (key, term):
+                    del _keys[index]
+        _evict_prefixes(term)
+
+
+def _event_terms(texts: Iterable[tuple[str, str]]) -> list[tuple[Term, str]]:
+    """The distinct (term, display text) pairs of one event."""
+    terms: dict[Term, str] = {}
+    for kind, text in texts:
+        normalized = normalize(text or "")
+        if normalized and (kind, normalized) not in terms:
+            terms[(kind, normalized)] = " ".join(text.split())
+    return list(terms.items())
+
+
+def _add_event(event_id: int, texts: Iterable[tuple[str, str]], popularity: int) -> None:
+    _remove_event(event_id)
+    terms = []
+    for term, display in _event_terms(texts):
+        normalized = term[1]
+        terms.append(term)
+        stats = _terms.get(term)
+        if stats is None:
+            _terms[term] = [popularity, 1, display]
+            for key in _word_starts(normalized):
+                bisect.insort(_keys, (key, term))
+        else:
+            stats[0] += popularity
+            stats[1] += 1
+        _evict_prefixes(term)
+    _events[event_id] = (tuple(terms), popularity)
+
+
+def _bump_event(event_id: int, delta: int) -> None:
+    entry = _events.get(event_id)
+    if entry is None:
+        return
+    terms, old = entry
+    new = max(old + delta, 0)
+    _events[event_id] = (terms, new)
+    for term in terms:
+        _terms[term][0] += new - old
+        _evict_prefixes(term)
+
+
+def _texts(title: str, location: str, categories: Iterable[str]) -> list[tuple[str, str]]:
+    return [("title", title), ("location", location), *(("category", c) for c in categories)]
+
+
+def _queue(*update) -> None:
+    if _pending is not None:
+        _pending.append(update)
+
+
+def add(event_id: int, title: str, location: str, categories: Iterable[str], popularity: int = 0) -> None:
+    """File a Public event (new or edited) under its title, location and categories."""
+    texts = _texts(title, location, categories)
+    with _lock:
+        _queue("add", event_id, texts, popularity)
+        _add_event(event_id, texts, popularity)
+
+
+def bump(event_id: int, delta: int) -> None:
+    """A like/RSVP (+1) or unlike/cancel (-1) on an event."""
+    with _lock:
+        _queue("bump", event_id, delta)
+        _bump_event(event_id, delta)
+
+
+def forget(event_id: int) -> None:
+    """Drop an event that was deleted or is no longer Public."""
+    with _lock:
+        _queue("forget", event_id)
+        _remove_event(event_id)
+
+
+# -----------------------------
+# LOADING FROM THE DATABASE
+# -----------------------------
+_EVENTS_SQL = """
+SELECT e.eventID, e.eventName, e.location, e.eventType,
+       (SELECT COUNT(*) FROM likesLog l WHERE l.eventID = e.eventID)
+     + (SELECT COUNT(*) FROM rsvpLog r WHERE r.eventID = e.eventID)
+FROM events e
+WHERE e.eventAccess = 'Public'
+"""
+
+
+def _load(conn: sqlite3.Connection, event_id: Optional[int] = None) -> list[tuple[int, list, int]]:
+    where = "" if event_id is None else " AND e.eventID = ?"
+    params = () if event_id is None else (event_id,)
+    rows = conn.execute(_EVENTS_SQL + where, params).fetchall()
+    extra: dict[int, list[str]] = {}
+    cat_where = "" if event_id is None else " WHERE eventID = ?"
+    for eid, category in conn.execute("SELECT eventID, category FROM eventCategories" + cat_where, params):
+        extra.setdefault(eid, []).append(category)
+    return [
+        (eid, _texts(title, location, [event_type, *extra.get(eid, [])]), popularity)
+        for eid, title, location, event_type, popularity in rows
+    ]
+
+
+def refresh(event_id: int, conn: Optional[sqlite3.Connection] = None) -> None:
+    """Re-read one event after an update (it may have been renamed, moved or made Private)."""
+    with connection.use(conn) as conn:
+        loaded = _load(conn, event_id)
+    if loaded:
+        _, texts, popularity = loaded[0]
+        with _lock:
+            _queue("add", event_id, texts, popularity)
+            _add_event(event_id, texts, popularity)
+    else:
+        forget(event_id)
+
+
+def _build(loaded: list[tuple[int, list, int]]) -> tuple[list, dict, dict]:
+    """A whole new (_keys, _terms, _events) from _load() rows, sorted once at the end."""
+    keys: list[tuple[str, Term]] = []
+    terms: dict[Term, list] = {}
+    events: dict[int, tuple[tuple[Term, ...], int]] = {}
+    for event_id, texts, popularity in loaded:
+        event_terms = _event_terms(texts)
+        for term, display in event_terms:
+            stats = terms.get(term)
+            if stats is None:
+                terms[term] = [popularity, 1, display]
+                keys.extend((key, term) for key in _word_starts(term[1]))
+            else:
+                stats[0] += popularity
+                stats[1] += 1
+        events[event_id] = (tuple(term for term, _ in event_terms), popularity)
+    keys.sort()
+    return keys, terms, events
+
+
+def rebuild(conn: Optional[sqlite3.Connection] = None) -> dict:
+    """Reload every Public event.  Also a warm-up step and the refresher's job."""
+    global _keys, _terms, _events, _cache, _built_at, _pending
+    with _rebuild_lock:
+        with _lock:
+            _pending = []
+        try:
+            with connection.use(conn) as conn:
+                loaded = _load(conn)
+            # Indexed without the lock; lookups keep using the old index meanwhile
+            keys, terms, events = _build(loaded)
+            with _lock:
+                _keys, _terms, _events, _cache = keys, terms, events, OrderedDict()
+                _built_at = time.monotonic()
+                for update in _pending:
+                    if update[0] == "add":
+                        _add_event(*update[1:])
+                    elif update[0] == "bump":
+                        _bump_event(*update[1:])
+                    else:
+                        _remove_event(update[1])
+                counts = {"events": len(_events), "terms": len(_terms)}
+        finally:
+            with _lock:
+                _pending = None
+    return counts
+
+
+def _stale() -> bool:
+    if _built_at is None:
+        return True
+    return REFRESH_SECONDS > 0 and time.monotonic() - _built_at > REFRESH_SECONDS
+
+
+def _refresh_forever() -> None:
+    while True:
+        if _stale():
+            try:
+                rebuild()
+            except sqlite3.Error as e:
+                print(f"[suggest] rebuild failed: {e}")
+        if REFRESH_SECONDS <= 0 and _built_at is not None:
+            return
+        wait = 1.0 if _built_at is None else _built_at + REFRESH_SECONDS - time.monotonic()
+        time.sleep(max(wait, 1.0))
+
+
+def start_refresher(force: bool = False) -> Optional[threading.Thread]:
+    """
+    Start the background rebuild thread (once per process).  Without
+    ``force`` only when SUGGEST_REFRESH_SECONDS > 0; with it, a one-off
+    first build when REFRESH_SECONDS is 0.
+    """
+    global _refresher
+    if REFRESH_SECONDS <= 0 and not force:
+        return None
+    with _lock:
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = threading.Thread(target=_refresh_forever, name="suggest-refresher", daemon=True)
+            _refresher.start()
+    return _refresher
+
+
+# -----------------------------
+# LOOKUP
+# -----------------------------
+def _compute(prefix: str) -> list[dict]:
+    """Caller holds _lock."""
+    matches: set[Term] = set()
+    index = bisect.bisect_left(_keys, (prefix,))
+    while index < len(_keys):
+        key, term = _keys[index]
+        if not key.startswith(prefix):
+            break
+        matches.add(term)
+        index += 1
+    best = heapq.nsmallest(
+        MAX_LIMIT, matches, key=lambda t: (-_terms[t][0], -_terms[t][1], t[1], KINDS.index(t[0]))
+    )
+    return [
+        {"text": _terms[t][2], "kind": t[0], "events": _terms[t][1], "popularity": _terms[t][0]}
+        for t in best
+    ]
+
+
+def suggest(query: str, limit: int = MAX_LIMIT) -> list[dict]:
+    """Up to ``limit`` suggestions for ``query``, most popular first."""
+    global hits, misses
+    if _built_at is None:
+        start_refresher(force=True)  # never built here yet; don't make this request wait for it
+    prefix = normalize(query)
+    if not prefix:
+        return []
+    with _lock:
+        results = _cache.get(prefix)
+        if results is None:
+            misses += 1
+            results = _compute(prefix)
+            _cache[prefix] = results
+            if len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+        else:
+            hits += 1
+            _cache.move_to_end(prefix)
+    return results[:limit]
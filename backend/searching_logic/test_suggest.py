@@ -0,0 +1,162 @@
+"""
+Typeahead suggestions: word-start matching, popularity ranking, the
+per-prefix cache staying correct across updates, the endpoint, and latency
+at 10k events.
+
+Run from the backend folder:
+    python -m pytest searching_logic/test_suggest.py
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import pytest
+from fastapi.testclient import TestClient
+
+from db import connection
+from searching_logic import suggest
+
+
+@pytest.fixture
+def empty(monkeypatch):
+    monkeypatch.setattr(suggest, "_keys", [])
+    monkeypatch.setattr(suggest, "_terms", {})
+    monkeypatch.setattr(suggest, "_events", {})
+    monkeypatch.setattr(suggest, "_cache", OrderedDict())
+    monkeypatch.setattr(suggest, "_built_at", time.monotonic())
+    monkeypatch.setattr(suggest, "REFRESH_SECONDS", 0)
+    return suggest
+
+
+def _texts(results):
+    return [r["text"] for r in results]
+
+
+def test_word_starts_and_popularity(empty):
+    empty.add(1, "Friday Jazz Night", "Union Ballroom", ["Performance"], popularity=2)
+    empty.add(2, "Jazz Combo Recital", "Frasier Hall", ["Performance", "Art"], popularity=9)
+    empty.add(3, "Java Study Group", "Michener Library", ["Study Session"], popularity=0)
+    assert _texts(empty.suggest("ja")) == ["Jazz Combo Recital", "Friday Jazz Night", "Java Study Group"]
+    assert _texts(empty.suggest("  JAZZ  n")) == ["Friday Jazz Night"]
+    # Categories add up over the events using them
+    top = empty.suggest("perf")[0]
+    assert (top["text"], top["kind"], top["events"], top["popularity"]) == ("Performance", "category", 2, 11)
+    assert _texts(empty.suggest("f", limit=2)) == ["Frasier Hall", "Friday Jazz Night"]
+    assert empty.suggest("zz") == []
+
+
+def test_cache_follows_updates(empty):
+    empty.add(1, "Chess Club", "UC", ["Competition"])
+    empty.add(2, "Chemistry Demo", "Ross Hall", ["Science"])
+    assert _texts(empty.suggest("che")) == ["Chemistry Demo", "Chess Club"]  # tie: alphabetical
+    assert empty.suggest("che") and "che" in empty._cache
+
+    empty.bump(1, 1)
+    assert _texts(empty.suggest("che")) == ["Chess Club", "Chemistry Demo"]
+    empty.add(2, "Organic Chemistry Demo", "Ross Hall", ["Science"])  # renamed
+    assert _texts(empty.suggest("che")) == ["Chess Club", "Organic Chemistry Demo"]
+    empty.forget(1)
+    assert _texts(empty.suggest("c")) == ["Organic Chemistry Demo"]
+    # Unrelated prefixes stay cached through all of that
+    assert empty.suggest("ross") and empty.hits
+
+
+def test_matches_a_brute_force_ranking(empty):
+    rng = random.Random(3)
+    words = ["alpha", "beta", "gamma", "delta", "alps", "bean"]
+    events = {}
+    for step in range(1500):
+        event_id = rng.randrange(60)
+        if rng.random() < 0.3:
+            events[event_id] = [" ".join(rng.sample(words, 2)), rng.choice(words), rng.randrange(5)]
+            empty.add(event_id, events[event_id][0], events[event_id][1], [], events[event_id][2])
+        elif rng.random() < 0.8 and event_id in events:
+            delta = rng.choice([1, -1])
+            events[event_id][2] = max(events[event_id][2] + delta, 0)
+            empty.bump(event_id, delta)
+        elif event_id in events:
+            del events[event_id]
+            empty.forget(event_id)
+        if step % 10 == 0:
+            prefix = rng.choice(["a", "al", "alp", "b", "be", "g", "d"])
+            expected = {}
+            for title, location, popularity in events.values():
+                for kind, text in (("title", title), ("location", location)):
+                    if any(word.startswith(prefix) for word in text.split()) or text.startswith(prefix):
+                        expected.setdefault((kind, text), 0)
+                        expected[(kind, text)] += popularity
+            got = {(r["kind"], r["text"]): r["popularity"] for r in empty.suggest(prefix, empty.MAX_LIMIT)}
+            best = sorted(expected.values(), reverse=True)[: empty.MAX_LIMIT]
+            assert sorted(got.values(), reverse=True) == best
+            assert all(expected[term] == popularity for term, popularity in got.items())
+
+
+def test_p99_at_10k_events(empty):
+    rng = random.Random(11)
+    words = [f"{a}{b}" for a in "bcdfghjklmnprstvwz" for b in ("a", "e", "i", "o", "u", "ar", "en", "ol")]
+    for event_id in range(10_000):
+        title = " ".join(rng.choice(words) for _ in range(3))
+        empty.add(event_id, title, f"Room {rng.randrange(300)}", [rng.choice(["Art", "Math", "Sports"])], rng.randrange(50))
+    prefixes = [w[:n] for w in words for n in (1, 2, 3)]
+    timings = []
+    for prefix in prefixes * 3:
+        start = time.perf_counter()
+        empty.suggest(prefix, 8)
+        timings.append(time.perf_counter() - start)
+        if rng.random() < 0.2:
+            empty.bump(rng.randrange(10_000), 1)  # keeps evicting cached prefixes
+    timings.sort()
+    assert timings[int(len(timings) * 0.99)] < 0.005
+
+
+def test_rebuild_does_not_block_lookups(empty, monkeypatch):
+    empty.add(1, "Quilting Bee", "Hall", ["Art"])
+    started, release = threading.Event(), threading.Event()
+    build = suggest._build
+
+    def slow_build(loaded):
+        started.set()
+        release.wait(5)
+        return build(loaded)
+
+    monkeypatch.setattr(suggest, "_build", slow_build)
+    monkeypatch.setattr(suggest, "_load", lambda conn: [(2, suggest._texts("Quilting Circle", "Library", []), 3)])
+    rebuilding = threading.Thread(target=suggest.rebuild)
+    rebuilding.start()
+    assert started.wait(5)
+    # Mid-rebuild: the old index answers, and writes still land (and are replayed onto the new one)
+    start = time.perf_counter()
+    assert _texts(suggest.suggest("quilt")) == ["Quilting Bee"]
+    assert time.perf_counter() - start < 0.5
+    suggest.add(3, "Quilt Show", "Gym", [])
+    release.set()
+    rebuilding.join(5)
+    assert _texts(suggest.suggest("quilt")) == ["Quilting Circle", "Quilt Show"]
+
+
+def test_endpoint_tracks_events_and_likes():
+    from main import app
+
+    with connection.use() as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO accounts (accountID, accountType, email, password, isVerified) VALUES (9600, 'Student', 'typeahead@unco.edu', 'x', 1)"
+        )
+    with TestClient(app) as client:
+        suggest.rebuild()
+        ids = []
+        for title in ("Xylophone Workshop", "Xylography Talk"):
+            ids.append(client.post("/events", json={
+                "creatorID": 9600, "title": title, "description": "d", "location": "Guggenheim Hall",
+                "eventType": "Art", "startDateTime": "2033-04-01 10:00:00",
+            }).json()["eventID"])
+        client.post(f"/events/{ids[1]}/like", json={"user_id": 9600})
+        assert [s["text"] for s in client.get("/search/suggest", params={"q": "xylo"}).json()] == [
+            "Xylography Talk", "Xylophone Workshop",
+        ]
+        client.put(f"/events/{ids[1]}", data={"updaterID": 9600, "eventAccess": "Private"})
+        assert [s["text"] for s in client.get("/search/suggest", params={"q": "xylo", "limit": 5}).json()] == [
+            "Xylophone Workshop",
+        ]
+        assert client.get("/search/suggest", params={"q": ""}).status_code == 422
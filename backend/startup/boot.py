@@ -0,0 +1,146 @@
+"""
+=========================================================
+BOOT TIMING (process start -> imports -> ready)
+=========================================================
+
+Purpose:
+- Fly stops idle machines (auto_stop_machines = 'stop', min 0), so the first
+  user after a quiet spell waits for the whole boot.  This module records
+  where that time goes so it can be reported by GET /ready and compared by
+  benchmarks/cold_start.py.
+
+What it records:
+- Time from process start (read from /proc, so interpreter and uvicorn
+  start-up are included) to each named phase: main imported, startup hooks
+  done, warm-up done.
+- Per-module import time while main.py is importing: a meta-path finder
+  wraps each loaded module's exec_module and keeps self/cumulative times.
+  It is removed again once start-up is done, so it costs nothing later.
+
+Settings:
+- BOOT_TIMING=0 turns the import timer off (phases are still recorded).
+"""
+
+import importlib.abc
+import importlib.machinery
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+IMPORT_TIMER_ENABLED = os.environ.get("BOOT_TIMING", "1") != "0"
+
+_t0 = time.perf_counter()
+_phases: dict[str, float] = {}
+_imports: dict[str, tuple[float, float]] = {}  # module -> (self s, cumulative s)
+_local = threading.local()
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process was started, or None off Linux."""
+    try:
+        with open("/proc/self/stat") as fh:
+            # starttime is field 22, after the parenthesised command name
+            fields = fh.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as fh:
+            uptime = float(fh.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# Offset between "process started" and this module being imported
+_age_at_t0 = process_age()
+
+
+def since_start() -> float:
+    """Seconds since process start (or since this module loaded, off Linux)."""
+    return (_age_at_t0 or 0.0) + time.perf_counter() - _t0
+
+
+def mark(phase: str) -> None:
+    """Record the first time ``phase`` is reached."""
+    _phases.setdefault(phase, round(since_start() * 1000, 1))
+
+
+def phases() -> dict[str, float]:
+    """Milliseconds since process start for each phase reached so far."""
+    return dict(_phases)
+
+
+# -----------------------------
+# IMPORT TIMER
+# -----------------------------
+_FILE_LOADERS = (
+    importlib.machinery.SourceFileLoader,
+    importlib.machinery.SourcelessFileLoader,
+    importlib.machinery.ExtensionFileLoader,
+)
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            # File loaders are created per module, so wrapping the instance is
+            # safe; builtin/frozen/zip loaders are shared and left alone.
+            if isinstance(spec.loader, _FILE_LOADERS):
+                spec.loader.exec_module = _timed(fullname, spec.loader.exec_module)
+            return spec
+        return None
+
+
+def _timed(name, exec_module):
+    def run(module):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        frame = [time.perf_counter(), 0.0]
+        stack.append(frame)
+        try:
+            exec_module(module)
+        finally:
+            stack.pop()
+            total = time.perf_counter() - frame[0]
+            if stack:
+                stack[-1][1] += total
+            _imports[name] = (total - frame[1], total)
+    return run
+
+
+_timer = _ImportTimer()
+
+
+def install_import_timer() -> None:
+    if IMPORT_TIMER_ENABLED and _timer not in sys.meta_path:
+        sys.meta_path.insert(0, _timer)
+
+
+def remove_import_timer() -> None:
+    try:
+        sys.meta_path.remove(_timer)
+    except ValueError:
+        pass
+
+
+def slowest_imports(limit: int = 15, by: str = "cumulative") -> list[dict]:
+    index = 1 if by == "cumulative" else 0
+    ranked = sorted(_imports.items(), key=lambda item: item[1][index], reverse=True)[:limit]
+    return [
+        {"module": name, "self_ms": round(self_s * 1000, 1), "cumulative_ms": round(total_s * 1000, 1)}
+        for name, (self_s, total_s) in ranked
+    ]
+
+
+def summary() -> dict:
+    return {
+        "phases_ms": phases(),
+        "modules_timed": len(_imports),
+        "slowest_imports": slowest_imports(),
+        "slowest_imports_self": slowest_imports(by="self"),
+    }
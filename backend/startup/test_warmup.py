@@ -0,0 +1,62 @@
+"""
+Boot timing / warm-up tests.
+
+Run from the backend folder:
+    python -m pytest startup/test_warmup.py
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from startup import boot, warmup
+
+
+@pytest.fixture
+def fresh_warmup(monkeypatch):
+    monkeypatch.setattr(warmup, "_steps", [])
+    monkeypatch.setattr(warmup, "_results", [])
+    monkeypatch.setattr(warmup, "_status", "pending")
+    monkeypatch.setattr(warmup, "_done", warmup.threading.Event())
+    monkeypatch.setattr(warmup, "ENABLED", True)
+    return warmup
+
+
+def test_failed_step_degrades_but_others_run(fresh_warmup):
+    ran = []
+    fresh_warmup.add_step("first", lambda: ran.append("first"))
+    fresh_warmup.add_step("broken", lambda: 1 / 0)
+    fresh_warmup.add_step("last", lambda: {"rows": 3})
+    fresh_warmup.start().join(5)
+
+    state = fresh_warmup.state()
+    assert ran == ["first"]
+    assert state["status"] == "degraded"
+    assert [s["state"] for s in state["steps"]] == ["done", "failed", "done"]
+    assert state["steps"][2]["detail"] == {"rows": 3}
+    assert fresh_warmup.is_ready()
+
+
+def test_disabled_warmup_is_ready_immediately(fresh_warmup, monkeypatch):
+    monkeypatch.setattr(fresh_warmup, "ENABLED", False)
+    assert fresh_warmup.start() is None
+    assert fresh_warmup.state()["status"] == "skipped"
+    assert fresh_warmup.wait(0)
+
+
+def test_read_into_page_cache_is_capped(tmp_path):
+    path = tmp_path / "blob.db"
+    path.write_bytes(b"x" * 5000)
+    assert warmup.read_into_page_cache(str(path), 4096) == 4096
+    assert warmup.read_into_page_cache(str(tmp_path / "missing.db"), 4096) == 0
+
+
+def test_ready_endpoint_reports_boot_phases():
+    from main import app
+
+    with TestClient(app) as client:
+        res = client.get("/ready")
+    assert res.status_code == 200  # WARMUP=0 in tests -> skipped counts as ready
+    body = res.json()
+    assert body["status"] == "skipped"
+    assert "main_imported" in body["boot"]["phases_ms"]
+    assert "startup_hooks_done" in boot.phases()
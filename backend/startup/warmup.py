@@ -0,0 +1,116 @@
+"""
+=========================================================
+BACKGROUND WARM-UP (page cache, hot queries, caches)
+=========================================================
+
+Purpose:
+- Everything a cold machine would otherwise do inside the first user
+  requests is done once, in a background thread, right after start-up:
+  schema checks, pulling the database file into the OS page cache,
+  running the hot read queries, preloading caches and starting the
+  bcrypt worker processes.
+- Start-up itself is not blocked: uvicorn accepts requests immediately, and
+  GET /ready reports whether warm-up has finished.
+
+How steps are added:
+- main.py registers named steps with `add_step(name, fn)` in the order they
+  should run (the /events path first, since that is what the home page
+  calls).  A failing step is recorded and the rest still run.
+
+Settings:
+- WARMUP=0                  skip warm-up entirely (reported as "skipped")
+- WARMUP_PAGE_CACHE_MB      how much of the DB file to pre-read (default 256)
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from startup import boot
+
+ENABLED = os.environ.get("WARMUP", "1") != "0"
+PAGE_CACHE_MB = int(os.environ.get("WARMUP_PAGE_CACHE_MB", "256"))
+
+_steps: list[tuple[str, Callable[[], object]]] = []
+_results: list[dict] = []
+_status = "pending"  # pending -> warming -> ready | degraded | skipped
+_done = threading.Event()
+_lock = threading.Lock()
+
+
+def add_step(name: str, fn: Callable[[], object]) -> None:
+    _steps.append((name, fn))
+
+
+def read_into_page_cache(path: str, max_bytes: int) -> int:
+    """Sequentially read up to ``max_bytes`` of ``path`` so later page reads hit RAM."""
+    if not os.path.exists(path):
+        return 0
+    read = 0
+    with open(path, "rb", buffering=0) as fh:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fh.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        while read < max_bytes:
+            chunk = fh.read(min(1 << 20, max_bytes - read))
+            if not chunk:
+                break
+            read += len(chunk)
+    return read
+
+
+def _run() -> None:
+    global _status
+    failed = False
+    for name, fn in _steps:
+        entry = {"step": name, "state": "running"}
+        with _lock:
+            _results.append(entry)
+        start = time.perf_counter()
+        try:
+            detail = fn()
+            entry["state"] = "done"
+            if detail is not None:
+                entry["detail"] = detail
+        except Exception as e:
+            failed = True
+            entry["state"] = "failed"
+            entry["error"] = str(e)
+            print(f"[startup] warm-up step {name} failed: {e}")
+        entry["ms"] = round((time.perf_counter() - start) * 1000, 1)
+    _status = "degraded" if failed else "ready"
+    boot.mark("warmup_done")
+    _done.set()
+    took = ", ".join(f"{r['step']} {r['ms']:.0f}" for r in _results)
+    print(f"[startup] {_status} {boot.phases().get('warmup_done', 0):.0f} ms after process start ({took} ms)")
+
+
+def start() -> Optional[threading.Thread]:
+    """Run the registered steps in a daemon thread (once)."""
+    global _status
+    with _lock:
+        if _status != "pending":
+            return None
+        if not ENABLED:
+            _status = "skipped"
+            _done.set()
+            return None
+        _status = "warming"
+    thread = threading.Thread(target=_run, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def wait(timeout: Optional[float] = None) -> bool:
+    """Block until warm-up is over (or skipped).  Returns False on timeout."""
+    return _done.wait(timeout)
+
+
+def is_ready() -> bool:
+    return _done.is_set()
+
+
+def state() -> dict:
+    with _lock:
+        steps = [dict(r) for r in _results]
+    return {"status": _status, "steps": steps}
@@ -0,0 +1,110 @@
+"""
+Query budgets per endpoint.  Each request reports how many SQL statements
+and connections it used (db/instrumentation.py); these tests pin the
+numbers so a per-event query sneaking back into a list endpoint fails here
+instead of in production.
+
+Run from the backend folder:
+    python -m pytest test_query_budgets.py
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from db import connection
+from events import fragments
+from db.instrumentation import assert_query_budget, capture
+
+CREATOR_ID = 9100
+EVENT_COUNT = 25
+
+
+@pytest.fixture(scope="module")
+def client():
+    with connection.use() as conn:
+        conn.execute("DELETE FROM likesLog")
+        conn.execute("DELETE FROM rsvpLog")
+        conn.execute("DELETE FROM eventCategories")
+        conn.execute("DELETE FROM events")
+        conn.executemany(
+            "INSERT OR IGNORE INTO accounts (accountID, accountType, email, password, isVerified) VALUES (?, ?, ?, ?, 1)",
+            [(CREATOR_ID + i, "Student", f"budget{i}@unco.edu", "x") for i in range(5)],
+        )
+        conn.executemany(
+            """
+            INSERT INTO events (eventID, creatorID, eventName, eventType, eventDescription, location,
+                                eventAccess, startDateTime)
+            VALUES (?, ?, ?, 'Workshops', 'budget test', 'Michener Library', 'Public', '2999-01-01 10:00:00')
+            """,
+            [(eid, CREATOR_ID, f"Workshop {eid}") for eid in range(1, EVENT_COUNT + 1)],
+        )
+        conn.executemany(
+            "INSERT INTO likesLog (eventID, accountID) VALUES (?, ?)",
+            [(eid, CREATOR_ID + i) for eid in range(1, EVENT_COUNT + 1) for i in range(eid % 5)],
+        )
+        conn.executemany(
+            "INSERT INTO rsvpLog (eventID, accountID) VALUES (?, ?)",
+            [(eid, CREATOR_ID + 1) for eid in range(1, EVENT_COUNT + 1, 2)],
+        )
+    # Raw inserts skip the event write paths; the app's warm-up does this
+    fragments.backfill()
+    return TestClient(main.app)
+
+
+def test_list_events_does_not_query_per_event(client):
+    resp = client.get("/events", params={"user_id": CREATOR_ID + 1})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert len(body) == EVENT_COUNT
+    assert body[1]["likes"] == 2 and body[1]["userLiked"] is True
+    assert body[0]["userRsvped"] is True and body[1]["userRsvped"] is False
+    # events + likes + rsvps, whatever the number of events
+    assert_query_budget(resp, queries=3, connections=1)
+
+
+def test_search_and_detail_budgets(client):
+    resp = client.get("/search", params={"title": "workshop", "user_id": CREATOR_ID})
+    assert resp.status_code == 200 and len(resp.json()) == EVENT_COUNT
+    assert_query_budget(resp, queries=3, connections=1)
+
+    resp = client.get("/events/3")
+    assert resp.status_code == 200 and resp.json()["likes"] == 3
+    assert_query_budget(resp, queries=3, connections=1)
+
+
+def test_user_events_budget(client):
+    # CREATOR_ID + 1 likes every event with eid % 5 >= 2 and RSVPs to the odd ones
+    for relation, expected in (("created", EVENT_COUNT), ("liked", 15), ("rsvped", 13)):
+        user = CREATOR_ID if relation == "created" else CREATOR_ID + 1
+        resp = client.get(f"/users/{user}/events", params={"relation": relation, "limit": 100})
+        assert resp.status_code == 200 and len(resp.json()) == expected
+        # one join for the page + likes + rsvps
+        assert_query_budget(resp, queries=3, connections=1)
+
+
+def test_like_round_trip_budget(client):
+    resp = client.post("/events/5/like", json={"user_id": CREATOR_ID + 4})
+    assert resp.status_code == 200
+    # BEGIN, INSERT, UPDATE numberLikes, SELECT likes, COMMIT
+    assert_query_budget(resp, queries=5, connections=1)
+    resp = client.request("DELETE", "/events/5/like", json={"user_id": CREATOR_ID + 4})
+    assert resp.status_code == 200
+    assert_query_budget(resp, queries=5, connections=1)
+
+
+def test_server_timing_header(client):
+    resp = client.get("/events")
+    timing = resp.headers["server-timing"]
+    assert timing.startswith("db;dur=") and "3 queries, 1 conn" in timing
+    assert "app;dur=" in timing
+
+
+def test_capture_outside_requests():
+    with capture() as stats:
+        with connection.use() as conn:
+            conn.execute("SELECT 1").fetchall()
+            conn.cursor().execute("SELECT eventID FROM events").fetchall()
+    assert stats.queries == 2
+    assert stats.connections == 1
+    assert stats.rows == 1 + EVENT_COUNT
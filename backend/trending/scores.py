@@ -0,0 +1,251 @@
+"""
+=========================================================
+TRENDING EVENTS (time-decayed popularity, kept in memory)
+=========================================================
+
+Purpose:
+- Backs GET /events/trending ("popular this week") without aggregating
+  likesLog and rsvpLog on every request.
+- An event's score is the sum of its likes and RSVPs, each weighted by
+  2^(-age / half-life), so last week's burst fades out on its own.
+
+How it stays cheap:
+- Scores are stored relative to a fixed epoch:
+      stored = sum(weight * 2^((t - epoch) / half_life))
+  The current score is stored * 2^(-(now - epoch) / half_life), and that
+  factor is the same for every event.  Ranking never has to touch all the
+  scores as time passes, and a like is a single addition.
+- The top TRENDING_CACHE_K entries are kept sorted.  A like/RSVP patches
+  that list in place; only an unlike/cancel that drops an event out of it
+  forces one O(events) recompute on the next read.  top() is therefore
+  O(K) in the common case, independent of log size.
+
+Where it hooks in:
+- main.py calls record() after the like / unlike / RSVP / cancel commits
+  and forget() when an event is deleted.
+- rebuild() recomputes everything from likesLog/rsvpLog.createdAt (hourly
+  buckets, one grouped query per log).  It runs on first use, then every
+  TRENDING_REBUILD_MINUTES.  That corrects drift: unlikes are subtracted
+  as if the like were recent (the log row is already gone), and other
+  worker processes' updates are not seen here until the next rebuild.
+  Rebuilding also moves the epoch to now so the stored values stay small.
+
+Settings:
+- TRENDING_HALF_LIFE_HOURS    default 72
+- TRENDING_LIKE_WEIGHT        default 1
+- TRENDING_RSVP_WEIGHT        default 3 (an RSVP says more than a like)
+- TRENDING_REBUILD_MINUTES    default 60 (0 = only the initial build)
+- TRENDING_CACHE_K            default 100 (largest limit served from the cache)
+"""
+
+import bisect
+import heapq
+import os
+import sqlite3
+import threading
+import time
+from operator import itemgetter
+from typing import Optional
+
+from db import connection
+from monitoring import metrics
+
+HALF_LIFE_SECONDS = float(os.environ.get("TRENDING_HALF_LIFE_HOURS", "72")) * 3600
+LIKE_WEIGHT = float(os.environ.get("TRENDING_LIKE_WEIGHT", "1"))
+RSVP_WEIGHT = float(os.environ.get("TRENDING_RSVP_WEIGHT", "3"))
+REBUILD_SECONDS = float(os.environ.get("TRENDING_REBUILD_MINUTES", "60")) * 60
+CACHE_K = int(os.environ.get("TRENDING_CACHE_K", "100"))
+
+# Scores below this (in current units) are dropped to keep the dict small
+_NEGLIGIBLE = 1e-3
+
+_lock = threading.Lock()
+_epoch = time.time()
+_scores: dict[int, float] = {}
+# Exact top CACHE_K as (-stored, eventID), ascending == best first; None = recompute
+_top: Optional[list[tuple[float, int]]] = None
+_built = False
+# While a rebuild reads the logs, updates are also queued here to replay
+_pending: Optional[list[tuple[int, Optional[float], float]]] = None  # weight None = forget
+_schema_ready = False
+
+
+def _growth(at: float, epoch: float) -> float:
+    return 2.0 ** ((at - epoch) / HALF_LIFE_SECONDS)
+
+
+# -----------------------------
+# SCHEMA (createdAt on the logs)
+# -----------------------------
+def ensure_schema(conn: Optional[sqlite3.Connection] = None) -> None:
+    """
+    Add likesLog/rsvpLog.createdAt to databases created before it existed.
+    Rows that predate the column are stamped with the migration time, so
+    existing likes count as fresh once and then decay normally.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    with connection.use(conn) as conn:
+        now = time.time()
+        for table in ("likesLog", "rsvpLog"):
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+            if "createdAt" not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN createdAt REAL")
+                conn.execute(f"UPDATE {table} SET createdAt = ? WHERE createdAt IS NULL", (now,))
+                print(f"[trending] added {table}.createdAt")
+    _schema_ready = True
+
+
+# -----------------------------
+# INCREMENTAL UPDATES
+# -----------------------------
+def _set(event_id: int, new: float) -> None:
+    """
+    Store one event's score (0 removes it) and keep _top exact.  Caller holds
+    _lock.  Invariant: _top is the exact best min(CACHE_K, scored events).
+    """
+    global _top
+    old = _scores.get(event_id)
+    if new > 0:
+        _scores[event_id] = new
+    else:
+        _scores.pop(event_id, None)
+    if _top is None:
+        return
+    key = (-(old or 0.0), event_id)
+    index = bisect.bisect_left(_top, key)
+    in_top = old is not None and index < len(_top) and _top[index] == key
+    if in_top:
+        del _top[index]
+        outside = len(_scores) - (1 if new > 0 else 0) - len(_top)
+        if outside == 0:
+            # The list holds every scored event; nothing outside can overtake
+            if new > 0:
+                bisect.insort(_top, (-new, event_id))
+        elif new > 0 and _top and new >= -_top[-1][0]:
+            bisect.insort(_top, (-new, event_id))
+        else:
+            _top = None  # an event outside the list may belong in it now
+    elif new > 0:
+        if len(_top) < CACHE_K or new > -_top[-1][0]:
+            bisect.insort(_top, (-new, event_id))
+            if len(_top) > CACHE_K:
+                _top.pop()
+
+
+def _apply(event_id: int, stored_delta: float) -> None:
+    new = _scores.get(event_id, 0.0) + stored_delta
+    if new / _growth(time.time(), _epoch) < _NEGLIGIBLE:
+        new = 0.0
+    _set(event_id, new)
+
+
+def record(event_id: int, weight: float, at: Optional[float] = None) -> None:
+    """Add ``weight`` (negative for unlike/cancel) to an event's score at time ``at``."""
+    at = time.time() if at is None else at
+    with _lock:
+        if _pending is not None:
+            _pending.append((event_id, weight, at))
+        _apply(event_id, weight * _growth(at, _epoch))
+
+
+def forget(event_id: int) -> None:
+    """Drop an event (deleted or made inactive)."""
+    with _lock:
+        if _pending is not None:
+            _pending.append((event_id, None, 0.0))
+        _set(event_id, 0.0)
+
+
+# -----------------------------
+# REBUILD
+# -----------------------------
+def _read_scores(epoch: float, conn: sqlite3.Connection) -> dict[int, float]:
+    scores: dict[int, float] = {}
+    for table, weight in (("likesLog", LIKE_WEIGHT), ("rsvpLog", RSVP_WEIGHT)):
+        # Hourly buckets: one row per event-hour instead of one per like.
+        # Within an hour the decay is ~linear, so the mean time is exact enough.
+        rows = conn.execute(
+            f"""
+            SELECT eventID, COUNT(*), AVG(createdAt)
+            FROM {table}
+            WHERE createdAt IS NOT NULL
+            GROUP BY eventID, CAST(createdAt / 3600 AS INTEGER)
+            """
+        ).fetchall()
+        for event_id, count, mean_at in rows:
+            scores[event_id] = scores.get(event_id, 0.0) + weight * count * _growth(mean_at, epoch)
+    return scores
+
+
+def rebuild(conn: Optional[sqlite3.Connection] = None) -> int:
+    """Recompute every score from the logs.  Returns the number of scored events."""
+    global _epoch, _scores, _top, _built, _pending
+    with _lock:
+        _pending = []
+    try:
+        epoch = time.time()
+        with connection.use(conn) as conn:
+            ensure_schema(conn)
+            scores = _read_scores(epoch, conn)
+        scores = {eid: s for eid, s in scores.items() if s >= _NEGLIGIBLE}
+        with _lock:
+            _epoch, _scores, _top, _built = epoch, scores, None, True
+            # Updates recorded while the logs were being read
+            for event_id, weight, at in _pending:
+                if weight is None:
+                    _set(event_id, 0.0)
+                else:
+                    _apply(event_id, weight * _growth(at, _epoch))
+            return len(_scores)
+    finally:
+        with _lock:
+            _pending = None
+
+
+# -----------------------------
+# READ
+# -----------------------------
+def top(k: int = 10) -> list[tuple[int, float]]:
+    """The ``k`` highest (eventID, current score) pairs, best first."""
+    global _top
+    if not _built:
+        rebuild()
+    with _lock:
+        if _top is None:
+            best = heapq.nlargest(CACHE_K, _scores.items(), key=itemgetter(1))
+            _top = sorted((-stored, eid) for eid, stored in best)
+        if k > len(_top) and len(_scores) > len(_top):
+            entries = heapq.nsmallest(k, ((-stored, eid) for eid, stored in _scores.items()))
+        else:
+            entries = _top[:k]
+        decay = 1.0 / _growth(time.time(), _epoch)
+    return [(eid, -neg * decay) for neg, eid in entries]
+
+
+def score(event_id: int) -> float:
+    with _lock:
+        return _scores.get(event_id, 0.0) / _growth(time.time(), _epoch)
+
+
+# -----------------------------
+# BACKGROUND REBUILD
+# -----------------------------
+def _rebuild_forever():
+    while True:
+        time.sleep(REBUILD_SECONDS)
+        try:
+            with metrics.time_job("trending_rebuild"):
+                count = rebuild()
+            print(f"[trending] rebuilt scores for {count} events")
+        except sqlite3.Error as e:
+            print(f"[trending] rebuild failed: {e}")
+
+
+def start_rebuilder() -> Optional[threading.Thread]:
+    if REBUILD_SECONDS <= 0:
+        return None
+    thread = threading.Thread(target=_rebuild_forever, name="trending-rebuilder", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,138 @@
+"""
+Trending scores: incremental top-K against a brute-force ranking, decay,
+rebuild from the logs, and the endpoint.
+
+Run from the backend folder:
+    python -m pytest trending/test_trending.py
+"""
+
+import random
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from db import connection
+from events import create as events_create
+from trending import scores as trending
+
+
+@pytest.fixture
+def fresh(monkeypatch):
+    monkeypatch.setattr(trending, "_scores", {})
+    monkeypatch.setattr(trending, "_top", None)
+    monkeypatch.setattr(trending, "_built", True)
+    monkeypatch.setattr(trending, "_epoch", time.time())
+    monkeypatch.setattr(trending, "CACHE_K", 5)
+    return trending
+
+
+def _brute_force(k):
+    return sorted(trending._scores, key=lambda eid: (-trending._scores[eid], eid))[:k]
+
+
+def test_incremental_top_matches_brute_force(fresh):
+    rng = random.Random(7)
+    for step in range(3000):
+        event_id = rng.randrange(40)
+        if rng.random() < 0.6:
+            fresh.record(event_id, rng.choice([fresh.LIKE_WEIGHT, fresh.RSVP_WEIGHT]))
+        elif rng.random() < 0.95:
+            fresh.record(event_id, -fresh.LIKE_WEIGHT)
+        else:
+            fresh.forget(event_id)
+        if step % 7 == 0:
+            k = rng.randint(1, 8)
+            assert [eid for eid, _ in fresh.top(k)] == _brute_force(k)
+
+
+def test_older_activity_counts_less(fresh):
+    now = time.time()
+    fresh.record(1, 1.0, at=now - fresh.HALF_LIFE_SECONDS)
+    fresh.record(2, 1.0, at=now)
+    (first, fresh_score), (second, old_score) = fresh.top(2)
+    assert (first, second) == (2, 1)
+    assert old_score == pytest.approx(fresh_score / 2, rel=1e-3)
+
+
+def test_rebuild_from_logs(fresh):
+    from events import create as events_create
+    from liking_log import liking_log
+    from rsvp import rsvp as rsvp_log
+
+    with connection.use() as conn:
+        quiet = events_create.create_event(1, "Quiet", "d", "L", "Art", "2031-01-01 10:00:00", conn=conn)
+        busy = events_create.create_event(1, "Busy", "d", "L", "Art", "2031-01-01 10:00:00", conn=conn)
+        liking_log.add_like(5, quiet, conn=conn)
+        rsvp_log.add_rsvp(5, busy, conn=conn)
+        liking_log.add_like(6, busy, conn=conn)
+        # An old like barely counts any more
+        conn.execute(
+            "INSERT INTO likesLog (eventID, accountID, createdAt) VALUES (?, 7, ?)",
+            (quiet, time.time() - 30 * 86400),
+        )
+    fresh.rebuild()
+    scores = dict(fresh.top(50))
+    assert scores[busy] == pytest.approx(fresh.RSVP_WEIGHT + fresh.LIKE_WEIGHT, rel=1e-2)
+    assert scores[quiet] == pytest.approx(fresh.LIKE_WEIGHT, rel=0.05)
+
+
+def test_top_is_fast_with_many_events(fresh, monkeypatch):
+    monkeypatch.setattr(fresh, "CACHE_K", 100)
+    for event_id in range(50_000):
+        fresh._scores[event_id] = float(event_id % 997) + 1
+    fresh.top(10)  # builds the cached list once
+    start = time.perf_counter()
+    for i in range(200):
+        fresh.record(i, fresh.LIKE_WEIGHT)
+        fresh.top(10)
+    per_call = (time.perf_counter() - start) / 200
+    assert per_call < 0.001
+
+
+def test_trending_endpoint_follows_likes_and_rsvps():
+    from main import app
+
+    with TestClient(app) as client:
+        ids = []
+        for title in ("Chess Club", "Jazz Night"):
+            res = client.post("/events", json={
+                "creatorID": 1, "title": title, "description": "d", "location": "UC",
+                "eventType": "Performance", "startDateTime": "2031-03-01 19:00:00",
+            })
+            ids.append(res.json()["eventID"])
+        chess, jazz = ids
+        client.post(f"/events/{jazz}/like", json={"user_id": 31})
+        client.post(f"/events/{jazz}/rsvp", json={"user_id": 32})
+        client.post(f"/events/{chess}/like", json={"user_id": 33})
+
+        ranked = [e["id"] for e in client.get("/events/trending", params={"limit": 50}).json()]
+        assert ranked.index(jazz) < ranked.index(chess)
+
+        client.request("DELETE", f"/events/{jazz}/rsvp", json={"user_id": 32})
+        client.request("DELETE", f"/events/{jazz}/like", json={"user_id": 31})
+        client.post(f"/events/{chess}/rsvp", json={"user_id": 34})
+        ranked = [e["id"] for e in client.get("/events/trending", params={"limit": 50}).json()]
+        assert chess in ranked and jazz not in ranked
+
+
+def test_trending_endpoint_fills_the_limit_past_hidden_events(fresh):
+    from main import app
+
+    with connection.use() as conn:
+        hidden = [
+            events_create.create_event(1, f"Board Meeting {i}", "d", "UC", "Business", "2031-04-01 09:00:00",
+                                       eventAccess="Private", conn=conn)
+            for i in range(fresh.CACHE_K)
+        ]
+        public = events_create.create_event(1, "Open Mic", "d", "UC", "Performance", "2031-04-01 19:00:00", conn=conn)
+    for event_id in hidden:
+        fresh.record(event_id, 100)
+    fresh.record(public, 1)
+
+    with TestClient(app) as client:
+        # Every cached top-K entry is Private: the public event is still found
+        assert [e["id"] for e in client.get("/events/trending", params={"limit": 1}).json()] == [public]
+        # Their creator still sees them first
+        mine = [e["id"] for e in client.get("/events/trending", params={"limit": 2, "user_id": 1}).json()]
+        assert len(mine) == 2 and set(mine) <= set(hidden)
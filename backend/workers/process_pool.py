@@ -0,0 +1,96 @@
+"""
+=========================================================
+BOUNDED PROCESS POOL
+=========================================================
+
+Purpose:
+- Runs CPU-heavy work (bcrypt, image resizing, ...) in separate processes
+  so it never holds the GIL on the threads that serve API requests.
+
+What Changed:
+- Admission control: at most ``max_workers + max_queue`` jobs may be
+  running or waiting at once.  A caller that cannot get a slot within
+  ``admission_timeout`` gets PoolBusy instead of piling onto the queue,
+  which lets an endpoint answer 503 quickly rather than stalling every
+  other request behind a burst.
+- The executor is created lazily on first use so importing the app (cold
+  start) does not spawn processes nobody needs yet.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+
+class PoolBusy(Exception):
+    """Raised when the pool's admission queue is full."""
+
+    def __init__(self, name: str, retry_after: float = 1.0):
+        super().__init__(f"{name} pool is busy")
+        self.retry_after = retry_after
+
+
+class BoundedProcessPool:
+    def __init__(self, name: str, max_workers: int = 1, max_queue: int = 8, admission_timeout: float = 0.5):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.admission_timeout = admission_timeout
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def in_use(self) -> int:
+        """Jobs admitted and not finished yet (running + queued)."""
+        return self.max_workers + self.max_queue - self._slots._value
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # Imported here: multiprocessing costs ~30 ms at import,
+                    # which a cold start should not pay before it is needed.
+                    import multiprocessing
+                    from concurrent.futures import ProcessPoolExecutor
+
+                    # spawn, not fork: the API process is multi-threaded
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+    def _admit(self, timeout: Optional[float]) -> None:
+        wait = self.admission_timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=wait):
+            self.rejected += 1
+            raise PoolBusy(self.name)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, admission_timeout: Optional[float] = None) -> Future:
+        """Queue ``fn(*args)``; the slot is given back when the job finishes."""
+        self._admit(admission_timeout)
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """Run ``fn(*args)`` in the pool and block the calling thread for the result."""
+        return self.submit(fn, *args).result(timeout)
+
+    def warm_up(self) -> None:
+        """Start the worker processes ahead of the first real job."""
+        executor = self._get_executor()
+        for f in [executor.submit(int) for _ in range(self.max_workers)]:
+            f.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -76,7 +76,8 @@ export const EventsProvider: React.FC<{ children: React.ReactNode }> = ({ childr
         rsvpRequired: evt.rsvpRequired,
         isPrivate: evt.eventAccess === 'Private',
         creatorID: evt.creatorID,
-        imageUrl: evt.imageUrl ?? undefined,
+        // The API returns its image route (/events/{id}/image?v=...), relative to itself
+        imageUrl: evt.imageUrl ? (evt.imageUrl.startsWith('/') ? `${API_BASE_URL}${evt.imageUrl}` : evt.imageUrl) : undefined,
       }));
 
       setEvents(mapped);